@@ -23,3 +23,4 @@ from .ssm import *
 from .covariances import *
 from .output import *
 from .tests import *
+from .backtesting import backtest
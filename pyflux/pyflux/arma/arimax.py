@@ -13,6 +13,7 @@ from .. import output as op
 from .. import tests as tst
 from .. import tsm as tsm
 from .. import data_check as dc
+from .. import forecasting as fc
 
 from .arma_recursions import arimax_recursion
 
@@ -233,7 +234,7 @@ class ARIMAX(tsm.TSM):
         Y = self.y[self.max_lag:]
 
         # Transform latent variables
-        z = np.array([self.latent_variables.z_list[k].prior.transform(beta[k]) for k in range(beta.shape[0])])
+        z = self.latent_variables.transform_all(beta)
 
         # Constant and AR terms
         if self.ar == 0:
@@ -276,7 +277,7 @@ class ARIMAX(tsm.TSM):
         Y = self.y[self.max_lag:]
 
         # Transform latent variables
-        z = np.array([self.latent_variables.z_list[k].prior.transform(beta[k]) for k in range(beta.shape[0])])
+        z = self.latent_variables.transform_all(beta)
 
         # Constant and AR terms
         if self.ar == 0:
@@ -334,7 +335,7 @@ class ARIMAX(tsm.TSM):
             ar_matrix = np.zeros(data.shape[0]-self.max_lag)
 
         # Transform latent variables
-        z = np.array([self.latent_variables.z_list[k].prior.transform(beta[k]) for k in range(beta.shape[0])])
+        z = self.latent_variables.transform_all(beta)
 
         # Constant and AR terms
         if self.ar == 0:
@@ -392,7 +393,7 @@ class ARIMAX(tsm.TSM):
             ar_matrix = np.zeros(data.shape[0]-self.max_lag)
 
         # Transform latent variables
-        z = np.array([self.latent_variables.z_list[k].prior.transform(beta[k]) for k in range(beta.shape[0])])
+        z = self.latent_variables.transform_all(beta)
 
         # Constant and AR terms
         if self.ar == 0:
@@ -567,7 +568,7 @@ class ARIMAX(tsm.TSM):
 
             t_z = self.draw_latent_variables(nsims=1).T[0]
             mu, Y = self._model(t_z)  
-            t_z = np.array([self.latent_variables.z_list[k].prior.transform(t_z[k]) for k in range(t_z.shape[0])])
+            t_z = self.latent_variables.transform_all(t_z)
 
             model_scale, model_shape, model_skewness = self._get_scale_and_shape(t_z)
 
@@ -627,11 +628,9 @@ class ARIMAX(tsm.TSM):
             How many past observations to include in the forecast plot
         """         
 
-        error_bars = []
-        for pre in range(5,100,5):
-            error_bars.append(np.insert([np.percentile(i,pre) for i in sim_vector], 0, mean_values[-h-1]))
+        error_bars = fc.error_bars(sim_vector, mean_values[-h-1])
         if self.latent_variables.estimation_method in ['M-H']:
-            forecasted_values = np.insert([np.mean(i) for i in sim_vector], 0, mean_values[-h-1])
+            forecasted_values = np.insert(sim_vector.mean(axis=1), 0, mean_values[-h-1])
         else:
             forecasted_values = mean_values[-h-1:]
         plot_values = mean_values[-h-past_values:]
@@ -686,7 +685,7 @@ class ARIMAX(tsm.TSM):
         """     
 
         mu, Y = self._model(beta)
-        transformed_parameters = np.array([self.latent_variables.z_list[k].prior.transform(beta[k]) for k in range(beta.shape[0])])
+        transformed_parameters = self.latent_variables.transform_all(beta)
         model_scale, model_shape, model_skewness = self._get_scale_and_shape(transformed_parameters)
         return self.family.neg_loglikelihood(Y, self.link(mu), model_scale, model_shape, model_skewness)
 
@@ -706,7 +705,7 @@ class ARIMAX(tsm.TSM):
         The negative logliklihood of the model
         """     
         mu, Y = self._mb_model(beta, mini_batch)
-        transformed_parameters = np.array([self.latent_variables.z_list[k].prior.transform(beta[k]) for k in range(beta.shape[0])])
+        transformed_parameters = self.latent_variables.transform_all(beta)
         model_scale, model_shape, model_skewness = self._get_scale_and_shape(transformed_parameters)
         return self.family.neg_loglikelihood(Y, self.link(mu), model_scale, model_shape, model_skewness)
 
@@ -783,12 +782,9 @@ class ARIMAX(tsm.TSM):
 
             if self.latent_variables.estimation_method in ['M-H']:
                 sim_vector = self._sim_prediction_bayes(h, X_pred, 15000)
-                error_bars = []
+                error_bars = fc.error_bars(sim_vector, Y[-1])
 
-                for pre in range(5,100,5):
-                    error_bars.append(np.insert([np.percentile(i,pre) for i in sim_vector], 0, Y[-1]))
-
-                forecasted_values = np.insert([np.mean(i) for i in sim_vector], 0, Y[-1])
+                forecasted_values = np.insert(sim_vector.mean(axis=1), 0, Y[-1])
                 plot_values = np.append(Y[-1-past_values:-2], forecasted_values)
                 plot_index = date_index[-h-past_values:]
 
@@ -905,7 +901,7 @@ class ARIMAX(tsm.TSM):
         plt.legend(loc=2)   
         plt.show()          
 
-    def predict(self, h=5, oos_data=None, intervals=False):
+    def predict(self, h=5, oos_data=None, intervals=False, percentiles=None):
         """ Makes forecast with the estimated model
 
         Parameters
@@ -919,6 +915,9 @@ class ARIMAX(tsm.TSM):
         intervals : boolean (default: False)
             Whether to return prediction intervals
 
+        percentiles : list (default: [1, 5, 95, 99])
+            Percentiles of the prediction intervals, in percent (e.g. [0.5, 2.5] for VaR)
+
         Returns
         ----------
         - pd.DataFrame with predicted values
@@ -940,13 +939,9 @@ class ARIMAX(tsm.TSM):
             date_index = self.shift_dates(h)
 
             if self.latent_variables.estimation_method in ['M-H']:
-                sim_vector = self._sim_prediction_bayes(h, X_pred, 15000)
+                sim_values = self._sim_prediction_bayes(h, X_pred, 15000)
 
-                forecasted_values = np.array([np.mean(i) for i in sim_vector])
-                prediction_01 = np.array([np.percentile(i, 1) for i in sim_vector])
-                prediction_05 = np.array([np.percentile(i, 5) for i in sim_vector])
-                prediction_95 = np.array([np.percentile(i, 95) for i in sim_vector])
-                prediction_99 = np.array([np.percentile(i, 99) for i in sim_vector])
+                forecasted_values = sim_values.mean(axis=1)
 
             else:
                 t_z = self.transform_z()
@@ -959,10 +954,6 @@ class ARIMAX(tsm.TSM):
                 else:
                     forecasted_values = mean_values[-h:] 
 
-                if intervals is True:
-                    sim_values = self._sim_prediction(mu, Y, h, t_z, X_pred, 15000)
-                else:
-                    sim_values = self._sim_prediction(mu, Y, h, t_z, X_pred, 2)
 
             if intervals is False:
                 result = pd.DataFrame(forecasted_values)
@@ -971,16 +962,8 @@ class ARIMAX(tsm.TSM):
                 # Get mean prediction and simulations (for errors)
                 if self.latent_variables.estimation_method not in ['M-H']:
                     sim_values = self._sim_prediction(mu, Y, h, t_z, X_pred, 15000)
-                    prediction_01 = np.array([np.percentile(i, 1) for i in sim_values])
-                    prediction_05 = np.array([np.percentile(i, 5) for i in sim_values])
-                    prediction_95 = np.array([np.percentile(i, 95) for i in sim_values])
-                    prediction_99 = np.array([np.percentile(i, 99) for i in sim_values])
-
-                result = pd.DataFrame([forecasted_values, prediction_01, prediction_05, 
-                    prediction_95, prediction_99]).T
-                result.rename(columns={0:self.data_name, 1: "1% Prediction Interval", 
-                    2: "5% Prediction Interval", 3: "95% Prediction Interval", 4: "99% Prediction Interval"}, 
-                    inplace=True)
+
+                result = fc.interval_frame(forecasted_values, sim_values, self.data_name, percentiles)
  
             result.index = date_index[-h:]
 
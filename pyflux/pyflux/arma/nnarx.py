@@ -12,6 +12,7 @@ from .. import output as op
 from .. import tests as tst
 from .. import tsm as tsm
 from .. import data_check as dc
+from .. import forecasting as fc
 
 from .nn_architecture import neural_network_tanh, neural_network_tanh_mb
 
@@ -235,7 +236,7 @@ class NNARX(tsm.TSM):
         Y = np.array(self.data[self.max_lag:])
 
         # Transform latent variables
-        z = np.array([self.latent_variables.z_list[k].prior.transform(beta[k]) for k in range(beta.shape[0])])
+        z = self.latent_variables.transform_all(beta)
 
         return neural_network_tanh(Y, self.X, z, self.units, self.layers, self.ar+len(self.X_names)), Y
 
@@ -267,7 +268,7 @@ class NNARX(tsm.TSM):
         X = self.X[:, sample]
 
         # Transform latent variables
-        z = np.array([self.latent_variables.z_list[k].prior.transform(beta[k]) for k in range(beta.shape[0])])
+        z = self.latent_variables.transform_all(beta)
 
         return neural_network_tanh_mb(Y, X, z, self.units, self.layers, self.ar+len(self.X_names)), Y
 
@@ -419,9 +420,7 @@ class NNARX(tsm.TSM):
             Would you like to show prediction intervals for the forecast?
         """         
 
-        error_bars = []
-        for pre in range(5,100,5):
-            error_bars.append(np.insert([np.percentile(i,pre) for i in sim_vector] - mean_values[-h:],0,0))
+        error_bars = fc.error_bars(sim_vector, 0.0) - np.insert(mean_values[-h:], 0, 0.0)
         forecasted_values = mean_values[-h-1:]
         plot_values = mean_values[-h-past_values:]
         plot_index = date_index[-h-past_values:]
@@ -441,7 +440,7 @@ class NNARX(tsm.TSM):
         """     
 
         mu, Y = self._model(beta)
-        parm = np.array([self.latent_variables.z_list[k].prior.transform(beta[k]) for k in range(beta.shape[0])])
+        parm = self.latent_variables.transform_all(beta)
         #TODO: Replace above with transformation that only acts on scale, shape, skewness in future (speed-up)
         model_scale, model_shape, model_skewness = self._get_scale_and_shape(parm)
         return self.family.neg_loglikelihood(Y, self.link(mu), model_scale, model_shape, model_skewness)
@@ -463,7 +462,7 @@ class NNARX(tsm.TSM):
         """     
 
         mu, Y = self._mb_model(beta, mini_batch)
-        parm = np.array([self.latent_variables.z_list[k].prior.transform(beta[k]) for k in range(beta.shape[0])])
+        parm = self.latent_variables.transform_all(beta)
         #TODO: Replace above with transformation that only acts on scale, shape, skewness in future (speed-up)
         model_scale, model_shape, model_skewness = self._get_scale_and_shape(parm)
         return self.family.neg_loglikelihood(Y, self.link(mu), model_scale, model_shape, model_skewness)
@@ -634,7 +633,7 @@ class NNARX(tsm.TSM):
         plt.legend(loc=2)   
         plt.show()          
 
-    def predict(self, h=5, intervals=False):
+    def predict(self, h=5, intervals=False, percentiles=None):
         """ Makes forecast with the estimated model
 
         Parameters
@@ -645,6 +644,9 @@ class NNARX(tsm.TSM):
         intervals : boolean (default: False)
             Whether to return prediction intervals
 
+        percentiles : list (default: [1, 5, 95, 99])
+            Percentiles of the prediction intervals, in percent (e.g. [0.5, 2.5] for VaR)
+
         Returns
         ----------
         - pd.DataFrame with predicted values
@@ -658,21 +660,13 @@ class NNARX(tsm.TSM):
             date_index = self.shift_dates(h)
 
             if self.latent_variables.estimation_method in ['M-H']:
-                sim_vector = self._sim_prediction_bayes(h, 15000)
+                sim_values = self._sim_prediction_bayes(h, 15000)
 
-                forecasted_values = np.array([np.mean(i) for i in sim_vector])
-                prediction_01 = np.array([np.percentile(i, 1) for i in sim_vector])
-                prediction_05 = np.array([np.percentile(i, 5) for i in sim_vector])
-                prediction_95 = np.array([np.percentile(i, 95) for i in sim_vector])
-                prediction_99 = np.array([np.percentile(i, 99) for i in sim_vector])
+                forecasted_values = sim_values.mean(axis=1)
 
             else:
                 t_z = self.transform_z()
                 mean_values = self._mean_prediction(mu, Y, h, t_z)
-                if intervals is True:
-                    sim_values = self._sim_prediction(mu, Y, h, t_z, 15000)
-                else:
-                    sim_values = self._sim_prediction(mu, Y, h, t_z, 2)
 
                 if self.model_name2 == "Skewt":
                     model_scale, model_shape, model_skewness = self._get_scale_and_shape(t_z)
@@ -688,16 +682,8 @@ class NNARX(tsm.TSM):
                 # Get mean prediction and simulations (for errors)
                 if self.latent_variables.estimation_method not in ['M-H']:
                     sim_values = self._sim_prediction(mu, Y, h, t_z, 15000)
-                    prediction_01 = np.array([np.percentile(i, 1) for i in sim_values])
-                    prediction_05 = np.array([np.percentile(i, 5) for i in sim_values])
-                    prediction_95 = np.array([np.percentile(i, 95) for i in sim_values])
-                    prediction_99 = np.array([np.percentile(i, 99) for i in sim_values])
-
-                result = pd.DataFrame([forecasted_values, prediction_01, prediction_05, 
-                    prediction_95, prediction_99]).T
-                result.rename(columns={0:self.data_name, 1: "1% Prediction Interval", 
-                    2: "5% Prediction Interval", 3: "95% Prediction Interval", 4: "99% Prediction Interval"}, 
-                    inplace=True)
+
+                result = fc.interval_frame(forecasted_values, sim_values, self.data_name, percentiles)
  
             result.index = date_index[-h:]
 
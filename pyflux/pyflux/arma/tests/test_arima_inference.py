@@ -46,6 +46,28 @@ def test_bbvi_mini_batch_elbo():
     x = model.fit('BBVI',iterations=100, quiet_progress=True, mini_batch=32, record_elbo=True)
     assert(x.elbo_records[-1]>x.elbo_records[0])
 
+def test_bbvi_elbo_every():
+    """
+    Tests that the ELBO can be recorded every k iterations
+    """
+    model = ARIMA(data=data, ar=1, ma=1)
+    x = model.fit('BBVI',iterations=100, quiet_progress=True, record_elbo=True, elbo_every=10)
+    assert(len(x.elbo_records) == 10)
+    x = model.fit('BBVI',iterations=100, quiet_progress=True, mini_batch=32, record_elbo=True, elbo_every=30)
+    assert(len(x.elbo_records) == 4)
+
+def test_bbvi_reparameterize_needs_gradient():
+    """
+    Tests that reparameterization gradients are refused for a model without an analytic likelihood gradient
+    """
+    model = ARIMA(data=data, ar=1, ma=1)
+    try:
+        model.fit('BBVI', iterations=100, quiet_progress=True, reparameterize=True)
+        raised = False
+    except Exception:
+        raised = True
+    assert(raised)
+
 def test_mh():
     """
     Tests an ARIMA model estimated with Metropolis-Hastings and that the length of the 
@@ -57,6 +79,131 @@ def test_mh():
     lvs = np.array([i.value for i in model.latent_variables.z_list])
     assert(len(lvs[np.isnan(lvs)]) == 0)
 
+def test_mh_chains():
+    """
+    Tests an ARIMA model estimated with several Metropolis-Hastings chains in parallel, and that
+    the chains are stacked and come with an R-hat and effective sample size per latent variable
+    """
+    model = ARIMA(data=data, ar=1, ma=1)
+    x = model.fit('M-H', nsims=200, quiet_progress=True, chains=3, processes=2)
+    assert(x.samples.shape == (4, 600))
+    assert(x.rhat.shape == (4,))
+    assert(x.ess.shape == (4,))
+    assert(np.all(x.ess > 0))
+    lvs = np.array([i.value for i in model.latent_variables.z_list])
+    assert(len(lvs[np.isnan(lvs)]) == 0)
+
+def test_chain_diagnostics():
+    """
+    Tests that independent draws have an R-hat close to one and an effective sample size
+    close to the number of draws, and that a sticky chain has far fewer effective draws
+    """
+    from pyflux.inference import split_rhat, effective_sample_size
+    draws = np.random.normal(0, 1, (4, 1000, 2))
+    assert(np.all(np.abs(split_rhat(draws) - 1.0) < 0.02))
+    assert(np.all(effective_sample_size(draws) > 2500))
+
+    sticky = np.repeat(draws, 20, axis=1)[:, :1000]
+    assert(np.all(effective_sample_size(sticky) < 500))
+
+def test_mh_adaptive():
+    """
+    Tests an ARIMA model estimated with adaptive Metropolis, and that the latent variables are not nan
+    """
+    model = ARIMA(data=data, ar=1, ma=1)
+    x = model.fit('M-H', nsims=200, quiet_progress=True, adaptive=True)
+    assert(x.samples.shape == (4, 200))
+    lvs = np.array([i.value for i in model.latent_variables.z_list])
+    assert(len(lvs[np.isnan(lvs)]) == 0)
+
+def test_mh_target_ess():
+    """
+    Tests that adaptive Metropolis stops early once the requested effective sample size is reached
+    """
+    from pyflux.inference import MetropolisHastings
+    cov = np.array([[1.0, 0.9], [0.9, 1.0]])
+    precision = np.linalg.inv(cov)
+    posterior = lambda z: 0.5*np.dot(z, np.dot(precision, z))
+    sampler = MetropolisHastings(posterior, 2.38/np.sqrt(2), 10000, np.ones(2), 
+        cov_matrix=np.identity(2), quiet_progress=True, adaptive=True, target_ess=200)
+    chain = sampler.sample()[0]
+    assert(chain.shape[1] < 10000)
+    assert(np.all(sampler.ess >= 200))
+
+def test_mh_chain_file():
+    """
+    Tests that Metropolis-Hastings chains kept in a memory-mapped file match the same chains kept in memory
+    """
+    import os, tempfile
+    chain_file = os.path.join(tempfile.mkdtemp(), 'chain.dat')
+    for options in [{}, {'chains': 2, 'processes': 1}]:
+        np.random.seed(10)
+        x = ARIMA(data=data, ar=1, ma=1).fit('M-H', nsims=200, quiet_progress=True, **options)
+        np.random.seed(10)
+        y = ARIMA(data=data, ar=1, ma=1).fit('M-H', nsims=200, quiet_progress=True, chain_file=chain_file, **options)
+        assert(isinstance(y.samples, np.memmap))
+        assert(np.array_equal(x.samples, y.samples))
+
+def test_update_moments():
+    """
+    Tests that recursively updated moments match the mean and covariance of all the draws
+    """
+    from pyflux.inference.metropolis_hastings import update_moments
+    draws = np.random.normal(0, 1, (300, 3))
+    count, mean, scatter = 1, draws[0], np.zeros((3, 3))
+    for block in range(1, 300, 50):
+        count, mean, scatter = update_moments(count, mean, scatter, draws[block:block+50])
+    assert(count == 300)
+    assert(np.allclose(mean, np.mean(draws, axis=0)))
+    assert(np.allclose(scatter/(count-1), np.cov(draws.T)))
+
+def test_vi_scores():
+    """
+    Tests that the batched scores of Normal approximations match the score of each one in turn
+    """
+    from pyflux.families import Normal
+    q = [Normal(0.5, 2.0), Normal(-1.0, 0.3), Normal(0.0, 1.0)]
+    z = np.random.normal(0, 1, (3, 20))
+    scores = Normal.vi_scores(z, np.array([i.mu0 for i in q]), np.array([i.sigma0 for i in q]))
+    assert(scores.shape == (6, 20))
+    for k in range(3):
+        assert(np.allclose(scores[2*k], q[k].vi_score(z[k], 0)))
+        assert(np.allclose(scores[2*k+1], q[k].vi_score(z[k], 1)))
+
+def test_alpha_recursion():
+    """
+    Tests that the control variate coefficients are the covariances of matching rows
+    """
+    from pyflux.inference.bbvi_routines import alpha_recursion
+    grad_log_q = np.random.normal(0, 1, (5, 30))
+    gradient = grad_log_q*np.random.normal(2, 1, (5, 30))
+    alpha = alpha_recursion(np.zeros(5), grad_log_q, gradient, 5)
+    assert(np.allclose(alpha, [np.cov(grad_log_q[i], gradient[i])[0][1] for i in range(5)]))
+
+def test_optimizers_in_place():
+    """
+    Tests that the in-place optimizer updates match the out-of-place formulas
+    """
+    from pyflux.inference.stoch_optim import RMSProp, ADAM
+    start, variance = np.random.normal(0, 1, 4), np.ones(4)
+    start_copy = start.copy()
+    rmsprop = RMSProp(start, variance, 0.01, 0.99)
+    adam = ADAM(start, variance, 0.01, 0.9, 0.999)
+    parameters_1, variance_1 = start.copy(), variance.copy()
+    parameters_2, variance_2, f_gradient = start.copy(), variance.copy(), np.zeros(4)
+    for t in range(1, 11):
+        gradient = np.random.normal(0, 1, 4)
+        variance_1 = 0.99*variance_1 + 0.01*np.power(gradient,2)
+        f_gradient = 0.9*f_gradient + 0.1*gradient
+        variance_2 = 0.999*variance_2 + 0.001*np.power(gradient,2)
+        if t > 5:
+            step = 0.01 + 0.01*15.0*(0.990**t)
+            parameters_1 = parameters_1 + step*(gradient/np.sqrt(variance_1+np.power(10.0,-8)))
+            parameters_2 = parameters_2 + step*((f_gradient/(1-np.power(0.9,t)))/(np.sqrt(variance_2/(1-np.power(0.999,t)))+np.power(10.0,-8)))
+        assert(np.allclose(rmsprop.update(gradient), parameters_1))
+        assert(np.allclose(adam.update(gradient), parameters_2))
+    assert(np.array_equal(start, start_copy))
+
 def test_laplace():
     """
     Tests an ARIMA model estimated with Laplace approximation and that the length of the 
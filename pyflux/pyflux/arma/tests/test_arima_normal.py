@@ -108,6 +108,17 @@ def test_predict_intervals():
     assert(np.all(predictions[model.data_name].values > predictions['5% Prediction Interval'].values))
     assert(np.all(predictions['5% Prediction Interval'].values > predictions['1% Prediction Interval'].values))
 
+def test_predict_custom_percentiles():
+    """
+    Tests that custom percentiles give one ordered prediction interval column each
+    """
+    model = ARIMA(data=data, ar=2, ma=2)
+    x = model.fit()
+    predictions = model.predict(h=10, intervals=True, percentiles=[0.5, 2.5])
+
+    assert(list(predictions.columns) == [model.data_name, '0.5% Prediction Interval', '2.5% Prediction Interval'])
+    assert(np.all(predictions['2.5% Prediction Interval'].values > predictions['0.5% Prediction Interval'].values))
+
 def test_predict_is_intervals():
     """
     Tests prediction intervals are ordered correctly
@@ -188,3 +199,74 @@ def test_ppc():
     x = model.fit('BBVI', iterations=100, quiet_progress=True)
     p_value = model.ppc()
     assert(0.0 <= p_value <= 1.0)
+
+def test_backtest_parallel():
+    """
+    Tests that a parallel backtest gives one forecast and loss per window,
+    and matches a backtest run in a single process with the same seed
+    """
+    from pyflux.backtesting import backtest
+    serial = backtest(ARIMA, data, 4, model_args={'ar': 1, 'ma': 0}, processes=1, seed=10)
+    parallel = backtest(ARIMA, data, 4, model_args={'ar': 1, 'ma': 0}, processes=2, seed=10)
+
+    assert(serial.shape == (4, 3))
+    assert(list(serial.index) == [96, 97, 98, 99])
+    assert(np.allclose(serial['Loss'].values, np.power(serial['Series'].values-serial['Forecast'].values, 2)))
+    assert(np.allclose(serial.values, parallel.values))
+
+def test_backtest_rolling_windows():
+    """
+    Tests that rolling windows forecast the observation that follows each window
+    """
+    from pyflux.backtesting import backtest
+    results = backtest(ARIMA, data, [(0, 50), (20, 70)], model_args={'ar': 1, 'ma': 0}, processes=1)
+
+    assert(list(results.index) == [50, 70])
+    assert(np.allclose(results['Series'].values, data[[50, 70]]))
+
+def absolute_change(model, value):
+    return np.abs(value - model.data[-1])
+
+def test_backtest_actual():
+    """
+    Tests that forecasts are scored against the values given by an actual function
+    """
+    from pyflux.backtesting import backtest
+    results = backtest(ARIMA, data, [(0, 50), (20, 70)], model_args={'ar': 1, 'ma': 0},
+        actual=absolute_change, processes=2, seed=1)
+
+    assert(np.allclose(results['Series'].values, np.abs(data[[50, 70]] - data[[49, 69]])))
+    assert(np.allclose(results['Loss'].values, np.power(results['Series'].values-results['Forecast'].values, 2)))
+
+def test_transform_all():
+    """
+    Tests that the grouped transforms and prior log-densities of the latent variables
+    match transforming and evaluating them one at a time
+    """
+    from pyflux.families import Normal, Laplace
+    model = ARIMA(data=data, ar=2, ma=2)
+    model.adjust_prior(0, Normal(0, 2, transform='tanh'))
+    model.adjust_prior(1, Laplace(0, 1))
+    z = np.random.normal(0, 1, (3, len(model.latent_variables.z_list)))
+    lvs = model.latent_variables.z_list
+
+    assert(np.allclose(model.latent_variables.transform_all(z[0]), [lvs[k].prior.transform(z[0][k]) for k in range(z.shape[1])]))
+    assert(np.allclose(model.latent_variables.transform_all(z), np.array([[lvs[k].prior.transform(row[k]) for k in range(z.shape[1])] for row in z])))
+    assert(np.allclose(model.latent_variables.log_prior_all(z[0]), np.sum([lvs[k].prior.logpdf(z[0][k]) for k in range(z.shape[1])])))
+    assert(np.allclose(model.latent_variables.log_prior_all(z), [np.sum([lvs[k].prior.logpdf(row[k]) for k in range(z.shape[1])]) for row in z]))
+
+def test_transform_all_after_adjust_prior():
+    """
+    Tests that the grouped latent variables are cached between calls and rebuilt
+    after a prior is adjusted
+    """
+    from pyflux.families import Normal
+    model = ARIMA(data=data, ar=1, ma=0)
+    z = np.random.normal(0, 1, (3, len(model.latent_variables.z_list)))
+    lvs = model.latent_variables.z_list
+    model.latent_variables.log_prior_all(z)
+    assert(model.latent_variables._compile() is model.latent_variables._compile())
+
+    model.adjust_prior(0, Normal(5, 1, transform='exp'))
+    assert(np.allclose(model.latent_variables.transform_all(z), np.array([[lvs[k].prior.transform(row[k]) for k in range(z.shape[1])] for row in z])))
+    assert(np.allclose(model.latent_variables.log_prior_all(z), [np.sum([lvs[k].prior.logpdf(row[k]) for k in range(z.shape[1])]) for row in z]))
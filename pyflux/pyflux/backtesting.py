@@ -0,0 +1,187 @@
+import sys
+if sys.version_info < (3,):
+    range = xrange
+
+import multiprocessing
+
+import numpy as np
+import pandas as pd
+
+from . import data_check as dc
+
+def squared_error(forecast, actual):
+    """ Squared forecast error, the default backtest loss """
+    return np.power(actual-forecast,2)
+
+def _window_bounds(windows, window_length, data_length):
+    """ Turns a backtest window specification into (start, end) pairs
+
+    Parameters
+    ----------
+    windows : int or list
+        Number of final observations to forecast, or a list of (start, end) pairs
+
+    window_length : int
+        Length of rolling windows; if None, windows expand from the start of the data
+
+    data_length : int
+        Number of observations in the data
+
+    Returns
+    ----------
+    - list of (start, end) pairs; each model is fit on data[start:end] and forecasts data[end]
+    """
+
+    if isinstance(windows, int):
+        if windows < 1 or windows >= data_length:
+            raise ValueError("The number of backtest windows must be between 1 and the data length!")
+
+        ends = range(data_length-windows, data_length)
+
+        if window_length is None:
+            return [(0, end) for end in ends]
+        else:
+            return [(max(end-window_length, 0), end) for end in ends]
+    else:
+        bounds = [(int(start), int(end)) for start, end in windows]
+
+        for start, end in bounds:
+            if start < 0 or end <= start or end >= data_length:
+                raise ValueError("Each backtest window must satisfy 0 <= start < end < data length!")
+
+        return bounds
+
+def _fit_window(task):
+    """ Fits a model to one data window and makes a one-step ahead forecast
+
+    Parameters
+    ----------
+    task : tuple
+        (model_cls, window data, model keyword arguments, fit method, fit keyword arguments,
+        seed sequence, next observation, actual function)
+
+    Returns
+    ----------
+    - float, the one-step ahead forecast
+    - float, the value the forecast is scored against
+    """
+
+    model_cls, window_data, model_args, fit_method, fit_kwargs, seed, value, actual = task
+
+    np.random.seed(seed.generate_state(4))
+
+    model = model_cls(data=window_data, **model_args)
+    model.fit(method=fit_method, **fit_kwargs)
+
+    if actual is not None:
+        target = actual(model, value)
+    elif hasattr(model, '_backtest_actual'):
+        target = model._backtest_actual(value)
+    else:
+        target = value
+
+    return model.predict(1).values[0][0], target
+
+def backtest(model_cls, data, windows, model_args=None, fit_method='MLE', target=None, window_length=None,
+    loss=squared_error, actual=None, processes=None, seed=None, **kwargs):
+    """ Refits a model on many data windows in parallel and scores its one-step ahead forecasts
+
+    The window refits are independent of each other, so they are spread over a process pool.
+    Every window gets its own random seed spawned from seed, which makes the results the same
+    whatever the number of processes.
+
+    Forecasts are scored against the observation that follows each window, unless the model
+    forecasts something else: volatility models score their forecasts against the demeaned
+    return (squared for GARCH variances, absolute for the EGARCH scales).
+
+    Parameters
+    ----------
+    model_cls : class
+        The model to backtest, e.g. pf.GARCH
+
+    data : pd.DataFrame or np.array
+        The time series data
+
+    windows : int or list
+        Number of final observations to forecast, or a list of (start, end) pairs
+        where the model is fit on data[start:end] and forecasts observation end
+
+    model_args : dict
+        (default: None) Keyword arguments for the model, e.g. {'p': 1, 'q': 1}
+
+    fit_method : str
+        (default: 'MLE') Which method to fit the model with
+
+    target : str or int
+        (default: None) Target column of the data
+
+    window_length : int
+        (default: None) Length of rolling windows when windows is an int; if None, windows expand
+
+    loss : function
+        (default: squared error) loss(forecasts, actuals) on np.arrays of forecasts and observations
+
+    actual : function
+        (default: None) actual(model, observation) gives the value a window's forecast is scored
+        against, from the fitted model and the next observation; if None, the model's own
+        scoring target is used (a module-level function, so it can be sent to the workers)
+
+    processes : int
+        (default: None) Number of worker processes; None uses every core and 1 runs in this process
+
+    seed : int
+        (default: None) Seed for the window seeds; the backtest is deterministic if given, and
+        the windows get fresh independent seeds otherwise
+
+    **kwargs
+        Passed on to the fit method of each model
+
+    Returns
+    ----------
+    - pd.DataFrame with the forecast, the value it is scored against and the loss for each window
+    """
+
+    if model_args is None:
+        model_args = {}
+    else:
+        model_args = dict(model_args)
+
+    if target is not None:
+        model_args['target'] = target
+
+    fit_kwargs = dict(kwargs)
+    fit_kwargs.setdefault('printer', False)
+
+    values, data_name, is_pandas, index = dc.data_check(data, target)
+    bounds = _window_bounds(windows, window_length, values.shape[0])
+
+    # Independent seeds for every window, so workers never share inherited random states
+    seeds = np.random.SeedSequence(seed).spawn(len(bounds))
+
+    tasks = []
+
+    for (start, end), window_seed in zip(bounds, seeds):
+        if is_pandas is True:
+            window_data = data.iloc[start:end]
+        else:
+            window_data = data[start:end]
+        tasks.append((model_cls, window_data, model_args, fit_method, fit_kwargs, window_seed, values[end], actual))
+
+    if processes == 1:
+        scored = [_fit_window(task) for task in tasks]
+    else:
+        pool = multiprocessing.Pool(processes)
+        try:
+            scored = pool.map(_fit_window, tasks)
+        finally:
+            pool.close()
+            pool.join()
+
+    forecasts = np.array([forecast for forecast, _ in scored])
+    actuals = np.array([target for _, target in scored])
+
+    results = pd.DataFrame({'Forecast': forecasts, data_name: actuals, 'Loss': loss(forecasts, actuals)},
+        columns=['Forecast', data_name, 'Loss'])
+    results.index = [index[end] for start, end in bounds]
+
+    return results
@@ -13,6 +13,7 @@ class Family(object):
         self.transform = self.transform_define(transform)
         self.itransform = self.itransform_define(transform)
         self.itransform_name = self.itransform_name_define(transform)
+        self.transform_derivative = self.transform_derivative_define(transform)
 
     @staticmethod
     def ilogit(x):
@@ -38,6 +39,22 @@ class Family(object):
         else:
             return None
 
+    @staticmethod
+    def transform_derivative_define(transform):
+        """
+        This function links the user's choice of transformation with the derivative of the transformation
+        """
+        if transform == 'tanh':
+            return lambda x: 1.0 - np.power(np.tanh(x),2)
+        elif transform == 'exp':
+            return np.exp
+        elif transform == 'logit':
+            return lambda x: Family.ilogit(x)*(1.0 - Family.ilogit(x))
+        elif transform is None:
+            return np.ones_like
+        else:
+            return None
+
     @staticmethod
     def itransform_define(transform):
         """
@@ -443,6 +443,31 @@ class Normal(Family):
         elif index == 1:
             return self.vi_scale_score(x)
 
+    @staticmethod
+    def vi_scores(x, mu0, sigma0):
+        """ The location and scale scores of many Normal approximations at once - used for variational inference
+
+        Parameters
+        ----------
+        x : np.array
+            (k, sims) random variables, one row per approximation
+
+        mu0 : np.array
+            (k,) locations of the approximations
+
+        sigma0 : np.array
+            (k,) scales of the approximations
+
+        Returns
+        ----------
+        (2k, sims) np.array of the location and scale scores, alternating for each approximation
+        """
+        standardized = (x-mu0[:, np.newaxis])/sigma0[:, np.newaxis]
+        scores = np.empty((2*x.shape[0], x.shape[1]))
+        scores[0::2] = standardized/sigma0[:, np.newaxis]
+        scores[1::2] = np.power(standardized, 2) - 1.0
+        return scores
+
 
     # Optional Cythonized recursions below for GAS Normal models
 
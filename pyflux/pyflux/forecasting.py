@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+
+ERROR_BAR_PERCENTILES = list(range(5, 100, 5))
+INTERVAL_PERCENTILES = [1, 5, 95, 99]
+
+def simulation_percentiles(sim_vector, percentiles):
+    """ Percentiles of simulated forecasts for every step of the horizon at once
+
+    Parameters
+    ----------
+    sim_vector : np.array
+        (h, simulations) matrix of simulated forecasts
+
+    percentiles : list
+        Percentiles to compute, in percent (e.g. [0.5, 2.5])
+
+    Returns
+    ----------
+    (len(percentiles), h) np.array
+    """
+    return np.percentile(sim_vector, percentiles, axis=1)
+
+def error_bars(sim_vector, start, percentiles=ERROR_BAR_PERCENTILES):
+    """ Percentile paths of simulated forecasts for plotting
+
+    Parameters
+    ----------
+    sim_vector : np.array
+        (h, simulations) matrix of simulated forecasts
+
+    start : float
+        The last in-sample value, which starts every path
+
+    percentiles : list
+        (default: 5, 10, ..., 95) Percentiles to compute, in percent
+
+    Returns
+    ----------
+    (len(percentiles), h+1) np.array, one path per percentile
+    """
+    return np.insert(simulation_percentiles(sim_vector, percentiles), 0, start, axis=1)
+
+def interval_names(percentiles):
+    """ Column names for prediction intervals, e.g. '2.5% Prediction Interval' """
+    return ['%g%% Prediction Interval' % pre for pre in percentiles]
+
+def interval_frame(forecasted_values, sim_vector, data_name, percentiles=None):
+    """ Tabulates a point forecast with prediction intervals from simulated forecasts
+
+    Parameters
+    ----------
+    forecasted_values : np.array
+        h-length vector of point forecasts
+
+    sim_vector : np.array
+        (h, simulations) matrix of simulated forecasts
+
+    data_name : str
+        Name of the point forecast column
+
+    percentiles : list
+        (default: [1, 5, 95, 99]) Percentiles to report, in percent
+
+    Returns
+    ----------
+    - pd.DataFrame with the point forecast followed by one column per percentile
+    """
+
+    if percentiles is None:
+        percentiles = INTERVAL_PERCENTILES
+
+    values = np.vstack([forecasted_values, simulation_percentiles(sim_vector, percentiles)]).T
+    return pd.DataFrame(values, columns=[data_name] + interval_names(percentiles))
@@ -7,3 +7,5 @@ from .egarchmreg import EGARCHMReg
 
 from .segarch import SEGARCH
 from .segarchm import SEGARCHM
+
+from .dcc import DCC
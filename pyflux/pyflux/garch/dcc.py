@@ -0,0 +1,355 @@
+import sys
+if sys.version_info < (3,):
+    range = xrange
+
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy import optimize
+from scipy.linalg import block_diag
+import numdifftools as nd
+
+from .. import families as fam
+from .. import tsm as tsm
+from .. import data_check as dc
+from ..results import MLEResults
+from ..hessians import central_difference_hessian
+
+from .garch import GARCH
+from .dcc_recursions import dcc_loglik, dcc_correlations
+
+def _fit_garch_column(args):
+    """ Fits a univariate GARCH model to one column of a shared-memory return matrix
+
+    Module level so that it can be sent to a process pool.
+
+    Parameters
+    ----------
+    args : tuple
+        (shared memory name, matrix shape, column, p, q, fit keyword arguments)
+
+    Returns
+    ----------
+    Optimizer results and inverse Hessian for the column
+    """
+    from multiprocessing import shared_memory
+
+    name, shape, column, p, q, kwargs = args
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        data = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)[:,column].copy()
+    finally:
+        shm.close()
+
+    x = GARCH(data=data, p=p, q=q).fit('MLE', **kwargs)
+    return x.results, x.ihessian
+
+class DCC(tsm.TSM):
+    """ Inherits time series methods from TSM class.
+
+    **** DYNAMIC CONDITIONAL CORRELATION (DCC-GARCH) MODELS ****
+
+    Each column follows a univariate GARCH(p,q) model and the standardized
+    residuals follow a DCC(1,1) correlation recursion. Estimation is two-step:
+    the univariate models are fitted first, then the correlation parameters.
+
+    Parameters
+    ----------
+    data : pd.DataFrame or np.array
+        Field to specify the time series data that will be used, one column per series.
+
+    p : int
+        Field to specify how many GARCH terms each univariate model will have.
+
+    q : int
+        Field to specify how many ARCH terms each univariate model will have.
+    """
+
+    def __init__(self, data, p=1, q=1):
+
+        # Initialize TSM object
+        super(DCC,self).__init__('DCC')
+
+        # Latent Variables
+        self.p = p
+        self.q = q
+        self.max_lag = max(self.p,self.q)
+        self.model_name = "DCC-GARCH(" + str(self.p) + "," + str(self.q) + ")"
+        self._z_hide = 0 # Whether to cutoff variance latent variables from results
+        self.supported_methods = ["MLE"]
+        self.default_method = "MLE"
+        self.multivariate_model = True
+
+        # Format the data
+        self.data, self.data_name, self.is_pandas, self.index = dc.mv_data_check(data,None)
+        self.data = np.asarray(self.data, dtype=np.float64)
+        self.data_name = [str(name) for name in self.data_name]
+        if self.is_pandas is False:
+            self.index = list(range(self.data.shape[0]))
+        self.data_length = self.data.shape[0]
+        self.ylen = self.data.shape[1]
+
+        self.univariate_models = [GARCH(data=self.data[:,i], p=self.p, q=self.q) for i in range(self.ylen)]
+        self._univariate_z_no = self.p + self.q + 2
+        self.z_no = self.ylen*self._univariate_z_no + 2
+        self._create_latent_variables()
+
+    def _create_latent_variables(self):
+        """ Creates model latent variables
+
+        The univariate GARCH latent variables come first, one block per series,
+        followed by the DCC correlation parameters.
+
+        Returns
+        ----------
+        None (changes model attributes)
+        """
+
+        for i, model in enumerate(self.univariate_models):
+            for z in model.latent_variables.z_list:
+                self.latent_variables.add_z(self.data_name[i] + ' ' + z.name, z.prior, z.q)
+                self.latent_variables.z_list[-1].start = z.start
+
+        self.latent_variables.add_z('DCC Alpha', fam.Normal(0,0.5,transform='logit'), fam.Normal(0,3))
+        self.latent_variables.z_list[-1].start = -3.00
+        self.latent_variables.add_z('DCC Beta', fam.Normal(0,0.5,transform='logit'), fam.Normal(0,3))
+        self.latent_variables.z_list[-1].start = 2.50
+
+    def _univariate_slice(self, i):
+        """ Position of the i-th univariate block in the latent variable vector """
+        return slice(i*self._univariate_z_no, (i+1)*self._univariate_z_no)
+
+    def _model(self, beta):
+        """ Creates the structure of the model
+
+        Parameters
+        ----------
+        beta : np.array
+            Contains untransformed starting values for latent variables
+
+        Returns
+        ----------
+        sigma2 : np.array
+            (T, N) array of conditional variances
+
+        Y : np.array
+            (T, N) length-adjusted data (accounting for lags)
+
+        Z : np.array
+            (T, N) array of standardized residuals
+        """
+
+        Y = self.data[self.max_lag:]
+        sigma2 = np.empty(Y.shape)
+        mu = np.empty(self.ylen)
+
+        for i, model in enumerate(self.univariate_models):
+            block = beta[self._univariate_slice(i)]
+            sigma2[:,i] = model._model(block)[0]
+            mu[i] = model.latent_variables.z_list[-1].prior.transform(block[-1])
+
+        Z = np.ascontiguousarray((Y-mu)/np.sqrt(sigma2))
+
+        return sigma2, Y, Z
+
+    @staticmethod
+    def _unconditional_covariance(Z):
+        """ Qbar target of the DCC recursion """
+        return np.ascontiguousarray(np.dot(Z.T, Z)/Z.shape[0])
+
+    def _dcc_parameters(self, beta):
+        """ Transformed DCC alpha and beta from untransformed latent variables """
+        return (self.latent_variables.z_list[-2].prior.transform(beta[-2]),
+            self.latent_variables.z_list[-1].prior.transform(beta[-1]))
+
+    def _correlation_neg_loglik(self, dcc_beta, Z, Qbar):
+        """ Negative correlation component of the log-likelihood
+
+        Parameters
+        ----------
+        dcc_beta : np.array
+            Untransformed DCC alpha and beta
+
+        Z : np.array
+            (T, N) array of standardized residuals
+
+        Qbar : np.array
+            (N, N) unconditional covariance of the standardized residuals
+
+        Returns
+        ----------
+        The negative correlation loglikelihood
+        """
+
+        alpha, beta = self._dcc_parameters(dcc_beta)
+        if alpha + beta >= 1.0:
+            return np.inf
+        return -dcc_loglik(alpha, beta, Z, Qbar)
+
+    def neg_loglik(self, beta):
+        """ Creates the negative log-likelihood of the model
+
+        Parameters
+        ----------
+        beta : np.array
+            Contains untransformed starting values for latent variables
+
+        Returns
+        ----------
+        The negative logliklihood of the model
+        """
+
+        sigma2, Y, Z = self._model(beta)
+        volatility = 0.5*np.sum(np.log(2.0*np.pi*sigma2) + np.power(Z,2))
+        return volatility + self._correlation_neg_loglik(beta[-2:], Z, self._unconditional_covariance(Z))
+
+    def _fit_univariate(self, workers=None, **kwargs):
+        """ Fits the univariate GARCH stage for every series
+
+        Parameters
+        ----------
+        workers : int
+            (default: None) Number of processes to fit the series on. If None or 1,
+            the series are fitted serially in this process.
+
+        Returns
+        ----------
+        List of (optimizer results, inverse Hessian) pairs, one per series
+        """
+
+        if workers is None or workers <= 1:
+            fits = []
+            for model in self.univariate_models:
+                x = model.fit('MLE', **kwargs)
+                fits.append((x.results, x.ihessian))
+            return fits
+
+        from multiprocessing import shared_memory
+
+        # Workers read their column from shared memory instead of receiving a pickled copy
+        shm = shared_memory.SharedMemory(create=True, size=self.data.nbytes)
+        shared_data = np.ndarray(self.data.shape, dtype=np.float64, buffer=shm.buf)
+        try:
+            shared_data[:] = self.data
+            tasks = [(shm.name, self.data.shape, i, self.p, self.q, kwargs) for i in range(self.ylen)]
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                fits = list(executor.map(_fit_garch_column, tasks, chunksize=max(1, self.ylen//(4*workers))))
+        finally:
+            del shared_data
+            shm.close()
+            shm.unlink()
+
+        for model, (results, ihessian) in zip(self.univariate_models, fits):
+            ses = None if ihessian is None else np.power(np.abs(np.diag(ihessian)),0.5)
+            model.latent_variables.set_z_values(results.x,'MLE',ses,None)
+            model.latent_variables.estimation_method = 'MLE'
+
+        return fits
+
+    def fit(self, method=None, **kwargs):
+        """ Fits the model by two-step maximum likelihood
+
+        Parameters
+        ----------
+        method : str
+            A fitting method (only 'MLE' is supported)
+
+        workers : int
+            (default: None) Number of processes for the univariate stage; None or 1 fits serially
+
+        hessian : str or None
+            (default: 'auto') Hessian method for the univariate fits; the two DCC parameters
+            use central differences ('numdifftools' keeps the adaptive estimator). If None
+            or False, no standard errors are computed
+
+        Returns
+        ----------
+        MLEResults object
+        """
+
+        if method is None:
+            method = self.default_method
+        elif method not in self.supported_methods:
+            raise ValueError("Method not supported!")
+
+        # Step 1 : univariate volatility models
+        univariate_fits = self._fit_univariate(workers=kwargs.pop('workers', None), **kwargs)
+        z = np.zeros(self.z_no)
+        for i, model in enumerate(self.univariate_models):
+            z[self._univariate_slice(i)] = model.latent_variables.get_z_values()
+
+        # Step 2 : correlation recursion given the standardized residuals
+        sigma2, Y, Z = self._model(z)
+        Qbar = self._unconditional_covariance(Z)
+        obj = lambda x: self._correlation_neg_loglik(x, Z, Qbar)
+        p = optimize.minimize(obj, self.latent_variables.get_z_starting_values()[-2:],
+            method='L-BFGS-B', options={'gtol': 1e-8})
+        z[-2:] = p.x
+
+        # Block diagonal inverse Hessian; cross-stage terms are ignored
+        hessian = kwargs.get('hessian', 'auto')
+        try:
+            if hessian == 'numdifftools':
+                H = nd.Hessian(obj)(p.x)
+            elif hessian is None or hessian is False:
+                H = None
+            else:
+                H = central_difference_hessian(obj, p.x)
+            ihessians = [ihessian for _, ihessian in univariate_fits]
+            ihessians.append(np.linalg.inv(H))
+            ihessian = block_diag(*ihessians)
+            ses = np.power(np.abs(np.diag(ihessian)),0.5)
+        except:
+            ihessian = None
+            ses = None
+
+        self.latent_variables.set_z_values(z,method,ses,None)
+        self.latent_variables.estimation_method = method
+
+        results = optimize.OptimizeResult(x=z, fun=self.neg_loglik(z), success=p.success,
+            message=p.message, univariate_results=[results for results, _ in univariate_fits], correlation_results=p)
+
+        # Change this in future
+        try:
+            latent_variables_store = self.latent_variables.copy()
+        except:
+            latent_variables_store = self.latent_variables
+
+        return MLEResults(data_name=self.data_name,X_names=None,model_name=self.model_name,
+                model_type=self.model_type, latent_variables=latent_variables_store,results=results,data=Y.T,
+                index=self.index,multivariate_model=self.multivariate_model,objective_object=self.neg_loglik,
+                method=method,ihessian=ihessian,signal=sigma2.T,scores=Z.T,
+                z_hide=self._z_hide,max_lag=self.max_lag,states=None,states_var=None)
+
+    def correlations(self, packed=True):
+        """ Conditional correlations implied by the estimated model
+
+        Parameters
+        ----------
+        packed : boolean
+            (default: True) If True, returns the strict lower triangle of each R_t
+            with shape (T, N(N-1)/2); otherwise the full (T, N, N) array
+
+        Returns
+        ----------
+        - np.ndarray of conditional correlations
+        """
+
+        if self.latent_variables.estimated is False:
+            raise Exception("No latent variables estimated!")
+
+        z = self.latent_variables.get_z_values()
+        alpha, beta = self._dcc_parameters(z)
+        sigma2, Y, Z = self._model(z)
+        R = dcc_correlations(alpha, beta, Z, self._unconditional_covariance(Z))
+
+        if packed is True:
+            return R
+
+        rows, cols = np.tril_indices(self.ylen, -1)
+        R_full = np.zeros((R.shape[0], self.ylen, self.ylen))
+        R_full[:, rows, cols] = R
+        R_full[:, cols, rows] = R
+        R_full[:, np.arange(self.ylen), np.arange(self.ylen)] = 1.0
+        return R_full
@@ -0,0 +1,158 @@
+import numpy as np
+cimport numpy as np
+cimport cython
+
+from libc.math cimport log, sqrt
+from scipy.linalg.cython_lapack cimport dpotrf
+from scipy.linalg.cython_blas cimport dtrsv
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.cdivision(True)
+cdef int dcc_step(double alpha, double beta, double[:,::1] Z, double[:,::1] Qbar,
+    double[:,::1] Q, double[:,::1] L, double[::1] s, Py_ssize_t t) nogil:
+    """ Advances Q to time t and stores the Cholesky factor of R_t in L
+
+    s is a work buffer for the inverse square roots of diag(Q_t).
+
+    Only the lower triangles of Q and L are touched. Returns 0 if R_t
+    is not positive definite.
+    """
+
+    cdef Py_ssize_t i, j
+    cdef Py_ssize_t N = Z.shape[1]
+    cdef double omega = 1.0 - alpha - beta
+    cdef char uplo = b'U'
+    cdef int n = <int> N
+    cdef int info = 0
+
+    for i in range(N):
+        for j in range(i+1):
+            if t == 0:
+                Q[i,j] = Qbar[i,j]
+            else:
+                Q[i,j] = omega*Qbar[i,j] + alpha*Z[t-1,i]*Z[t-1,j] + beta*Q[i,j]
+
+    for i in range(N):
+        if Q[i,i] <= 0.0:
+            return 0
+        s[i] = 1.0/sqrt(Q[i,i])
+
+    # R_t = diag(Q_t)^(-1/2) Q_t diag(Q_t)^(-1/2); the row-major lower triangle
+    # is the column-major upper triangle, so LAPACK factorises it as U'U = L L'
+    for i in range(N):
+        for j in range(i+1):
+            L[i,j] = Q[i,j]*s[i]*s[j]
+
+    dpotrf(&uplo, &n, &L[0,0], &n, &info)
+
+    return info == 0
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.cdivision(True)
+def dcc_loglik(double alpha, double beta, double[:,::1] Z, double[:,::1] Qbar):
+    """ Correlation component of the DCC log-likelihood
+
+    Parameters
+    ----------
+    alpha, beta : float
+        DCC news and persistence parameters
+
+    Z : np.ndarray
+        (T, N) array of standardized residuals from the univariate stage
+
+    Qbar : np.ndarray
+        (N, N) unconditional covariance of the standardized residuals
+
+    Returns
+    ----------
+    -0.5 * sum_t (log|R_t| + z_t'R_t^{-1}z_t - z_t'z_t), or -inf if some R_t
+    is not positive definite
+    """
+
+    cdef Py_ssize_t t, i
+    cdef Py_ssize_t T = Z.shape[0]
+    cdef Py_ssize_t N = Z.shape[1]
+    cdef double[:,::1] Q = np.zeros((N, N))
+    cdef double[:,::1] L = np.zeros((N, N))
+    cdef double[::1] y = np.zeros(N)
+    cdef double[::1] s = np.zeros(N)
+    cdef double loglik = 0.0
+    cdef int ok = 1
+    cdef char uplo = b'U'
+    cdef char trans = b'T'
+    cdef char diag = b'N'
+    cdef int n = <int> N
+    cdef int inc = 1
+
+    with nogil:
+        for t in range(T):
+            ok = dcc_step(alpha, beta, Z, Qbar, Q, L, s, t)
+            if ok == 0:
+                break
+
+            # Forward substitution L y = z_t gives z_t'R_t^{-1}z_t = y'y
+            for i in range(N):
+                y[i] = Z[t,i]
+            dtrsv(&uplo, &trans, &diag, &n, &L[0,0], &n, &y[0], &inc)
+            for i in range(N):
+                loglik -= log(L[i,i]) + 0.5*(y[i]*y[i] - Z[t,i]*Z[t,i])
+
+    if ok == 0:
+        return -np.inf
+
+    return loglik
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.cdivision(True)
+def dcc_correlations(double alpha, double beta, double[:,::1] Z, double[:,::1] Qbar):
+    """ Conditional correlations of the DCC recursion in packed storage
+
+    Parameters
+    ----------
+    alpha, beta : float
+        DCC news and persistence parameters
+
+    Z : np.ndarray
+        (T, N) array of standardized residuals from the univariate stage
+
+    Qbar : np.ndarray
+        (N, N) unconditional covariance of the standardized residuals
+
+    Returns
+    ----------
+    (T, N(N-1)/2) array holding the strict lower triangle of each R_t, row by
+    row: element (i, j) with j < i is stored in column i(i-1)/2 + j
+    """
+
+    cdef Py_ssize_t t, i, j, idx
+    cdef Py_ssize_t T = Z.shape[0]
+    cdef Py_ssize_t N = Z.shape[1]
+    cdef double omega = 1.0 - alpha - beta
+    cdef double[:,::1] Q = np.zeros((N, N))
+    cdef double[::1] s = np.zeros(N)
+    cdef np.ndarray[double, ndim=2, mode="c"] R = np.zeros((T, N*(N-1)//2))
+    cdef double[:,::1] R_view = R
+
+    with nogil:
+        for t in range(T):
+            for i in range(N):
+                for j in range(i+1):
+                    if t == 0:
+                        Q[i,j] = Qbar[i,j]
+                    else:
+                        Q[i,j] = omega*Qbar[i,j] + alpha*Z[t-1,i]*Z[t-1,j] + beta*Q[i,j]
+                s[i] = sqrt(Q[i,i])
+
+            idx = 0
+            for i in range(1, N):
+                for j in range(i):
+                    R_view[t,idx] = Q[i,j]/(s[i]*s[j])
+                    idx += 1
+
+    return R
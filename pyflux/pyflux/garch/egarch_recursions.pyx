@@ -0,0 +1,1010 @@
+import numpy as np
+cimport numpy as np
+cimport cython
+
+from libc.math cimport exp, log, sqrt, lgamma, tgamma, M_PI
+from scipy.special import digamma
+
+
+cdef struct tstep:
+    double score        # Beta-t score u_t
+    double loglik       # log-density of y_t
+    double dll_dlmda    # partial derivatives holding the residual fixed
+    double dll_de
+    double dll_dv
+    double du_dlmda
+    double du_de
+    double du_dv
+    double de_dlmda     # derivative of the residual through the in-mean term
+    double scale
+
+
+cdef inline double sign(double x) nogil:
+    if x > 0:
+        return 1.0
+    elif x < 0:
+        return -1.0
+    return 0.0
+
+
+@cython.cdivision(True)
+cdef inline tstep t_step(double y, double lmda, double mu, double gamma, double v, double loglik_const,
+    double dv_const) nogil:
+    """ Beta-t score, log-density and their partial derivatives for one observation """
+
+    cdef tstep r
+    cdef double el = exp(lmda)
+    cdef double e, D
+
+    r.scale = exp(lmda/2.0)
+    e = y - mu - gamma*r.scale
+    D = v*el + e*e
+
+    r.score = (v+1.0)*e*e/D - 1.0
+    r.loglik = loglik_const - lmda/2.0 - 0.5*(v+1.0)*log(1.0 + e*e/(v*el))
+    r.dll_dlmda = 0.5*r.score
+    r.dll_de = -(v+1.0)*e/D
+    r.dll_dv = dv_const - 0.5*log(1.0 + e*e/(v*el)) + 0.5*(v+1.0)*e*e/(v*D)
+    r.du_dlmda = -(v+1.0)*e*e*v*el/(D*D)
+    r.du_de = 2.0*(v+1.0)*e*v*el/(D*D)
+    r.du_dv = e*e/D - (v+1.0)*e*e*el/(D*D)
+    r.de_dlmda = -0.5*gamma*r.scale
+    return r
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef inline void t_step_gradient(tstep r, double[:,::1] dl, double[:,::1] du, double[:,::1] G,
+    Py_ssize_t t, Py_ssize_t iv, Py_ssize_t imu, Py_ssize_t ig) nogil:
+    """ Chains the partial derivatives of one observation with the sensitivities of lambda_t,
+    storing the gradient of the observation in G[t] """
+
+    cdef Py_ssize_t j
+    cdef double de
+
+    for j in range(dl.shape[1]):
+        de = r.de_dlmda*dl[t,j]
+        if j == imu:
+            de -= 1.0
+        elif j == ig:
+            de -= r.scale
+        du[t,j] = r.du_dlmda*dl[t,j] + r.du_de*de
+        G[t,j] = r.dll_dlmda*dl[t,j] + r.dll_de*de
+        if j == iv:
+            du[t,j] += r.du_dv
+            G[t,j] += r.dll_dv
+
+
+@cython.cdivision(True)
+cdef inline double beta_t_observation(double e, double lmda, double v, double loglik_const,
+    double* score) nogil:
+    """ Beta-t score and Student-t log-density of an observation with residual e and log volatility lmda """
+
+    cdef double el = exp(lmda)
+
+    score[0] = (v+1.0)*e*e/(v*el + e*e) - 1.0
+    return loglik_const - lmda/2.0 - 0.5*(v+1.0)*log(1.0 + e*e/(v*el))
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.cdivision(True)
+cdef double beta_t_filter(const double[:] Y, const double[:] ar_terms, const double[:] score_terms,
+    double leverage_term, bint leverage, double v, double gamma, const double[:] intercept,
+    const double[:] location, double lmda_init, bint init_in_mean, int max_lag, double[:] lmda,
+    double[:] scores, double[:] theta) nogil:
+    """ Runs the Beta-t-EGARCH recursion and the Student-t log-likelihood in one pass
+
+    For t >= max_lag, lambda_t = intercept_t + sum_k ar_k*lambda_{t-k} + sum_k score_k*u_{t-k},
+    plus leverage*sign(-(y_{t-1} - theta_{t-1}))*(u_{t-1} + 1) with a leverage term, and the
+    location is theta_t = location_t + gamma*exp(lambda_t/2). Earlier periods start from
+    lmda_init, with the in-mean term in the location only if init_in_mean is set. lmda,
+    scores and theta are filled in; the log-likelihood is returned.
+    """
+
+    cdef Py_ssize_t t, k
+    cdef double loglik_const = lgamma((v+1.0)/2.0) - lgamma(v/2.0) - 0.5*log(v*M_PI)
+    cdef double loglik = 0.0
+    cdef double l
+
+    for t in range(Y.shape[0]):
+        if t < max_lag:
+            l = lmda_init
+            theta[t] = location[t]
+            if init_in_mean:
+                theta[t] += gamma*exp(l/2.0)
+        else:
+            l = intercept[t]
+            for k in range(ar_terms.shape[0]):
+                l += ar_terms[k]*lmda[t-k-1]
+            for k in range(score_terms.shape[0]):
+                l += score_terms[k]*scores[t-k-1]
+            if leverage and t > 0:
+                l += leverage_term*sign(-(Y[t-1] - theta[t-1]))*(scores[t-1]+1.0)
+            theta[t] = location[t] + gamma*exp(l/2.0)
+        lmda[t] = l
+        loglik += beta_t_observation(Y[t] - theta[t], l, v, loglik_const, &scores[t])
+
+    return loglik
+
+
+def egarch_recursion(double[:] parameters, double[:] Y, int p_terms, int q_terms, int max_lag,
+    bint leverage, bint in_mean):
+    """ Log volatilities, scores and log-likelihood of a Beta-t-EGARCH model
+
+    Parameters
+    ----------
+    parameters : np.array
+        Transformed latent variables in model order: constant, p GARCH terms,
+        q score terms, [leverage], v, returns constant, [GARCH-M]
+
+    Y : np.array
+        The length-adjusted time series (accounting for lags)
+
+    leverage : boolean
+        Whether the model has a leverage term
+
+    in_mean : boolean
+        Whether the model has a GARCH-in-mean term
+
+    Returns
+    ----------
+    - np.array, the log volatilities
+    - np.array, the scores
+    - float, the log-likelihood
+    """
+
+    cdef Py_ssize_t K = parameters.shape[0]
+    cdef Py_ssize_t T = Y.shape[0]
+    cdef Py_ssize_t iv = K-3 if in_mean else K-2
+    parm = np.asarray(parameters)
+    lmda = np.empty(T)
+    scores = np.empty(T)
+    theta = np.empty(T)
+
+    loglik = beta_t_filter(Y, parm[1:1+p_terms], parm[1+p_terms:1+p_terms+q_terms],
+        parm[iv-1] if leverage else 0.0, leverage, parm[iv], parm[K-1] if in_mean else 0.0,
+        np.broadcast_to(parm[0], T), np.broadcast_to(parm[iv+1], T),
+        parm[0]/(1.0-parm[1:1+p_terms].sum()), True, max_lag, lmda, scores, theta)
+
+    return lmda, scores, loglik
+
+
+def egarchmreg_recursion(double[:] parameters, double[:] Y, double[:,:] X, int p_terms, int q_terms,
+    int max_lag, bint leverage):
+    """ Log volatilities, scores, locations and log-likelihood of a Beta-t-EGARCH-M regression
+
+    Parameters
+    ----------
+    parameters : np.array
+        Transformed latent variables in model order: p GARCH terms, q score terms, v,
+        GARCH-M, [leverage], volatility betas, returns betas
+
+    Y : np.array
+        The length-adjusted time series (accounting for lags)
+
+    X : np.array
+        The regressors, one row per element of Y
+
+    leverage : boolean
+        Whether the model has a leverage term
+
+    Returns
+    ----------
+    - np.array, the log volatilities
+    - np.array, the scores
+    - np.array, the locations
+    - float, the log-likelihood
+    """
+
+    cdef Py_ssize_t K = parameters.shape[0]
+    cdef Py_ssize_t T = Y.shape[0]
+    cdef Py_ssize_t nX = X.shape[1]
+    parm = np.asarray(parameters)
+    X_values = np.asarray(X)[:T]
+    lmda = np.empty(T)
+    scores = np.empty(T)
+    theta = np.empty(T)
+
+    loglik = beta_t_filter(Y, parm[:p_terms], parm[p_terms:p_terms+q_terms],
+        parm[K-2*nX-3] if leverage else 0.0, leverage, parm[p_terms+q_terms], parm[K-2*nX-1],
+        np.dot(X_values, parm[K-2*nX:K-nX]), np.dot(X_values, parm[K-nX:]),
+        parm[K-2*nX]/(1.0-parm[:p_terms].sum()), False, max_lag, lmda, scores, theta)
+
+    return lmda, scores, theta, loglik
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef inline void gather_draw(const double[:] values, const double[:] scores, const Py_ssize_t[:] draws,
+    double[:] values_lags, double[:] scores_lags, double[:] future_scores) nogil:
+    """ Copies the last values and scores of one filtered series, and its scores at the drawn periods """
+
+    cdef Py_ssize_t k
+    cdef Py_ssize_t T = values.shape[0]
+    cdef Py_ssize_t lags = values_lags.shape[0]
+
+    for k in range(lags):
+        values_lags[k] = values[T-lags+k]
+        scores_lags[k] = scores[T-lags+k]
+    for k in range(draws.shape[0]):
+        future_scores[k] = scores[draws[k]]
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.cdivision(True)
+def egarch_recursion_batch(double[:,::1] parameters, double[:] Y, int p_terms, int q_terms, int max_lag,
+    bint leverage, bint in_mean, Py_ssize_t[:,::1] draws, int lags):
+    """ Runs the Beta-t-EGARCH recursion for many latent variable vectors, keeping only what
+    simulated forecast paths need
+
+    Parameters
+    ----------
+    parameters : np.array
+        (S, K) array of transformed latent variables, one vector per row (order as in egarch_recursion)
+
+    Y : np.array
+        The length-adjusted time series (accounting for lags)
+
+    leverage : boolean
+        Whether the model has a leverage term
+
+    in_mean : boolean
+        Whether the model has a GARCH-in-mean term
+
+    draws : np.array
+        (S, h) in-sample periods whose scores are bootstrapped, one row per vector
+
+    lags : int
+        How many of the last log volatilities and scores to keep
+
+    Returns
+    ----------
+    - np.array, (S, lags) last log volatilities
+    - np.array, (S, lags) last scores
+    - np.array, (S, h) scores at the drawn periods
+    """
+
+    cdef Py_ssize_t i, t, k
+    cdef Py_ssize_t S = parameters.shape[0]
+    cdef Py_ssize_t K = parameters.shape[1]
+    cdef Py_ssize_t T = Y.shape[0]
+    cdef Py_ssize_t iv = K-3 if in_mean else K-2
+    cdef double persistence
+    cdef double[::1] lmda = np.empty(T)
+    cdef double[::1] scores = np.empty(T)
+    cdef double[::1] theta = np.empty(T)
+    cdef double[::1] intercept = np.empty(T)
+    cdef double[::1] location = np.empty(T)
+    cdef np.ndarray[double, ndim=2, mode="c"] lmda_lags = np.empty((S, lags))
+    cdef np.ndarray[double, ndim=2, mode="c"] scores_lags = np.empty((S, lags))
+    cdef np.ndarray[double, ndim=2, mode="c"] future_scores = np.empty((S, draws.shape[1]))
+    cdef double[:,::1] lmda_lags_view = lmda_lags
+    cdef double[:,::1] scores_lags_view = scores_lags
+    cdef double[:,::1] future_scores_view = future_scores
+
+    with nogil:
+        for i in range(S):
+            persistence = 0.0
+            for k in range(p_terms):
+                persistence += parameters[i,1+k]
+            for t in range(T):
+                intercept[t] = parameters[i,0]
+                location[t] = parameters[i,iv+1]
+
+            beta_t_filter(Y, parameters[i,1:1+p_terms], parameters[i,1+p_terms:1+p_terms+q_terms],
+                parameters[i,iv-1] if leverage else 0.0, leverage, parameters[i,iv],
+                parameters[i,K-1] if in_mean else 0.0, intercept, location,
+                parameters[i,0]/(1.0-persistence), True, max_lag, lmda, scores, theta)
+            gather_draw(lmda, scores, draws[i], lmda_lags_view[i], scores_lags_view[i], future_scores_view[i])
+
+    return lmda_lags, scores_lags, future_scores
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.cdivision(True)
+def egarchmreg_recursion_batch(double[:,::1] parameters, double[:] Y, double[:,:] X, int p_terms, int q_terms,
+    int max_lag, bint leverage, Py_ssize_t[:,::1] draws, int lags):
+    """ Runs the Beta-t-EGARCH-M regression recursion for many latent variable vectors, keeping
+    only what simulated forecast paths need
+
+    Parameters
+    ----------
+    parameters : np.array
+        (S, K) array of transformed latent variables, one vector per row (order as in egarchmreg_recursion)
+
+    Y : np.array
+        The length-adjusted time series (accounting for lags)
+
+    X : np.array
+        The regressors, one row per element of Y
+
+    leverage : boolean
+        Whether the model has a leverage term
+
+    draws : np.array
+        (S, h) in-sample periods whose scores are bootstrapped, one row per vector
+
+    lags : int
+        How many of the last log volatilities and scores to keep
+
+    Returns
+    ----------
+    - np.array, (S, lags) last log volatilities
+    - np.array, (S, lags) last scores
+    - np.array, (S, h) scores at the drawn periods
+    """
+
+    cdef Py_ssize_t i, t, k
+    cdef Py_ssize_t S = parameters.shape[0]
+    cdef Py_ssize_t K = parameters.shape[1]
+    cdef Py_ssize_t T = Y.shape[0]
+    cdef Py_ssize_t nX = X.shape[1]
+    cdef double persistence
+    cdef double[::1] lmda = np.empty(T)
+    cdef double[::1] scores = np.empty(T)
+    cdef double[::1] theta = np.empty(T)
+    cdef double[::1] intercept = np.empty(T)
+    cdef double[::1] location = np.empty(T)
+    cdef np.ndarray[double, ndim=2, mode="c"] lmda_lags = np.empty((S, lags))
+    cdef np.ndarray[double, ndim=2, mode="c"] scores_lags = np.empty((S, lags))
+    cdef np.ndarray[double, ndim=2, mode="c"] future_scores = np.empty((S, draws.shape[1]))
+    cdef double[:,::1] lmda_lags_view = lmda_lags
+    cdef double[:,::1] scores_lags_view = scores_lags
+    cdef double[:,::1] future_scores_view = future_scores
+
+    with nogil:
+        for i in range(S):
+            persistence = 0.0
+            for k in range(p_terms):
+                persistence += parameters[i,k]
+            for t in range(T):
+                intercept[t] = 0.0
+                location[t] = 0.0
+                for k in range(nX):
+                    intercept[t] += X[t,k]*parameters[i,K-2*nX+k]
+                    location[t] += X[t,k]*parameters[i,K-nX+k]
+
+            beta_t_filter(Y, parameters[i,:p_terms], parameters[i,p_terms:p_terms+q_terms],
+                parameters[i,K-2*nX-3] if leverage else 0.0, leverage, parameters[i,p_terms+q_terms],
+                parameters[i,K-2*nX-1], intercept, location, parameters[i,K-2*nX]/(1.0-persistence),
+                False, max_lag, lmda, scores, theta)
+            gather_draw(lmda, scores, draws[i], lmda_lags_view[i], scores_lags_view[i], future_scores_view[i])
+
+    return lmda_lags, scores_lags, future_scores
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.cdivision(True)
+cdef double lmegarch_filter(const double[:] Y, const double[:] parameters, int p_terms, int q_terms,
+    int max_lag, bint leverage, double[:] lmda, double[:,:] lmda_c, double[:] scores) nogil:
+    """ Runs the long memory Beta-t-EGARCH recursion and the Student-t log-likelihood in one pass
+
+    Each of the two components follows its own GARCH and score terms, the second one taking
+    the leverage term; lambda is the constant plus both components. lmda, lmda_c and scores
+    are filled in; the log-likelihood is returned.
+    """
+
+    cdef Py_ssize_t t, k, comp, offset
+    cdef Py_ssize_t K = parameters.shape[0]
+    cdef double v = parameters[K-2]
+    cdef double mu = parameters[K-1]
+    cdef double loglik_const = lgamma((v+1.0)/2.0) - lgamma(v/2.0) - 0.5*log(v*M_PI)
+    cdef double persistence = 0.0
+    cdef double loglik = 0.0
+    cdef double c
+
+    for k in range(p_terms):
+        persistence += parameters[1+k]
+
+    for t in range(Y.shape[0]):
+        if t < max_lag:
+            lmda_c[t,0] = 0.0
+            lmda_c[t,1] = 0.0
+            lmda[t] = parameters[0]/(1.0-persistence)
+        else:
+            for comp in range(2):
+                offset = 1 + comp*(p_terms+q_terms)
+                c = 0.0
+                for k in range(p_terms):
+                    c += parameters[offset+k]*lmda_c[t-k-1,comp]
+                for k in range(q_terms):
+                    c += parameters[offset+p_terms+k]*scores[t-k-1]
+                lmda_c[t,comp] = c
+            if leverage and t > 0:
+                lmda_c[t,1] += parameters[K-3]*sign(-(Y[t-1] - mu))*(scores[t-1]+1.0)
+            lmda[t] = parameters[0] + lmda_c[t,0] + lmda_c[t,1]
+
+        loglik += beta_t_observation(Y[t] - mu, lmda[t], v, loglik_const, &scores[t])
+
+    return loglik
+
+
+def lmegarch_recursion(double[:] parameters, double[:] Y, int p_terms, int q_terms, int max_lag,
+    bint leverage):
+    """ Log volatilities, components, scores and log-likelihood of a long memory Beta-t-EGARCH model
+
+    Parameters
+    ----------
+    parameters : np.array
+        Transformed latent variables in model order: constant, p GARCH and q score
+        terms for each of the two components, [leverage], v, returns constant
+
+    Y : np.array
+        The length-adjusted time series (accounting for lags)
+
+    leverage : boolean
+        Whether the model has a leverage term
+
+    Returns
+    ----------
+    - np.array, the log volatilities
+    - np.array, (T, 2) the two volatility components
+    - np.array, the scores
+    - float, the log-likelihood
+    """
+
+    cdef Py_ssize_t T = Y.shape[0]
+    lmda = np.empty(T)
+    lmda_c = np.empty((T, 2))
+    scores = np.empty(T)
+
+    loglik = lmegarch_filter(Y, parameters, p_terms, q_terms, max_lag, leverage, lmda, lmda_c, scores)
+
+    return lmda, lmda_c, scores, loglik
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def lmegarch_recursion_batch(double[:,::1] parameters, double[:] Y, int p_terms, int q_terms, int max_lag,
+    bint leverage, Py_ssize_t[:,::1] draws, int lags):
+    """ Runs the long memory Beta-t-EGARCH recursion for many latent variable vectors, keeping
+    only what simulated forecast paths need
+
+    Parameters
+    ----------
+    parameters : np.array
+        (S, K) array of transformed latent variables, one vector per row (order as in lmegarch_recursion)
+
+    Y : np.array
+        The length-adjusted time series (accounting for lags)
+
+    leverage : boolean
+        Whether the model has a leverage term
+
+    draws : np.array
+        (S, h) in-sample periods whose scores are bootstrapped, one row per vector
+
+    lags : int
+        How many of the last volatility components and scores to keep
+
+    Returns
+    ----------
+    - np.array, (S, lags, 2) last volatility components
+    - np.array, (S, lags) last scores
+    - np.array, (S, h) scores at the drawn periods
+    """
+
+    cdef Py_ssize_t i, k
+    cdef Py_ssize_t S = parameters.shape[0]
+    cdef Py_ssize_t T = Y.shape[0]
+    cdef double[::1] lmda = np.empty(T)
+    cdef double[:,::1] lmda_c = np.empty((T, 2))
+    cdef double[::1] scores = np.empty(T)
+    cdef np.ndarray[double, ndim=3, mode="c"] lmda_c_lags = np.empty((S, lags, 2))
+    cdef np.ndarray[double, ndim=2, mode="c"] scores_lags = np.empty((S, lags))
+    cdef np.ndarray[double, ndim=2, mode="c"] future_scores = np.empty((S, draws.shape[1]))
+    cdef double[:,:,::1] lmda_c_lags_view = lmda_c_lags
+    cdef double[:,::1] scores_lags_view = scores_lags
+    cdef double[:,::1] future_scores_view = future_scores
+
+    with nogil:
+        for i in range(S):
+            lmegarch_filter(Y, parameters[i], p_terms, q_terms, max_lag, leverage, lmda, lmda_c, scores)
+            for k in range(lags):
+                lmda_c_lags_view[i,k,0] = lmda_c[T-lags+k,0]
+                lmda_c_lags_view[i,k,1] = lmda_c[T-lags+k,1]
+                scores_lags_view[i,k] = scores[T-lags+k]
+            for k in range(draws.shape[1]):
+                future_scores_view[i,k] = scores[draws[i,k]]
+
+    return lmda_c_lags, scores_lags, future_scores
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.cdivision(True)
+cdef double segarch_filter(const double[:] Y, const double[:] parameters, int p_terms, int q_terms,
+    int max_lag, bint leverage, bint in_mean, double[:] lmda, double[:] scores, double[:] theta) nogil:
+    """ Runs the skew Beta-t-EGARCH recursion and the skew-t log-likelihood in one pass
+
+    The location theta_t is the returns constant (plus the GARCH-M term) shifted by the mean
+    of the skewed disturbance. lmda, scores and theta are filled in; the log-likelihood
+    (of the skew-t centred a further skewness shift away, as in logpdf) is returned.
+    """
+
+    cdef Py_ssize_t t, k
+    cdef Py_ssize_t K = parameters.shape[0]
+    cdef Py_ssize_t imu = K-2 if in_mean else K-1
+    cdef double mu = parameters[imu]
+    cdef double v = parameters[imu-1]
+    cdef double skewness = parameters[imu-2]
+    cdef double gamma = parameters[K-1] if in_mean else 0.0
+    cdef double m1 = sqrt(v)*tgamma((v-1.0)/2.0)/(sqrt(M_PI)*tgamma(v/2.0))
+    cdef double shift = (skewness - 1.0/skewness)*m1
+    cdef double loglik_const = log(2.0) - log(skewness + 1.0/skewness) + lgamma((v+1.0)/2.0) - lgamma(v/2.0) - 0.5*log(v*M_PI)
+    cdef double persistence = 0.0
+    cdef double loglik = 0.0
+    cdef double l, e, scale, z
+
+    for k in range(p_terms):
+        persistence += parameters[1+k]
+
+    for t in range(Y.shape[0]):
+        if t < max_lag:
+            l = parameters[0]/(1.0-persistence)
+            theta[t] = mu + shift*exp(l)
+        else:
+            l = parameters[0]
+            for k in range(p_terms):
+                l += parameters[1+k]*lmda[t-k-1]
+            for k in range(q_terms):
+                l += parameters[1+p_terms+k]*scores[t-k-1]
+            if leverage and t > 0:
+                l += parameters[imu-3]*sign(-(Y[t-1] - theta[t-1]))*(scores[t-1]+1.0)
+            theta[t] = mu + (gamma + shift)*exp(l/2.0)
+        lmda[t] = l
+
+        e = Y[t] - theta[t]
+        if e >= 0:
+            scores[t] = (v+1.0)*e*e/(skewness*skewness*v*exp(l) + e*e) - 1.0
+        else:
+            scores[t] = (v+1.0)*e*e/(v*exp(l)/(skewness*skewness) + e*e) - 1.0
+
+        scale = exp(l/2.0)
+        e = e - shift*scale
+        if e < 0:
+            z = skewness*e/scale
+        else:
+            z = e/(skewness*scale)
+        loglik += loglik_const - l/2.0 - 0.5*(v+1.0)*log(1.0 + z*z/v)
+
+    return loglik
+
+
+def segarch_recursion(double[:] parameters, double[:] Y, int p_terms, int q_terms, int max_lag,
+    bint leverage, bint in_mean):
+    """ Log volatilities, scores, locations and log-likelihood of a skew Beta-t-EGARCH model
+
+    Parameters
+    ----------
+    parameters : np.array
+        Transformed latent variables in model order: constant, p GARCH terms,
+        q score terms, [leverage], skewness, v, returns constant, [GARCH-M]
+
+    Y : np.array
+        The length-adjusted time series (accounting for lags)
+
+    leverage : boolean
+        Whether the model has a leverage term
+
+    in_mean : boolean
+        Whether the model has a GARCH-in-mean term
+
+    Returns
+    ----------
+    - np.array, the log volatilities
+    - np.array, the scores
+    - np.array, the locations
+    - float, the log-likelihood
+    """
+
+    cdef Py_ssize_t T = Y.shape[0]
+    lmda = np.empty(T)
+    scores = np.empty(T)
+    theta = np.empty(T)
+
+    loglik = segarch_filter(Y, parameters, p_terms, q_terms, max_lag, leverage, in_mean, lmda, scores, theta)
+
+    return lmda, scores, theta, loglik
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def segarch_recursion_batch(double[:,::1] parameters, double[:] Y, int p_terms, int q_terms, int max_lag,
+    bint leverage, bint in_mean, Py_ssize_t[:,::1] draws, int lags):
+    """ Runs the skew Beta-t-EGARCH recursion for many latent variable vectors, keeping only what
+    simulated forecast paths need
+
+    Parameters
+    ----------
+    parameters : np.array
+        (S, K) array of transformed latent variables, one vector per row (order as in segarch_recursion)
+
+    Y : np.array
+        The length-adjusted time series (accounting for lags)
+
+    leverage : boolean
+        Whether the model has a leverage term
+
+    in_mean : boolean
+        Whether the model has a GARCH-in-mean term
+
+    draws : np.array
+        (S, h) in-sample periods whose scores are bootstrapped, one row per vector
+
+    lags : int
+        How many of the last log volatilities and scores to keep
+
+    Returns
+    ----------
+    - np.array, (S, lags) last log volatilities
+    - np.array, (S, lags) last scores
+    - np.array, (S, h) scores at the drawn periods
+    """
+
+    cdef Py_ssize_t i
+    cdef Py_ssize_t S = parameters.shape[0]
+    cdef Py_ssize_t T = Y.shape[0]
+    cdef double[::1] lmda = np.empty(T)
+    cdef double[::1] scores = np.empty(T)
+    cdef double[::1] theta = np.empty(T)
+    cdef np.ndarray[double, ndim=2, mode="c"] lmda_lags = np.empty((S, lags))
+    cdef np.ndarray[double, ndim=2, mode="c"] scores_lags = np.empty((S, lags))
+    cdef np.ndarray[double, ndim=2, mode="c"] future_scores = np.empty((S, draws.shape[1]))
+    cdef double[:,::1] lmda_lags_view = lmda_lags
+    cdef double[:,::1] scores_lags_view = scores_lags
+    cdef double[:,::1] future_scores_view = future_scores
+
+    with nogil:
+        for i in range(S):
+            segarch_filter(Y, parameters[i], p_terms, q_terms, max_lag, leverage, in_mean, lmda, scores, theta)
+            gather_draw(lmda, scores, draws[i], lmda_lags_view[i], scores_lags_view[i], future_scores_view[i])
+
+    return lmda_lags, scores_lags, future_scores
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.cdivision(True)
+cdef double egarch_gradient_filter(double[:] parameters, double[:] Y, int p_terms, int q_terms, int max_lag,
+    bint leverage, bint in_mean, double dv_const, double[::1] lmda, double[::1] scores, double[:,::1] dl,
+    double[:,::1] du, double[:,::1] G) nogil:
+    """ Runs the Beta-t-EGARCH recursion with the sensitivities of lambda and the scores to
+    each latent variable, filling G with the gradient of each observation's log-likelihood
+
+    dl, du and G must be (T, K) arrays and dl and du must start at zero. dv_const is the
+    digamma term of the derivative with respect to v. The log-likelihood is returned.
+    """
+
+    cdef Py_ssize_t t, k, j
+    cdef Py_ssize_t K = parameters.shape[0]
+    cdef Py_ssize_t iv = K-3 if in_mean else K-2
+    cdef Py_ssize_t imu = iv+1
+    cdef Py_ssize_t ig = K-1 if in_mean else -1
+    cdef Py_ssize_t ik = iv-1
+    cdef double v = parameters[iv]
+    cdef double mu = parameters[imu]
+    cdef double gamma = parameters[ig] if in_mean else 0.0
+    cdef double persistence = 0.0
+    cdef double loglik = 0.0
+    cdef double loglik_const = lgamma((v+1.0)/2.0) - lgamma(v/2.0) - 0.5*log(v*M_PI)
+    cdef double l, sg
+    cdef tstep r
+
+    for k in range(p_terms):
+        persistence += parameters[1+k]
+
+    for t in range(Y.shape[0]):
+        if t < max_lag:
+            l = parameters[0]/(1.0-persistence)
+            dl[t,0] = 1.0/(1.0-persistence)
+            for k in range(p_terms):
+                dl[t,1+k] = l/(1.0-persistence)
+        else:
+            l = parameters[0]
+            dl[t,0] = 1.0
+            for k in range(p_terms):
+                l += parameters[1+k]*lmda[t-k-1]
+                dl[t,1+k] += lmda[t-k-1]
+                for j in range(K):
+                    dl[t,j] += parameters[1+k]*dl[t-k-1,j]
+            for k in range(q_terms):
+                l += parameters[1+p_terms+k]*scores[t-k-1]
+                dl[t,1+p_terms+k] += scores[t-k-1]
+                for j in range(K):
+                    dl[t,j] += parameters[1+p_terms+k]*du[t-k-1,j]
+            if leverage and t > 0:
+                sg = sign(-(Y[t-1] - mu - gamma*exp(lmda[t-1]/2.0)))
+                l += parameters[ik]*sg*(scores[t-1]+1.0)
+                dl[t,ik] += sg*(scores[t-1]+1.0)
+                for j in range(K):
+                    dl[t,j] += parameters[ik]*sg*du[t-1,j]
+        lmda[t] = l
+
+        r = t_step(Y[t], l, mu, gamma, v, loglik_const, dv_const)
+        scores[t] = r.score
+        loglik += r.loglik
+        t_step_gradient(r, dl, du, G, t, iv, imu, ig)
+
+    return loglik
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.cdivision(True)
+def egarch_loglik_gradient(double[:] parameters, double[:] Y, int p_terms, int q_terms, int max_lag,
+    bint leverage, bint in_mean, bint contributions=False):
+    """ Log-likelihood of a Beta-t-EGARCH model and its gradient
+
+    The gradient is taken with respect to the transformed latent variables, using
+    forward recursions for the sensitivities of lambda and the scores.
+
+    Parameters
+    ----------
+    parameters : np.array
+        Transformed latent variables in model order: constant, p GARCH terms,
+        q score terms, [leverage], v, returns constant, [GARCH-M]
+
+    Y : np.array
+        The length-adjusted time series (accounting for lags)
+
+    leverage : boolean
+        Whether the model has a leverage term
+
+    in_mean : boolean
+        Whether the model has a GARCH-in-mean term
+
+    contributions : boolean
+        (default: False) Whether to also return the gradient of each observation
+
+    Returns
+    ----------
+    - float, the log-likelihood
+    - np.array, the gradient of the log-likelihood
+    - np.array, (T, K) per-observation gradients (only if contributions is True)
+    """
+
+    cdef Py_ssize_t K = parameters.shape[0]
+    cdef Py_ssize_t T = Y.shape[0]
+    cdef double v = parameters[K-3 if in_mean else K-2]
+    cdef double dv_const = 0.5*digamma((v+1.0)/2.0) - 0.5*digamma(v/2.0) - 0.5/v
+    cdef double loglik
+    cdef np.ndarray[double, ndim=2, mode="c"] G = np.zeros((T, K))
+    cdef double[:,::1] G_view = G
+    cdef double[::1] lmda = np.zeros(T)
+    cdef double[::1] scores = np.zeros(T)
+    cdef double[:,::1] dl = np.zeros((T, K))
+    cdef double[:,::1] du = np.zeros((T, K))
+
+    with nogil:
+        loglik = egarch_gradient_filter(parameters, Y, p_terms, q_terms, max_lag, leverage, in_mean, dv_const,
+            lmda, scores, dl, du, G_view)
+
+    if contributions:
+        return loglik, G.sum(axis=0), G
+    return loglik, G.sum(axis=0)
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.cdivision(True)
+def egarch_loglik_gradient_batch(double[:,::1] parameters, double[:] Y, int p_terms, int q_terms,
+    int max_lag, bint leverage, bint in_mean):
+    """ Gradients of the log-likelihood of a Beta-t-EGARCH model for many latent variable vectors
+
+    Parameters
+    ----------
+    parameters : np.array
+        (S, K) array of transformed latent variables, one vector per row, in the order
+        of egarch_loglik_gradient
+
+    Y : np.array
+        The length-adjusted time series (accounting for lags)
+
+    Returns
+    ----------
+    (S, K) np.array of gradients with respect to the transformed latent variables
+    """
+
+    cdef Py_ssize_t i, t, j
+    cdef Py_ssize_t K = parameters.shape[1]
+    cdef Py_ssize_t T = Y.shape[0]
+    v = np.asarray(parameters)[:, K-3 if in_mean else K-2]
+    cdef double[::1] dv_const = np.ascontiguousarray(0.5*digamma((v+1.0)/2.0) - 0.5*digamma(v/2.0) - 0.5/v)
+    cdef np.ndarray[double, ndim=2, mode="c"] grad = np.zeros((parameters.shape[0], K))
+    cdef double[:,::1] grad_view = grad
+    cdef double[::1] lmda = np.empty(T)
+    cdef double[::1] scores = np.empty(T)
+    cdef double[:,::1] dl = np.empty((T, K))
+    cdef double[:,::1] du = np.empty((T, K))
+    cdef double[:,::1] G = np.empty((T, K))
+
+    with nogil:
+        for i in range(parameters.shape[0]):
+            dl[:,:] = 0.0
+            du[:,:] = 0.0
+            egarch_gradient_filter(parameters[i], Y, p_terms, q_terms, max_lag, leverage, in_mean, dv_const[i],
+                lmda, scores, dl, du, G)
+            for t in range(T):
+                for j in range(K):
+                    grad_view[i,j] += G[t,j]
+
+    return grad
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.cdivision(True)
+cdef double lmegarch_gradient_filter(double[:] parameters, double[:] Y, int p_terms, int q_terms, int max_lag,
+    bint leverage, double dv_const, double[:,::1] lmda_c, double[::1] scores, double[:,:,::1] dc,
+    double[:,::1] dl, double[:,::1] du, double[:,::1] G) nogil:
+    """ Runs the long memory Beta-t-EGARCH recursion with the sensitivities of both components
+    and the scores to each latent variable, filling G with the gradient of each observation's
+    log-likelihood
+
+    dc must be a (2, T, K) array and dl, du and G (T, K) arrays; dc, dl and du must start at
+    zero. dv_const is the digamma term of the derivative with respect to v. The log-likelihood
+    is returned.
+    """
+
+    cdef Py_ssize_t t, k, j, comp, offset
+    cdef Py_ssize_t K = parameters.shape[0]
+    cdef Py_ssize_t iv = K-2
+    cdef Py_ssize_t imu = K-1
+    cdef Py_ssize_t ik = K-3
+    cdef double v = parameters[iv]
+    cdef double mu = parameters[imu]
+    cdef double persistence = 0.0
+    cdef double loglik = 0.0
+    cdef double loglik_const = lgamma((v+1.0)/2.0) - lgamma(v/2.0) - 0.5*log(v*M_PI)
+    cdef double l, c, sg
+    cdef tstep r
+
+    for k in range(p_terms):
+        persistence += parameters[1+k]
+
+    for t in range(Y.shape[0]):
+        if t < max_lag:
+            l = parameters[0]/(1.0-persistence)
+            dl[t,0] = 1.0/(1.0-persistence)
+            for k in range(p_terms):
+                dl[t,1+k] = l/(1.0-persistence)
+        else:
+            for comp in range(2):
+                offset = 1 + comp*(p_terms+q_terms)
+                c = 0.0
+                for k in range(p_terms):
+                    c += parameters[offset+k]*lmda_c[t-k-1,comp]
+                    dc[comp,t,offset+k] += lmda_c[t-k-1,comp]
+                    for j in range(K):
+                        dc[comp,t,j] += parameters[offset+k]*dc[comp,t-k-1,j]
+                for k in range(q_terms):
+                    c += parameters[offset+p_terms+k]*scores[t-k-1]
+                    dc[comp,t,offset+p_terms+k] += scores[t-k-1]
+                    for j in range(K):
+                        dc[comp,t,j] += parameters[offset+p_terms+k]*du[t-k-1,j]
+                lmda_c[t,comp] = c
+
+            if leverage and t > 0:
+                sg = sign(-(Y[t-1] - mu))
+                lmda_c[t,1] += parameters[ik]*sg*(scores[t-1]+1.0)
+                dc[1,t,ik] += sg*(scores[t-1]+1.0)
+                for j in range(K):
+                    dc[1,t,j] += parameters[ik]*sg*du[t-1,j]
+
+            l = parameters[0] + lmda_c[t,0] + lmda_c[t,1]
+            for j in range(K):
+                dl[t,j] = dc[0,t,j] + dc[1,t,j]
+            dl[t,0] += 1.0
+
+        r = t_step(Y[t], l, mu, 0.0, v, loglik_const, dv_const)
+        scores[t] = r.score
+        loglik += r.loglik
+        t_step_gradient(r, dl, du, G, t, iv, imu, -1)
+
+    return loglik
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.cdivision(True)
+def lmegarch_loglik_gradient(double[:] parameters, double[:] Y, int p_terms, int q_terms, int max_lag,
+    bint leverage, bint contributions=False):
+    """ Log-likelihood of a long memory Beta-t-EGARCH model and its gradient
+
+    Parameters
+    ----------
+    parameters : np.array
+        Transformed latent variables in model order: constant, p GARCH and q score
+        terms for each of the two components, [leverage], v, returns constant
+
+    Y : np.array
+        The length-adjusted time series (accounting for lags)
+
+    leverage : boolean
+        Whether the model has a leverage term
+
+    contributions : boolean
+        (default: False) Whether to also return the gradient of each observation
+
+    Returns
+    ----------
+    - float, the log-likelihood
+    - np.array, the gradient of the log-likelihood
+    - np.array, (T, K) per-observation gradients (only if contributions is True)
+    """
+
+    cdef Py_ssize_t K = parameters.shape[0]
+    cdef Py_ssize_t T = Y.shape[0]
+    cdef double v = parameters[K-2]
+    cdef double dv_const = 0.5*digamma((v+1.0)/2.0) - 0.5*digamma(v/2.0) - 0.5/v
+    cdef double loglik
+    cdef np.ndarray[double, ndim=2, mode="c"] G = np.zeros((T, K))
+    cdef double[:,::1] G_view = G
+    cdef double[:,::1] lmda_c = np.zeros((T, 2))
+    cdef double[::1] scores = np.zeros(T)
+    cdef double[:,:,::1] dc = np.zeros((2, T, K))
+    cdef double[:,::1] dl = np.zeros((T, K))
+    cdef double[:,::1] du = np.zeros((T, K))
+
+    with nogil:
+        loglik = lmegarch_gradient_filter(parameters, Y, p_terms, q_terms, max_lag, leverage, dv_const,
+            lmda_c, scores, dc, dl, du, G_view)
+
+    if contributions:
+        return loglik, G.sum(axis=0), G
+    return loglik, G.sum(axis=0)
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.cdivision(True)
+def lmegarch_loglik_gradient_batch(double[:,::1] parameters, double[:] Y, int p_terms, int q_terms,
+    int max_lag, bint leverage):
+    """ Gradients of the log-likelihood of a long memory Beta-t-EGARCH model for many latent
+    variable vectors
+
+    Parameters
+    ----------
+    parameters : np.array
+        (S, K) array of transformed latent variables, one vector per row, in the order
+        of lmegarch_loglik_gradient
+
+    Y : np.array
+        The length-adjusted time series (accounting for lags)
+
+    Returns
+    ----------
+    (S, K) np.array of gradients with respect to the transformed latent variables
+    """
+
+    cdef Py_ssize_t i, t, j
+    cdef Py_ssize_t K = parameters.shape[1]
+    cdef Py_ssize_t T = Y.shape[0]
+    v = np.asarray(parameters)[:, K-2]
+    cdef double[::1] dv_const = np.ascontiguousarray(0.5*digamma((v+1.0)/2.0) - 0.5*digamma(v/2.0) - 0.5/v)
+    cdef np.ndarray[double, ndim=2, mode="c"] grad = np.zeros((parameters.shape[0], K))
+    cdef double[:,::1] grad_view = grad
+    cdef double[:,::1] lmda_c = np.empty((T, 2))
+    cdef double[::1] scores = np.empty(T)
+    cdef double[:,:,::1] dc = np.empty((2, T, K))
+    cdef double[:,::1] dl = np.empty((T, K))
+    cdef double[:,::1] du = np.empty((T, K))
+    cdef double[:,::1] G = np.empty((T, K))
+
+    with nogil:
+        for i in range(parameters.shape[0]):
+            dc[:,:,:] = 0.0
+            dl[:,:] = 0.0
+            du[:,:] = 0.0
+            lmegarch_gradient_filter(parameters[i], Y, p_terms, q_terms, max_lag, leverage, dv_const[i],
+                lmda_c, scores, dc, dl, du, G)
+            for t in range(T):
+                for j in range(K):
+                    grad_view[i,j] += G[t,j]
+
+    return grad
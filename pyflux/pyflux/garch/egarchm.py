@@ -12,6 +12,10 @@ from .. import tests as tst
 from .. import tsm as tsm
 from .. import gas as gas
 from .. import data_check as dc
+from .. import forecasting as fc
+
+from .egarch_recursions import egarch_loglik_gradient, egarch_loglik_gradient_batch, egarch_recursion, egarch_recursion_batch
+from .simulations import bootstrap_draws, simulate_recursion
 
 class EGARCHM(tsm.TSM):
     """ Inherits time series methods from TSM class.
@@ -107,37 +111,10 @@ class EGARCHM(tsm.TSM):
             Contains the score terms for the time series
         """
 
+        parm = self.latent_variables.transform_all(beta)
         Y = np.array(self.data[self.max_lag:self.data.shape[0]])
-        X = np.ones(Y.shape[0])
-        scores = np.zeros(Y.shape[0])
-
-        # Transform latent variables
-        parm = np.array([self.latent_variables.z_list[k].prior.transform(beta[k]) for k in range(beta.shape[0])])
-
-        lmda = np.ones(Y.shape[0])*parm[0]
-
-        # Loop over time series
-        for t in range(0,Y.shape[0]):
-
-            if t < self.max_lag:
-
-                lmda[t] = parm[0]/(1-np.sum(parm[1:(self.p+1)]))
-
-            else:
-
-                # Loop over GARCH terms
-                for p_term in range(0,self.p):
-                    lmda[t] += parm[1+p_term]*lmda[t-p_term-1]
-
-                # Loop over Score terms
-                for q_term in range(0,self.q):
-                    lmda[t] += parm[1+self.p+q_term]*scores[t-q_term-1]
-
-                if self.leverage is True:
-                    lmda[t] += parm[-4]*np.sign(-(Y[t-1]-parm[-2]-parm[-1]*np.exp(lmda[t-1]/2.0)))*(scores[t-1]+1)
+        lmda, scores, _ = egarch_recursion(parm, Y, self.p, self.q, self.max_lag, self.leverage, True)
 
-            scores[t] = (((parm[-3]+1.0)*np.power(Y[t]-(parm[-2]+parm[-1]*np.exp(lmda[t]/2.0)),2))/float(parm[-3]*np.exp(lmda[t]) + np.power(Y[t]-(parm[-2]+parm[-1]*np.exp(lmda[t]/2.0)),2))) - 1.0
- 
         return lmda, Y, scores
 
     def _mb_model(self, beta, mini_batch):
@@ -160,40 +137,11 @@ class EGARCHM(tsm.TSM):
             Contains the score terms for the time series
         """
 
-        # Transform latent variables
-        parm = np.array([self.latent_variables.z_list[k].prior.transform(beta[k]) for k in range(beta.shape[0])])
-
+        parm = self.latent_variables.transform_all(beta)
         rand_int =  np.random.randint(low=0, high=self.data_length-mini_batch+1)
-        sample = np.arange(start=rand_int, stop=rand_int+mini_batch)
-        sampled_data = self.data[sample]
-
-        Y = np.array(sampled_data[self.max_lag:])
-        X = np.ones(Y.shape[0])
-        scores = np.zeros(Y.shape[0])
-        lmda = np.ones(Y.shape[0])*parm[0]
+        Y = self.data[rand_int+self.max_lag:rand_int+mini_batch]
+        lmda, scores, _ = egarch_recursion(parm, Y, self.p, self.q, self.max_lag, self.leverage, True)
 
-        # Loop over time series
-        for t in range(0,Y.shape[0]):
-
-            if t < self.max_lag:
-
-                lmda[t] = parm[0]/(1-np.sum(parm[1:(self.p+1)]))
-
-            else:
-
-                # Loop over GARCH terms
-                for p_term in range(0,self.p):
-                    lmda[t] += parm[1+p_term]*lmda[t-p_term-1]
-
-                # Loop over Score terms
-                for q_term in range(0,self.q):
-                    lmda[t] += parm[1+self.p+q_term]*scores[t-q_term-1]
-
-                if self.leverage is True:
-                    lmda[t] += parm[-4]*np.sign(-(Y[t-1]-parm[-2]-parm[-1]*np.exp(lmda[t-1]/2.0)))*(scores[t-1]+1)
-
-            scores[t] = (((parm[-3]+1.0)*np.power(Y[t]-(parm[-2]+parm[-1]*np.exp(lmda[t]/2.0)),2))/float(parm[-3]*np.exp(lmda[t]) + np.power(Y[t]-(parm[-2]+parm[-1]*np.exp(lmda[t]/2.0)),2))) - 1.0
- 
         return lmda, Y, scores
 
     def _mean_prediction(self, lmda, Y, scores, h, t_params):
@@ -247,6 +195,42 @@ class EGARCHM(tsm.TSM):
 
         return lmda_exp
 
+    def _simulate_paths(self, lmda, Y, scores, t_params, future_Y, future_scores):
+        """ Simulates h-step ahead paths of the log volatility
+
+        Parameters
+        ----------
+        lmda : np.array
+            The past predicted values, one row per path if 2-D
+
+        Y : np.array
+            The past data
+
+        scores : np.array
+            The past scores, one row per path if 2-D
+
+        t_params : np.array
+            A vector of (transformed) latent variables, one row per path if 2-D
+
+        future_Y : np.array
+            (simulations, h) bootstrapped returns
+
+        future_scores : np.array
+            (simulations, h) bootstrapped scores
+
+        Returns
+        ----------
+        (simulations, h) matrix of simulations
+        """     
+
+        if self.leverage is True:
+            return simulate_recursion(t_params[..., :1], t_params[..., 1:1+self.p], t_params[..., 1+self.p:1+self.p+self.q], 
+                lmda, scores, future_scores, leverage=t_params[..., 1+self.p+self.q], past_return=Y[-1], 
+                future_returns=future_Y, location=lambda t, lmda_prev: t_params[..., -2] + t_params[..., -1]*np.exp(lmda_prev/2.0))
+        else:
+            return simulate_recursion(t_params[..., :1], t_params[..., 1:1+self.p], t_params[..., 1+self.p:1+self.p+self.q], 
+                lmda, scores, future_scores)
+
     def _sim_prediction(self, lmda, Y, scores, h, t_params, simulations):
         """ Simulates a h-step ahead mean prediction
 
@@ -275,36 +259,8 @@ class EGARCHM(tsm.TSM):
         Matrix of simulations
         """     
 
-        sim_vector = np.zeros([simulations,h])
-
-        for n in range(0,simulations):
-            # Create arrays to iteratre over        
-            lmda_exp = lmda.copy()
-            scores_exp = scores.copy()
-            Y_exp = Y.copy()
-
-            # Loop over h time periods          
-            for t in range(0,h):
-                new_value = t_params[0]
-
-                if self.p != 0:
-                    for j in range(1,self.p+1):
-                        new_value += t_params[j]*lmda_exp[-j]
-
-                if self.q != 0:
-                    for k in range(1,self.q+1):
-                        new_value += t_params[k+self.p]*scores_exp[-k]
-
-                if self.leverage is True:
-                    new_value += t_params[1+self.p+self.q]*np.sign(-(Y_exp[-1]-t_params[-2]-t_params[-1]*np.exp(lmda_exp[-1]/2.0)))*(scores_exp[-1]+1)
-
-                lmda_exp = np.append(lmda_exp,[new_value]) # For indexing consistency
-                scores_exp = np.append(scores_exp,scores[np.random.randint(scores.shape[0])]) # expectation of score is zero
-                Y_exp = np.append(Y_exp,Y[np.random.randint(Y.shape[0])]) # bootstrap returns
-
-            sim_vector[n] = lmda_exp[-h:]
-
-        return np.transpose(sim_vector)
+        draws = bootstrap_draws(scores.shape[0], h, simulations)
+        return self._simulate_paths(lmda, Y, scores, t_params, Y[draws], scores[draws]).T
 
     def _sim_prediction_bayes(self, h, simulations):
         """ Simulates a h-step ahead mean prediction
@@ -322,41 +278,17 @@ class EGARCHM(tsm.TSM):
         Matrix of simulations
         """     
 
-        sim_vector = np.zeros([simulations,h])
-
-        for n in range(0,simulations):
-
-            t_z = self.draw_latent_variables(nsims=1).T[0]
-            lmda, Y, scores = self._model(t_z)
-            t_z = np.array([self.latent_variables.z_list[k].prior.transform(t_z[k]) for k in range(t_z.shape[0])])
-
-            # Create arrays to iteratre over        
-            lmda_exp = lmda.copy()
-            scores_exp = scores.copy()
-            Y_exp = Y.copy()
+        z = self.draw_latent_variables(nsims=simulations).T
+        t_params = np.ascontiguousarray(self.transform_batch(z))
+        lags = self.max_lag + 1
+        draws = bootstrap_draws(self.data.shape[0]-self.max_lag, h, simulations)
 
-            # Loop over h time periods          
-            for t in range(0,h):
-                new_value = t_z[0]
-
-                if self.p != 0:
-                    for j in range(1,self.p+1):
-                        new_value += t_z[j]*lmda_exp[-j]
-
-                if self.q != 0:
-                    for k in range(1,self.q+1):
-                        new_value += t_z[k+self.p]*scores_exp[-k]
-
-                if self.leverage is True:
-                    new_value += t_z[1+self.p+self.q]*np.sign(-(Y_exp[-1]-t_z[-2]-t_z[-1]*np.exp(lmda_exp[-1]/2.0)))*(scores_exp[-1]+1)
-
-                lmda_exp = np.append(lmda_exp,[new_value]) # For indexing consistency
-                scores_exp = np.append(scores_exp,scores[np.random.randint(scores.shape[0])]) # expectation of score is zero
-                Y_exp = np.append(Y_exp,Y[np.random.randint(Y.shape[0])]) # bootstrap returns
-
-            sim_vector[n] = lmda_exp[-h:]
+        # One batched filter pass for all draws
+        Y = np.array(self.data[self.max_lag:self.data.shape[0]])
+        lmda_lags, scores_lags, future_scores = egarch_recursion_batch(t_params, Y, self.p, self.q,
+            self.max_lag, self.leverage, True, draws, lags)
 
-        return np.transpose(sim_vector)
+        return self._simulate_paths(lmda_lags, Y, scores_lags, t_params, Y[draws], future_scores).T
 
     def _sim_predicted_mean(self, lmda, Y, scores, h, t_params, simulations):
         """ Simulates a h-step ahead mean prediction
@@ -386,36 +318,9 @@ class EGARCHM(tsm.TSM):
         Matrix of simulations
         """     
 
-        sim_vector = np.zeros([simulations,h])
-
-        for n in range(0,simulations):
-            # Create arrays to iteratre over        
-            lmda_exp = lmda.copy()
-            scores_exp = scores.copy()
-            Y_exp = Y.copy()
-
-            # Loop over h time periods          
-            for t in range(0,h):
-                new_value = t_params[0]
-
-                if self.p != 0:
-                    for j in range(1,self.p+1):
-                        new_value += t_params[j]*lmda_exp[-j]
-
-                if self.q != 0:
-                    for k in range(1,self.q+1):
-                        new_value += t_params[k+self.p]*scores_exp[-k]
-
-                if self.leverage is True:
-                    new_value += t_params[1+self.p+self.q]*np.sign(-(Y_exp[-1]-t_params[-2]-t_params[-1]*np.exp(lmda_exp[-1]/2.0)))*(scores_exp[-1]+1)
-
-                lmda_exp = np.append(lmda_exp,[new_value]) # For indexing consistency
-                scores_exp = np.append(scores_exp,scores[np.random.randint(scores.shape[0])]) # expectation of score is zero
-                Y_exp = np.append(Y_exp,Y[np.random.randint(Y.shape[0])]) # bootstrap returns
-
-            sim_vector[n] = lmda_exp[-h:]
-
-        return np.append(lmda, np.array([np.mean(i) for i in np.transpose(sim_vector)]))
+        draws = bootstrap_draws(scores.shape[0], h, simulations)
+        sim_vector = self._simulate_paths(lmda, Y, scores, t_params, Y[draws], scores[draws])
+        return np.append(lmda, sim_vector.mean(axis=0))
 
     def _summarize_simulations(self, lmda, sim_vector, date_index, h, past_values):
         """ Summarizes a simulation vector and a mean vector of predictions
@@ -440,12 +345,10 @@ class EGARCHM(tsm.TSM):
         intervals : Boolean
             Would you like to show prediction intervals for the forecast?
         """ 
-        mean_values = np.append(lmda, np.array([np.mean(i) for i in sim_vector]))
+        mean_values = np.append(lmda, sim_vector.mean(axis=1))
 
-        error_bars = []
-        for pre in range(5,100,5):
-            error_bars.append(np.insert([np.percentile(i,pre) for i in sim_vector], 0, mean_values[-h-1]))
-        forecasted_values = np.insert([np.mean(i) for i in sim_vector], 0, mean_values[-h-1])
+        error_bars = fc.error_bars(sim_vector, mean_values[-h-1])
+        forecasted_values = np.insert(sim_vector.mean(axis=1), 0, mean_values[-h-1])
         plot_values = mean_values[-h-past_values:]
         plot_index = date_index[-h-past_values:]
 
@@ -486,11 +389,65 @@ class EGARCHM(tsm.TSM):
         The negative logliklihood of the model
         """     
 
-        lmda, Y, ___ = self._model(beta)
-        loc = np.ones(lmda.shape[0])*self.latent_variables.z_list[-2].prior.transform(beta[-2]) + self.latent_variables.z_list[-1].prior.transform(beta[-1])*np.exp(lmda/2.0)
-        return -np.sum(ss.t.logpdf(x=Y,
-            df=self.latent_variables.z_list[-3].prior.transform(beta[-3]),
-            loc=loc,scale=np.exp(lmda/2.0)))
+        parm = self.latent_variables.transform_all(beta)
+        return -egarch_recursion(parm, self.data[self.max_lag:], self.p, self.q, self.max_lag, 
+            self.leverage, True)[2]
+
+    def neg_loglik_gradient(self, beta):
+        """ Creates the gradient of the negative log-likelihood of the model
+
+        Parameters
+        ----------
+        beta : np.array
+            Contains untransformed starting values for latent variables
+
+        Returns
+        ----------
+        The gradient of the negative loglikelihood with respect to the untransformed latent variables
+        """
+
+        parm = self.latent_variables.transform_all(beta)
+        dparm = self.latent_variables.transform_derivative_all(beta)
+        __, grad = egarch_loglik_gradient(parm, self.data[self.max_lag:], self.p, self.q, self.max_lag,
+            self.leverage, True)
+        return -grad*dparm
+
+    def neg_loglik_gradient_contributions(self, beta):
+        """ Creates the per-observation gradients of the negative log-likelihood of the model
+
+        Parameters
+        ----------
+        beta : np.array
+            Contains untransformed starting values for latent variables
+
+        Returns
+        ----------
+        (T, K) array whose rows are the gradients of each observation's negative loglikelihood
+        """
+
+        parm = self.latent_variables.transform_all(beta)
+        dparm = self.latent_variables.transform_derivative_all(beta)
+        __, __, G = egarch_loglik_gradient(parm, self.data[self.max_lag:], self.p, self.q, self.max_lag,
+            self.leverage, True, contributions=True)
+        return -G*dparm
+
+    def neg_loglik_gradient_batch(self, Z):
+        """ Creates the gradients of the negative log-likelihood for many latent variable vectors
+
+        Parameters
+        ----------
+        Z : np.array
+            (S, k) array of untransformed latent variables, one vector per row
+
+        Returns
+        ----------
+        (S, k) array whose rows are the gradients of the negative loglikelihood
+        """
+
+        parm = np.ascontiguousarray(self.transform_batch(Z))
+        dparm = self.latent_variables.transform_derivative_all(Z)
+        return -egarch_loglik_gradient_batch(parm, self.data[self.max_lag:], self.p, self.q,
+            self.max_lag, self.leverage, True)*dparm
     
     def mb_neg_loglik(self, beta, mini_batch):
         """ Calculates the negative log-likelihood of the Normal model for a minibatch
@@ -508,9 +465,10 @@ class EGARCHM(tsm.TSM):
         The negative logliklihood of the model
         """     
 
-        lmda, Y, ___ = self._mb_model(beta, mini_batch)
-        loc = np.ones(lmda.shape[0])*self.latent_variables.z_list[-2].prior.transform(beta[-2]) + self.latent_variables.z_list[-1].prior.transform(beta[-1])*np.exp(lmda/2.0)
-        return -np.sum(ss.t.logpdf(x=Y, df=self.latent_variables.z_list[-3].prior.transform(beta[-3]), loc=loc, scale=np.exp(lmda/2.0)))
+        parm = self.latent_variables.transform_all(beta)
+        rand_int =  np.random.randint(low=0, high=self.data_length-mini_batch+1)
+        return -egarch_recursion(parm, self.data[rand_int+self.max_lag:rand_int+mini_batch], self.p, self.q, 
+            self.max_lag, self.leverage, True)[2]
 
     def plot_fit(self, **kwargs):
         """ Plots the fit of the model
@@ -569,12 +527,9 @@ class EGARCHM(tsm.TSM):
 
             if self.latent_variables.estimation_method in ['M-H']:
                 sim_vector = self._sim_prediction_bayes(h, 15000)
-                error_bars = []
-
-                for pre in range(5,100,5):
-                    error_bars.append(np.insert([np.percentile(i,pre) for i in sim_vector], 0, lmda[-1]))
+                error_bars = fc.error_bars(sim_vector, lmda[-1])
 
-                forecasted_values = np.insert([np.mean(i) for i in sim_vector], 0, lmda[-1])
+                forecasted_values = np.insert(sim_vector.mean(axis=1), 0, lmda[-1])
                 plot_values = np.append(lmda[-1-past_values:-2], forecasted_values)
                 plot_index = date_index[-h-past_values:]
 
@@ -681,7 +636,7 @@ class EGARCHM(tsm.TSM):
         plt.legend(loc=2)   
         plt.show()          
 
-    def predict(self, h=5, intervals=False):
+    def predict(self, h=5, intervals=False, percentiles=None):
         """ Makes forecast with the estimated model
 
         Parameters
@@ -692,6 +647,9 @@ class EGARCHM(tsm.TSM):
         intervals : boolean (default: False)
             Whether to return prediction intervals
 
+        percentiles : list (default: [1, 5, 95, 99])
+            Percentiles of the prediction intervals, in percent (e.g. [0.5, 2.5] for VaR)
+
         Returns
         ----------
         - pd.DataFrame with predicted values
@@ -704,26 +662,12 @@ class EGARCHM(tsm.TSM):
             date_index = self.shift_dates(h)
 
             if self.latent_variables.estimation_method in ['M-H']:
-                sim_vector = self._sim_prediction_bayes(h, 15000)
-                error_bars = []
-
-                for pre in range(5,100,5):
-                    error_bars.append(np.insert([np.percentile(i,pre) for i in sim_vector], 0, lmda[-1]))
-
-                forecasted_values = np.array([np.mean(i) for i in sim_vector])
-                prediction_01 = np.array([np.percentile(i, 1) for i in sim_vector])
-                prediction_05 = np.array([np.percentile(i, 5) for i in sim_vector])
-                prediction_95 = np.array([np.percentile(i, 95) for i in sim_vector])
-                prediction_99 = np.array([np.percentile(i, 99) for i in sim_vector])
+                sim_values = self._sim_prediction_bayes(h, 15000)
+                forecasted_values = sim_values.mean(axis=1)
 
             else:
                 t_z = self.transform_z()
 
-                if intervals is True:
-                    sim_values = self._sim_prediction(lmda, Y, scores, h, t_z, 15000)
-                else:
-                    sim_values = self._sim_prediction(lmda, Y, scores, h, t_z, 2)
-
                 mean_values = self._sim_predicted_mean(lmda, Y, scores, h, t_z, 15000)
                 forecasted_values = mean_values[-h:]
 
@@ -733,16 +677,8 @@ class EGARCHM(tsm.TSM):
             else:
                 if self.latent_variables.estimation_method not in ['M-H']:
                     sim_values = self._sim_prediction(lmda, Y, scores, h, t_z, 15000)
-                    prediction_01 = np.array([np.percentile(i, 1) for i in sim_values])
-                    prediction_05 = np.array([np.percentile(i, 5) for i in sim_values])
-                    prediction_95 = np.array([np.percentile(i, 95) for i in sim_values])
-                    prediction_99 = np.array([np.percentile(i, 99) for i in sim_values])
-
-                result = np.exp(pd.DataFrame([forecasted_values, prediction_01, prediction_05, 
-                    prediction_95, prediction_99]).T/2.0)
-                result.rename(columns={0:self.data_name, 1: "1% Prediction Interval", 
-                    2: "5% Prediction Interval", 3: "95% Prediction Interval", 4: "99% Prediction Interval"}, 
-                    inplace=True)
+
+                result = np.exp(fc.interval_frame(forecasted_values, sim_values, self.data_name, percentiles)/2.0)
  
             result.index = date_index[-h:]
 
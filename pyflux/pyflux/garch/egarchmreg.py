@@ -13,6 +13,10 @@ from .. import tests as tst
 from .. import tsm as tsm
 from .. import gas as gas
 from .. import data_check as dc
+from .. import forecasting as fc
+
+from .egarch_recursions import egarchmreg_recursion, egarchmreg_recursion_batch
+from .simulations import bootstrap_draws, simulate_recursion
 
 class EGARCHMReg(tsm.TSM):
     """ Inherits time series methods from TSM class.
@@ -128,38 +132,9 @@ class EGARCHMReg(tsm.TSM):
             Contains the score terms for the time series
         """
 
+        parm = self.latent_variables.transform_all(beta)
         Y = np.array(self.data[self.max_lag:self.data.shape[0]])
-        X = np.ones(Y.shape[0])
-        scores = np.zeros(Y.shape[0])
-
-        # Transform latent variables
-        parm = np.array([self.latent_variables.z_list[k].prior.transform(beta[k]) for k in range(beta.shape[0])])
-
-        lmda = np.zeros(Y.shape[0])
-        theta = np.zeros(Y.shape[0])
-
-        # Loop over time series
-        for t in range(0,Y.shape[0]):
-            if t < self.max_lag:
-                lmda[t] = parm[-len(self.X_names)*2]/(1-np.sum(parm[:self.p]))
-                theta[t] = np.dot(self.X[t],parm[-len(self.X_names):])
-            else:
-                # Loop over GARCH terms
-                for p_term in range(0,self.p):
-                    lmda[t] += parm[p_term]*lmda[t-p_term-1]
-
-                # Loop over Score terms
-                for q_term in range(0,self.q):
-                    lmda[t] += parm[self.p+q_term]*scores[t-q_term-1]
-
-                if self.leverage is True:
-                    lmda[t] += parm[-(len(self.X_names)*2)-3]*np.sign(-(Y[t-1]-theta[t-1]))*(scores[t-1]+1)
-
-                lmda[t] += np.dot(self.X[t],parm[-len(self.X_names)*2:-len(self.X_names)])
-
-                theta[t] = np.dot(self.X[t],parm[-len(self.X_names):]) + parm[-(len(self.X_names)*2)-1]*np.exp(lmda[t]/2.0)
-            
-            scores[t] = (((parm[self.p+self.q]+1.0)*np.power(Y[t]-theta[t],2))/float(parm[self.p+self.q]*np.exp(lmda[t]) + np.power(Y[t]-theta[t],2))) - 1.0        
+        lmda, scores, theta, _ = egarchmreg_recursion(parm, Y, self.X, self.p, self.q, self.max_lag, self.leverage)
 
         return lmda, Y, scores, theta
 
@@ -183,42 +158,11 @@ class EGARCHMReg(tsm.TSM):
             Contains the score terms for the time series
         """
 
-        # Transform latent variables
-        parm = np.array([self.latent_variables.z_list[k].prior.transform(beta[k]) for k in range(beta.shape[0])])
-
+        parm = self.latent_variables.transform_all(beta)
         rand_int =  np.random.randint(low=0, high=self.data_length-mini_batch+1)
-        sample = np.arange(start=rand_int, stop=rand_int+mini_batch)
-
-        data = self.y[sample]
-        X = self.X[sample, :]
-        Y = data[self.max_lag:]
-
-        scores = np.zeros(Y.shape[0])
-        lmda = np.ones(Y.shape[0])
-        theta = np.ones(Y.shape[0])
-
-        # Loop over time series
-        for t in range(0,Y.shape[0]):
-            if t < self.max_lag:
-                lmda[t] = parm[-len(self.X_names)*2]/(1-np.sum(parm[:self.p]))
-                theta[t] = np.dot(self.X[t],parm[-len(self.X_names):])
-            else:
-                # Loop over GARCH terms
-                for p_term in range(0,self.p):
-                    lmda[t] += parm[p_term]*lmda[t-p_term-1]
-
-                # Loop over Score terms
-                for q_term in range(0,self.q):
-                    lmda[t] += parm[self.p+q_term]*scores[t-q_term-1]
-
-                if self.leverage is True:
-                    lmda[t] += parm[-(len(self.X_names)*2)-3]*np.sign(-(Y[t-1]-theta[t-1]))*(scores[t-1]+1)
-
-                lmda[t] += np.dot(self.X[t],parm[-len(self.X_names)*2:-len(self.X_names)])
-
-                theta[t] = np.dot(self.X[t],parm[-len(self.X_names):]) + parm[-(len(self.X_names)*2)-1]*np.exp(lmda[t]/2.0)
-            
-            scores[t] = (((parm[self.p+self.q]+1.0)*np.power(Y[t]-theta[t],2))/float(parm[self.p+self.q]*np.exp(lmda[t]) + np.power(Y[t]-theta[t],2))) - 1.0        
+        Y = self.y[rand_int+self.max_lag:rand_int+mini_batch]
+        lmda, scores, theta, _ = egarchmreg_recursion(parm, Y, self.X[rand_int:rand_int+mini_batch], self.p, self.q, 
+            self.max_lag, self.leverage)
 
         return lmda, Y, scores, theta
 
@@ -277,6 +221,52 @@ class EGARCHMReg(tsm.TSM):
 
         return lmda_exp
 
+    def _simulate_paths(self, lmda, Y, scores, t_params, future_Y, future_scores, X_oos):
+        """ Simulates h-step ahead paths of the log volatility
+
+        Parameters
+        ----------
+        lmda : np.array
+            The past predicted values, one row per path if 2-D
+
+        Y : np.array
+            The past data
+
+        scores : np.array
+            The past scores, one row per path if 2-D
+
+        t_params : np.array
+            A vector of (transformed) latent variables, one row per path if 2-D
+
+        future_Y : np.array
+            (simulations, h) bootstrapped returns
+
+        future_scores : np.array
+            (simulations, h) bootstrapped scores
+
+        X_oos : np.array
+            Out of sample predictors
+
+        Returns
+        ----------
+        (simulations, h) matrix of simulations
+        """     
+
+        X_no = len(self.X_names)
+        constant = np.dot(t_params[..., -X_no*2:-X_no], X_oos[:future_scores.shape[1]].T)
+
+        def location(t, lmda_prev):
+            X_prev = self.X[-1] if t == 0 else X_oos[t-1]
+            return np.dot(t_params[..., -X_no:], X_prev) + t_params[..., -(X_no*2)-1]*np.exp(lmda_prev/2.0)
+
+        if self.leverage is True:
+            return simulate_recursion(constant, t_params[..., :self.p], t_params[..., self.p:self.p+self.q], lmda, scores, 
+                future_scores, leverage=t_params[..., -(X_no*2)-3], past_return=Y[-1], future_returns=future_Y, 
+                location=location)
+        else:
+            return simulate_recursion(constant, t_params[..., :self.p], t_params[..., self.p:self.p+self.q], lmda, scores, 
+                future_scores)
+
     def _sim_prediction(self, lmda, Y, scores, h, t_params, simulations, X_oos):
         """ Simulates a h-step ahead mean prediction
 
@@ -308,39 +298,8 @@ class EGARCHMReg(tsm.TSM):
         Matrix of simulations
         """     
 
-        sim_vector = np.zeros([simulations,h])
-
-        for n in range(0,simulations):
-            # Create arrays to iteratre over
-            lmda_exp = lmda.copy()
-            scores_exp = scores.copy()
-            Y_exp = Y.copy()
-
-            # Loop over h time periods          
-            for t in range(0,h):
-                new_lambda_value = 0
-
-                if self.p != 0:
-                    for j in range(self.p):
-                        new_lambda_value += t_params[j]*lmda_exp[-j-1]
-
-                if self.q != 0:
-                    for k in range(self.q):
-                        new_lambda_value += t_params[k+self.p]*scores_exp[-k-1]
-
-                if self.leverage is True:
-                    new_lambda_value += t_params[self.p+self.q]*np.sign(-(Y_exp[-1]-new_theta_value))*(scores_exp[-1]+1)
-
-                new_lambda_value += np.dot(X_oos[t],t_params[-len(self.X_names)*2:-len(self.X_names)]) 
-                new_theta_value = np.dot(X_oos[t],t_params[-len(self.X_names):]) + t_params[-(len(self.X_names)*2)-1]*np.exp(new_lambda_value/2.0)
-
-                lmda_exp = np.append(lmda_exp,[new_lambda_value]) # For indexing consistency
-                scores_exp = np.append(scores_exp,scores[np.random.randint(scores.shape[0])]) # expectation of score is zero
-                Y_exp = np.append(Y_exp,Y[np.random.randint(Y.shape[0])]) # bootstrap returns
-
-            sim_vector[n] = lmda_exp[-h:]
-
-        return np.transpose(sim_vector)
+        draws = bootstrap_draws(scores.shape[0], h, simulations)
+        return self._simulate_paths(lmda, Y, scores, t_params, Y[draws], scores[draws], X_oos).T
 
     def _sim_prediction_bayes(self, h, simulations, X_oos):
         """ Simulates a h-step ahead mean prediction
@@ -361,44 +320,18 @@ class EGARCHMReg(tsm.TSM):
         Matrix of simulations
         """     
 
-        sim_vector = np.zeros([simulations,h])
-
-        for n in range(0,simulations):
-
-            t_z = self.draw_latent_variables(nsims=1).T[0]
-            lmda, Y, scores, theta = self._model(beta)
-            t_z = np.array([self.latent_variables.z_list[k].prior.transform(t_z[k]) for k in range(t_z.shape[0])])
-
-            # Create arrays to iteratre over
-            lmda_exp = lmda.copy()
-            scores_exp = scores.copy()
-            Y_exp = Y.copy()
-
-            # Loop over h time periods          
-            for t in range(0,h):
-                new_lambda_value = 0
-
-                if self.p != 0:
-                    for j in range(self.p):
-                        new_lambda_value += t_z[j]*lmda_exp[-j-1]
+        z = self.draw_latent_variables(nsims=simulations).T
+        t_params = np.ascontiguousarray(self.transform_batch(z))
+        lags = self.max_lag + 1
+        draws = bootstrap_draws(self.data.shape[0]-self.max_lag, h, simulations)
 
-                if self.q != 0:
-                    for k in range(self.q):
-                        new_lambda_value += t_z[k+self.p]*scores_exp[-k-1]
-
-                if self.leverage is True:
-                    new_lambda_value += t_z[self.p+self.q]*np.sign(-(Y_exp[-1]-new_theta_value))*(scores_exp[-1]+1)
-
-                new_lambda_value += np.dot(X_oos[t],t_z[-len(self.X_names)*2:-len(self.X_names)]) 
-                new_theta_value = np.dot(X_oos[t],t_z[-len(self.X_names):]) + t_z[-(len(self.X_names)*2)-1]*np.exp(new_lambda_value/2.0)
-
-                lmda_exp = np.append(lmda_exp,[new_lambda_value]) # For indexing consistency
-                scores_exp = np.append(scores_exp,scores[np.random.randint(scores.shape[0])]) # expectation of score is zero
-                Y_exp = np.append(Y_exp,Y[np.random.randint(Y.shape[0])]) # bootstrap returns
-
-            sim_vector[n] = lmda_exp[-h:]
+        # One batched filter pass for all draws
+        Y = np.array(self.data[self.max_lag:self.data.shape[0]])
+        lmda_lags, scores_lags, future_scores = egarchmreg_recursion_batch(t_params, Y, self.X, self.p, self.q,
+            self.max_lag, self.leverage, draws, lags)
 
-        return np.transpose(sim_vector)
+        return self._simulate_paths(lmda_lags, Y, scores_lags, t_params, Y[draws], 
+            future_scores, X_oos).T
 
     def _sim_predicted_mean(self, lmda, Y, scores, h, t_params, simulations, X_oos):
         """ Simulates a h-step ahead mean prediction
@@ -431,39 +364,9 @@ class EGARCHMReg(tsm.TSM):
         Matrix of simulations
         """     
 
-        sim_vector = np.zeros([simulations,h])
-
-        for n in range(0,simulations):
-            # Create arrays to iteratre over
-            lmda_exp = lmda.copy()
-            scores_exp = scores.copy()
-            Y_exp = Y.copy()
-
-            # Loop over h time periods          
-            for t in range(0,h):
-                new_lambda_value = 0
-
-                if self.p != 0:
-                    for j in range(self.p):
-                        new_lambda_value += t_params[j]*lmda_exp[-j-1]
-
-                if self.q != 0:
-                    for k in range(self.q):
-                        new_lambda_value += t_params[k+self.p]*scores_exp[-k-1]
-
-                if self.leverage is True:
-                    new_lambda_value += t_params[self.p+self.q]*np.sign(-(Y_exp[-1]-new_theta_value))*(scores_exp[-1]+1)
-
-                new_lambda_value += np.dot(X_oos[t],t_params[-len(self.X_names)*2:-len(self.X_names)]) 
-                new_theta_value = np.dot(X_oos[t],t_params[-len(self.X_names):]) + t_params[-(len(self.X_names)*2)-1]*np.exp(new_lambda_value/2.0)
-
-                lmda_exp = np.append(lmda_exp,[new_lambda_value]) # For indexing consistency
-                scores_exp = np.append(scores_exp,scores[np.random.randint(scores.shape[0])]) # expectation of score is zero
-                Y_exp = np.append(Y_exp,Y[np.random.randint(Y.shape[0])]) # bootstrap returns
-
-            sim_vector[n] = lmda_exp[-h:]
-
-        return np.append(lmda, np.array([np.mean(i) for i in np.transpose(sim_vector)]))
+        draws = bootstrap_draws(scores.shape[0], h, simulations)
+        sim_vector = self._simulate_paths(lmda, Y, scores, t_params, Y[draws], scores[draws], X_oos)
+        return np.append(lmda, sim_vector.mean(axis=0))
 
     def _summarize_simulations(self, lmda, sim_vector, date_index, h, past_values):
         """ Summarizes a simulation vector and a mean vector of predictions
@@ -488,12 +391,10 @@ class EGARCHMReg(tsm.TSM):
         intervals : Boolean
             Would you like to show prediction intervals for the forecast?
         """ 
-        mean_values = np.append(lmda, np.array([np.mean(i) for i in sim_vector]))
+        mean_values = np.append(lmda, sim_vector.mean(axis=1))
 
-        error_bars = []
-        for pre in range(5,100,5):
-            error_bars.append(np.insert([np.percentile(i,pre) for i in sim_vector], 0, mean_values[-h-1]))
-        forecasted_values = np.insert([np.mean(i) for i in sim_vector], 0, mean_values[-h-1])
+        error_bars = fc.error_bars(sim_vector, mean_values[-h-1])
+        forecasted_values = np.insert(sim_vector.mean(axis=1), 0, mean_values[-h-1])
         plot_values = mean_values[-h-past_values:]
         plot_index = date_index[-h-past_values:]
 
@@ -541,11 +442,10 @@ class EGARCHMReg(tsm.TSM):
         The negative logliklihood of the model
         """     
 
-        lmda, Y, _, theta = self._model(beta)
-        return -np.sum(ss.t.logpdf(x=Y,
-            df=self.latent_variables.z_list[-(len(self.X_names)*2)-2].prior.transform(beta[-(len(self.X_names)*2)-2]),
-            loc=theta,scale=np.exp(lmda/2.0)))
-    
+        parm = self.latent_variables.transform_all(beta)
+        return -egarchmreg_recursion(parm, self.data[self.max_lag:], self.X, self.p, self.q, self.max_lag, 
+            self.leverage)[3]
+
     def mb_neg_loglik(self, beta, mini_batch):
         """ Creates the negative log-likelihood of the model
 
@@ -561,11 +461,12 @@ class EGARCHMReg(tsm.TSM):
         ----------
         The negative logliklihood of the model
         """     
-        lmda, Y, _, theta = self._mb_model(beta, mini_batch)
-        return -np.sum(ss.t.logpdf(x=Y,
-            df=self.latent_variables.z_list[-(len(self.X_names)*2)-2].prior.transform(beta[-(len(self.X_names)*2)-2]),
-            loc=theta,scale=np.exp(lmda/2.0)))
-    
+
+        parm = self.latent_variables.transform_all(beta)
+        rand_int =  np.random.randint(low=0, high=self.data_length-mini_batch+1)
+        return -egarchmreg_recursion(parm, self.y[rand_int+self.max_lag:rand_int+mini_batch], 
+            self.X[rand_int:rand_int+mini_batch], self.p, self.q, self.max_lag, self.leverage)[3]
+
     def plot_fit(self, **kwargs):
         """ Plots the fit of the model
 
@@ -630,12 +531,9 @@ class EGARCHMReg(tsm.TSM):
 
             if self.latent_variables.estimation_method in ['M-H']:
                 sim_vector = self._sim_prediction_bayes(h, 15000, X_pred)
-                error_bars = []
-
-                for pre in range(5,100,5):
-                    error_bars.append(np.insert([np.percentile(i,pre) for i in sim_vector], 0, lmda[-1]))
+                error_bars = fc.error_bars(sim_vector, lmda[-1])
 
-                forecasted_values = np.insert([np.mean(i) for i in sim_vector], 0, lmda[-1])
+                forecasted_values = np.insert(sim_vector.mean(axis=1), 0, lmda[-1])
                 plot_values = np.append(lmda[-1-past_values:-2], forecasted_values)
                 plot_index = date_index[-h-past_values:]
 
@@ -740,7 +638,7 @@ class EGARCHMReg(tsm.TSM):
         plt.legend(loc=2)   
         plt.show()          
 
-    def predict(self, h=5, oos_data=None, intervals=False):
+    def predict(self, h=5, oos_data=None, intervals=False, percentiles=None):
         """ Makes forecast with the estimated model
 
         Parameters
@@ -754,6 +652,9 @@ class EGARCHMReg(tsm.TSM):
         intervals : boolean (default: False)
             Whether to return prediction intervals
 
+        percentiles : list (default: [1, 5, 95, 99])
+            Percentiles of the prediction intervals, in percent (e.g. [0.5, 2.5] for VaR)
+
         Returns
         ----------
         - pd.DataFrame with predicted values
@@ -768,26 +669,12 @@ class EGARCHMReg(tsm.TSM):
             date_index = self.shift_dates(h)
 
             if self.latent_variables.estimation_method in ['M-H']:
-                sim_vector = self._sim_prediction_bayes(h, 15000, X_pred)
-                error_bars = []
-
-                for pre in range(5,100,5):
-                    error_bars.append(np.insert([np.percentile(i,pre) for i in sim_vector], 0, lmda[-1]))
-
-                forecasted_values = np.array([np.mean(i) for i in sim_vector])
-                prediction_01 = np.array([np.percentile(i, 1) for i in sim_vector])
-                prediction_05 = np.array([np.percentile(i, 5) for i in sim_vector])
-                prediction_95 = np.array([np.percentile(i, 95) for i in sim_vector])
-                prediction_99 = np.array([np.percentile(i, 99) for i in sim_vector])
+                sim_values = self._sim_prediction_bayes(h, 15000, X_pred)
+                forecasted_values = sim_values.mean(axis=1)
 
             else:
                 t_z = self.transform_z()
 
-                if intervals is True:
-                    sim_values = self._sim_prediction(lmda, Y, scores, h, t_z, 15000, X_pred)
-                else:
-                    sim_values = self._sim_prediction(lmda, Y, scores, h, t_z, 2, X_pred)
-
                 mean_values = self._sim_predicted_mean(lmda, Y, scores, h, t_z, 15000, X_pred)
                 forecasted_values = mean_values[-h:]
 
@@ -797,16 +684,8 @@ class EGARCHMReg(tsm.TSM):
             else:
                 if self.latent_variables.estimation_method not in ['M-H']:
                     sim_values = self._sim_prediction(lmda, Y, scores, h, t_z, 15000, X_pred)
-                    prediction_01 = np.array([np.percentile(i, 1) for i in sim_values])
-                    prediction_05 = np.array([np.percentile(i, 5) for i in sim_values])
-                    prediction_95 = np.array([np.percentile(i, 95) for i in sim_values])
-                    prediction_99 = np.array([np.percentile(i, 99) for i in sim_values])
-
-                result = np.exp(pd.DataFrame([forecasted_values, prediction_01, prediction_05, 
-                    prediction_95, prediction_99]).T/2.0)
-                result.rename(columns={0:self.data_name, 1: "1% Prediction Interval", 
-                    2: "5% Prediction Interval", 3: "95% Prediction Interval", 4: "99% Prediction Interval"}, 
-                    inplace=True)
+
+                result = np.exp(fc.interval_frame(forecasted_values, sim_values, self.data_name, percentiles)/2.0)
  
             result.index = date_index[-h:]
 
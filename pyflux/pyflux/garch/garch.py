@@ -11,8 +11,11 @@ from .. import output as op
 from .. import tests as tst
 from .. import tsm as tsm
 from .. import data_check as dc
+from .. import forecasting as fc
 
-from .garch_recursions import garch_recursion
+from .garch_recursions import garch_recursion, garch_recursion_batch, garch_loglik, garch_loglik_batch, garch_loglik_gradient, garch_loglik_gradient_batch
+from .simulations import bootstrap_draws, simulate_recursion
+from .streaming import FilterState
 
 class GARCH(tsm.TSM):
     """ Inherits time series methods from TSM class.
@@ -54,6 +57,7 @@ class GARCH(tsm.TSM):
         # Format the data
         self.data, self.data_name, self.is_pandas, self.index = dc.data_check(data,target)
         self.data_length = self.data.shape[0]
+        self._filter_state = None
         self._create_latent_variables()
         
     def _create_latent_variables(self):
@@ -104,24 +108,13 @@ class GARCH(tsm.TSM):
         """
 
         # Transform latent variables
-        parm = np.array([self.latent_variables.z_list[k].prior.transform(beta[k]) for k in range(beta.shape[0])])
+        parm = self.latent_variables.transform_all(beta)
 
-        xeps = np.power(self.data-parm[-1],2)
         Y = np.array(self.data[self.max_lag:])
         eps = np.power(Y-parm[-1],2)
-        X = np.ones(Y.shape[0])
+        sigma2 = garch_recursion(parm, self.data, self.q, self.p, self.max_lag)
 
-        # ARCH terms
-        if self.q != 0:
-            for i in range(0,self.q):   
-                X = np.vstack((X,xeps[(self.max_lag-i-1):-i-1]))
-            sigma2 = np.matmul(np.transpose(X),parm[0:-self.p-1])
-        else:
-            sigma2 = np.transpose(X*parm[0])
-
-        sigma2 = garch_recursion(parm, sigma2, self.q, self.p, Y.shape[0], self.max_lag)
-
-        return np.array(sigma2), Y, eps
+        return sigma2, Y, eps
 
     def _mb_model(self, beta, mini_batch):
         """ Creates the structure of the model (model matrices etc) for mini batch model.
@@ -147,28 +140,16 @@ class GARCH(tsm.TSM):
         """     
 
         # Transform latent variables
-        parm = np.array([self.latent_variables.z_list[k].prior.transform(beta[k]) for k in range(beta.shape[0])])
+        parm = self.latent_variables.transform_all(beta)
 
         rand_int =  np.random.randint(low=0, high=self.data_length-mini_batch+1)
-        sample = np.arange(start=rand_int, stop=rand_int+mini_batch)
-        sampled_data = self.data[sample]
+        sampled_data = self.data[rand_int:rand_int+mini_batch]
 
-        xeps = np.power(sampled_data-parm[-1],2)
         Y = np.array(sampled_data[self.max_lag:])
         eps = np.power(Y-parm[-1],2)
-        X = np.ones(Y.shape[0])
-
-        # ARCH terms
-        if self.q != 0:
-            for i in range(0,self.q):   
-                X = np.vstack((X,xeps[(self.max_lag-i-1):-i-1]))
-            sigma2 = np.matmul(np.transpose(X),parm[0:-self.p-1])
-        else:
-            sigma2 = np.transpose(X*parm[0])
-
-        sigma2 = garch_recursion(parm, sigma2, self.q, self.p, Y.shape[0], self.max_lag)
+        sigma2 = garch_recursion(parm, sampled_data, self.q, self.p, self.max_lag)
 
-        return np.array(sigma2), Y, eps
+        return sigma2, Y, eps
 
     def _mean_prediction(self, sigma2, Y, scores, h, t_params):
         """ Creates a h-step ahead mean prediction
@@ -218,6 +199,60 @@ class GARCH(tsm.TSM):
 
         return sigma2_exp
 
+    def _next_variance(self, sigma2, scores, t_params):
+        """ Creates the one-step ahead conditional variance from the latest p variances and q scores
+
+        Parameters
+        ----------
+        sigma2 : np.array
+            The past predicted values
+
+        scores : np.array
+            The past scores
+
+        t_params : np.array
+            A vector of (transformed) latent variables
+
+        Returns
+        ----------
+        The next conditional variance
+        """     
+
+        new_value = t_params[0]
+
+        for j in range(1,self.q+1):
+            new_value += t_params[j]*scores[-j]
+
+        for k in range(1,self.p+1):
+            new_value += t_params[k+self.q]*sigma2[-k]
+
+        return new_value
+
+    def _simulate_paths(self, sigma2, scores, t_params, future_scores):
+        """ Simulates h-step ahead paths of the conditional variance
+
+        Parameters
+        ----------
+        sigma2 : np.array
+            The past predicted values, one row per path if 2-D
+
+        scores : np.array
+            The past scores, one row per path if 2-D
+
+        t_params : np.array
+            A vector of (transformed) latent variables, one row per path if 2-D
+
+        future_scores : np.array
+            (simulations, h) bootstrapped scores
+
+        Returns
+        ----------
+        (simulations, h) matrix of simulations
+        """     
+
+        return simulate_recursion(t_params[..., :1], t_params[..., 1+self.q:1+self.q+self.p], 
+            t_params[..., 1:1+self.q], sigma2, scores, future_scores)
+
     def _sim_prediction(self, sigma2, Y, scores, h, t_params, simulations):
         """ Simulates a h-step ahead mean prediction
 
@@ -246,31 +281,8 @@ class GARCH(tsm.TSM):
         Matrix of simulations
         """     
 
-        sim_vector = np.zeros([simulations,h])
-
-        for n in range(0,simulations):
-            # Create arrays to iteratre over        
-            sigma2_exp = sigma2.copy()
-            scores_exp = scores.copy()
-
-            # Loop over h time periods          
-            for t in range(0,h):
-                new_value = t_params[0]
-
-                if self.q != 0:
-                    for j in range(1,self.q+1):
-                        new_value += t_params[j]*scores_exp[-j]
-
-                if self.p != 0:
-                    for k in range(1,self.p+1):
-                        new_value += t_params[k+self.q]*sigma2_exp[-k]  
-
-                sigma2_exp = np.append(sigma2_exp,[new_value]) # For indexing consistency
-                scores_exp = np.append(scores_exp,scores[np.random.randint(scores.shape[0])]) # expectation of score is zero
-
-            sim_vector[n] = sigma2_exp[-h:]
-
-        return np.transpose(sim_vector)
+        draws = bootstrap_draws(scores.shape[0], h, simulations)
+        return self._simulate_paths(sigma2, scores, t_params, scores[draws]).T
 
     def _sim_prediction_bayes(self, h, simulations):
         """ Simulates a h-step ahead mean prediction
@@ -288,36 +300,18 @@ class GARCH(tsm.TSM):
         Matrix of simulations
         """     
 
-        sim_vector = np.zeros([simulations,h])
-
-        for n in range(0,simulations):
-
-            t_z = self.draw_latent_variables(nsims=1).T[0]
-            sigma2, Y, scores = self._model(t_z)
-            t_z = np.array([self.latent_variables.z_list[k].prior.transform(t_z[k]) for k in range(t_z.shape[0])])
-
-            # Create arrays to iteratre over        
-            sigma2_exp = sigma2.copy()
-            scores_exp = scores.copy()
-
-            # Loop over h time periods          
-            for t in range(0,h):
-                new_value = t_z[0]
-
-                if self.q != 0:
-                    for j in range(1,self.q+1):
-                        new_value += t_z[j]*scores_exp[-j]
+        z = self.draw_latent_variables(nsims=simulations).T
+        t_params = np.ascontiguousarray(self.transform_batch(z))
+        lags = self.max_lag + 1
+        draws = bootstrap_draws(self.data.shape[0]-self.max_lag, h, simulations)
 
-                if self.p != 0:
-                    for k in range(1,self.p+1):
-                        new_value += t_z[k+self.q]*sigma2_exp[-k]  
-
-                sigma2_exp = np.append(sigma2_exp,[new_value]) # For indexing consistency
-                scores_exp = np.append(scores_exp,scores[np.random.randint(scores.shape[0])]) # expectation of score is zero
-
-            sim_vector[n] = sigma2_exp[-h:]
+        # One batched filter pass for all draws; the scores are the squared residuals
+        Y = np.array(self.data[self.max_lag:])
+        sigma2_lags = garch_recursion_batch(t_params, self.data, self.q, self.p, self.max_lag, lags)
+        scores_lags = np.power(Y[-lags:] - t_params[:,-1:], 2)
+        future_scores = np.power(Y[draws] - t_params[:,-1:], 2)
 
-        return np.transpose(sim_vector)
+        return self._simulate_paths(sigma2_lags, scores_lags, t_params, future_scores).T
 
     def _sim_predicted_mean(self, sigma2, Y, scores, h, t_params, simulations):
         """ Simulates a h-step ahead mean prediction (with randomly draw disturbances)
@@ -347,31 +341,9 @@ class GARCH(tsm.TSM):
         Matrix of simulations
         """     
 
-        sim_vector = np.zeros([simulations,h])
-
-        for n in range(0,simulations):
-            # Create arrays to iteratre over        
-            sigma2_exp = sigma2.copy()
-            scores_exp = scores.copy()
-
-            # Loop over h time periods          
-            for t in range(0,h):
-                new_value = t_params[0]
-
-                if self.q != 0:
-                    for j in range(1, self.q+1):
-                        new_value += t_params[j]*scores_exp[-j]
-
-                if self.p != 0:
-                    for k in range(1, self.p+1):
-                        new_value += t_params[k+self.q]*sigma2_exp[-k]  
-
-                sigma2_exp = np.append(sigma2_exp,[new_value]) # For indexing consistency
-                scores_exp = np.append(scores_exp,scores[np.random.randint(scores.shape[0])]) # expectation of score is zero
-
-            sim_vector[n] = sigma2_exp[-h:]
-            
-        return np.append(sigma2, np.array([np.mean(i) for i in np.transpose(sim_vector)]))
+        draws = bootstrap_draws(scores.shape[0], h, simulations)
+        sim_vector = self._simulate_paths(sigma2, scores, t_params, scores[draws])
+        return np.append(sigma2, sim_vector.mean(axis=0))
 
     def _summarize_simulations(self, sigma2, sim_vector, date_index, h, past_values):
         """ Summarizes a simulation vector and a mean vector of predictions
@@ -396,11 +368,9 @@ class GARCH(tsm.TSM):
         intervals : Boolean
             Would you like to show prediction intervals for the forecast?
         """ 
-        mean_values = np.append(sigma2, np.array([np.mean(i) for i in sim_vector]))
-        error_bars = []
-        for pre in range(5,100,5):
-            error_bars.append(np.insert([np.percentile(i,pre) for i in sim_vector], 0, mean_values[-h-1]))
-        forecasted_values = np.insert([np.mean(i) for i in sim_vector], 0, mean_values[-h-1])
+        mean_values = np.append(sigma2, sim_vector.mean(axis=1))
+        error_bars = fc.error_bars(sim_vector, mean_values[-h-1])
+        forecasted_values = np.insert(sim_vector.mean(axis=1), 0, mean_values[-h-1])
         plot_values = mean_values[-h-past_values:]
         plot_index = date_index[-h-past_values:]
         return error_bars, forecasted_values, plot_values, plot_index
@@ -418,9 +388,77 @@ class GARCH(tsm.TSM):
         The negative logliklihood of the model
         """     
 
-        sigma2, Y, __ = self._model(beta)
-        parm = np.array([self.latent_variables.z_list[k].prior.transform(beta[k]) for k in range(beta.shape[0])])
-        return -np.sum(ss.norm.logpdf(Y, loc=parm[-1]*np.ones(sigma2.shape[0]), scale=np.sqrt(sigma2)))
+        parm = self.latent_variables.transform_all(beta)
+        return -garch_loglik(parm, self.data, self.q, self.p, self.max_lag)
+
+    def neg_loglik_batch(self, Z):
+        """ Creates the negative log-likelihood of the model for many latent variable vectors
+
+        Parameters
+        ----------
+        Z : np.array
+            (S, k) array of untransformed latent variables, one vector per row
+
+        Returns
+        ----------
+        np.array of S negative loglikelihoods
+        """
+
+        parm = np.ascontiguousarray(self.transform_batch(Z))
+        return -garch_loglik_batch(parm, self.data, self.q, self.p, self.max_lag)
+
+    def neg_loglik_gradient(self, beta):
+        """ Creates the gradient of the negative log-likelihood of the model
+
+        Parameters
+        ----------
+        beta : np.array
+            Contains untransformed starting values for latent variables
+
+        Returns
+        ----------
+        The gradient of the negative loglikelihood with respect to the untransformed latent variables
+        """
+
+        parm = self.latent_variables.transform_all(beta)
+        dparm = self.latent_variables.transform_derivative_all(beta)
+        __, grad = garch_loglik_gradient(parm, self.data, self.q, self.p, self.max_lag)
+        return -grad*dparm
+
+    def neg_loglik_gradient_contributions(self, beta):
+        """ Creates the per-observation gradients of the negative log-likelihood of the model
+
+        Parameters
+        ----------
+        beta : np.array
+            Contains untransformed starting values for latent variables
+
+        Returns
+        ----------
+        (T, K) array whose rows are the gradients of each observation's negative loglikelihood
+        """
+
+        parm = self.latent_variables.transform_all(beta)
+        dparm = self.latent_variables.transform_derivative_all(beta)
+        __, __, G = garch_loglik_gradient(parm, self.data, self.q, self.p, self.max_lag, contributions=True)
+        return -G*dparm
+
+    def neg_loglik_gradient_batch(self, Z):
+        """ Creates the gradients of the negative log-likelihood for many latent variable vectors
+
+        Parameters
+        ----------
+        Z : np.array
+            (S, k) array of untransformed latent variables, one vector per row
+
+        Returns
+        ----------
+        (S, k) array whose rows are the gradients of the negative loglikelihood
+        """
+
+        parm = np.ascontiguousarray(self.transform_batch(Z))
+        dparm = self.latent_variables.transform_derivative_all(Z)
+        return -garch_loglik_gradient_batch(parm, self.data, self.q, self.p, self.max_lag)*dparm
 
     def mb_neg_loglik(self, beta, mini_batch):
         """ Calculates the negative log-likelihood of the Normal model for a minibatch
@@ -438,9 +476,9 @@ class GARCH(tsm.TSM):
         The negative logliklihood of the model
         """     
 
-        sigma2, Y, __ = self._mb_model(beta, mini_batch)
-        parm = np.array([self.latent_variables.z_list[k].prior.transform(beta[k]) for k in range(beta.shape[0])])
-        return -np.sum(ss.norm.logpdf(Y, loc=parm[-1]*np.ones(sigma2.shape[0]), scale=np.sqrt(sigma2)))
+        parm = self.latent_variables.transform_all(beta)
+        rand_int =  np.random.randint(low=0, high=self.data_length-mini_batch+1)
+        return -garch_loglik(parm, self.data[rand_int:rand_int+mini_batch], self.q, self.p, self.max_lag)
 
     def plot_fit(self, **kwargs):
         """ Plots the fit of the model
@@ -500,12 +538,9 @@ class GARCH(tsm.TSM):
 
             if self.latent_variables.estimation_method in ['M-H']:
                 sim_vector = self._sim_prediction_bayes(h, 15000)
-                error_bars = []
-
-                for pre in range(5,100,5):
-                    error_bars.append(np.insert([np.percentile(i,pre) for i in sim_vector], 0, sigma2[-1]))
+                error_bars = fc.error_bars(sim_vector, sigma2[-1])
 
-                forecasted_values = np.insert([np.mean(i) for i in sim_vector], 0, sigma2[-1])
+                forecasted_values = np.insert(sim_vector.mean(axis=1), 0, sigma2[-1])
                 plot_values = np.append(sigma2[-1-past_values:-2], forecasted_values)
                 plot_index = date_index[-h-past_values:]
 
@@ -526,9 +561,13 @@ class GARCH(tsm.TSM):
             plt.ylabel(self.data_name + " Conditional Volatility")
             plt.show()
 
-    def predict_is(self, h=5, fit_once=True, fit_method='MLE', intervals=False, **kwargs):
+    def predict_is(self, h=5, fit_once=True, fit_method='MLE', intervals=False, refit_every=None, **kwargs):
         """ Makes dynamic in-sample predictions with the estimated model
 
+        The forecast origin rolls forward one observation at a time on a single model: between
+        refits the conditional variance is updated from the newest observation only, and every
+        refit is warm-started from the previous estimates.
+
         Parameters
         ----------
         h : int (default : 5)
@@ -543,33 +582,66 @@ class GARCH(tsm.TSM):
         intervals: boolean
             Whether to return prediction intervals
 
+        refit_every : int
+            (default: None) Refits the model every refit_every new datapoints; overrides fit_once if given
+
         Returns
         ----------
         - pd.DataFrame with predicted values
         """     
 
-        predictions = []
+        if refit_every is None:
+            refit_every = h if fit_once is True else 1
+
+        fit_kwargs = dict(kwargs)
+        fit_kwargs.setdefault('printer', False)
+
+        x = GARCH(p=self.p, q=self.q, data=self.data[:-h])
+        x.fit(method=fit_method, **fit_kwargs)
+
+        # Filtered values for the full sample, filled in as the forecast origin moves forward
+        Y = self.data[self.max_lag:]
+        sigma2 = np.zeros(Y.shape[0])
+        scores = np.zeros(Y.shape[0])
+        forecasted_values = np.zeros(h)
+
+        # Simulated forecasts are only kept for the prediction intervals
+        if intervals is True:
+            sim_vector = np.zeros((h, 15000))
 
         for t in range(0,h):
-            x = GARCH(p=self.p, q=self.q, data=self.data[0:-h+t])
+            n = Y.shape[0] - h + t
+
+            if t > 0:
+                x.data = self.data[:-h+t]
+                x.data_length = x.data.shape[0]
+
+            if t % refit_every == 0:
+                if t > 0:
+                    fit_kwargs['start'] = x.latent_variables.get_z_values()
+                    x.fit(method=fit_method, **fit_kwargs)
+                sigma2[:n], _, scores[:n] = x._model(x.latent_variables.get_z_values())
+                t_z = x.transform_z()
+            else:
+                sigma2[n-1] = next_sigma2
+                scores[n-1] = np.power(Y[n-1]-t_z[-1],2)
 
-            if fit_once is False:
-                x.fit(method=fit_method, printer=False)
+            next_sigma2 = x._next_variance(sigma2[:n], scores[:n], t_z)
 
-            if t == 0:
-                if fit_once is True:
-                    x.fit(method=fit_method, printer=False)
-                    saved_lvs = x.latent_variables
-                predictions = x.predict(1, intervals=intervals)
+            if x.latent_variables.estimation_method in ['M-H']:
+                sims = x._sim_prediction_bayes(1, 15000)[0]
+                forecasted_values[t] = sims.mean()
+                if intervals is True:
+                    sim_vector[t] = sims
             else:
-                if fit_once is True:
-                    x.latent_variables = saved_lvs
-                predictions = pd.concat([predictions,x.predict(1, intervals=intervals)])
-        
+                forecasted_values[t] = next_sigma2
+                if intervals is True:
+                    sim_vector[t] = x._sim_prediction(sigma2[:n], Y[:n], scores[:n], 1, t_z, 15000)[0]
+
         if intervals is True:
-            predictions.rename(columns={0:self.data_name, 1: "1% Prediction Interval", 
-                2: "5% Prediction Interval", 3: "95% Prediction Interval", 4: "99% Prediction Interval"}, inplace=True)
+            predictions = fc.interval_frame(forecasted_values, sim_vector, self.data_name)
         else:
+            predictions = pd.DataFrame(forecasted_values)
             predictions.rename(columns={0:self.data_name}, inplace=True)
 
         predictions.index = self.index[-h:]
@@ -613,7 +685,22 @@ class GARCH(tsm.TSM):
         plt.legend(loc=2)   
         plt.show()          
 
-    def predict(self, h=5, intervals=False):
+    def _backtest_actual(self, value):
+        """ The value a one-step ahead forecast is scored against in a backtest
+
+        Parameters
+        ----------
+        value : float
+            The next observation
+
+        Returns
+        ----------
+        - float, the squared demeaned return (predict forecasts the conditional variance)
+        """
+
+        return np.power(value - self.transform_z()[-1], 2)
+
+    def predict(self, h=5, intervals=False, percentiles=None):
         """ Makes forecast with the estimated model
 
         Parameters
@@ -624,6 +711,9 @@ class GARCH(tsm.TSM):
         intervals : boolean (default: False)
             Whether to return prediction intervals
 
+        percentiles : list (default: [1, 5, 95, 99])
+            Percentiles of the prediction intervals, in percent (e.g. [0.5, 2.5] for VaR)
+
         Returns
         ----------
         - pd.DataFrame with predicted values
@@ -638,26 +728,12 @@ class GARCH(tsm.TSM):
             date_index = self.shift_dates(h)
 
             if self.latent_variables.estimation_method in ['M-H']:
-                sim_vector = self._sim_prediction_bayes(h, 15000)
-                error_bars = []
-
-                for pre in range(5,100,5):
-                    error_bars.append(np.insert([np.percentile(i,pre) for i in sim_vector], 0, sigma2[-1]))
-
-                forecasted_values = np.array([np.mean(i) for i in sim_vector])
-                prediction_01 = np.array([np.percentile(i, 1) for i in sim_vector])
-                prediction_05 = np.array([np.percentile(i, 5) for i in sim_vector])
-                prediction_95 = np.array([np.percentile(i, 95) for i in sim_vector])
-                prediction_99 = np.array([np.percentile(i, 99) for i in sim_vector])
+                sim_values = self._sim_prediction_bayes(h, 15000)
+                forecasted_values = sim_values.mean(axis=1)
 
             else:
                 t_z = self.transform_z()
 
-                if intervals is True:
-                    sim_values = self._sim_prediction(sigma2, Y, scores, h, t_z, 15000)
-                else:
-                    sim_values = self._sim_prediction(sigma2, Y, scores, h, t_z, 2)
-
                 mean_values = self._sim_predicted_mean(sigma2, Y, scores, h, t_z, 15000)
                 forecasted_values = mean_values[-h:]
 
@@ -667,21 +743,76 @@ class GARCH(tsm.TSM):
             else:
                 if self.latent_variables.estimation_method not in ['M-H']:
                     sim_values = self._sim_prediction(sigma2, Y, scores, h, t_z, 15000)
-                    prediction_01 = np.array([np.percentile(i, 1) for i in sim_values])
-                    prediction_05 = np.array([np.percentile(i, 5) for i in sim_values])
-                    prediction_95 = np.array([np.percentile(i, 95) for i in sim_values])
-                    prediction_99 = np.array([np.percentile(i, 99) for i in sim_values])
-
-                result = pd.DataFrame([forecasted_values, prediction_01, prediction_05, 
-                    prediction_95, prediction_99]).T
-                result.rename(columns={0:self.data_name, 1: "1% Prediction Interval", 
-                    2: "5% Prediction Interval", 3: "95% Prediction Interval", 4: "99% Prediction Interval"}, 
-                    inplace=True)
+
+                result = fc.interval_frame(forecasted_values, sim_values, self.data_name, percentiles)
  
             result.index = date_index[-h:]
 
             return result
 
+    def _current_filter_state(self):
+        """ Returns the filter state at the end of the data, refiltering if the latent variables have changed
+
+        Returns
+        ----------
+        FilterState object
+        """
+
+        z = self.latent_variables.get_z_values()
+
+        if self._filter_state is None or not self._filter_state.is_current(z):
+            sigma2, Y, scores = self._model(z)
+            t_z = self.transform_z()
+            self._filter_state = FilterState(z, t_z, sigma2, scores, Y[-1], max(self.max_lag, 1))
+            self._filter_state.next_value = self._next_variance(sigma2, scores, t_z)
+
+        return self._filter_state
+
+    def update(self, new_value):
+        """ Updates the conditional variance with a new observation, using the estimated latent variables
+
+        Only the latest filtered values and scores are used, so each update takes O(p+q) time.
+        The data the model was estimated on is left unchanged.
+
+        Parameters
+        ----------
+        new_value : float
+            The new observation
+
+        Returns
+        ----------
+        The one-step ahead forecast of the conditional variance
+        """
+
+        return self.update_batch([new_value])[-1]
+
+    def update_batch(self, new_data):
+        """ Updates the conditional variance with new observations, using the estimated latent variables
+
+        Parameters
+        ----------
+        new_data : np.array
+            The new observations, oldest first
+
+        Returns
+        ----------
+        np.array of one-step ahead forecasts of the conditional variance, one after each observation
+        """
+
+        if self.latent_variables.estimated is False:
+            raise Exception("No latent variables estimated!")
+
+        state = self._current_filter_state()
+        t_z = state.t_params
+        forecasts = np.zeros(len(new_data))
+
+        for i, new_value in enumerate(new_data):
+            state.push(state.next_value, np.power(new_value-t_z[-1],2), new_value)
+            state.next_value = self._next_variance(state.values, state.scores, t_z)
+            forecasts[i] = state.next_value
+
+        return forecasts
+
     def sample(self, nsims=1000):
         """ Samples from the posterior predictive distribution
 
@@ -697,11 +828,9 @@ class GARCH(tsm.TSM):
         if self.latent_variables.estimation_method not in ['BBVI', 'M-H']:
             raise Exception("No latent variables estimated!")
         else:
-            lv_draws = self.draw_latent_variables(nsims=nsims)
-            sigmas = [self._model(lv_draws[:,i])[0] for i in range(nsims)]
-            data_draws = np.array([ss.norm.rvs(loc=self.latent_variables.z_list[-1].prior.transform(lv_draws[-1,i]),
-                scale=np.sqrt(sigmas[i])) for i in range(nsims)])
-            return data_draws
+            parm = np.ascontiguousarray(self.transform_batch(self.draw_latent_variables(nsims=nsims).T))
+            sigma2 = garch_recursion_batch(parm, self.data, self.q, self.p, self.max_lag)
+            return ss.norm.rvs(loc=parm[:,-1:], scale=np.sqrt(sigma2))
 
     def plot_sample(self, nsims=10, plot_data=True, **kwargs):
         """
@@ -752,10 +881,6 @@ class GARCH(tsm.TSM):
         if self.latent_variables.estimation_method not in ['BBVI', 'M-H']:
             raise Exception("No latent variables estimated!")
         else:
-            lv_draws = self.draw_latent_variables(nsims=nsims)
-            sigmas = [self._model(lv_draws[:,i])[0] for i in range(nsims)]
-            data_draws = np.array([ss.norm.rvs(loc=self.latent_variables.z_list[-1].prior.transform(lv_draws[-1,i]),
-                scale=np.sqrt(sigmas[i])) for i in range(nsims)])
             T_sims = T(self.sample(nsims=nsims), axis=1)
             T_actual = T(self.data)
             return len(T_sims[T_sims>T_actual])/nsims
@@ -779,10 +904,6 @@ class GARCH(tsm.TSM):
 
             figsize = kwargs.get('figsize',(10,7))
 
-            lv_draws = self.draw_latent_variables(nsims=nsims)
-            sigmas = [self._model(lv_draws[:,i])[0] for i in range(nsims)]
-            data_draws = np.array([ss.norm.rvs(loc=self.latent_variables.z_list[-1].prior.transform(lv_draws[-1,i]),
-                scale=np.sqrt(sigmas[i])) for i in range(nsims)])
             T_sim = T(self.sample(nsims=nsims), axis=1)
             T_actual = T(self.data)
 
@@ -2,21 +2,298 @@ import numpy as np
 cimport numpy as np
 cimport cython
 
-from libc.math cimport exp, abs, M_PI
+from libc.math cimport log, M_PI
+
 
 @cython.boundscheck(False)
 @cython.wraparound(False)
 @cython.cdivision(True)
-def garch_recursion(double[:] parameters, double[:] sigma2, int q_terms, int p_terms, int Y_len, int max_lag):
+cdef double garch_filter(double[:] parameters, double[:] data, int q_terms, int p_terms,
+    int max_lag, double[:] sigma2) nogil:
+    """ Runs the GARCH(p,q) variance recursion and the Normal log-likelihood in one pass
+
+    parameters holds the transformed latent variables in model order: the volatility
+    constant, q ARCH terms, p GARCH terms and the returns constant. sigma2 must have
+    length data.shape[0] - max_lag and is filled with the conditional variances.
+    """
 
     cdef Py_ssize_t t, k
+    cdef Py_ssize_t Y_len = data.shape[0] - max_lag
+    cdef double mu = parameters[q_terms+p_terms+1]
+    cdef double persistence = 0.0
+    cdef double loglik = 0.0
+    cdef double s, e
+
+    for k in range(p_terms):
+        persistence += parameters[1+q_terms+k]
+
+    for t in range(Y_len):
+        if p_terms != 0 and t < max_lag:
+            s = parameters[0]/(1.0-persistence)
+        else:
+            s = parameters[0]
+            for k in range(q_terms):
+                e = data[max_lag+t-k-1] - mu
+                s += parameters[1+k]*e*e
+            for k in range(p_terms):
+                s += parameters[1+q_terms+k]*sigma2[t-1-k]
+        sigma2[t] = s
+
+        e = data[max_lag+t] - mu
+        loglik -= 0.5*(log(2.0*M_PI*s) + e*e/s)
+
+    return loglik
+
+
+def garch_recursion(double[:] parameters, double[:] data, int q_terms, int p_terms, int max_lag):
+    """ Conditional variances of a GARCH(p,q) model
+
+    Parameters
+    ----------
+    parameters : np.array
+        Transformed latent variables (constant, ARCH terms, GARCH terms, returns constant)
+
+    data : np.array
+        The full time series (including the first max_lag observations)
+
+    Returns
+    ----------
+    np.array of length data.shape[0] - max_lag
+    """
+
+    cdef np.ndarray[double, ndim=1] sigma2 = np.empty(data.shape[0] - max_lag)
+    garch_filter(parameters, data, q_terms, p_terms, max_lag, sigma2)
+    return sigma2
+
+
+def garch_loglik(double[:] parameters, double[:] data, int q_terms, int p_terms, int max_lag):
+    """ Normal log-likelihood of a GARCH(p,q) model
+
+    Parameters
+    ----------
+    parameters : np.array
+        Transformed latent variables (constant, ARCH terms, GARCH terms, returns constant)
+
+    data : np.array
+        The full time series (including the first max_lag observations)
+
+    Returns
+    ----------
+    float, the log-likelihood of data[max_lag:]
+    """
+
+    cdef double[:] sigma2 = np.empty(data.shape[0] - max_lag)
+    return garch_filter(parameters, data, q_terms, p_terms, max_lag, sigma2)
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def garch_recursion_batch(double[:,::1] parameters, double[:] data, int q_terms, int p_terms, int max_lag,
+    int lags=0):
+    """ Conditional variances of a GARCH(p,q) model for many latent variable vectors
+
+    Parameters
+    ----------
+    parameters : np.array
+        (S, K) array of transformed latent variables, one vector per row
+
+    data : np.array
+        The full time series (including the first max_lag observations)
+
+    lags : int
+        (default: 0) If positive, only the last lags conditional variances of each row are
+        kept, so memory does not grow with the length of the series
+
+    Returns
+    ----------
+    (S, data.shape[0] - max_lag) np.array of conditional variances, or (S, lags) if lags is positive
+    """
+
+    cdef Py_ssize_t i, k
+    cdef Py_ssize_t Y_len = data.shape[0] - max_lag
+    cdef np.ndarray[double, ndim=2, mode="c"] sigma2
+    cdef double[:,::1] sigma2_view
+    cdef double[::1] work = np.empty(Y_len)
+
+    if lags <= 0:
+        sigma2 = np.empty((parameters.shape[0], Y_len))
+        sigma2_view = sigma2
+        with nogil:
+            for i in range(parameters.shape[0]):
+                garch_filter(parameters[i], data, q_terms, p_terms, max_lag, sigma2_view[i])
+        return sigma2
+
+    sigma2 = np.empty((parameters.shape[0], lags))
+    sigma2_view = sigma2
+    with nogil:
+        for i in range(parameters.shape[0]):
+            garch_filter(parameters[i], data, q_terms, p_terms, max_lag, work)
+            for k in range(lags):
+                sigma2_view[i,k] = work[Y_len-lags+k]
+
+    return sigma2
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def garch_loglik_batch(double[:,::1] parameters, double[:] data, int q_terms, int p_terms, int max_lag):
+    """ Normal log-likelihoods of a GARCH(p,q) model for many latent variable vectors
+
+    Parameters
+    ----------
+    parameters : np.array
+        (S, K) array of transformed latent variables, one vector per row
+
+    data : np.array
+        The full time series (including the first max_lag observations)
+
+    Returns
+    ----------
+    np.array of S log-likelihoods
+    """
+
+    cdef Py_ssize_t i
+    cdef np.ndarray[double, ndim=1] loglik = np.empty(parameters.shape[0])
+    cdef double[::1] loglik_view = loglik
+    cdef double[:] sigma2 = np.empty(data.shape[0] - max_lag)
+
+    with nogil:
+        for i in range(parameters.shape[0]):
+            loglik_view[i] = garch_filter(parameters[i], data, q_terms, p_terms, max_lag, sigma2)
+
+    return loglik
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.cdivision(True)
+cdef double garch_gradient_filter(double[:] parameters, double[:] data, int q_terms, int p_terms,
+    int max_lag, double[:] sigma2, double[:,::1] ds, double[:,::1] G) nogil:
+    """ Runs the GARCH(p,q) variance recursion with the sensitivities of sigma2 to each
+    latent variable, filling G with the gradient of each observation's log-likelihood
+
+    ds and G must be (data.shape[0] - max_lag, K) arrays and ds must start at zero.
+    The log-likelihood is returned.
+    """
+
+    cdef Py_ssize_t t, k, j
+    cdef Py_ssize_t K = parameters.shape[0]
+    cdef double mu = parameters[K-1]
+    cdef double persistence = 0.0
+    cdef double loglik = 0.0
+    cdef double s, e, dl_ds
+
+    for k in range(p_terms):
+        persistence += parameters[1+q_terms+k]
+
+    for t in range(sigma2.shape[0]):
+        if p_terms != 0 and t < max_lag:
+            s = parameters[0]/(1.0-persistence)
+            ds[t,0] = 1.0/(1.0-persistence)
+            for k in range(p_terms):
+                ds[t,1+q_terms+k] = s/(1.0-persistence)
+        else:
+            s = parameters[0]
+            ds[t,0] = 1.0
+            for k in range(q_terms):
+                e = data[max_lag+t-k-1] - mu
+                s += parameters[1+k]*e*e
+                ds[t,1+k] = e*e
+                ds[t,K-1] -= 2.0*parameters[1+k]*e
+            for k in range(p_terms):
+                s += parameters[1+q_terms+k]*sigma2[t-1-k]
+                ds[t,1+q_terms+k] += sigma2[t-1-k]
+                for j in range(K):
+                    ds[t,j] += parameters[1+q_terms+k]*ds[t-1-k,j]
+        sigma2[t] = s
+
+        e = data[max_lag+t] - mu
+        loglik -= 0.5*(log(2.0*M_PI*s) + e*e/s)
+        dl_ds = 0.5*(e*e - s)/(s*s)
+        for j in range(K):
+            G[t,j] = dl_ds*ds[t,j]
+        G[t,K-1] += e/s
+
+    return loglik
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.cdivision(True)
+def garch_loglik_gradient(double[:] parameters, double[:] data, int q_terms, int p_terms, int max_lag,
+    bint contributions=False):
+    """ Normal log-likelihood of a GARCH(p,q) model and its gradient
+
+    The gradient is taken with respect to the transformed latent variables, using
+    forward recursions for the sensitivities of sigma2 to each latent variable.
+
+    Parameters
+    ----------
+    parameters : np.array
+        Transformed latent variables (constant, ARCH terms, GARCH terms, returns constant)
+
+    data : np.array
+        The full time series (including the first max_lag observations)
+
+    contributions : boolean
+        (default: False) Whether to also return the gradient of each observation
+
+    Returns
+    ----------
+    - float, the log-likelihood of data[max_lag:]
+    - np.array, the gradient of the log-likelihood
+    - np.array, (T, K) per-observation gradients (only if contributions is True)
+    """
+
+    cdef Py_ssize_t Y_len = data.shape[0] - max_lag
+    cdef double[:] sigma2 = np.empty(Y_len)
+    cdef double[:,::1] ds = np.zeros((Y_len, parameters.shape[0]))
+    cdef np.ndarray[double, ndim=2, mode="c"] G = np.zeros((Y_len, parameters.shape[0]))
+    cdef double[:,::1] G_view = G
+    cdef double loglik
+
+    with nogil:
+        loglik = garch_gradient_filter(parameters, data, q_terms, p_terms, max_lag, sigma2, ds, G_view)
+
+    if contributions:
+        return loglik, G.sum(axis=0), G
+    return loglik, G.sum(axis=0)
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def garch_loglik_gradient_batch(double[:,::1] parameters, double[:] data, int q_terms, int p_terms,
+    int max_lag):
+    """ Gradients of the Normal log-likelihood of a GARCH(p,q) model for many latent variable vectors
+
+    Parameters
+    ----------
+    parameters : np.array
+        (S, K) array of transformed latent variables, one vector per row
+
+    data : np.array
+        The full time series (including the first max_lag observations)
+
+    Returns
+    ----------
+    (S, K) np.array of gradients with respect to the transformed latent variables
+    """
+
+    cdef Py_ssize_t i, t, j
+    cdef Py_ssize_t K = parameters.shape[1]
+    cdef Py_ssize_t Y_len = data.shape[0] - max_lag
+    cdef np.ndarray[double, ndim=2, mode="c"] grad = np.zeros((parameters.shape[0], K))
+    cdef double[:,::1] grad_view = grad
+    cdef double[:] sigma2 = np.empty(Y_len)
+    cdef double[:,::1] ds = np.empty((Y_len, K))
+    cdef double[:,::1] G = np.empty((Y_len, K))
 
-    if p_terms != 0:
-        for t in range(0,Y_len):
-            if t < max_lag:
-                sigma2[t] = parameters[0]/(1-np.sum(parameters[(q_terms+1):(q_terms+p_terms+1)]))
-            elif t >= max_lag:
-                for k in range(0,p_terms):
-                    sigma2[t] += parameters[1+q_terms+k]*(sigma2[t-1-k])
+    with nogil:
+        for i in range(parameters.shape[0]):
+            ds[:,:] = 0.0
+            garch_gradient_filter(parameters[i], data, q_terms, p_terms, max_lag, sigma2, ds, G)
+            for t in range(Y_len):
+                for j in range(K):
+                    grad_view[i,j] += G[t,j]
 
-    return sigma2
\ No newline at end of file
+    return grad
@@ -12,6 +12,11 @@ from .. import tests as tst
 from .. import tsm as tsm
 from .. import gas as gas
 from .. import data_check as dc
+from .. import forecasting as fc
+
+from .egarch_recursions import lmegarch_loglik_gradient, lmegarch_loglik_gradient_batch, lmegarch_recursion, lmegarch_recursion_batch
+from .simulations import bootstrap_draws, simulate_recursion
+from .streaming import FilterState
 
 class LMEGARCH(tsm.TSM):
     """ Inherits time series methods from TSM class.
@@ -54,6 +59,7 @@ class LMEGARCH(tsm.TSM):
         # Format the data
         self.data, self.data_name, self.is_pandas, self.index = dc.data_check(data,target)
         self.data_length = self.data.shape[0]
+        self._filter_state = None
         self._create_latent_variables()
 
     def _create_latent_variables(self):
@@ -106,41 +112,10 @@ class LMEGARCH(tsm.TSM):
             Contains the score terms for the time series
         """
 
+        parm = self.latent_variables.transform_all(beta)
         Y = np.array(self.data[self.max_lag:self.data.shape[0]])
-        X = np.ones(Y.shape[0])
-        scores = np.zeros(Y.shape[0])
-
-        # Transform latent variables
-        parm = np.array([self.latent_variables.z_list[k].prior.transform(beta[k]) for k in range(beta.shape[0])])
-
-        lmda = np.ones(Y.shape[0])*parm[0]
-        lmda_c = np.zeros((Y.shape[0],2))
-
-        # Loop over time series
-        for t in range(0,Y.shape[0]):
-
-            if t >= self.max_lag:
-                
-                for comp in range(2):
-
-                    # Loop over GARCH terms
-                    for p_term in range(0,self.p):
-                        lmda_c[t,comp] += parm[1+p_term+(comp*(self.q+self.p))]*lmda_c[t-p_term-1,comp]
+        lmda, lmda_c, scores, _ = lmegarch_recursion(parm, Y, self.p, self.q, self.max_lag, self.leverage)
 
-                    # Loop over Score terms
-                    for q_term in range(0,self.q):
-                        lmda_c[t,comp] += parm[1+self.p+q_term+(comp*(self.q+self.p))]*scores[t-q_term-1]
-
-                if self.leverage is True:
-                    lmda_c[t,1] += parm[-3]*np.sign(-(Y[t-1]-parm[-1]))*(scores[t-1]+1)
-
-                lmda[t] += lmda_c[t,:].sum()
-
-            else:
-                lmda[t] = parm[0] / (1-parm[1:1+self.p].sum())
-
-            scores[t] = (((parm[-2]+1.0)*np.power(Y[t]-parm[-1],2))/float(parm[-2]*np.exp(lmda[t]) + np.power(Y[t]-parm[-1],2))) - 1.0
-        
         return lmda, lmda_c, Y, scores
 
     def _mb_model(self, beta, mini_batch):
@@ -163,44 +138,11 @@ class LMEGARCH(tsm.TSM):
             Contains the score terms for the time series
         """
 
-        # Transform latent variables
-        parm = np.array([self.latent_variables.z_list[k].prior.transform(beta[k]) for k in range(beta.shape[0])])
-
+        parm = self.latent_variables.transform_all(beta)
         rand_int =  np.random.randint(low=0, high=self.data_length-mini_batch+1)
-        sample = np.arange(start=rand_int, stop=rand_int+mini_batch)
-        sampled_data = self.data[sample]
-
-        Y = np.array(sampled_data[self.max_lag:])
-        X = np.ones(Y.shape[0])
-        scores = np.zeros(Y.shape[0])
-        lmda = np.ones(Y.shape[0])*parm[0]
-        lmda_c = np.zeros((Y.shape[0],2))
-
-        # Loop over time series
-        for t in range(0,Y.shape[0]):
-
-            if t >= self.max_lag:
-                
-                for comp in range(2):
-
-                    # Loop over GARCH terms
-                    for p_term in range(0,self.p):
-                        lmda_c[t,comp] += parm[1+p_term+(comp*(self.q+self.p))]*lmda_c[t-p_term-1,comp]
-
-                    # Loop over Score terms
-                    for q_term in range(0,self.q):
-                        lmda_c[t,comp] += parm[1+self.p+q_term+(comp*(self.q+self.p))]*scores[t-q_term-1]
+        Y = self.data[rand_int+self.max_lag:rand_int+mini_batch]
+        lmda, lmda_c, scores, _ = lmegarch_recursion(parm, Y, self.p, self.q, self.max_lag, self.leverage)
 
-                if self.leverage is True:
-                    lmda_c[t,1] += parm[-3]*np.sign(-(Y[t-1]-parm[-1]))*(scores[t-1]+1)
-
-                lmda[t] += lmda_c[t,:].sum()
-
-            else:
-                lmda[t] = parm[0] / (1-parm[1:1+self.p].sum())
-
-            scores[t] = (((parm[-2]+1.0)*np.power(Y[t]-parm[-1],2))/float(parm[-2]*np.exp(lmda[t]) + np.power(Y[t]-parm[-1],2))) - 1.0
-        
         return lmda, lmda_c, Y, scores
 
     def _mean_prediction(self, lmda, lmda_c, Y, scores, h, t_params):
@@ -263,6 +205,87 @@ class LMEGARCH(tsm.TSM):
 
         return lmda_exp
 
+    def _next_components(self, lmda_c, scores, last_return, t_params):
+        """ Creates the one-step ahead volatility components from the latest p values and q scores
+
+        Parameters
+        ----------
+        lmda_c : np.array
+            The past values of the two components, one row per period
+
+        scores : np.array
+            The past scores
+
+        last_return : float
+            The last observation
+
+        t_params : np.array
+            A vector of (transformed) latent variables
+
+        Returns
+        ----------
+        np.array of the next two components (the log volatility is the constant plus their sum)
+        """     
+
+        new_values = np.zeros(2)
+
+        for comp in range(2):
+
+            for p_term in range(0, self.p):
+                new_values[comp] += t_params[1+p_term+(comp*(self.q+self.p))]*lmda_c[-p_term-1][comp]
+
+            for q_term in range(0, self.q):
+                new_values[comp] += t_params[1+self.p+q_term+(comp*(self.q+self.p))]*scores[-q_term-1]
+
+        if self.leverage is True:
+            new_values[1] += t_params[-3]*np.sign(-(last_return-t_params[-1]))*(scores[-1]+1)
+
+        return new_values
+
+    def _simulate_paths(self, lmda_c, Y, scores, t_params, future_Y, future_scores):
+        """ Simulates h-step ahead paths of the combined log volatility
+
+        Parameters
+        ----------
+        lmda_c : np.array
+            The two past volatility components, one matrix per path if 3-D
+
+        Y : np.array
+            The past data
+
+        scores : np.array
+            The past scores, one row per path if 2-D
+
+        t_params : np.array
+            A vector of (transformed) latent variables, one row per path if 2-D
+
+        future_Y : np.array
+            (simulations, h) bootstrapped returns
+
+        future_scores : np.array
+            (simulations, h) bootstrapped scores
+
+        Returns
+        ----------
+        (simulations, h) matrix of simulations
+        """     
+
+        sim_vector = t_params[..., :1]
+
+        for comp in range(2):
+            offset = 1 + comp*(self.p+self.q)
+            ar_terms = t_params[..., offset:offset+self.p]
+            score_terms = t_params[..., offset+self.p:offset+self.p+self.q]
+
+            if comp == 1 and self.leverage is True:
+                sim_vector = sim_vector + simulate_recursion(0.0, ar_terms, score_terms, lmda_c[..., comp], scores, 
+                    future_scores, leverage=t_params[..., -3], past_return=Y[-1], future_returns=future_Y, 
+                    location=lambda t, lmda_prev: t_params[..., -1])
+            else:
+                sim_vector = sim_vector + simulate_recursion(0.0, ar_terms, score_terms, lmda_c[..., comp], scores, future_scores)
+
+        return sim_vector
+
     def _sim_prediction(self, lmda, lmda_c, Y, scores, h, t_params, simulations):
         """ Simulates a h-step ahead mean prediction
 
@@ -294,42 +317,8 @@ class LMEGARCH(tsm.TSM):
         Matrix of simulations
         """     
 
-        sim_vector = np.zeros([simulations,h])
-
-        for n in range(0,simulations):
-            # Create arrays to iteratre over
-            lmda_exp = lmda.copy()
-            lmda_c_exp = [lmda_c.T[0],lmda_c.T[1]] 
-            scores_exp = scores.copy()
-            Y_exp = Y.copy()
-
-            # Loop over h time periods          
-            for t in range(0,h):
-                new_value_comp = np.zeros(2)
-                new_value = 0
-
-                for comp in range(2):
-
-                    if self.p != 0:
-                        for j in range(self.p):
-                            new_value_comp[comp] += t_params[1+j+(comp*(self.q+self.p))]*lmda_c_exp[comp][-j-1]
-
-                    if self.q != 0:
-                        for k in range(self.q):
-                            new_value_comp[comp] += t_params[1+k+self.p+(comp*(self.q+self.p))]*scores_exp[-k-1]
-
-                if self.leverage is True:
-                    new_value_comp[1] += t_params[-3]*np.sign(-(Y_exp[-1]-t_params[-1]))*(scores_exp[t-1]+1)
-
-                lmda_exp = np.append(lmda_exp,[new_value_comp.sum()+t_params[0]]) # For indexing consistency
-                lmda_c_exp[0] = np.append(lmda_c_exp[0],new_value_comp[0])
-                lmda_c_exp[1] = np.append(lmda_c_exp[1],new_value_comp[1])
-                rnd_no = np.random.randint(scores.shape[0])
-                scores_exp = np.append(scores_exp,scores[rnd_no]) # expectation of score is zero
-                Y_exp = np.append(Y_exp,Y[rnd_no])
-            sim_vector[n] = lmda_exp[-h:]
-
-        return np.transpose(sim_vector)
+        draws = bootstrap_draws(scores.shape[0], h, simulations)
+        return self._simulate_paths(lmda_c, Y, scores, t_params, Y[draws], scores[draws]).T
 
     def _sim_prediction_bayes(self, h, simulations):
         """ Simulates a h-step ahead mean prediction
@@ -347,47 +336,17 @@ class LMEGARCH(tsm.TSM):
         Matrix of simulations
         """     
 
-        sim_vector = np.zeros([simulations,h])
-
-        for n in range(0,simulations):
-
-            t_z = self.draw_latent_variables(nsims=1).T[0]
-            lmda, lmda_c, Y, scores = self._model(self.latent_variables.get_z_values())
-            t_z = np.array([self.latent_variables.z_list[k].prior.transform(t_z[k]) for k in range(t_z.shape[0])])
+        z = self.draw_latent_variables(nsims=simulations).T
+        t_params = np.ascontiguousarray(self.transform_batch(z))
+        lags = self.max_lag + 1
+        draws = bootstrap_draws(self.data.shape[0]-self.max_lag, h, simulations)
 
-            # Create arrays to iteratre over
-            lmda_exp = lmda.copy()
-            lmda_c_exp = [lmda_c.T[0],lmda_c.T[1]] 
-            scores_exp = scores.copy()
-            Y_exp = Y.copy()
-
-            # Loop over h time periods          
-            for t in range(0,h):
-                new_value_comp = np.zeros(2)
-                new_value = 0
-
-                for comp in range(2):
-
-                    if self.p != 0:
-                        for j in range(self.p):
-                            new_value_comp[comp] += t_z[1+j+(comp*(self.q+self.p))]*lmda_c_exp[comp][-j-1]
-
-                    if self.q != 0:
-                        for k in range(self.q):
-                            new_value_comp[comp] += t_z[1+k+self.p+(comp*(self.q+self.p))]*scores_exp[-k-1]
-
-                if self.leverage is True:
-                    new_value_comp[1] += t_z[-3]*np.sign(-(Y_exp[-1]-t_z[-1]))*(scores_exp[t-1]+1)
-
-                lmda_exp = np.append(lmda_exp,[new_value_comp.sum()+t_z[0]]) # For indexing consistency
-                lmda_c_exp[0] = np.append(lmda_c_exp[0],new_value_comp[0])
-                lmda_c_exp[1] = np.append(lmda_c_exp[1],new_value_comp[1])
-                rnd_no = np.random.randint(scores.shape[0])
-                scores_exp = np.append(scores_exp,scores[rnd_no]) # expectation of score is zero
-                Y_exp = np.append(Y_exp,Y[rnd_no])
-            sim_vector[n] = lmda_exp[-h:]
+        # One batched filter pass for all draws
+        Y = np.array(self.data[self.max_lag:self.data.shape[0]])
+        lmda_c_lags, scores_lags, future_scores = lmegarch_recursion_batch(t_params, Y, self.p, self.q,
+            self.max_lag, self.leverage, draws, lags)
 
-        return np.transpose(sim_vector)
+        return self._simulate_paths(lmda_c_lags, Y, scores_lags, t_params, Y[draws], future_scores).T
 
     def _sim_predicted_mean(self, lmda, lmda_c, Y, scores, h, t_params, simulations):
         """ Simulates a h-step ahead mean prediction
@@ -420,42 +379,9 @@ class LMEGARCH(tsm.TSM):
         Matrix of simulations
         """     
 
-        sim_vector = np.zeros([simulations,h])
-
-        for n in range(0,simulations):
-            # Create arrays to iteratre over
-            lmda_exp = lmda.copy()
-            lmda_c_exp = [lmda_c.T[0],lmda_c.T[1]] 
-            scores_exp = scores.copy()
-            Y_exp = Y.copy()
-
-            # Loop over h time periods          
-            for t in range(0,h):
-                new_value_comp = np.zeros(2)
-                new_value = 0
-
-                for comp in range(2):
-
-                    if self.p != 0:
-                        for j in range(self.p):
-                            new_value_comp[comp] += t_params[1+j+(comp*(self.q+self.p))]*lmda_c_exp[comp][-j-1]
-
-                    if self.q != 0:
-                        for k in range(self.q):
-                            new_value_comp[comp] += t_params[1+k+self.p+(comp*(self.q+self.p))]*scores_exp[-k-1]
-
-                if self.leverage is True:
-                    new_value_comp[1] += t_params[-3]*np.sign(-(Y_exp[-1]-t_params[-1]))*(scores_exp[t-1]+1)
-
-                lmda_exp = np.append(lmda_exp,[new_value_comp.sum()+t_params[0]]) # For indexing consistency
-                lmda_c_exp[0] = np.append(lmda_c_exp[0],new_value_comp[0])
-                lmda_c_exp[1] = np.append(lmda_c_exp[1],new_value_comp[1])
-                rnd_no = np.random.randint(scores.shape[0])
-                scores_exp = np.append(scores_exp,scores[rnd_no]) # expectation of score is zero
-                Y_exp = np.append(Y_exp,Y[rnd_no])
-            sim_vector[n] = lmda_exp[-h:]
-
-        return np.append(lmda, np.array([np.mean(i) for i in np.transpose(sim_vector)]))
+        draws = bootstrap_draws(scores.shape[0], h, simulations)
+        sim_vector = self._simulate_paths(lmda_c, Y, scores, t_params, Y[draws], scores[draws])
+        return np.append(lmda, sim_vector.mean(axis=0))
 
     def _summarize_simulations(self, lmda, sim_vector, date_index, h, past_values):
         """ Summarizes a simulation vector and a mean vector of predictions
@@ -480,12 +406,10 @@ class LMEGARCH(tsm.TSM):
         intervals : Boolean
             Would you like to show prediction intervals for the forecast?
         """ 
-        mean_values = np.append(lmda, np.array([np.mean(i) for i in sim_vector]))
+        mean_values = np.append(lmda, sim_vector.mean(axis=1))
 
-        error_bars = []
-        for pre in range(5,100,5):
-            error_bars.append(np.insert([np.percentile(i,pre) for i in sim_vector], 0, mean_values[-h-1]))
-        forecasted_values = np.insert([np.mean(i) for i in sim_vector], 0, mean_values[-h-1])
+        error_bars = fc.error_bars(sim_vector, mean_values[-h-1])
+        forecasted_values = np.insert(sim_vector.mean(axis=1), 0, mean_values[-h-1])
         plot_values = mean_values[-h-past_values:]
         plot_index = date_index[-h-past_values:]
 
@@ -524,10 +448,65 @@ class LMEGARCH(tsm.TSM):
         The negative logliklihood of the model
         """     
 
-        lmda, _, Y, ___ = self._model(beta)
-        return -np.sum(ss.t.logpdf(x=Y,
-            df=self.latent_variables.z_list[-2].prior.transform(beta[-2]),
-            loc=np.ones(lmda.shape[0])*self.latent_variables.z_list[-1].prior.transform(beta[-1]),scale=np.exp(lmda/2.0)))
+        parm = self.latent_variables.transform_all(beta)
+        return -lmegarch_recursion(parm, self.data[self.max_lag:], self.p, self.q, self.max_lag, 
+            self.leverage)[3]
+
+    def neg_loglik_gradient(self, beta):
+        """ Creates the gradient of the negative log-likelihood of the model
+
+        Parameters
+        ----------
+        beta : np.array
+            Contains untransformed starting values for latent variables
+
+        Returns
+        ----------
+        The gradient of the negative loglikelihood with respect to the untransformed latent variables
+        """
+
+        parm = self.latent_variables.transform_all(beta)
+        dparm = self.latent_variables.transform_derivative_all(beta)
+        __, grad = lmegarch_loglik_gradient(parm, self.data[self.max_lag:], self.p, self.q, self.max_lag,
+            self.leverage)
+        return -grad*dparm
+
+    def neg_loglik_gradient_contributions(self, beta):
+        """ Creates the per-observation gradients of the negative log-likelihood of the model
+
+        Parameters
+        ----------
+        beta : np.array
+            Contains untransformed starting values for latent variables
+
+        Returns
+        ----------
+        (T, K) array whose rows are the gradients of each observation's negative loglikelihood
+        """
+
+        parm = self.latent_variables.transform_all(beta)
+        dparm = self.latent_variables.transform_derivative_all(beta)
+        __, __, G = lmegarch_loglik_gradient(parm, self.data[self.max_lag:], self.p, self.q, self.max_lag,
+            self.leverage, contributions=True)
+        return -G*dparm
+
+    def neg_loglik_gradient_batch(self, Z):
+        """ Creates the gradients of the negative log-likelihood for many latent variable vectors
+
+        Parameters
+        ----------
+        Z : np.array
+            (S, k) array of untransformed latent variables, one vector per row
+
+        Returns
+        ----------
+        (S, k) array whose rows are the gradients of the negative loglikelihood
+        """
+
+        parm = np.ascontiguousarray(self.transform_batch(Z))
+        dparm = self.latent_variables.transform_derivative_all(Z)
+        return -lmegarch_loglik_gradient_batch(parm, self.data[self.max_lag:], self.p, self.q,
+            self.max_lag, self.leverage)*dparm
     
     def mb_neg_loglik(self, beta, mini_batch):
         """ Creates the negative log-likelihood of the model
@@ -541,11 +520,12 @@ class LMEGARCH(tsm.TSM):
         ----------
         The negative logliklihood of the model
         """     
-        lmda, _, Y, ___ = self._mb_model(beta, mini_batch)
-        return -np.sum(ss.t.logpdf(x=Y,
-            df=self.latent_variables.z_list[-2].prior.transform(beta[-2]),
-            loc=np.ones(lmda.shape[0])*self.latent_variables.z_list[-1].prior.transform(beta[-1]),scale=np.exp(lmda/2.0)))
-    
+
+        parm = self.latent_variables.transform_all(beta)
+        rand_int =  np.random.randint(low=0, high=self.data_length-mini_batch+1)
+        return -lmegarch_recursion(parm, self.data[rand_int+self.max_lag:rand_int+mini_batch], self.p, self.q, 
+            self.max_lag, self.leverage)[3]
+
     def plot_fit(self, **kwargs):
         """ Plots the fit of the model
 
@@ -603,12 +583,9 @@ class LMEGARCH(tsm.TSM):
 
             if self.latent_variables.estimation_method in ['M-H']:
                 sim_vector = self._sim_prediction_bayes(h, 15000)
-                error_bars = []
-
-                for pre in range(5,100,5):
-                    error_bars.append(np.insert([np.percentile(i,pre) for i in sim_vector], 0, lmda[-1]))
+                error_bars = fc.error_bars(sim_vector, lmda[-1])
 
-                forecasted_values = np.insert([np.mean(i) for i in sim_vector], 0, lmda[-1])
+                forecasted_values = np.insert(sim_vector.mean(axis=1), 0, lmda[-1])
                 plot_values = np.append(lmda[-1-past_values:-2], forecasted_values)
                 plot_index = date_index[-h-past_values:]
 
@@ -715,7 +692,22 @@ class LMEGARCH(tsm.TSM):
         plt.legend(loc=2)   
         plt.show()        
 
-    def predict(self, h=5, intervals=False):
+    def _backtest_actual(self, value):
+        """ The value a one-step ahead forecast is scored against in a backtest
+
+        Parameters
+        ----------
+        value : float
+            The next observation
+
+        Returns
+        ----------
+        - float, the absolute demeaned return (predict forecasts the conditional scale)
+        """
+
+        return np.abs(value - self.transform_z()[-1])
+
+    def predict(self, h=5, intervals=False, percentiles=None):
         """ Makes forecast with the estimated model
 
         Parameters
@@ -726,6 +718,9 @@ class LMEGARCH(tsm.TSM):
         intervals : boolean (default: False)
             Whether to return prediction intervals
 
+        percentiles : list (default: [1, 5, 95, 99])
+            Percentiles of the prediction intervals, in percent (e.g. [0.5, 2.5] for VaR)
+
         Returns
         ----------
         - pd.DataFrame with predicted values
@@ -738,26 +733,12 @@ class LMEGARCH(tsm.TSM):
             date_index = self.shift_dates(h)
 
             if self.latent_variables.estimation_method in ['M-H']:
-                sim_vector = self._sim_prediction_bayes(h, 15000)
-                error_bars = []
-
-                for pre in range(5,100,5):
-                    error_bars.append(np.insert([np.percentile(i,pre) for i in sim_vector], 0, lmda[-1]))
-
-                forecasted_values = np.array([np.mean(i) for i in sim_vector])
-                prediction_01 = np.array([np.percentile(i, 1) for i in sim_vector])
-                prediction_05 = np.array([np.percentile(i, 5) for i in sim_vector])
-                prediction_95 = np.array([np.percentile(i, 95) for i in sim_vector])
-                prediction_99 = np.array([np.percentile(i, 99) for i in sim_vector])
+                sim_values = self._sim_prediction_bayes(h, 15000)
+                forecasted_values = sim_values.mean(axis=1)
 
             else:
                 t_z = self.transform_z()
 
-                if intervals is True:
-                    sim_values = self._sim_prediction(lmda, lmda_c, Y, scores, h, t_z, 15000)
-                else:
-                    sim_values = self._sim_prediction(lmda, lmda_c, Y, scores, h, t_z, 2)
-
                 mean_values = self._sim_predicted_mean(lmda, lmda_c, Y, scores, h, t_z, 15000)
                 forecasted_values = mean_values[-h:]
 
@@ -767,21 +748,78 @@ class LMEGARCH(tsm.TSM):
             else:
                 if self.latent_variables.estimation_method not in ['M-H']:
                     sim_values = self._sim_prediction(lmda, lmda_c, Y, scores, h, t_z, 15000)
-                    prediction_01 = np.array([np.percentile(i, 1) for i in sim_values])
-                    prediction_05 = np.array([np.percentile(i, 5) for i in sim_values])
-                    prediction_95 = np.array([np.percentile(i, 95) for i in sim_values])
-                    prediction_99 = np.array([np.percentile(i, 99) for i in sim_values])
-
-                result = np.exp(pd.DataFrame([forecasted_values, prediction_01, prediction_05, 
-                    prediction_95, prediction_99]).T/2.0)
-                result.rename(columns={0:self.data_name, 1: "1% Prediction Interval", 
-                    2: "5% Prediction Interval", 3: "95% Prediction Interval", 4: "99% Prediction Interval"}, 
-                    inplace=True)
+
+                result = np.exp(fc.interval_frame(forecasted_values, sim_values, self.data_name, percentiles)/2.0)
  
             result.index = date_index[-h:]
 
             return result
 
+    def _current_filter_state(self):
+        """ Returns the filter state at the end of the data, refiltering if the latent variables have changed
+
+        Returns
+        ----------
+        FilterState object
+        """
+
+        z = self.latent_variables.get_z_values()
+
+        if self._filter_state is None or not self._filter_state.is_current(z):
+            lmda, lmda_c, Y, scores = self._model(z)
+            t_z = self.transform_z()
+            self._filter_state = FilterState(z, t_z, lmda_c, scores, Y[-1], max(self.max_lag, 1))
+            self._filter_state.next_value = self._next_components(lmda_c, scores, Y[-1], t_z)
+
+        return self._filter_state
+
+    def update(self, new_value):
+        """ Updates the log volatility components with a new observation, using the estimated latent variables
+
+        Only the latest filtered values and scores are used, so each update takes O(p+q) time.
+        The data the model was estimated on is left unchanged.
+
+        Parameters
+        ----------
+        new_value : float
+            The new observation
+
+        Returns
+        ----------
+        The one-step ahead forecast of the conditional volatility
+        """
+
+        return self.update_batch([new_value])[-1]
+
+    def update_batch(self, new_data):
+        """ Updates the log volatility components with new observations, using the estimated latent variables
+
+        Parameters
+        ----------
+        new_data : np.array
+            The new observations, oldest first
+
+        Returns
+        ----------
+        np.array of one-step ahead forecasts of the conditional volatility, one after each observation
+        """
+
+        if self.latent_variables.estimated is False:
+            raise Exception("No latent variables estimated!")
+
+        state = self._current_filter_state()
+        t_z = state.t_params
+        forecasts = np.zeros(len(new_data))
+
+        for i, new_value in enumerate(new_data):
+            lmda = t_z[0] + state.next_value.sum()
+            score = (((t_z[-2]+1.0)*np.power(new_value-t_z[-1],2))/float(t_z[-2]*np.exp(lmda) + np.power(new_value-t_z[-1],2))) - 1.0
+            state.push(state.next_value, score, new_value)
+            state.next_value = self._next_components(state.values, state.scores, new_value, t_z)
+            forecasts[i] = np.exp((t_z[0] + state.next_value.sum())/2.0)
+
+        return forecasts
+
     def sample(self, nsims=1000):
         """ Samples from the posterior predictive distribution
 
@@ -13,6 +13,11 @@ from .. import tests as tst
 from .. import tsm as tsm
 from .. import gas as gas
 from .. import data_check as dc
+from .. import forecasting as fc
+
+from .egarch_recursions import segarch_recursion, segarch_recursion_batch
+from .simulations import bootstrap_draws, simulate_recursion
+from .streaming import FilterState
 
 def logpdf(x, shape, loc=0.0, scale=1.0, skewness = 1.0):
     m1 = (np.sqrt(shape)*sp.gamma((shape-1.0)/2.0))/(np.sqrt(np.pi)*sp.gamma(shape/2.0))
@@ -63,6 +68,7 @@ class SEGARCH(tsm.TSM):
         # Format the data
         self.data, self.data_name, self.is_pandas, self.index = dc.data_check(data,target)
         self.data_length = self.data.shape[0]
+        self._filter_state = None
         self._create_latent_variables()
 
     def _create_latent_variables(self):
@@ -114,41 +120,9 @@ class SEGARCH(tsm.TSM):
             Contains the score terms for the time series
         """
 
+        parm = self.latent_variables.transform_all(beta)
         Y = np.array(self.data[self.max_lag:self.data.shape[0]])
-        X = np.ones(Y.shape[0])
-        scores = np.zeros(Y.shape[0])
-
-        # Transform latent variables
-        parm = np.array([self.latent_variables.z_list[k].prior.transform(beta[k]) for k in range(beta.shape[0])])
-
-        lmda = np.ones(Y.shape[0])*parm[0]
-        theta = np.ones(Y.shape[0])*parm[-1]
-
-        # Loop over time series
-        for t in range(0,Y.shape[0]):
-
-            if t < self.max_lag:
-                lmda[t] = parm[0]/(1-np.sum(parm[1:(self.p+1)]))
-                theta[t] += (parm[-3] - (1.0/parm[-3]))*np.exp(lmda[t])*(np.sqrt(parm[-2])*sp.gamma((parm[-2]-1.0)/2.0))/(np.sqrt(np.pi)*sp.gamma(parm[-2]/2.0))
-            else:
-
-                # Loop over GARCH terms
-                for p_term in range(0,self.p):
-                    lmda[t] += parm[1+p_term]*lmda[t-p_term-1]
-
-                # Loop over Score terms
-                for q_term in range(0,self.q):
-                    lmda[t] += parm[1+self.p+q_term]*scores[t-q_term-1]
-
-                if self.leverage is True:
-                    lmda[t] += parm[-4]*np.sign(-(Y[t-1]-theta[t-1]))*(scores[t-1]+1)
-
-                theta[t] += (parm[-3] - (1.0/parm[-3]))*np.exp(lmda[t]/2.0)*(np.sqrt(parm[-2])*sp.gamma((parm[-2]-1.0)/2.0))/(np.sqrt(np.pi)*sp.gamma(parm[-2]/2.0))
-            
-            if (Y[t]-theta[t])>=0:
-                scores[t] = (((parm[-2]+1.0)*np.power(Y[t]-theta[t],2))/float(np.power(parm[-3], 2)*parm[-2]*np.exp(lmda[t]) + np.power(Y[t]-theta[t],2))) - 1.0
-            else:
-                scores[t] = (((parm[-2]+1.0)*np.power(Y[t]-theta[t],2))/float(np.power(parm[-3],-2)*parm[-2]*np.exp(lmda[t]) + np.power(Y[t]-theta[t],2))) - 1.0    
+        lmda, scores, theta, _ = segarch_recursion(parm, Y, self.p, self.q, self.max_lag, self.leverage, False)
 
         return lmda, Y, scores, theta
 
@@ -175,44 +149,10 @@ class SEGARCH(tsm.TSM):
             Contains the score terms for the time series
         """
 
-        # Transform latent variables
-        parm = np.array([self.latent_variables.z_list[k].prior.transform(beta[k]) for k in range(beta.shape[0])])
-
+        parm = self.latent_variables.transform_all(beta)
         rand_int =  np.random.randint(low=0, high=self.data_length-mini_batch+1)
-        sample = np.arange(start=rand_int, stop=rand_int+mini_batch)
-        sampled_data = self.data[sample]
-
-        Y = np.array(sampled_data[self.max_lag:])
-        X = np.ones(Y.shape[0])
-        scores = np.zeros(Y.shape[0])
-        lmda = np.ones(Y.shape[0])*parm[0]
-        theta = np.ones(Y.shape[0])*parm[-1]
-
-        # Loop over time series
-        for t in range(0,Y.shape[0]):
-
-            if t < self.max_lag:
-                lmda[t] = parm[0]/(1-np.sum(parm[1:(self.p+1)]))
-                theta[t] += (parm[-3] - (1.0/parm[-3]))*np.exp(lmda[t])*(np.sqrt(parm[-2])*sp.gamma((parm[-2]-1.0)/2.0))/(np.sqrt(np.pi)*sp.gamma(parm[-2]/2.0))
-            else:
-
-                # Loop over GARCH terms
-                for p_term in range(0,self.p):
-                    lmda[t] += parm[1+p_term]*lmda[t-p_term-1]
-
-                # Loop over Score terms
-                for q_term in range(0,self.q):
-                    lmda[t] += parm[1+self.p+q_term]*scores[t-q_term-1]
-
-                if self.leverage is True:
-                    lmda[t] += parm[-4]*np.sign(-(Y[t-1]-theta[t-1]))*(scores[t-1]+1)
-
-                theta[t] += (parm[-3] - (1.0/parm[-3]))*np.exp(lmda[t]/2.0)*(np.sqrt(parm[-2])*sp.gamma((parm[-2]-1.0)/2.0))/(np.sqrt(np.pi)*sp.gamma(parm[-2]/2.0))
-            
-            if (Y[t]-theta[t])>=0:
-                scores[t] = (((parm[-2]+1.0)*np.power(Y[t]-theta[t],2))/float(np.power(parm[-3], 2)*parm[-2]*np.exp(lmda[t]) + np.power(Y[t]-theta[t],2))) - 1.0
-            else:
-                scores[t] = (((parm[-2]+1.0)*np.power(Y[t]-theta[t],2))/float(np.power(parm[-3],-2)*parm[-2]*np.exp(lmda[t]) + np.power(Y[t]-theta[t],2))) - 1.0    
+        Y = self.data[rand_int+self.max_lag:rand_int+mini_batch]
+        lmda, scores, theta, _ = segarch_recursion(parm, Y, self.p, self.q, self.max_lag, self.leverage, False)
 
         return lmda, Y, scores, theta
 
@@ -271,77 +211,117 @@ class SEGARCH(tsm.TSM):
 
         return lmda_exp
 
-    def _sim_prediction(self, lmda, Y, scores, h, t_params, simulations):
-        """ Simulates a h-step ahead mean prediction
+    def _location(self, lmda, t_params):
+        """ Location of an observation given its log volatility (the mean of the skew-t is shifted by the skewness)
+
+        Parameters
+        ----------
+        lmda : float
+            The log volatility
+
+        t_params : np.array
+            A vector of (transformed) latent variables
+
+        Returns
+        ----------
+        The location of the observation
+        """     
+
+        m1 = (np.sqrt(t_params[-2])*sp.gamma((t_params[-2]-1.0)/2.0))/(np.sqrt(np.pi)*sp.gamma(t_params[-2]/2.0))
+        return t_params[-1] + (t_params[-3] - (1.0/t_params[-3]))*np.exp(lmda/2.0)*m1
+
+    def _next_lambda(self, lmda, scores, last_return, t_params):
+        """ Creates the one-step ahead log volatility from the latest p values and q scores
 
         Parameters
         ----------
         lmda : np.array
             The past predicted values
 
-        Y : np.array
-            The past data
-
         scores : np.array
             The past scores
 
-        h : int
-            How many steps ahead for the prediction
+        last_return : float
+            The last observation
 
         t_params : np.array
             A vector of (transformed) latent variables
 
-        simulations : int
-            How many simulations to perform
-
         Returns
         ----------
-        Matrix of simulations
+        The next log volatility
         """     
 
-        sim_vector = np.zeros([simulations,h])
-        m1 = (np.sqrt(t_params[-2])*sp.gamma((t_params[-2]-1.0)/2.0))/(np.sqrt(np.pi)*sp.gamma(t_params[-2]/2.0))
-        for n in range(0,simulations):
-            # Create arrays to iteratre over        
-            lmda_exp = lmda.copy()
-            scores_exp = scores.copy()
-            Y_exp = Y.copy()
-            temp_theta = t_params[-1] + (t_params[-3] - (1.0/t_params[-3]))*np.exp(lmda_exp[-1]/2.0)*m1
+        new_value = t_params[0]
 
-            # Loop over h time periods          
-            for t in range(0,h):
-                new_value = t_params[0]
+        for p_term in range(0, self.p):
+            new_value += t_params[1+p_term]*lmda[-p_term-1]
 
-                if self.p != 0:
-                    for j in range(1,self.p+1):
-                        new_value += t_params[j]*lmda_exp[-j]
+        for q_term in range(0, self.q):
+            new_value += t_params[1+self.p+q_term]*scores[-q_term-1]
 
-                if self.q != 0:
-                    for k in range(1,self.q+1):
-                        new_value += t_params[k+self.p]*scores_exp[-k]
+        if self.leverage is True:
+            new_value += t_params[-4]*np.sign(-(last_return-self._location(lmda[-1], t_params)))*(scores[-1]+1)
 
-                if self.leverage is True:
-                    m1 = (np.sqrt(t_params[-2])*sp.gamma((t_params[-2]-1.0)/2.0))/(np.sqrt(np.pi)*sp.gamma(t_params[-2]/2.0))
-                    new_value += t_params[1+self.p+self.q]*np.sign(-(Y_exp[-1]-temp_theta))*(scores_exp[-1]+1)
-                temp_theta = t_params[-1] + (t_params[-3] - (1.0/t_params[-3]))*np.exp(new_value/2.0)*m1
+        return new_value
 
+    def _simulate_paths(self, lmda, Y, scores, t_params, future_Y, future_scores):
+        """ Simulates h-step ahead paths of the log volatility
 
-                lmda_exp = np.append(lmda_exp,[new_value]) # For indexing consistency
-                scores_exp = np.append(scores_exp,scores[np.random.randint(scores.shape[0])]) # expectation of score is zero
-                Y_exp = np.append(Y_exp,Y[np.random.randint(Y.shape[0])]) # bootstrap returns
+        Parameters
+        ----------
+        lmda : np.array
+            The past predicted values, one row per path if 2-D
 
-            sim_vector[n] = lmda_exp[-h:]
+        Y : np.array
+            The past data
 
-        return np.transpose(sim_vector)
+        scores : np.array
+            The past scores, one row per path if 2-D
 
-    def _sim_prediction_bayes(self, h, simulations):
+        t_params : np.array
+            A vector of (transformed) latent variables, one row per path if 2-D
+
+        future_Y : np.array
+            (simulations, h) bootstrapped returns
+
+        future_scores : np.array
+            (simulations, h) bootstrapped scores
+
+        Returns
+        ----------
+        (simulations, h) matrix of simulations
+        """     
+        m1 = (np.sqrt(t_params[..., -2])*sp.gamma((t_params[..., -2]-1.0)/2.0))/(np.sqrt(np.pi)*sp.gamma(t_params[..., -2]/2.0))
+
+        if self.leverage is True:
+            return simulate_recursion(t_params[..., :1], t_params[..., 1:1+self.p], t_params[..., 1+self.p:1+self.p+self.q], 
+                lmda, scores, future_scores, leverage=t_params[..., 1+self.p+self.q], past_return=Y[-1], 
+                future_returns=future_Y, location=lambda t, lmda_prev: t_params[..., -1] + (t_params[..., -3] - (1.0/t_params[..., -3]))*np.exp(lmda_prev/2.0)*m1)
+        else:
+            return simulate_recursion(t_params[..., :1], t_params[..., 1:1+self.p], t_params[..., 1+self.p:1+self.p+self.q], 
+                lmda, scores, future_scores)
+
+    def _sim_prediction(self, lmda, Y, scores, h, t_params, simulations):
         """ Simulates a h-step ahead mean prediction
 
         Parameters
         ----------
+        lmda : np.array
+            The past predicted values
+
+        Y : np.array
+            The past data
+
+        scores : np.array
+            The past scores
+
         h : int
             How many steps ahead for the prediction
 
+        t_params : np.array
+            A vector of (transformed) latent variables
+
         simulations : int
             How many simulations to perform
 
@@ -350,45 +330,36 @@ class SEGARCH(tsm.TSM):
         Matrix of simulations
         """     
 
-        sim_vector = np.zeros([simulations,h])
-        
-        for n in range(0,simulations):
-
-            t_z = self.draw_latent_variables(nsims=1).T[0]
-            lmda, Y, scores, theta = self._model(t_z)
-            t_z = np.array([self.latent_variables.z_list[k].prior.transform(t_z[k]) for k in range(t_z.shape[0])])
-            m1 = (np.sqrt(t_z[-2])*sp.gamma((t_z[-2]-1.0)/2.0))/(np.sqrt(np.pi)*sp.gamma(t_z[-2]/2.0))
+        draws = bootstrap_draws(scores.shape[0], h, simulations)
+        return self._simulate_paths(lmda, Y, scores, t_params, Y[draws], scores[draws]).T
 
-            # Create arrays to iterate over        
-            lmda_exp = lmda.copy()
-            scores_exp = scores.copy()
-            Y_exp = Y.copy()
-            temp_theta = t_z[-1] + (t_z[-3] - (1.0/t_z[-3]))*np.exp(lmda_exp[-1]/2.0)*m1
-
-            # Loop over h time periods          
-            for t in range(0,h):
-                new_value = t_z[0]
+    def _sim_prediction_bayes(self, h, simulations):
+        """ Simulates a h-step ahead mean prediction
 
-                if self.p != 0:
-                    for j in range(1,self.p+1):
-                        new_value += t_z[j]*lmda_exp[-j]
+        Parameters
+        ----------
+        h : int
+            How many steps ahead for the prediction
 
-                if self.q != 0:
-                    for k in range(1,self.q+1):
-                        new_value += t_z[k+self.p]*scores_exp[-k]
+        simulations : int
+            How many simulations to perform
 
-                if self.leverage is True:
-                    m1 = (np.sqrt(t_z[-2])*sp.gamma((t_z[-2]-1.0)/2.0))/(np.sqrt(np.pi)*sp.gamma(t_z[-2]/2.0))
-                    new_value += t_z[1+self.p+self.q]*np.sign(-(Y_exp[-1]-temp_theta))*(scores_exp[-1]+1)
-                temp_theta = t_z[-1] + (t_z[-3] - (1.0/t_z[-3]))*np.exp(new_value/2.0)*m1
+        Returns
+        ----------
+        Matrix of simulations
+        """     
 
-                lmda_exp = np.append(lmda_exp,[new_value]) # For indexing consistency
-                scores_exp = np.append(scores_exp,scores[np.random.randint(scores.shape[0])]) # expectation of score is zero
-                Y_exp = np.append(Y_exp,Y[np.random.randint(Y.shape[0])]) # bootstrap returns
+        z = self.draw_latent_variables(nsims=simulations).T
+        t_params = np.ascontiguousarray(self.transform_batch(z))
+        lags = self.max_lag + 1
+        draws = bootstrap_draws(self.data.shape[0]-self.max_lag, h, simulations)
 
-            sim_vector[n] = lmda_exp[-h:]
+        # One batched filter pass for all draws
+        Y = np.array(self.data[self.max_lag:self.data.shape[0]])
+        lmda_lags, scores_lags, future_scores = segarch_recursion_batch(t_params, Y, self.p, self.q,
+            self.max_lag, self.leverage, False, draws, lags)
 
-        return np.transpose(sim_vector)
+        return self._simulate_paths(lmda_lags, Y, scores_lags, t_params, Y[draws], future_scores).T
 
     def _sim_predicted_mean(self, lmda, Y, scores, h, t_params, simulations):
         """ Simulates a h-step ahead mean prediction
@@ -418,40 +389,9 @@ class SEGARCH(tsm.TSM):
         Matrix of simulations
         """     
 
-        sim_vector = np.zeros([simulations,h])
-        m1 = (np.sqrt(t_params[-2])*sp.gamma((t_params[-2]-1.0)/2.0))/(np.sqrt(np.pi)*sp.gamma(t_params[-2]/2.0))
-        for n in range(0,simulations):
-            # Create arrays to iteratre over        
-            lmda_exp = lmda.copy()
-            scores_exp = scores.copy()
-            Y_exp = Y.copy()
-            temp_theta = t_params[-1] + (t_params[-3] - (1.0/t_params[-3]))*np.exp(lmda_exp[-1]/2.0)*m1
-
-            # Loop over h time periods          
-            for t in range(0,h):
-                new_value = t_params[0]
-
-                if self.p != 0:
-                    for j in range(1,self.p+1):
-                        new_value += t_params[j]*lmda_exp[-j]
-
-                if self.q != 0:
-                    for k in range(1,self.q+1):
-                        new_value += t_params[k+self.p]*scores_exp[-k]
-
-                if self.leverage is True:
-                    m1 = (np.sqrt(t_params[-2])*sp.gamma((t_params[-2]-1.0)/2.0))/(np.sqrt(np.pi)*sp.gamma(t_params[-2]/2.0))
-                    new_value += t_params[1+self.p+self.q]*np.sign(-(Y_exp[-1]-temp_theta))*(scores_exp[-1]+1)
-                temp_theta = t_params[-1] + (t_params[-3] - (1.0/t_params[-3]))*np.exp(new_value/2.0)*m1
-
-
-                lmda_exp = np.append(lmda_exp,[new_value]) # For indexing consistency
-                scores_exp = np.append(scores_exp,scores[np.random.randint(scores.shape[0])]) # expectation of score is zero
-                Y_exp = np.append(Y_exp,Y[np.random.randint(Y.shape[0])]) # bootstrap returns
-
-            sim_vector[n] = lmda_exp[-h:]
-
-        return np.append(lmda, np.array([np.mean(i) for i in np.transpose(sim_vector)]))
+        draws = bootstrap_draws(scores.shape[0], h, simulations)
+        sim_vector = self._simulate_paths(lmda, Y, scores, t_params, Y[draws], scores[draws])
+        return np.append(lmda, sim_vector.mean(axis=0))
 
     def _summarize_simulations(self, lmda, sim_vector, date_index, h, past_values):
         """ Summarizes a simulation vector and a mean vector of predictions
@@ -476,12 +416,10 @@ class SEGARCH(tsm.TSM):
         intervals : Boolean
             Would you like to show prediction intervals for the forecast?
         """ 
-        mean_values = np.append(lmda, np.array([np.mean(i) for i in sim_vector]))
+        mean_values = np.append(lmda, sim_vector.mean(axis=1))
 
-        error_bars = []
-        for pre in range(5,100,5):
-            error_bars.append(np.insert([np.percentile(i,pre) for i in sim_vector], 0, mean_values[-h-1]))
-        forecasted_values = np.insert([np.mean(i) for i in sim_vector], 0, mean_values[-h-1])
+        error_bars = fc.error_bars(sim_vector, mean_values[-h-1])
+        forecasted_values = np.insert(sim_vector.mean(axis=1), 0, mean_values[-h-1])
         plot_values = mean_values[-h-past_values:]
         plot_index = date_index[-h-past_values:]
 
@@ -522,11 +460,10 @@ class SEGARCH(tsm.TSM):
         The negative logliklihood of the model
         """     
 
-        lmda, Y, ___, theta = self._model(beta)
-        return -np.sum(logpdf(Y, self.latent_variables.z_list[-2].prior.transform(beta[-2]), 
-            loc=theta, scale=np.exp(lmda/2.0), 
-            skewness=self.latent_variables.z_list[-3].prior.transform(beta[-3])))
-    
+        parm = self.latent_variables.transform_all(beta)
+        return -segarch_recursion(parm, self.data[self.max_lag:], self.p, self.q, self.max_lag, 
+            self.leverage, False)[3]
+
     def mb_neg_loglik(self, beta, mini_batch):
         """ Creates the negative log-likelihood of the model
 
@@ -543,11 +480,11 @@ class SEGARCH(tsm.TSM):
         The negative logliklihood of the model
         """     
 
-        lmda, Y, ___, theta = self._mb_model(beta, mini_batch)
-        return -np.sum(logpdf(Y, self.latent_variables.z_list[-2].prior.transform(beta[-2]), 
-            loc=theta, scale=np.exp(lmda/2.0), 
-            skewness = self.latent_variables.z_list[-3].prior.transform(beta[-3])))
-    
+        parm = self.latent_variables.transform_all(beta)
+        rand_int =  np.random.randint(low=0, high=self.data_length-mini_batch+1)
+        return -segarch_recursion(parm, self.data[rand_int+self.max_lag:rand_int+mini_batch], self.p, self.q, 
+            self.max_lag, self.leverage, False)[3]
+
     def plot_fit(self, **kwargs):
         """ Plots the fit of the model
 
@@ -605,12 +542,9 @@ class SEGARCH(tsm.TSM):
 
             if self.latent_variables.estimation_method in ['M-H']:
                 sim_vector = self._sim_prediction_bayes(h, 15000)
-                error_bars = []
+                error_bars = fc.error_bars(sim_vector, lmda[-1])
 
-                for pre in range(5,100,5):
-                    error_bars.append(np.insert([np.percentile(i,pre) for i in sim_vector], 0, lmda[-1]))
-
-                forecasted_values = np.insert([np.mean(i) for i in sim_vector], 0, lmda[-1])
+                forecasted_values = np.insert(sim_vector.mean(axis=1), 0, lmda[-1])
                 plot_values = np.append(lmda[-1-past_values:-2], forecasted_values)
                 plot_index = date_index[-h-past_values:]
 
@@ -718,7 +652,7 @@ class SEGARCH(tsm.TSM):
         plt.legend(loc=2)   
         plt.show()          
 
-    def predict(self, h=5, intervals=False):
+    def predict(self, h=5, intervals=False, percentiles=None):
         """ Makes forecast with the estimated model
 
         Parameters
@@ -729,6 +663,9 @@ class SEGARCH(tsm.TSM):
         intervals : boolean (default: False)
             Whether to return prediction intervals
 
+        percentiles : list (default: [1, 5, 95, 99])
+            Percentiles of the prediction intervals, in percent (e.g. [0.5, 2.5] for VaR)
+
         Returns
         ----------
         - pd.DataFrame with predicted values
@@ -741,26 +678,12 @@ class SEGARCH(tsm.TSM):
             date_index = self.shift_dates(h)
 
             if self.latent_variables.estimation_method in ['M-H']:
-                sim_vector = self._sim_prediction_bayes(h, 15000)
-                error_bars = []
-
-                for pre in range(5,100,5):
-                    error_bars.append(np.insert([np.percentile(i,pre) for i in sim_vector], 0, sigma2[-1]))
-
-                forecasted_values = np.array([np.mean(i) for i in sim_vector])
-                prediction_01 = np.array([np.percentile(i, 1) for i in sim_vector])
-                prediction_05 = np.array([np.percentile(i, 5) for i in sim_vector])
-                prediction_95 = np.array([np.percentile(i, 95) for i in sim_vector])
-                prediction_99 = np.array([np.percentile(i, 99) for i in sim_vector])
+                sim_values = self._sim_prediction_bayes(h, 15000)
+                forecasted_values = sim_values.mean(axis=1)
 
             else:
                 t_z = self.transform_z()
 
-                if intervals is True:
-                    sim_values = self._sim_prediction(sigma2, Y, scores, h, t_z, 15000)
-                else:
-                    sim_values = self._sim_prediction(sigma2, Y, scores, h, t_z, 2)
-
                 mean_values = self._sim_predicted_mean(sigma2, Y, scores, h, t_z, 15000)
                 forecasted_values = mean_values[-h:]
 
@@ -770,21 +693,84 @@ class SEGARCH(tsm.TSM):
             else:
                 if self.latent_variables.estimation_method not in ['M-H']:
                     sim_values = self._sim_prediction(sigma2, Y, scores, h, t_z, 15000)
-                    prediction_01 = np.array([np.percentile(i, 1) for i in sim_values])
-                    prediction_05 = np.array([np.percentile(i, 5) for i in sim_values])
-                    prediction_95 = np.array([np.percentile(i, 95) for i in sim_values])
-                    prediction_99 = np.array([np.percentile(i, 99) for i in sim_values])
-
-                result = np.exp(pd.DataFrame([forecasted_values, prediction_01, prediction_05, 
-                    prediction_95, prediction_99]).T/2.0)
-                result.rename(columns={0:self.data_name, 1: "1% Prediction Interval", 
-                    2: "5% Prediction Interval", 3: "95% Prediction Interval", 4: "99% Prediction Interval"}, 
-                    inplace=True)
+
+                result = np.exp(fc.interval_frame(forecasted_values, sim_values, self.data_name, percentiles)/2.0)
  
             result.index = date_index[-h:]
 
             return result
 
+    def _current_filter_state(self):
+        """ Returns the filter state at the end of the data, refiltering if the latent variables have changed
+
+        Returns
+        ----------
+        FilterState object
+        """
+
+        z = self.latent_variables.get_z_values()
+
+        if self._filter_state is None or not self._filter_state.is_current(z):
+            lmda, Y, scores, theta = self._model(z)
+            t_z = self.transform_z()
+            self._filter_state = FilterState(z, t_z, lmda, scores, Y[-1], max(self.max_lag, 1))
+            self._filter_state.next_value = self._next_lambda(lmda, scores, Y[-1], t_z)
+
+        return self._filter_state
+
+    def update(self, new_value):
+        """ Updates the log volatility with a new observation, using the estimated latent variables
+
+        Only the latest filtered values and scores are used, so each update takes O(p+q) time.
+        The data the model was estimated on is left unchanged.
+
+        Parameters
+        ----------
+        new_value : float
+            The new observation
+
+        Returns
+        ----------
+        The one-step ahead forecast of the conditional volatility
+        """
+
+        return self.update_batch([new_value])[-1]
+
+    def update_batch(self, new_data):
+        """ Updates the log volatility with new observations, using the estimated latent variables
+
+        Parameters
+        ----------
+        new_data : np.array
+            The new observations, oldest first
+
+        Returns
+        ----------
+        np.array of one-step ahead forecasts of the conditional volatility, one after each observation
+        """
+
+        if self.latent_variables.estimated is False:
+            raise Exception("No latent variables estimated!")
+
+        state = self._current_filter_state()
+        t_z = state.t_params
+        forecasts = np.zeros(len(new_data))
+
+        for i, new_value in enumerate(new_data):
+            lmda = state.next_value
+            theta = self._location(lmda, t_z)
+
+            if (new_value-theta) >= 0:
+                score = (((t_z[-2]+1.0)*np.power(new_value-theta,2))/float(np.power(t_z[-3], 2)*t_z[-2]*np.exp(lmda) + np.power(new_value-theta,2))) - 1.0
+            else:
+                score = (((t_z[-2]+1.0)*np.power(new_value-theta,2))/float(np.power(t_z[-3],-2)*t_z[-2]*np.exp(lmda) + np.power(new_value-theta,2))) - 1.0
+
+            state.push(lmda, score, new_value)
+            state.next_value = self._next_lambda(state.values, state.scores, new_value, t_z)
+            forecasts[i] = np.exp(state.next_value/2.0)
+
+        return forecasts
+
     def sample(self, nsims=1000):
         """ Samples from the posterior predictive distribution
 
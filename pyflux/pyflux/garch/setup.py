@@ -8,6 +8,10 @@ def configuration(parent_package='', top_path=None):
 
     config.add_extension('garch_recursions',
                          sources=['garch_recursions.c'])
+    config.add_extension('egarch_recursions',
+                         sources=['egarch_recursions.c'])
+    config.add_extension('dcc_recursions',
+                         sources=['dcc_recursions.c'])
     return config
 
 
@@ -0,0 +1,105 @@
+import sys
+if sys.version_info < (3,):
+    range = xrange
+
+import numpy as np
+
+def bootstrap_draws(n, h, simulations):
+    """ Draws the in-sample periods whose scores and returns are bootstrapped
+
+    Parameters
+    ----------
+    n : int
+        How many in-sample periods to draw from
+
+    h : int
+        How many steps ahead for the prediction
+
+    simulations : int
+        How many simulations to perform
+
+    Returns
+    ----------
+    (simulations, h) np.array of period indices
+    """
+    return np.random.randint(n, size=(simulations, h))
+
+def simulate_recursion(constant, ar_terms, score_terms, past_values, past_scores, future_scores,
+    leverage=None, past_return=None, future_returns=None, location=None):
+    """ Simulates a GARCH-type recursion along many forecast paths at once
+
+    For every path, value_t = constant_t + sum_j ar_j*value_{t-j} + sum_k score_k*score_{t-k},
+    plus leverage*sign(-(y_{t-1} - location_{t-1}))*(score_{t-1} + 1) if a leverage term is given.
+    The paths are stepped through the horizon together in preallocated buffers.
+
+    Parameters
+    ----------
+    constant : float or np.array
+        Intercept, broadcastable to (simulations, h)
+
+    ar_terms : np.array
+        (p,) or (simulations, p) coefficients on the lagged values, first lag first
+
+    score_terms : np.array
+        (q,) or (simulations, q) coefficients on the lagged scores, first lag first
+
+    past_values : np.array
+        (n,) or (simulations, n) in-sample values, most recent last, with n >= max(p, q, 1)
+
+    past_scores : np.array
+        (n,) or (simulations, n) in-sample scores, most recent last, with n >= max(p, q, 1)
+
+    future_scores : np.array
+        (simulations, h) bootstrapped scores for the forecast periods
+
+    leverage : float or np.array
+        (default: None) Leverage coefficient, one per path if an array
+
+    past_return : float or np.array
+        (default: None) The last in-sample return, one per path if an array
+
+    future_returns : np.array
+        (default: None) (simulations, h) bootstrapped returns for the forecast periods
+
+    location : function
+        (default: None) location(t, values) gives the location of the return preceding
+        forecast period t, where values are the simulated values of the period before
+
+    Returns
+    ----------
+    (simulations, h) np.array of simulated values
+    """
+
+    simulations, h = future_scores.shape
+    ar_terms = np.atleast_2d(ar_terms)
+    score_terms = np.atleast_2d(score_terms)
+    p = ar_terms.shape[1]
+    q = score_terms.shape[1]
+    lags = max(p, q, 1)
+
+    values = np.empty((simulations, lags+h))
+    scores = np.empty((simulations, lags+h))
+    values[:, :lags] = np.atleast_2d(past_values)[:, -lags:]
+    scores[:, :lags] = np.atleast_2d(past_scores)[:, -lags:]
+    scores[:, lags:] = future_scores
+    constant = np.broadcast_to(constant, (simulations, h))
+
+    if leverage is not None:
+        returns = np.empty((simulations, h))
+        returns[:, 0] = past_return
+        returns[:, 1:] = future_returns[:, :-1]
+
+    for t in range(h):
+        i = lags + t
+        values[:, i] = constant[:, t]
+
+        for j in range(p):
+            values[:, i] += ar_terms[:, j]*values[:, i-j-1]
+
+        for k in range(q):
+            values[:, i] += score_terms[:, k]*scores[:, i-k-1]
+
+        if leverage is not None:
+            values[:, i] += leverage*np.sign(-(returns[:, t]-location(t, values[:, i-1])))*(scores[:, i-1]+1.0)
+
+    return values[:, lags:]
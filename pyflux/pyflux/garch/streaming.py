@@ -0,0 +1,45 @@
+from collections import deque
+
+import numpy as np
+
+class FilterState(object):
+    """ The latest filtered values of a GARCH-type model, kept for streaming updates
+
+    Parameters
+    ----------
+    z : np.array
+        The (untransformed) latent variables the values were filtered with
+
+    t_params : np.array
+        The transformed latent variables
+
+    values : np.array
+        In-sample filtered values (conditional variances or log volatilities), most recent last
+
+    scores : np.array
+        In-sample scores, most recent last
+
+    last_return : float
+        The last observation
+
+    lags : int
+        How many past values and scores the recursion needs
+    """
+
+    def __init__(self, z, t_params, values, scores, last_return, lags):
+        self.z = z.copy()
+        self.t_params = t_params
+        self.values = deque(values[-lags:], lags)
+        self.scores = deque(scores[-lags:], lags)
+        self.last_return = last_return
+        self.next_value = None
+
+    def is_current(self, z):
+        """ Whether the state was filtered with the latent variables z """
+        return np.array_equal(self.z, z)
+
+    def push(self, value, score, new_return):
+        """ Adds the filtered value and score of a new observation, dropping the oldest ones """
+        self.values.append(value)
+        self.scores.append(score)
+        self.last_return = new_return
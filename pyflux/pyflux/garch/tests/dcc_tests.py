@@ -0,0 +1,73 @@
+import numpy as np
+import pyflux as pf
+
+from pyflux.garch.dcc_recursions import dcc_loglik, dcc_correlations
+
+T = 400
+noise = np.random.multivariate_normal(np.zeros(3), [[1.0,0.5,0.2],[0.5,1.0,0.3],[0.2,0.3,1.0]], T)
+data = np.zeros((T,3))
+sigma2 = np.ones(3)*0.0001
+
+for t in range(1,T):
+    sigma2 = 0.000005 + 0.1*np.power(data[t-1],2) + 0.85*sigma2
+    data[t] = np.sqrt(sigma2)*noise[t]
+
+def reference_dcc(alpha, beta, Z):
+    """ Straightforward numpy version of the DCC recursion """
+    Qbar = np.dot(Z.T, Z)/Z.shape[0]
+    Q = Qbar.copy()
+    loglik = 0.0
+    R_all = []
+    for t in range(Z.shape[0]):
+        if t > 0:
+            Q = (1-alpha-beta)*Qbar + alpha*np.outer(Z[t-1], Z[t-1]) + beta*Q
+        s = np.sqrt(np.diag(Q))
+        R = Q/np.outer(s, s)
+        loglik += -0.5*(np.linalg.slogdet(R)[1] + np.dot(Z[t], np.linalg.solve(R, Z[t])) - np.dot(Z[t], Z[t]))
+        R_all.append(R[np.tril_indices(Z.shape[1], -1)])
+    return loglik, np.array(R_all)
+
+def test_recursion_matches_reference():
+    """
+    Tests that the compiled DCC likelihood and correlations agree with a numpy implementation
+    """
+    Z = np.ascontiguousarray(noise[:100])
+    Qbar = np.ascontiguousarray(np.dot(Z.T, Z)/Z.shape[0])
+    loglik, R = reference_dcc(0.05, 0.9, Z)
+    assert(np.isclose(dcc_loglik(0.05, 0.9, Z, Qbar), loglik))
+    assert(np.allclose(dcc_correlations(0.05, 0.9, Z, Qbar), R))
+
+def test_couple_terms():
+    """
+    Tests that the latent variable list length is correct, and that the estimated
+    latent variables are not nan
+    """
+    model = pf.DCC(data=data, p=1, q=1)
+    x = model.fit()
+    assert(len(model.latent_variables.z_list) == 14)
+    lvs = np.array([i.value for i in model.latent_variables.z_list])
+    assert(len(lvs[np.isnan(lvs)]) == 0)
+
+def test_correlations_shape():
+    """
+    Tests that packed and full conditional correlations are consistent
+    """
+    model = pf.DCC(data=data, p=1, q=1)
+    x = model.fit()
+    R = model.correlations()
+    R_full = model.correlations(packed=False)
+    assert(R.shape == (T-1, 3))
+    assert(R_full.shape == (T-1, 3, 3))
+    assert(np.allclose(R_full[:,1,0], R[:,0]))
+    assert(np.allclose(R_full[:,2,1], R[:,2]))
+    assert(np.all(np.abs(R) < 1.0))
+
+def test_parallel_univariate_stage():
+    """
+    Tests that fitting the univariate stage on a process pool gives the serial estimates
+    """
+    serial = pf.DCC(data=data, p=1, q=1)
+    serial.fit()
+    parallel = pf.DCC(data=data, p=1, q=1)
+    parallel.fit(workers=2)
+    assert(np.allclose(serial.latent_variables.get_z_values(), parallel.latent_variables.get_z_values()))
@@ -1,8 +1,11 @@
 import numpy as np
 import pyflux as pf
 import pandas as pd
+import numdifftools as nd
+import scipy.stats as ss
 from pandas.io.data import DataReader
 from datetime import datetime
+from pyflux.garch.egarch_recursions import egarch_recursion_batch
 
 jpm = DataReader('JPM',  'yahoo', datetime(2013,1,1), datetime(2016,3,10))
 data = pd.DataFrame(np.diff(np.log(jpm['Adj Close'].values)))
@@ -23,6 +26,46 @@ def test_couple_terms():
     lvs = np.array([i.value for i in model.latent_variables.z_list])
     assert(len(lvs[np.isnan(lvs)]) == 0)
 
+def test_neg_loglik_leverage():
+    model = pf.EGARCH(data=data, p=2, q=2)
+    model.add_leverage()
+    z = model.latent_variables.get_z_starting_values()
+    t_z = np.array([model.latent_variables.z_list[k].prior.transform(z[k]) for k in range(z.shape[0])])
+    lmda, Y, scores = model._model(z)
+    loglik = np.sum(ss.t.logpdf(x=Y, df=t_z[-2], loc=t_z[-1], scale=np.exp(lmda/2.0)))
+    assert(np.allclose(model.neg_loglik(z), -loglik))
+
+def test_neg_loglik_gradient():
+    model = pf.EGARCH(data=data, p=1, q=1)
+    z = model.latent_variables.get_z_starting_values()
+    assert(np.allclose(model.neg_loglik_gradient(z), nd.Gradient(model.neg_loglik)(z)))
+
+def test_neg_loglik_gradient_leverage():
+    model = pf.EGARCH(data=data, p=1, q=1)
+    model.add_leverage()
+    z = model.latent_variables.get_z_starting_values()
+    assert(np.allclose(model.neg_loglik_gradient(z), nd.Gradient(model.neg_loglik)(z)))
+
+def test_recursion_batch_leverage():
+    model = pf.EGARCH(data=data, p=1, q=1)
+    model.add_leverage()
+    Z = model.latent_variables.get_z_starting_values() + np.random.normal(0, 0.1, (5, model.z_no))
+    Y = np.array(model.data[model.max_lag:])
+    draws = np.random.randint(Y.shape[0], size=(5, 4))
+    values_lags, scores_lags, future_scores = egarch_recursion_batch(np.ascontiguousarray(model.transform_batch(Z)), Y,
+        model.p, model.q, model.max_lag, True, False, draws, 3)
+    for n in range(5):
+        lmda, Y, scores = model._model(Z[n])
+        assert(np.allclose(values_lags[n], lmda[-3:]))
+        assert(np.allclose(scores_lags[n], scores[-3:]))
+        assert(np.allclose(future_scores[n], scores[draws[n]]))
+
+def test_gradient_batch_leverage():
+    model = pf.EGARCH(data=data, p=1, q=1)
+    model.add_leverage()
+    Z = model.latent_variables.get_z_starting_values() + np.random.normal(0, 0.1, (5, model.z_no))
+    assert(np.allclose(model.neg_logposterior_gradient_batch(Z), np.array([model.neg_logposterior_gradient(z) for z in Z])))
+
 def test_bbvi():
     model = pf.EGARCH(data=data, p=1, q=1)
     x = model.fit('BBVI', map_start=False, iterations=100)
@@ -74,6 +117,17 @@ def test_predict_length():
     x.summary()
     assert(model.predict(h=5).shape[0] == 5)
 
+def test_update():
+    model = pf.EGARCH(data=data[:-5], p=1, q=1)
+    model.add_leverage()
+    x = model.fit()
+    full = pf.EGARCH(data=data, p=1, q=1)
+    full.add_leverage()
+    lmda, Y, scores = full._model(model.latent_variables.get_z_values())
+    forecasts = model.update_batch(full.data[-5:-1])
+    assert(np.allclose(forecasts, np.exp(lmda[-4:]/2.0)))
+    assert(np.isscalar(model.update(full.data[-1])))
+
 def test_predict_is_length():
     model = pf.EGARCH(data=data, p=2, q=2)
     x = model.fit()
@@ -97,6 +151,17 @@ def test_predict_nans():
     x.summary()
     assert(len(model.predict(h=5).values[np.isnan(model.predict(h=5).values)]) == 0)
 
+def test_sim_prediction_leverage():
+    model = pf.EGARCH(data=data, p=1, q=1)
+    model.add_leverage()
+    x = model.fit()
+    lmda, Y, scores = model._model(model.latent_variables.get_z_values())
+    t_z = model.transform_z()
+    sim_values = model._sim_prediction(lmda, Y, scores, 5, t_z, 1000)
+    assert(sim_values.shape == (5, 1000))
+    assert(np.allclose(sim_values[0], model._mean_prediction(lmda, Y, scores, 5, t_z)[-5]))
+    assert(np.unique(sim_values[1]).shape[0] > 1)
+
 def test_predict_is_nans():
     model = pf.EGARCH(data=data, q=2, p=2)
     x = model.fit()
@@ -1,6 +1,8 @@
 import numpy as np
 import pyflux as pf
 import pandas as pd
+import numdifftools as nd
+import scipy.stats as ss
 from pandas.io.data import DataReader
 from datetime import datetime
 
@@ -23,6 +25,26 @@ def test_couple_terms():
     lvs = np.array([i.value for i in model.latent_variables.z_list])
     assert(len(lvs[np.isnan(lvs)]) == 0)
 
+def test_neg_loglik_leverage():
+    model = pf.EGARCHM(data=data, p=2, q=2)
+    model.add_leverage()
+    z = model.latent_variables.get_z_starting_values()
+    t_z = np.array([model.latent_variables.z_list[k].prior.transform(z[k]) for k in range(z.shape[0])])
+    lmda, Y, scores = model._model(z)
+    loglik = np.sum(ss.t.logpdf(x=Y, df=t_z[-3], loc=t_z[-2]+t_z[-1]*np.exp(lmda/2.0), scale=np.exp(lmda/2.0)))
+    assert(np.allclose(model.neg_loglik(z), -loglik))
+
+def test_neg_loglik_gradient():
+    model = pf.EGARCHM(data=data, p=1, q=1)
+    z = model.latent_variables.get_z_starting_values()
+    assert(np.allclose(model.neg_loglik_gradient(z), nd.Gradient(model.neg_loglik)(z)))
+
+def test_neg_loglik_gradient_leverage():
+    model = pf.EGARCHM(data=data, p=1, q=1)
+    model.add_leverage()
+    z = model.latent_variables.get_z_starting_values()
+    assert(np.allclose(model.neg_loglik_gradient(z), nd.Gradient(model.neg_loglik)(z)))
+
 def test_bbvi():
     model = pf.EGARCHM(data=data, p=1, q=1)
     x = model.fit('BBVI', map_start=False, iterations=100)
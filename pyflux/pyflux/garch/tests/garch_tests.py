@@ -1,8 +1,11 @@
 import numpy as np
 import pyflux as pf
 import pandas as pd
+import numdifftools as nd
+import scipy.stats as ss
 from pandas.io.data import DataReader
 from datetime import datetime
+from pyflux.garch.garch_recursions import garch_recursion_batch
 
 jpm = DataReader('JPM',  'yahoo', datetime(2006,1,1), datetime(2016,3,10))
 data = pd.DataFrame(np.diff(np.log(jpm['Adj Close'].values)))
@@ -23,6 +26,76 @@ def test_couple_terms():
     lvs = np.array([i.value for i in model.latent_variables.z_list])
     assert(len(lvs[np.isnan(lvs)]) == 0)
 
+def test_loglik_kernel():
+    model = pf.GARCH(data=data, p=2, q=1)
+    z = model.latent_variables.get_z_starting_values()
+    sigma2, Y, ___ = model._model(z)
+    mu = model.latent_variables.z_list[-1].prior.transform(z[-1])
+    assert(np.isclose(model.neg_loglik(z), -np.sum(ss.norm.logpdf(Y, loc=mu, scale=np.sqrt(sigma2)))))
+
+def test_neg_loglik_gradient():
+    model = pf.GARCH(data=data, p=1, q=1)
+    z = model.latent_variables.get_z_starting_values()
+    assert(np.allclose(model.neg_loglik_gradient(z), nd.Gradient(model.neg_loglik)(z)))
+
+def test_neg_loglik_batch():
+    model = pf.GARCH(data=data, p=1, q=1)
+    Z = model.latent_variables.get_z_starting_values() + np.random.normal(0, 0.1, (5, model.z_no))
+    assert(np.allclose(model.neg_loglik_batch(Z), [model.neg_loglik(z) for z in Z]))
+
+def test_recursion_batch():
+    model = pf.GARCH(data=data, p=2, q=1)
+    Z = model.latent_variables.get_z_starting_values() + np.random.normal(0, 0.1, (5, model.z_no))
+    sigma2 = np.array([model._model(z)[0] for z in Z])
+    t_params = np.ascontiguousarray(model.transform_batch(Z))
+    assert(np.allclose(garch_recursion_batch(t_params, model.data, model.q, model.p, model.max_lag), sigma2))
+    assert(np.allclose(garch_recursion_batch(t_params, model.data, model.q, model.p, model.max_lag, 3), sigma2[:,-3:]))
+
+def test_gradient_batch():
+    model = pf.GARCH(data=data, p=2, q=1)
+    model.adjust_prior(0, pf.Laplace(0, 1))
+    Z = model.latent_variables.get_z_starting_values() + np.random.normal(0, 0.1, (5, model.z_no))
+    assert(np.allclose(model.neg_logposterior_gradient_batch(Z), np.array([model.neg_logposterior_gradient(z) for z in Z])))
+
+def test_hessian_providers():
+    model = pf.GARCH(data=data, p=1, q=1)
+    x = model.fit()
+    z = model.latent_variables.get_z_values()
+    H = nd.Jacobian(model.neg_loglik_gradient)(z)
+    assert(np.allclose(x.ihessian, np.linalg.inv(H), rtol=1e-3))
+    assert(np.allclose(model.fit(hessian='central').ihessian, np.linalg.inv(H), rtol=1e-2))
+    assert(np.all(np.diag(model.fit(hessian='opg').ihessian) > 0))
+
+def test_skip_hessian():
+    model = pf.GARCH(data=data, p=1, q=1)
+    x = model.fit(hessian=None)
+    assert(x.ihessian is None)
+    lvs = np.array([i.value for i in model.latent_variables.z_list])
+    assert(len(lvs[np.isnan(lvs)]) == 0)
+
+def test_hessian_errors_propagate():
+    model = pf.GARCH(data=data, p=1, q=1)
+    def broken_gradient(z):
+        raise RuntimeError("broken gradient")
+    model.neg_loglik_gradient = broken_gradient
+    try:
+        model.fit(hessian='gradient')
+    except RuntimeError:
+        pass
+    else:
+        assert(False)
+
+def test_backtest_loss():
+    from pyflux.backtesting import backtest
+    values = np.asarray(data).ravel()
+    results = backtest(pf.GARCH, data, [(0, 400), (100, 500)], model_args={'p': 1, 'q': 1}, processes=1, seed=3)
+    for row, (start, end) in enumerate([(0, 400), (100, 500)]):
+        model = pf.GARCH(data=values[start:end], p=1, q=1)
+        model.fit()
+        assert(np.allclose(results['Forecast'].values[row], model.predict(1).values[0][0]))
+        assert(np.allclose(results.iloc[row, 1], np.power(values[end] - model.transform_z()[-1], 2)))
+    assert(np.allclose(results['Loss'].values, np.power(results.iloc[:, 1].values - results['Forecast'].values, 2)))
+
 def test_bbvi():
     model = pf.GARCH(data=data, p=1, q=1)
     x = model.fit('BBVI', iterations=100)
@@ -47,6 +120,18 @@ def test_bbvi_mini_batch_elbo():
     x = model.fit('BBVI',iterations=100, map_start=False, mini_batch=32, record_elbo=True)
     assert(x.elbo_records[-1]>x.elbo_records[0])
 
+def test_bbvi_reparameterize():
+    model = pf.GARCH(data=data, p=1, q=1)
+    x = model.fit('BBVI', iterations=100, reparameterize=True)
+    assert(len(model.latent_variables.z_list) == 4)
+    lvs = np.array([i.value for i in model.latent_variables.z_list])
+    assert(len(lvs[np.isnan(lvs)]) == 0)
+
+def test_bbvi_reparameterize_elbo():
+    model = pf.GARCH(data=data, p=1, q=1)
+    x = model.fit('BBVI', iterations=100, map_start=False, reparameterize=True, record_elbo=True)
+    assert(x.elbo_records[-1]>x.elbo_records[0])
+
 def test_mh():
     model = pf.GARCH(data=data, p=1, q=1)
     x = model.fit('M-H', nsims=300)
@@ -74,6 +159,15 @@ def test_predict_length():
     x.summary()
     assert(model.predict(h=5).shape[0] == 5)
 
+def test_update():
+    model = pf.GARCH(data=data[:-5], p=1, q=1)
+    x = model.fit()
+    full = pf.GARCH(data=data, p=1, q=1)
+    sigma2, Y, scores = full._model(model.latent_variables.get_z_values())
+    forecasts = model.update_batch(full.data[-5:-1])
+    assert(np.allclose(forecasts, sigma2[-4:]))
+    assert(np.isscalar(model.update(full.data[-1])))
+
 def test_predict_is_length():
     model = pf.GARCH(data=data, p=2, q=2)
     x = model.fit()
@@ -91,12 +185,37 @@ def test_predict_is_nonconstant():
     predictions = model.predict_is(h=5, intervals=False)
     assert(not np.all(predictions.values==predictions.values[0]))
 
+def test_predict_is_incremental():
+    model = pf.GARCH(data=data, p=2, q=2)
+    x = model.fit()
+    predictions = model.predict_is(h=5)
+    fitted = pf.GARCH(data=data[:-5], p=2, q=2)
+    fitted.fit()
+    sigma2, _, _ = model._model(fitted.latent_variables.get_z_values())
+    assert(np.allclose(predictions.values[:,0], sigma2[-5:]))
+
+def test_predict_is_refit_every():
+    model = pf.GARCH(data=data, p=2, q=2)
+    x = model.fit()
+    predictions = model.predict_is(h=6, refit_every=3)
+    assert(predictions.shape[0] == 6)
+    assert(len(predictions.values[np.isnan(predictions.values)]) == 0)
+
 def test_predict_nans():
     model = pf.GARCH(data=data, p=2, q=2)
     x = model.fit()
     x.summary()
     assert(len(model.predict(h=5).values[np.isnan(model.predict(h=5).values)]) == 0)
 
+def test_sim_prediction():
+    model = pf.GARCH(data=data, p=2, q=2)
+    x = model.fit()
+    sigma2, Y, scores = model._model(model.latent_variables.get_z_values())
+    t_z = model.transform_z()
+    sim_values = model._sim_prediction(sigma2, Y, scores, 5, t_z, 1000)
+    assert(sim_values.shape == (5, 1000))
+    assert(np.allclose(sim_values[0], model._mean_prediction(sigma2, Y, scores, 5, t_z)[-5]))
+
 def test_predict_is_nans():
     model = pf.GARCH(data=data, q=2, p=2)
     x = model.fit()
@@ -111,6 +230,13 @@ def test_predict_intervals():
     assert(np.all(predictions['95% Prediction Interval'].values >= predictions['5% Prediction Interval'].values))
     assert(np.all(predictions['5% Prediction Interval'].values >= predictions['1% Prediction Interval'].values))
 
+def test_predict_custom_percentiles():
+    model = pf.GARCH(data=data, q=2, p=2)
+    x = model.fit()
+    predictions = model.predict(h=10, intervals=True, percentiles=[0.5, 2.5])
+    assert(list(predictions.columns) == [model.data_name, '0.5% Prediction Interval', '2.5% Prediction Interval'])
+    assert(np.all(predictions['2.5% Prediction Interval'].values >= predictions['0.5% Prediction Interval'].values))
+
 def test_predict_is_intervals():
     model = pf.GARCH(data=data, q=2, p=2)
     x = model.fit()
@@ -1,8 +1,11 @@
 import numpy as np
 import pyflux as pf
 import pandas as pd
+import numdifftools as nd
+import scipy.stats as ss
 from pandas.io.data import DataReader
 from datetime import datetime
+from pyflux.garch.egarch_recursions import lmegarch_recursion_batch
 
 jpm = DataReader('JPM',  'yahoo', datetime(2011,1,1), datetime(2016,3,10))
 data = pd.DataFrame(np.diff(np.log(jpm['Adj Close'].values)))
@@ -23,6 +26,68 @@ def a_test_couple_terms():
     lvs = np.array([i.value for i in model.latent_variables.z_list])
     assert(len(lvs[np.isnan(lvs)]) == 0)
 
+def test_neg_loglik_leverage():
+    model = pf.LMEGARCH(data=data, p=1, q=1)
+    model.add_leverage()
+    z = model.latent_variables.get_z_starting_values()
+    t_z = np.array([model.latent_variables.z_list[k].prior.transform(z[k]) for k in range(z.shape[0])])
+    lmda, lmda_c, Y, scores = model._model(z)
+    loglik = np.sum(ss.t.logpdf(x=Y, df=t_z[-2], loc=t_z[-1], scale=np.exp(lmda/2.0)))
+    assert(np.allclose(model.neg_loglik(z), -loglik))
+
+def test_neg_loglik_gradient():
+    model = pf.LMEGARCH(data=data, p=1, q=1)
+    z = model.latent_variables.get_z_starting_values()
+    assert(np.allclose(model.neg_loglik_gradient(z), nd.Gradient(model.neg_loglik)(z)))
+
+def test_neg_loglik_gradient_leverage():
+    model = pf.LMEGARCH(data=data, p=1, q=1)
+    model.add_leverage()
+    z = model.latent_variables.get_z_starting_values()
+    assert(np.allclose(model.neg_loglik_gradient(z), nd.Gradient(model.neg_loglik)(z)))
+
+def test_recursion_batch_leverage():
+    model = pf.LMEGARCH(data=data, p=1, q=1)
+    model.add_leverage()
+    Z = model.latent_variables.get_z_starting_values() + np.random.normal(0, 0.1, (5, model.z_no))
+    Y = np.array(model.data[model.max_lag:])
+    draws = np.random.randint(Y.shape[0], size=(5, 4))
+    values_lags, scores_lags, future_scores = lmegarch_recursion_batch(np.ascontiguousarray(model.transform_batch(Z)), Y,
+        model.p, model.q, model.max_lag, True, draws, 3)
+    for n in range(5):
+        lmda, lmda_c, Y, scores = model._model(Z[n])
+        assert(np.allclose(values_lags[n], lmda_c[-3:]))
+        assert(np.allclose(scores_lags[n], scores[-3:]))
+        assert(np.allclose(future_scores[n], scores[draws[n]]))
+
+def test_gradient_batch_leverage():
+    model = pf.LMEGARCH(data=data, p=1, q=1)
+    model.add_leverage()
+    Z = model.latent_variables.get_z_starting_values() + np.random.normal(0, 0.1, (5, model.z_no))
+    assert(np.allclose(model.neg_logposterior_gradient_batch(Z), np.array([model.neg_logposterior_gradient(z) for z in Z])))
+
+def test_update():
+    model = pf.LMEGARCH(data=data[:-5], p=1, q=1)
+    full = pf.LMEGARCH(data=data, p=1, q=1)
+    z = model.latent_variables.get_z_starting_values()
+    model.latent_variables.set_z_values(z, 'MLE')
+    lmda, lmda_c, Y, scores = full._model(z)
+    forecasts = model.update_batch(full.data[-5:-1])
+    assert(np.allclose(forecasts, np.exp(lmda[-4:]/2.0)))
+    assert(np.isscalar(model.update(full.data[-1])))
+
+def test_update_leverage():
+    model = pf.LMEGARCH(data=data[:-5], p=1, q=1)
+    full = pf.LMEGARCH(data=data, p=1, q=1)
+    model.add_leverage()
+    full.add_leverage()
+    z = model.latent_variables.get_z_starting_values()
+    model.latent_variables.set_z_values(z, 'MLE')
+    lmda, lmda_c, Y, scores = full._model(z)
+    forecasts = model.update_batch(full.data[-5:-1])
+    assert(np.allclose(forecasts, np.exp(lmda[-4:]/2.0)))
+    assert(np.isscalar(model.update(full.data[-1])))
+
 def a_test_bbvi():
     model = pf.LMEGARCH(data=data, p=1, q=1)
     x = model.fit('BBVI', map_start=False, iterations=100)
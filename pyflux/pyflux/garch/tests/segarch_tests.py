@@ -3,6 +3,7 @@ import pyflux as pf
 import pandas as pd
 from pandas.io.data import DataReader
 from datetime import datetime
+from pyflux.garch.egarch_recursions import segarch_recursion_batch
 
 jpm = DataReader('JPM',  'yahoo', datetime(2014,1,1), datetime(2016,3,10))
 data = pd.DataFrame(np.diff(np.log(jpm['Adj Close'].values)))
@@ -74,6 +75,52 @@ def test_predict_length():
     x.summary()
     assert(model.predict(h=5).shape[0] == 5)
 
+def test_neg_loglik_leverage():
+    from pyflux.garch.segarch import logpdf
+    model = pf.SEGARCH(data=data, p=1, q=1)
+    model.add_leverage()
+    z = model.latent_variables.get_z_starting_values()
+    t_z = np.array([model.latent_variables.z_list[k].prior.transform(z[k]) for k in range(z.shape[0])])
+    lmda, Y, scores, theta = model._model(z)
+    loglik = np.sum(logpdf(Y, t_z[-2], loc=theta, scale=np.exp(lmda/2.0), skewness=t_z[-3]))
+    assert(np.allclose(model.neg_loglik(z), -loglik))
+
+def test_recursion_batch_leverage():
+    model = pf.SEGARCH(data=data, p=1, q=1)
+    model.add_leverage()
+    Z = model.latent_variables.get_z_starting_values() + np.random.normal(0, 0.1, (5, model.z_no))
+    Y = np.array(model.data[model.max_lag:])
+    draws = np.random.randint(Y.shape[0], size=(5, 4))
+    values_lags, scores_lags, future_scores = segarch_recursion_batch(np.ascontiguousarray(model.transform_batch(Z)), Y,
+        model.p, model.q, model.max_lag, True, False, draws, 3)
+    for n in range(5):
+        lmda, Y, scores, theta = model._model(Z[n])
+        assert(np.allclose(values_lags[n], lmda[-3:]))
+        assert(np.allclose(scores_lags[n], scores[-3:]))
+        assert(np.allclose(future_scores[n], scores[draws[n]]))
+
+def test_update():
+    model = pf.SEGARCH(data=data[:-5], p=1, q=1)
+    full = pf.SEGARCH(data=data, p=1, q=1)
+    z = model.latent_variables.get_z_starting_values()
+    model.latent_variables.set_z_values(z, 'MLE')
+    lmda, Y, scores, theta = full._model(z)
+    forecasts = model.update_batch(full.data[-5:-1])
+    assert(np.allclose(forecasts, np.exp(lmda[-4:]/2.0)))
+    assert(np.isscalar(model.update(full.data[-1])))
+
+def test_update_leverage():
+    model = pf.SEGARCH(data=data[:-5], p=1, q=1)
+    full = pf.SEGARCH(data=data, p=1, q=1)
+    model.add_leverage()
+    full.add_leverage()
+    z = model.latent_variables.get_z_starting_values()
+    model.latent_variables.set_z_values(z, 'MLE')
+    lmda, Y, scores, theta = full._model(z)
+    forecasts = model.update_batch(full.data[-5:-1])
+    assert(np.allclose(forecasts, np.exp(lmda[-4:]/2.0)))
+    assert(np.isscalar(model.update(full.data[-1])))
+
 def test_predict_is_length():
     model = pf.SEGARCH(data=data, p=2, q=2)
     x = model.fit()
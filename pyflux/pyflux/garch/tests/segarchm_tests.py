@@ -68,6 +68,16 @@ def test_pml():
     lvs = np.array([i.value for i in model.latent_variables.z_list])
     assert(len(lvs[np.isnan(lvs)]) == 0)
 
+def test_neg_loglik_leverage():
+    from pyflux.garch.segarchm import logpdf
+    model = pf.SEGARCHM(data=data, p=1, q=1)
+    model.add_leverage()
+    z = model.latent_variables.get_z_starting_values()
+    t_z = np.array([model.latent_variables.z_list[k].prior.transform(z[k]) for k in range(z.shape[0])])
+    lmda, Y, scores, theta = model._model(z)
+    loglik = np.sum(logpdf(Y, t_z[-3], loc=theta, scale=np.exp(lmda/2.0), skewness=t_z[-4]))
+    assert(np.allclose(model.neg_loglik(z), -loglik))
+
 def test_predict_length():
     model = pf.SEGARCHM(data=data, p=2, q=2)
     x = model.fit()
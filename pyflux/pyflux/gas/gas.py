@@ -11,6 +11,7 @@ import scipy.special as sp
 from .. import families as fam
 from .. import tsm as tsm
 from .. import data_check as dc
+from .. import forecasting as fc
 
 from .gas_core_recursions import gas_recursion
 
@@ -207,7 +208,7 @@ class GAS(tsm.TSM):
             Contains the scores for the time series
         """
 
-        parm = np.array([self.latent_variables.z_list[k].prior.transform(beta[k]) for k in range(beta.shape[0])])
+        parm = self.latent_variables.transform_all(beta)
         theta = np.ones(self.model_Y.shape[0])*parm[0]
         model_scale, model_shape, model_skewness = self._get_scale_and_shape(parm)
 
@@ -243,7 +244,7 @@ class GAS(tsm.TSM):
 
         Y = self.model_Y[sample]
 
-        parm = np.array([self.latent_variables.z_list[k].prior.transform(beta[k]) for k in range(beta.shape[0])])
+        parm = self.latent_variables.transform_all(beta)
         theta = np.ones(Y.shape[0])*parm[0]
         model_scale, model_shape, model_skewness = self._get_scale_and_shape(parm)
 
@@ -271,7 +272,7 @@ class GAS(tsm.TSM):
             Contains the scores for the time series
         """
 
-        parm = np.array([self.latent_variables.z_list[k].prior.transform(beta[k]) for k in range(beta.shape[0])])
+        parm = self.latent_variables.transform_all(beta)
         theta = np.ones(self.model_Y.shape[0])*parm[0]
         model_scale, model_shape, model_skewness = self._get_scale_and_shape(parm)
 
@@ -308,7 +309,7 @@ class GAS(tsm.TSM):
 
         Y = self.model_Y[sample]
 
-        parm = np.array([self.latent_variables.z_list[k].prior.transform(beta[k]) for k in range(beta.shape[0])])
+        parm = self.latent_variables.transform_all(beta)
         theta = np.ones(Y.shape[0])*parm[0]
         model_scale, model_shape, model_skewness = self._get_scale_and_shape(parm)
 
@@ -317,6 +318,45 @@ class GAS(tsm.TSM):
             self.link, model_scale, model_shape, model_skewness, self.max_lag)
         return theta, Y, self.model_scores
 
+    def _model_batch(self, Z):
+        """ Runs the model recursion for many latent variable vectors at once
+
+        For families with elementwise score functions the recursion runs over all
+        draws in one vectorized pass; otherwise each draw is filtered in turn.
+
+        Parameters
+        ----------
+        Z : np.array
+            (S, k) array of untransformed latent variables, one vector per row
+
+        Returns
+        ----------
+        theta : np.array
+            (S, T) array of predicted values for the time series
+        """
+
+        if self.model_name2 not in ['Normal', 't', 'Cauchy']:
+            return np.array([self._model(Z[i])[0] for i in range(Z.shape[0])])
+
+        parm = self.transform_batch(Z)
+        model_scale, model_shape, model_skewness = self._get_scale_and_shape_sim(Z.T)
+        theta = np.zeros((Z.shape[0], self.model_Y.shape[0]))
+        scores = np.zeros((Z.shape[0], self.model_Y.shape[0]))
+
+        for t in range(self.model_Y.shape[0]):
+            if t < self.max_lag:
+                theta[:,t] = parm[:,0]/(1.0-np.sum(parm[:,1:(self.ar+1)], axis=1))
+            else:
+                theta[:,t] = parm[:,0]
+                for k in range(self.ar):
+                    theta[:,t] += parm[:,1+k]*theta[:,t-1-k]
+                for k in range(self.sc):
+                    theta[:,t] += parm[:,1+self.ar+k]*scores[:,t-1-k]
+            scores[:,t] = self.family.score_function(self.model_Y[t], self.link(theta[:,t]), model_scale, 
+                model_shape, model_skewness)
+
+        return theta
+
     def _mean_prediction(self, theta, Y, scores, h, t_params):
         """ Creates a h-step ahead mean prediction
 
@@ -496,7 +536,7 @@ class GAS(tsm.TSM):
 
             t_z = self.draw_latent_variables(nsims=1).T[0]
             theta, Y, scores = self._model(t_z)
-            t_z = np.array([self.latent_variables.z_list[k].prior.transform(t_z[k]) for k in range(t_z.shape[0])])
+            t_z = self.latent_variables.transform_all(t_z)
 
             model_scale, model_shape, model_skewness = self._get_scale_and_shape(t_z)
 
@@ -591,7 +631,7 @@ class GAS(tsm.TSM):
 
             sim_vector[n] = Y_exp[-h:]
 
-        return np.append(Y, np.array([np.mean(i) for i in np.transpose(sim_vector)]))
+        return np.append(Y, sim_vector.mean(axis=0))
 
     def _summarize_simulations(self,mean_values,sim_vector,date_index,h,past_values):
         """ Summarizes a simulation vector and a mean vector of predictions
@@ -617,9 +657,7 @@ class GAS(tsm.TSM):
             Would you like to show prediction intervals for the forecast?
         """ 
 
-        error_bars = []
-        for pre in range(5,100,5):
-            error_bars.append(np.insert([np.percentile(i,pre) for i in sim_vector], 0, mean_values[-h-1]))
+        error_bars = fc.error_bars(sim_vector, mean_values[-h-1])
         forecasted_values = mean_values[-h-1:]
         plot_values = mean_values[-h-past_values:]
         plot_index = date_index[-h-past_values:]
@@ -634,10 +672,23 @@ class GAS(tsm.TSM):
             Contains untransformed starting values for latent variables
         """
         theta, Y, _ = self._model(beta)
-        parm = np.array([self.latent_variables.z_list[k].prior.transform(beta[k]) for k in range(beta.shape[0])])
+        parm = self.latent_variables.transform_all(beta)
         model_scale, model_shape, model_skewness = self._get_scale_and_shape(parm)
         return self.family.neg_loglikelihood(Y, self.link(theta), model_scale, model_shape, model_skewness)
 
+    def neg_loglik_batch(self, Z):
+        """ Returns the negative loglikelihood of the model for many latent variable vectors
+
+        Parameters
+        ----------
+        Z : np.array
+            (S, k) array of untransformed latent variables, one vector per row
+        """
+        theta = self._model_batch(Z)
+        model_scale, model_shape, model_skewness = self._get_scale_and_shape_sim(Z.T)
+        return np.array([self.family.neg_loglikelihood(self.model_Y, self.link(theta[i]), model_scale[i], 
+            model_shape[i], model_skewness[i]) for i in range(Z.shape[0])])
+
     def mb_neg_loglik(self, beta, mini_batch):
         """ Returns the negative loglikelihood of the model
 
@@ -650,7 +701,7 @@ class GAS(tsm.TSM):
             Size of each mini batch of data
         """
         theta, Y, _ = self._mb_model(beta, mini_batch)
-        parm = np.array([self.latent_variables.z_list[k].prior.transform(beta[k]) for k in range(beta.shape[0])])
+        parm = self.latent_variables.transform_all(beta)
         model_scale, model_shape, model_skewness = self._get_scale_and_shape(parm)
         return self.family.neg_loglikelihood(Y, self.link(theta), model_scale, model_shape, model_skewness)
 
@@ -731,12 +782,9 @@ class GAS(tsm.TSM):
 
             if self.latent_variables.estimation_method in ['M-H']:
                 sim_vector = self._sim_prediction_bayes(h, 15000)
-                error_bars = []
-
-                for pre in range(5,100,5):
-                    error_bars.append(np.insert([np.percentile(i,pre) for i in sim_vector], 0, Y[-1]))
+                error_bars = fc.error_bars(sim_vector, Y[-1])
 
-                forecasted_values = np.insert([np.mean(i) for i in sim_vector], 0, Y[-1])
+                forecasted_values = np.insert(sim_vector.mean(axis=1), 0, Y[-1])
                 plot_values = np.append(Y[-1-past_values:-2], forecasted_values)
                 plot_index = date_index[-h-past_values:]
 
@@ -844,7 +892,7 @@ class GAS(tsm.TSM):
         plt.legend(loc=2)   
         plt.show()          
 
-    def predict(self, h=5, intervals=False):
+    def predict(self, h=5, intervals=False, percentiles=None):
         """ Makes forecast with the estimated model
 
         Parameters
@@ -855,6 +903,9 @@ class GAS(tsm.TSM):
         intervals : boolean (default: False)
             Whether to return prediction intervals
 
+        percentiles : list (default: [1, 5, 95, 99])
+            Percentiles of the prediction intervals, in percent (e.g. [0.5, 2.5] for VaR)
+
         Returns
         ----------
         - pd.DataFrame with predicted values
@@ -868,21 +919,13 @@ class GAS(tsm.TSM):
             date_index = self.shift_dates(h)
 
             if self.latent_variables.estimation_method in ['M-H']:
-                sim_vector = self._sim_prediction_bayes(h, 15000)
+                sim_values = self._sim_prediction_bayes(h, 15000)
 
-                forecasted_values = np.array([np.mean(i) for i in sim_vector])
-                prediction_01 = np.array([np.percentile(i, 1) for i in sim_vector])
-                prediction_05 = np.array([np.percentile(i, 5) for i in sim_vector])
-                prediction_95 = np.array([np.percentile(i, 95) for i in sim_vector])
-                prediction_99 = np.array([np.percentile(i, 99) for i in sim_vector])
+                forecasted_values = sim_values.mean(axis=1)
 
             else:
                 t_z = self.transform_z()
                 mean_values = self._mean_prediction(theta, Y, scores, h, t_z)
-                if intervals is True:
-                    sim_values = self._sim_prediction(theta, Y, scores, h, t_z, 15000)
-                else:
-                    sim_values = self._sim_prediction(theta, Y, scores, h, t_z, 2)
 
                 if self.model_name2 == "Skewt":
                     model_scale, model_shape, model_skewness = self._get_scale_and_shape(t_z)
@@ -898,16 +941,8 @@ class GAS(tsm.TSM):
                 # Get mean prediction and simulations (for errors)
                 if self.latent_variables.estimation_method not in ['M-H']:
                     sim_values = self._sim_prediction(theta, Y, scores, h, t_z, 15000)
-                    prediction_01 = np.array([np.percentile(i, 1) for i in sim_values])
-                    prediction_05 = np.array([np.percentile(i, 5) for i in sim_values])
-                    prediction_95 = np.array([np.percentile(i, 95) for i in sim_values])
-                    prediction_99 = np.array([np.percentile(i, 99) for i in sim_values])
-
-                result = pd.DataFrame([forecasted_values, prediction_01, prediction_05, 
-                    prediction_95, prediction_99]).T
-                result.rename(columns={0:self.data_name, 1: "1% Prediction Interval", 
-                    2: "5% Prediction Interval", 3: "95% Prediction Interval", 4: "99% Prediction Interval"}, 
-                    inplace=True)
+
+                result = fc.interval_frame(forecasted_values, sim_values, self.data_name, percentiles)
  
             result.index = date_index[-h:]
 
@@ -929,7 +964,7 @@ class GAS(tsm.TSM):
             raise Exception("No latent variables estimated!")
         else:
             lv_draws = self.draw_latent_variables(nsims=nsims)
-            mus = [self._model(lv_draws[:,i])[0] for i in range(nsims)]
+            mus = self._model_batch(lv_draws.T)
             model_scale, model_shape, model_skewness = self._get_scale_and_shape_sim(lv_draws)
             data_draws = np.array([self.family.draw_variable(self.link(mus[i]), 
                 np.repeat(model_scale[i], mus[i].shape[0]), np.repeat(model_shape[i], mus[i].shape[0]), 
@@ -984,12 +1019,6 @@ class GAS(tsm.TSM):
         if self.latent_variables.estimation_method not in ['BBVI', 'M-H']:
             raise Exception("No latent variables estimated!")
         else:
-            lv_draws = self.draw_latent_variables(nsims=nsims)
-            mus = [self._model(lv_draws[:,i])[0] for i in range(nsims)]
-            model_scale, model_shape, model_skewness = self._get_scale_and_shape_sim(lv_draws)
-            data_draws = np.array([self.family.draw_variable(self.link(mus[i]), 
-                np.repeat(model_scale[i], mus[i].shape[0]), np.repeat(model_shape[i], mus[i].shape[0]), 
-                np.repeat(model_skewness[i], mus[i].shape[0]), mus[i].shape[0]) for i in range(nsims)])
             T_sims = T(self.sample(nsims=nsims), axis=1)
             T_actual = T(self.data)
             return len(T_sims[T_sims>T_actual])/nsims
@@ -1013,12 +1042,6 @@ class GAS(tsm.TSM):
 
             figsize = kwargs.get('figsize',(10,7))
 
-            lv_draws = self.draw_latent_variables(nsims=nsims)
-            mus = [self._model(lv_draws[:,i])[0] for i in range(nsims)]
-            model_scale, model_shape, model_skewness = self._get_scale_and_shape_sim(lv_draws)
-            data_draws = np.array([self.family.draw_variable(self.link(mus[i]), 
-                np.repeat(model_scale[i], mus[i].shape[0]), np.repeat(model_shape[i], mus[i].shape[0]), 
-                np.repeat(model_skewness[i], mus[i].shape[0]), mus[i].shape[0]) for i in range(nsims)])
             T_sim = T(self.sample(nsims=nsims), axis=1)
             T_actual = T(self.data)
 
@@ -10,6 +10,7 @@ import scipy.special as sp
 from .. import families as fam
 from .. import tsm as tsm
 from .. import data_check as dc
+from .. import forecasting as fc
 
 from .gas_core_recursions import gas_llev_recursion
 
@@ -190,7 +191,7 @@ class GASLLEV(tsm.TSM):
             Contains the scores for the time series
         """
 
-        parm = np.array([self.latent_variables.z_list[k].prior.transform(beta[k]) for k in range(beta.shape[0])])
+        parm = self.latent_variables.transform_all(beta)
         theta = np.zeros(self.model_Y.shape[0])
         model_scale, model_shape, model_skewness = self._get_scale_and_shape(parm)
 
@@ -227,7 +228,7 @@ class GASLLEV(tsm.TSM):
 
         Y = self.model_Y[sample]
 
-        parm = np.array([self.latent_variables.z_list[k].prior.transform(beta[k]) for k in range(beta.shape[0])])
+        parm = self.latent_variables.transform_all(beta)
         theta = np.zeros(Y.shape[0])
         model_scale, model_shape, model_skewness = self._get_scale_and_shape(parm)
 
@@ -256,7 +257,7 @@ class GASLLEV(tsm.TSM):
             Contains the scores for the time series
         """
 
-        parm = np.array([self.latent_variables.z_list[k].prior.transform(beta[k]) for k in range(beta.shape[0])])
+        parm = self.latent_variables.transform_all(beta)
         theta = np.zeros(self.model_Y.shape[0])
         model_scale, model_shape, model_skewness = self._get_scale_and_shape(parm)
 
@@ -291,7 +292,7 @@ class GASLLEV(tsm.TSM):
 
         Y = self.model_Y[sample]
 
-        parm = np.array([self.latent_variables.z_list[k].prior.transform(beta[k]) for k in range(beta.shape[0])])
+        parm = self.latent_variables.transform_all(beta)
         theta = np.zeros(Y.shape[0])
         model_scale, model_shape, model_skewness = self._get_scale_and_shape(parm)
 
@@ -450,7 +451,7 @@ class GASLLEV(tsm.TSM):
 
             t_z = self.draw_latent_variables(nsims=1).T[0]
             theta, Y, scores = self._model(t_z)
-            t_z = np.array([self.latent_variables.z_list[k].prior.transform(t_z[k]) for k in range(t_z.shape[0])])
+            t_z = self.latent_variables.transform_all(t_z)
 
             model_scale, model_shape, model_skewness = self._get_scale_and_shape(t_z)
 
@@ -529,7 +530,7 @@ class GASLLEV(tsm.TSM):
 
             sim_vector[n] = Y_exp[-h:]
 
-        return np.append(Y, np.array([np.mean(i) for i in np.transpose(sim_vector)]))
+        return np.append(Y, sim_vector.mean(axis=0))
 
     def _summarize_simulations(self, mean_values, sim_vector, date_index, h, past_values):
         """ Summarizes a simulation vector and a mean vector of predictions
@@ -554,9 +555,7 @@ class GASLLEV(tsm.TSM):
         intervals : Boolean
             Would you like to show prediction intervals for the forecast?
         """ 
-        error_bars = []
-        for pre in range(5,100,5):
-            error_bars.append(np.insert([np.percentile(i,pre) for i in sim_vector], 0, mean_values[-h-1]))
+        error_bars = fc.error_bars(sim_vector, mean_values[-h-1])
         forecasted_values = mean_values[-h-1:]
         plot_values = mean_values[-h-past_values:]
         plot_index = date_index[-h-past_values:]
@@ -571,7 +570,7 @@ class GASLLEV(tsm.TSM):
             Contains untransformed starting values for latent variables
         """
         theta, Y, _ = self._model(beta)
-        parm = np.array([self.latent_variables.z_list[k].prior.transform(beta[k]) for k in range(beta.shape[0])])
+        parm = self.latent_variables.transform_all(beta)
         model_scale, model_shape, model_skewness = self._get_scale_and_shape(parm)
         return self.family.neg_loglikelihood(Y,self.link(theta),model_scale,model_shape,model_skewness)
 
@@ -587,7 +586,7 @@ class GASLLEV(tsm.TSM):
             Size of each mini batch of data
         """
         theta, Y, _ = self._mb_model(beta, mini_batch)
-        parm = np.array([self.latent_variables.z_list[k].prior.transform(beta[k]) for k in range(beta.shape[0])])
+        parm = self.latent_variables.transform_all(beta)
         model_scale, model_shape, model_skewness = self._get_scale_and_shape(parm)
         return self.family.neg_loglikelihood(Y,self.link(theta),model_scale,model_shape,model_skewness)
 
@@ -668,12 +667,9 @@ class GASLLEV(tsm.TSM):
 
             if self.latent_variables.estimation_method in ['M-H']:
                 sim_vector = self._sim_prediction_bayes(h, 15000)
-                error_bars = []
+                error_bars = fc.error_bars(sim_vector, Y[-1])
 
-                for pre in range(5,100,5):
-                    error_bars.append(np.insert([np.percentile(i,pre) for i in sim_vector], 0, Y[-1]))
-
-                forecasted_values = np.insert([np.mean(i) for i in sim_vector], 0, Y[-1])
+                forecasted_values = np.insert(sim_vector.mean(axis=1), 0, Y[-1])
                 plot_values = np.append(Y[-1-past_values:-2], forecasted_values)
                 plot_index = date_index[-h-past_values:]
 
@@ -782,7 +778,7 @@ class GASLLEV(tsm.TSM):
         plt.legend(loc=2)   
         plt.show()          
 
-    def predict(self, h=5, intervals=False):
+    def predict(self, h=5, intervals=False, percentiles=None):
         """ Makes forecast with the estimated model
 
         Parameters
@@ -793,6 +789,9 @@ class GASLLEV(tsm.TSM):
         intervals : boolean (default: False)
             Whether to return prediction intervals
 
+        percentiles : list (default: [1, 5, 95, 99])
+            Percentiles of the prediction intervals, in percent (e.g. [0.5, 2.5] for VaR)
+
         Returns
         ----------
         - pd.DataFrame with predicted values
@@ -806,21 +805,13 @@ class GASLLEV(tsm.TSM):
             date_index = self.shift_dates(h)
 
             if self.latent_variables.estimation_method in ['M-H']:
-                sim_vector = self._sim_prediction_bayes(h, 15000)
+                sim_values = self._sim_prediction_bayes(h, 15000)
 
-                forecasted_values = np.array([np.mean(i) for i in sim_vector])
-                prediction_01 = np.array([np.percentile(i, 1) for i in sim_vector])
-                prediction_05 = np.array([np.percentile(i, 5) for i in sim_vector])
-                prediction_95 = np.array([np.percentile(i, 95) for i in sim_vector])
-                prediction_99 = np.array([np.percentile(i, 99) for i in sim_vector])
+                forecasted_values = sim_values.mean(axis=1)
 
             else:
                 t_z = self.transform_z()
                 mean_values = self._mean_prediction(theta, Y, scores, h, t_z)
-                if intervals is True:
-                    sim_values = self._sim_prediction(theta, Y, scores, h, t_z, 15000)
-                else:
-                    sim_values = self._sim_prediction(theta, Y, scores, h, t_z, 2)
 
                 if self.model_name2 == "Skewt":
                     model_scale, model_shape, model_skewness = self._get_scale_and_shape(t_z)
@@ -836,16 +827,8 @@ class GASLLEV(tsm.TSM):
                 # Get mean prediction and simulations (for errors)
                 if self.latent_variables.estimation_method not in ['M-H']:
                     sim_values = self._sim_prediction(theta, Y, scores, h, t_z, 15000)
-                    prediction_01 = np.array([np.percentile(i, 1) for i in sim_values])
-                    prediction_05 = np.array([np.percentile(i, 5) for i in sim_values])
-                    prediction_95 = np.array([np.percentile(i, 95) for i in sim_values])
-                    prediction_99 = np.array([np.percentile(i, 99) for i in sim_values])
-
-                result = pd.DataFrame([forecasted_values, prediction_01, prediction_05, 
-                    prediction_95, prediction_99]).T
-                result.rename(columns={0:self.data_name, 1: "1% Prediction Interval", 
-                    2: "5% Prediction Interval", 3: "95% Prediction Interval", 4: "99% Prediction Interval"}, 
-                    inplace=True)
+
+                result = fc.interval_frame(forecasted_values, sim_values, self.data_name, percentiles)
  
             result.index = date_index[-h:]
 
@@ -206,7 +206,7 @@ class GASRank(tsm.TSM):
             Contains the scores for the time series
         """
 
-        parm = np.array([self.latent_variables.z_list[k].prior.transform(beta[k]) for k in range(beta.shape[0])])
+        parm = self.latent_variables.transform_all(beta)
         scale, shape, skewness = self._get_scale_and_shape(parm)
         state_vectors = np.zeros(shape=(self.max_team+1))
         theta = np.zeros(shape=(self.data.shape[0]))
@@ -239,7 +239,7 @@ class GASRank(tsm.TSM):
             Contains the scores for the time series
         """
 
-        parm = np.array([self.latent_variables.z_list[k].prior.transform(beta[k]) for k in range(beta.shape[0])])
+        parm = self.latent_variables.transform_all(beta)
         scale, shape, skewness = self._get_scale_and_shape(parm)
         state_vectors_1 = np.zeros(shape=(self.max_team+1))
         state_vectors_2 = np.zeros(shape=(self.max_team_2+1))
@@ -275,7 +275,7 @@ class GASRank(tsm.TSM):
             Contains the scores for the time series
         """
 
-        parm = np.array([self.latent_variables.z_list[k].prior.transform(beta[k]) for k in range(beta.shape[0])])
+        parm = self.latent_variables.transform_all(beta)
         scale, shape, skewness = self._get_scale_and_shape(parm)
         state_vectors = np.zeros(shape=(self.max_team+1))
         state_vectors_store = np.zeros(shape=(int(np.max(self.home_count)+50),int(self.max_team+1)))
@@ -311,7 +311,7 @@ class GASRank(tsm.TSM):
             Contains the scores for the time series
         """
 
-        parm = np.array([self.latent_variables.z_list[k].prior.transform(beta[k]) for k in range(beta.shape[0])])
+        parm = self.latent_variables.transform_all(beta)
         scale, shape, skewness = self._get_scale_and_shape(parm)
         state_vectors = np.zeros(shape=(self.max_team+1))
         state_vectors_2 = np.zeros(shape=(self.max_team_2+1))
@@ -360,7 +360,7 @@ class GASRank(tsm.TSM):
 
     def neg_loglik(self, beta):
         theta, Y, _ = self._model(beta)
-        parm = np.array([self.latent_variables.z_list[k].prior.transform(beta[k]) for k in range(beta.shape[0])])
+        parm = self.latent_variables.transform_all(beta)
         model_scale, model_shape, model_skewness = self._get_scale_and_shape(parm)
         return self.family.neg_loglikelihood(Y,self.link(theta),model_scale,model_shape,model_skewness)
 
@@ -11,6 +11,7 @@ from patsy import dmatrices, dmatrix, demo_data
 from .. import families as fam
 from .. import tsm as tsm
 from .. import data_check as dc
+from .. import forecasting as fc
 
 from .gas_core_recursions import gas_reg_recursion
 
@@ -195,7 +196,7 @@ class GASReg(tsm.TSM):
             Contains the scores for the time series
         """
 
-        parm = np.array([self.latent_variables.z_list[k].prior.transform(beta[k]) for k in range(beta.shape[0])])
+        parm = self.latent_variables.transform_all(beta)
         coefficients = np.zeros((self.X.shape[1],self.model_Y.shape[0]+1))
         coefficients[:,0] = self.initial_values
         theta = np.zeros(self.model_Y.shape[0]+1)
@@ -236,7 +237,7 @@ class GASReg(tsm.TSM):
         X = self.X[sample, :]
         Y = data[self.max_lag:]
 
-        parm = np.array([self.latent_variables.z_list[k].prior.transform(beta[k]) for k in range(beta.shape[0])])
+        parm = self.latent_variables.transform_all(beta)
         coefficients = np.zeros((X.shape[1], Y.shape[0]+1))
         coefficients[:,0] = self.initial_values
         theta = np.zeros(Y.shape[0]+1)
@@ -267,7 +268,7 @@ class GASReg(tsm.TSM):
             Contains the scores for the time series
         """
 
-        parm = np.array([self.latent_variables.z_list[k].prior.transform(beta[k]) for k in range(beta.shape[0])])
+        parm = self.latent_variables.transform_all(beta)
         coefficients = np.zeros((self.X.shape[1],self.model_Y.shape[0]+1))
         coefficients[:,0] = self.initial_values
         theta = np.zeros(self.model_Y.shape[0]+1)
@@ -309,7 +310,7 @@ class GASReg(tsm.TSM):
         X = self.X[sample, :]
         Y = data[self.max_lag:]
 
-        parm = np.array([self.latent_variables.z_list[k].prior.transform(beta[k]) for k in range(beta.shape[0])])
+        parm = self.latent_variables.transform_all(beta)
         coefficients = np.zeros((X.shape[1], Y.shape[0]+1))
         coefficients[:,0] = self.initial_values
         theta = np.zeros(Y.shape[0]+1)
@@ -367,7 +368,7 @@ class GASReg(tsm.TSM):
             Contains untransformed starting values for latent variables
         """
         theta, Y, scores,_ = self._model(beta)
-        parm = np.array([self.latent_variables.z_list[k].prior.transform(beta[k]) for k in range(beta.shape[0])])
+        parm = self.latent_variables.transform_all(beta)
         model_scale, model_shape, model_skewness = self._get_scale_and_shape(parm)
         return self.family.neg_loglikelihood(Y,self.link(theta),model_scale,model_shape,model_skewness)
 
@@ -383,7 +384,7 @@ class GASReg(tsm.TSM):
             Size of each mini batch of data
         """
         theta, Y, scores,_ = self._mb_model(beta, mini_batch)
-        parm = np.array([self.latent_variables.z_list[k].prior.transform(beta[k]) for k in range(beta.shape[0])])
+        parm = self.latent_variables.transform_all(beta)
         model_scale, model_shape, model_skewness = self._get_scale_and_shape(parm)
         return self.family.neg_loglikelihood(Y,self.link(theta),model_scale,model_shape,model_skewness)
 
@@ -485,7 +486,7 @@ class GASReg(tsm.TSM):
                     _, Y, _, coefficients = self._model(t_z)
                     coefficients_star = coefficients.T[-1]
                     theta_pred = np.dot(np.array([coefficients_star]), X_pred.T)[0]
-                    t_z = np.array([self.latent_variables.z_list[k].prior.transform(t_z[k]) for k in range(t_z.shape[0])])
+                    t_z = self.latent_variables.transform_all(t_z)
                     model_scale, model_shape, model_skewness = self._get_scale_and_shape(t_z)
                     sim_vector[n,:] = self.family.draw_variable(self.link(theta_pred), model_scale, model_shape, model_skewness, theta_pred.shape[0])
                 mean_values = np.append(Y, self.link(np.array([np.mean(i) for i in sim_vector.T])))
@@ -508,9 +509,7 @@ class GASReg(tsm.TSM):
                     sim_vector[n,:] = self.family.draw_variable(self.link(theta_pred),model_scale,model_shape,model_skewness,theta_pred.shape[0])
 
             sim_vector = sim_vector.T
-            error_bars = []
-            for pre in range(5,100,5):
-                error_bars.append(np.insert([np.percentile(i,pre) for i in sim_vector], 0, mean_values[-h-1]))
+            error_bars = fc.error_bars(sim_vector, mean_values[-h-1])
             forecasted_values = mean_values[-h-1:]
             plot_values = mean_values[-h-past_values:]
             plot_index = date_index[-h-past_values:]
@@ -560,7 +559,7 @@ class GASReg(tsm.TSM):
         plt.legend(loc=2)   
         plt.show()          
 
-    def predict(self, h=5, oos_data=None, intervals=False, **kwargs):
+    def predict(self, h=5, oos_data=None, intervals=False, percentiles=None, **kwargs):
         """ Makes forecast with the estimated model
 
         Parameters
@@ -574,6 +573,9 @@ class GASReg(tsm.TSM):
         intervals : boolean (default: False)
             Whether to return prediction intervals
 
+        percentiles : list (default: [1, 5, 95, 99])
+            Percentiles of the prediction intervals, in percent (e.g. [0.5, 2.5] for VaR)
+
         Returns
         ----------
         - pd.DataFrame with predicted values
@@ -597,17 +599,12 @@ class GASReg(tsm.TSM):
                     _, Y, _, coefficients = self._model(t_z)
                     coefficients_star = coefficients.T[-1]
                     theta_pred = np.dot(np.array([coefficients_star]), X_pred.T)[0]
-                    t_z = np.array([self.latent_variables.z_list[k].prior.transform(t_z[k]) for k in range(t_z.shape[0])])
+                    t_z = self.latent_variables.transform_all(t_z)
                     model_scale, model_shape, model_skewness = self._get_scale_and_shape(t_z)
                     sim_vector[n,:] = self.family.draw_variable(self.link(theta_pred), model_scale, model_shape, model_skewness, theta_pred.shape[0])
 
-                sim_vector = sim_vector.T
-
-                forecasted_values = np.array([np.mean(i) for i in sim_vector])
-                prediction_01 = np.array([np.percentile(i, 1) for i in sim_vector])
-                prediction_05 = np.array([np.percentile(i, 5) for i in sim_vector])
-                prediction_95 = np.array([np.percentile(i, 95) for i in sim_vector])
-                prediction_99 = np.array([np.percentile(i, 99) for i in sim_vector])
+                sim_values = sim_vector.T
+                forecasted_values = sim_values.mean(axis=1)
 
             else:
 
@@ -639,16 +636,7 @@ class GASReg(tsm.TSM):
 
                     sim_values = sim_values.T
 
-                    prediction_01 = np.array([np.percentile(i, 1) for i in sim_values])
-                    prediction_05 = np.array([np.percentile(i, 5) for i in sim_values])
-                    prediction_95 = np.array([np.percentile(i, 95) for i in sim_values])
-                    prediction_99 = np.array([np.percentile(i, 99) for i in sim_values])
-
-                result = pd.DataFrame([forecasted_values, prediction_01, prediction_05, 
-                    prediction_95, prediction_99]).T
-                result.rename(columns={0:self.data_name, 1: "1% Prediction Interval", 
-                    2: "5% Prediction Interval", 3: "95% Prediction Interval", 4: "99% Prediction Interval"}, 
-                    inplace=True)
+                result = fc.interval_frame(forecasted_values, sim_values, self.data_name, percentiles)
  
             result.index = date_index[-h:]
 
@@ -48,6 +48,15 @@ def test_laplace_couple_terms_integ():
 	lvs = np.array([i.value for i in model.latent_variables.z_list])
 	assert(len(lvs[np.isnan(lvs)]) == 0)
 
+def test_laplace_neg_loglik_batch():
+	"""
+	Tests that the batched negative loglikelihood agrees with evaluating
+	each latent variable vector in turn
+	"""
+	model = pf.GAS(data=data, ar=1, sc=1, family=pf.Laplace(gradient_only=True))
+	Z = model.latent_variables.get_z_starting_values() + np.random.normal(0, 0.1, (5, model.z_no))
+	assert(np.allclose(model.neg_loglik_batch(Z), [model.neg_loglik(z) for z in Z]))
+
 def test_laplace_bbvi():
 	"""
 	Tests an GAS model estimated with BBVI and that the length of the latent variable
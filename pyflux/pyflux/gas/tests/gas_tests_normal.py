@@ -47,6 +47,15 @@ def test_couple_terms_integ():
 	lvs = np.array([i.value for i in model.latent_variables.z_list])
 	assert(len(lvs[np.isnan(lvs)]) == 0)
 
+def test_neg_loglik_batch():
+	"""
+	Tests that the batched negative loglikelihood agrees with evaluating
+	each latent variable vector in turn
+	"""
+	model = pf.GAS(data=data, ar=1, sc=1, family=pf.Normal())
+	Z = model.latent_variables.get_z_starting_values() + np.random.normal(0, 0.1, (5, model.z_no))
+	assert(np.allclose(model.neg_loglik_batch(Z), [model.neg_loglik(z) for z in Z]))
+
 def test_bbvi():
 	"""
 	Tests an GAS model estimated with BBVI and that the length of the latent variable
@@ -186,6 +195,17 @@ def test_predict_intervals():
     assert(np.all(predictions[model.data_name].values > predictions['5% Prediction Interval'].values))
     assert(np.all(predictions['5% Prediction Interval'].values > predictions['1% Prediction Interval'].values))
 
+def test_predict_custom_percentiles():
+    """
+    Tests that custom percentiles give one ordered prediction interval column each
+    """
+    model = pf.GAS(data=data, ar=1, sc=1, family=pf.Normal())
+    x = model.fit()
+    predictions = model.predict(h=10, intervals=True, percentiles=[0.5, 2.5])
+
+    assert(list(predictions.columns) == [model.data_name, '0.5% Prediction Interval', '2.5% Prediction Interval'])
+    assert(np.all(predictions['2.5% Prediction Interval'].values > predictions['0.5% Prediction Interval'].values))
+
 def test_predict_is_intervals():
     """
     Tests prediction intervals are ordered correctly
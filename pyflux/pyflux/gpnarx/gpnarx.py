@@ -120,7 +120,7 @@ class GPNARX(tsm.TSM):
         """             
 
         # Refactor this entire code in future
-        parm = np.array([self.latent_variables.z_list[k].prior.transform(beta[k]) for k in range(beta.shape[0])])
+        parm = self.latent_variables.transform_all(beta)
         Xstart = self.X().copy()
         Xstart = [i for i in Xstart]
         predictions = np.zeros(h)
@@ -219,7 +219,7 @@ class GPNARX(tsm.TSM):
         The expected values of the function
         """     
 
-        parm = np.array([self.latent_variables.z_list[k].prior.transform(beta[k]) for k in range(beta.shape[0])])
+        parm = self.latent_variables.transform_all(beta)
         L = self._L(parm)
         alpha = self._alpha(L)
         return np.dot(np.transpose(self.kernel.K(parm)), alpha)
@@ -236,7 +236,7 @@ class GPNARX(tsm.TSM):
         ----------
         Covariance matrix for the estimated function 
         """     
-        parm = np.array([self.latent_variables.z_list[k].prior.transform(beta[k]) for k in range(beta.shape[0])])
+        parm = self.latent_variables.transform_all(beta)
         L = self._L(parm)
         v = la.cho_solve((L, True), self.kernel.K(parm))
         return self.kernel.K(parm) - np.dot(v.T, v)
@@ -253,7 +253,7 @@ class GPNARX(tsm.TSM):
         ----------
         The negative log marginal logliklihood of the model
         """             
-        parm = np.array([self.latent_variables.z_list[k].prior.transform(beta[k]) for k in range(beta.shape[0])])
+        parm = self.latent_variables.transform_all(beta)
         L = self._L(parm)
         return -(-0.5*(np.dot(np.transpose(self.data),self._alpha(L))) - np.log(np.diag(L)).sum() - (self.data.shape[0]/2.0)*np.log(2.0*np.pi))
 
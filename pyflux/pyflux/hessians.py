@@ -0,0 +1,177 @@
+import sys
+if sys.version_info < (3,):
+    range = xrange
+
+import numpy as np
+import numdifftools as nd
+
+HESSIAN_METHODS = ['auto', 'analytic', 'gradient', 'opg', 'central', 'numdifftools']
+
+def _steps(x, order):
+    """ Relative finite difference steps, eps**(1/order) scaled by the size of x """
+    return np.power(np.finfo(float).eps, 1.0/order)*np.maximum(np.abs(x), 1.0)
+
+def central_difference_hessian(f, x):
+    """ Hessian of a scalar function by central differences of function values
+
+    Uses a fixed budget of 1 + 2k^2 function calls for k latent variables.
+
+    Parameters
+    ----------
+    f : function
+        Scalar function of the latent variables
+
+    x : np.array
+        Point at which to evaluate the Hessian
+
+    Returns
+    ----------
+    (k, k) np.array
+    """
+
+    x = np.asarray(x, dtype=np.float64)
+    k = x.shape[0]
+    h = _steps(x, 4)
+    E = np.diag(h)
+    H = np.zeros((k, k))
+    f0 = f(x)
+
+    for i in range(k):
+        H[i,i] = (f(x+E[i]) - 2.0*f0 + f(x-E[i]))/(h[i]*h[i])
+        for j in range(i):
+            H[i,j] = (f(x+E[i]+E[j]) - f(x+E[i]-E[j]) - f(x-E[i]+E[j]) + f(x-E[i]-E[j]))/(4.0*h[i]*h[j])
+            H[j,i] = H[i,j]
+
+    return H
+
+def gradient_difference_hessian(gradient, x):
+    """ Hessian from central differences of an analytic gradient
+
+    Uses a fixed budget of 2k gradient calls for k latent variables.
+
+    Parameters
+    ----------
+    gradient : function
+        Gradient of the objective with respect to the latent variables
+
+    x : np.array
+        Point at which to evaluate the Hessian
+
+    Returns
+    ----------
+    (k, k) np.array
+    """
+
+    x = np.asarray(x, dtype=np.float64)
+    k = x.shape[0]
+    h = _steps(x, 3)
+    E = np.diag(h)
+    H = np.zeros((k, k))
+
+    for i in range(k):
+        H[:,i] = (gradient(x+E[i]) - gradient(x-E[i]))/(2.0*h[i])
+
+    return 0.5*(H + H.T)
+
+def outer_product_hessian(contributions, x):
+    """ Outer-product-of-gradients (BHHH) approximation to the Hessian
+
+    Parameters
+    ----------
+    contributions : function
+        Returns the (T, k) per-observation gradients of the objective
+
+    x : np.array
+        Point at which to evaluate the Hessian
+
+    Returns
+    ----------
+    (k, k) np.array
+    """
+
+    G = contributions(np.asarray(x, dtype=np.float64))
+    return np.dot(G.T, G)
+
+def resolve_hessian(model, obj_type, hessian='auto'):
+    """ Checks a Hessian request against what the model supplies
+
+    Parameters
+    ----------
+    model : TSM
+        The model whose objective is being differentiated
+
+    obj_type : method
+        Whether a likelihood or a posterior
+
+    hessian : str or None
+        (default: 'auto') One of 'auto', 'analytic', 'gradient', 'opg', 'central' or
+        'numdifftools'. 'auto' uses the model's analytic Hessian if it supplies one,
+        then differences of its analytic gradient, then central differences of the
+        objective. If None or False, no Hessian is computed.
+
+    Returns
+    ----------
+    The concrete Hessian method, or None if the Hessian is skipped
+    """
+
+    if hessian is None or hessian is False:
+        return None
+    elif hessian not in HESSIAN_METHODS:
+        raise ValueError("Hessian method not recognized!")
+
+    is_likelihood = obj_type == model.neg_loglik
+    has_analytic = is_likelihood and hasattr(model, 'neg_loglik_hessian')
+    has_gradient = model._objective_gradient(obj_type) is not None
+
+    if hessian == 'auto':
+        if has_analytic:
+            return 'analytic'
+        elif has_gradient:
+            return 'gradient'
+        else:
+            return 'central'
+    elif hessian == 'analytic' and not has_analytic:
+        raise ValueError("No analytic Hessian available for this model and objective!")
+    elif hessian == 'gradient' and not has_gradient:
+        raise ValueError("No analytic gradient available for this model and objective!")
+    elif hessian == 'opg' and not (is_likelihood and hasattr(model, 'neg_loglik_gradient_contributions')):
+        raise ValueError("Outer-product-of-gradients Hessian requires per-observation likelihood gradients!")
+
+    return hessian
+
+def find_hessian(model, obj_type, x, hessian='auto'):
+    """ Evaluates the Hessian of a model objective with the requested provider
+
+    Parameters
+    ----------
+    model : TSM
+        The model whose objective is being differentiated
+
+    obj_type : method
+        Whether a likelihood or a posterior
+
+    x : np.array
+        Point at which to evaluate the Hessian (usually the optimum)
+
+    hessian : str or None
+        (default: 'auto') A Hessian method accepted by resolve_hessian
+
+    Returns
+    ----------
+    (k, k) np.array, or None if the Hessian is skipped
+    """
+
+    hessian = resolve_hessian(model, obj_type, hessian)
+
+    if hessian is None:
+        return None
+    elif hessian == 'analytic':
+        return model.neg_loglik_hessian(x)
+    elif hessian == 'gradient':
+        return gradient_difference_hessian(model._objective_gradient(obj_type), x)
+    elif hessian == 'opg':
+        return outer_product_hessian(model.neg_loglik_gradient_contributions, x)
+    elif hessian == 'central':
+        return central_difference_hessian(obj_type, x)
+    else:
+        return nd.Hessian(obj_type)(x)
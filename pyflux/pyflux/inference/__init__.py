@@ -1,3 +1,3 @@
-from .metropolis_hastings import MetropolisHastings
+from .metropolis_hastings import MetropolisHastings, split_rhat, effective_sample_size
 from .norm_post_sim import norm_post_sim
-from .bbvi import BBVI, CBBVI, BBVIM
+from .bbvi import BBVI, CBBVI, BBVIM, BBVIR
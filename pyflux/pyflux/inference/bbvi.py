@@ -32,25 +32,42 @@ class BBVI(object):
         How many iterations to run
 
     record_elbo : boolean
-        Whether to record the ELBO at every iteration
+        Whether to record the ELBO
 
     quiet_progress : boolean
         Whether to print progress or stay quiet
+
+    neg_posterior_batch : function
+        (optional) posterior function taking an (S, k) array of draws and returning S values
+
+    elbo_every : int
+        (default: 1) If recording the ELBO, record it every elbo_every iterations
     """
 
     def __init__(self, neg_posterior, q, sims, optimizer='RMSProp', iterations=1000, learning_rate=0.001, record_elbo=False,
-        quiet_progress=False):
+        quiet_progress=False, neg_posterior_batch=None, elbo_every=1):
         self.neg_posterior = neg_posterior
+        self.neg_posterior_batch = neg_posterior_batch
         self.q = q
         self.sims = sims
         self.iterations = iterations
         self.approx_param_no = np.array([i.param_no for i in self.q])
+        self.batched_scores = self.scores_are_batched(self.q)
         self.optimizer = optimizer
         self.printer = True
         self.learning_rate = learning_rate
         self.record_elbo = record_elbo
+        self.elbo_every = elbo_every
         self.quiet_progress = quiet_progress
 
+    @staticmethod
+    def scores_are_batched(q):
+        """
+        Whether the scores of every approximating distribution can be computed in one batch
+        (all of them are of the same family, which provides vi_scores)
+        """
+        return hasattr(q[0], 'vi_scores') and all(type(i) is type(q[0]) for i in q)
+
     def change_parameters(self,params):
         """
         Utility function for changing the approximate distribution parameters
@@ -139,11 +156,8 @@ class BBVI(object):
         """
         Gets the mean and scales for normal approximating parameters
         """
-        means = np.zeros(len(self.q))
-        scale = np.zeros(len(self.q))
-        for i in range(len(self.q)):
-            means[i] = self.q[i].mu0
-            scale[i] = self.q[i].sigma0 
+        means = np.array([q.mu0 for q in self.q], dtype=np.float64)
+        scale = np.array([q.sigma0 for q in self.q], dtype=np.float64)
         return means, scale
 
     def get_means_and_scales(self):
@@ -156,6 +170,10 @@ class BBVI(object):
         """
         The gradients of the approximating distributions
         """        
+        if self.batched_scores:
+            means, scale = self.get_means_and_scales_from_q()
+            return self.q[0].vi_scores(z, means, scale)
+
         param_count = 0
         grad = np.zeros((np.sum(self.approx_param_no),self.sims))
         for core_param in range(len(self.q)):
@@ -168,6 +186,8 @@ class BBVI(object):
         """
         The unnormalized log posterior components (the quantity we want to approximate)
         """
+        if self.neg_posterior_batch is not None:
+            return -self.neg_posterior_batch(z)
         return log_p_posterior(z, self.neg_posterior)
 
     def normal_log_q(self,z):
@@ -213,7 +233,7 @@ class BBVI(object):
         gradient[np.isnan(gradient)] = 0
         variance = np.power(gradient, 2)       
         final_parameters = self.current_parameters()
-        final_samples = 1
+        final_samples = 0
 
         # Create optimizer
         if self.optimizer == 'ADAM':
@@ -223,7 +243,7 @@ class BBVI(object):
 
         # Record elbo
         if self.record_elbo is True:
-            elbo_records = np.zeros(self.iterations)
+            elbo_records = np.zeros(len(range(0, self.iterations, self.elbo_every)))
         else:
             elbo_records = None
 
@@ -236,18 +256,17 @@ class BBVI(object):
             if self.printer is True:
                 self.print_progress(i, self.optim.parameters[::2])
 
-            # Construct final parameters using final 10% of samples
-            if i > self.iterations-round(self.iterations/10):
+            # Construct final parameters as a running mean over the final 10% of iterations
+            if i >= self.iterations-max(round(self.iterations/10), 1):
                 final_samples += 1
-                final_parameters = final_parameters+self.optim.parameters
+                final_parameters += (self.optim.parameters-final_parameters)/final_samples
 
-            if self.record_elbo is True:
-                elbo_records[i] = self.get_elbo(self.optim.parameters[::2])
+            if self.record_elbo is True and i % self.elbo_every == 0:
+                elbo_records[i//self.elbo_every] = self.get_elbo(self.optim.parameters[::2])
 
-        final_parameters = final_parameters/float(final_samples)
         self.change_parameters(final_parameters)
-        final_means = np.array([final_parameters[el] for el in range(len(final_parameters)) if el%2==0])
-        final_ses = np.array([final_parameters[el] for el in range(len(final_parameters)) if el%2!=0])
+        final_means = final_parameters[::2]
+        final_ses = final_parameters[1::2]
         if not self.quiet_progress:
             print("")
             print("Final model ELBO is " + str(-self.neg_posterior(final_means)-self.create_normal_logq(final_means)))
@@ -264,7 +283,7 @@ class BBVI(object):
         gradient[np.isnan(gradient)] = 0
         variance = np.power(gradient,2)       
         final_parameters = self.current_parameters()
-        final_samples = 1
+        final_samples = 0
 
         # Create optimizer
         if self.optimizer == 'ADAM':
@@ -278,7 +297,7 @@ class BBVI(object):
 
         # Record elbo
         if self.record_elbo is True:
-            elbo_records = np.zeros(self.iterations)
+            elbo_records = np.zeros(len(range(0, self.iterations, self.elbo_every)))
         else:
             elbo_records = None
 
@@ -294,18 +313,17 @@ class BBVI(object):
             if self.printer is True:
                 self.print_progress(i,self.optim.parameters[::2])
 
-            # Construct final parameters using final 10% of samples
-            if i > self.iterations-round(self.iterations/10):
+            # Construct final parameters as a running mean over the final 10% of iterations
+            if i >= self.iterations-max(round(self.iterations/10), 1):
                 final_samples += 1
-                final_parameters = final_parameters+self.optim.parameters
+                final_parameters += (self.optim.parameters-final_parameters)/final_samples
 
-            if self.record_elbo is True:
-                elbo_records[i] = self.get_elbo(self.optim.parameters[::2])
+            if self.record_elbo is True and i % self.elbo_every == 0:
+                elbo_records[i//self.elbo_every] = self.get_elbo(self.optim.parameters[::2])
 
-        final_parameters = final_parameters/float(final_samples)
         self.change_parameters(final_parameters)
-        final_means = np.array([final_parameters[el] for el in range(len(final_parameters)) if el%2==0])
-        final_ses = np.array([final_parameters[el] for el in range(len(final_parameters)) if el%2!=0])
+        final_means = final_parameters[::2]
+        final_ses = final_parameters[1::2]
 
         if not self.quiet_progress:
             print("")
@@ -315,8 +333,9 @@ class BBVI(object):
 class CBBVI(BBVI):
 
     def __init__(self, neg_posterior, log_p_blanket, q, sims, optimizer='RMSProp',iterations=300000, 
-        learning_rate=0.001, record_elbo=False, quiet_progress=False):
-        super(CBBVI, self).__init__(neg_posterior, q, sims, optimizer, iterations, learning_rate, record_elbo, quiet_progress)
+        learning_rate=0.001, record_elbo=False, quiet_progress=False, elbo_every=1):
+        super(CBBVI, self).__init__(neg_posterior, q, sims, optimizer, iterations, learning_rate, record_elbo, quiet_progress,
+            elbo_every=elbo_every)
         self.log_p_blanket = log_p_blanket
 
     def log_p(self,z):
@@ -377,6 +396,99 @@ class CBBVI(BBVI):
         return np.mean(vectorized,axis=1)
 
 
+class BBVIR(BBVI):
+    """
+    Black Box Variational Inference - reparameterization gradients
+
+    Draws z = mu + sigma*epsilon from the mean-field normal family and differentiates the ELBO
+    through the draws, using the gradient of the posterior. The estimator has far lower variance
+    than the score function estimator, so fewer samples and iterations are needed.
+
+    Parameters
+    ----------
+    neg_posterior : function
+        posterior function
+
+    neg_posterior_gradient : function
+        gradient of the posterior function
+
+    q : List
+        list holding distribution objects
+
+    sims : int
+        Number of Monte Carlo sims for the gradient
+
+    step : float
+        Step size for RMSProp
+
+    iterations: int
+        How many iterations to run
+
+    record_elbo : boolean
+        Whether to record the ELBO
+
+    quiet_progress : boolean
+        Whether to print progress or stay quiet
+
+    neg_posterior_gradient_batch : function
+        (optional) gradient function taking an (S, k) array of draws and returning (S, k) gradients
+
+    elbo_every : int
+        (default: 1) If recording the ELBO, record it every elbo_every iterations
+    """
+
+    def __init__(self, neg_posterior, neg_posterior_gradient, q, sims, optimizer='RMSProp', iterations=1000, 
+        learning_rate=0.001, record_elbo=False, quiet_progress=False, neg_posterior_gradient_batch=None, elbo_every=1):
+        super(BBVIR, self).__init__(neg_posterior, q, sims, optimizer, iterations, learning_rate, record_elbo, quiet_progress,
+            elbo_every=elbo_every)
+        self.neg_posterior_gradient = neg_posterior_gradient
+        self.neg_posterior_gradient_batch = neg_posterior_gradient_batch
+
+    def reparameterization_gradient(self, z, means, scale):
+        """
+        The reparameterization gradient of the ELBO with respect to the means and log scales
+
+        Parameters
+        ----------
+        z : np.array
+            (k, sims) draws from the approximating distributions
+
+        means : np.array
+            Means of the approximating distributions
+
+        scale : np.array
+            Scales of the approximating distributions
+
+        Returns
+        ----------
+        np.array of the gradient, alternating between the mean and log scale of each latent variable
+        """
+        epsilon = (z.T - means)/scale
+        if self.neg_posterior_gradient_batch is not None:
+            grad_log_p = -self.neg_posterior_gradient_batch(z.T)
+        else:
+            grad_log_p = -np.array([self.neg_posterior_gradient(draw) for draw in z.T])
+
+        gradient = np.empty(2*means.shape[0])
+        gradient[0::2] = np.mean(grad_log_p, axis=0)
+        gradient[1::2] = np.mean(grad_log_p*epsilon, axis=0)*scale + 1.0 # The entropy adds 1 per log scale
+        return gradient
+
+    def cv_gradient(self, z):
+        """
+        The reparameterization gradient at the current parameters (no control variate is needed)
+        """
+        means, scale = self.get_means_and_scales()
+        return self.reparameterization_gradient(z, means, scale)
+
+    def cv_gradient_initial(self, z):
+        """
+        The reparameterization gradient at the starting parameters (no control variate is needed)
+        """
+        means, scale = self.get_means_and_scales_from_q()
+        return self.reparameterization_gradient(z, means, scale)
+
+
 class BBVIM(BBVI):
     """
     Black Box Variational Inference - minibatch
@@ -409,21 +521,26 @@ class BBVIM(BBVI):
 
     quiet_progress : boolean
         Whether to print progress or stay quiet
+
+    elbo_every : int
+        (default: 1) If recording the ELBO, record it every elbo_every iterations
     """
 
     def __init__(self, neg_posterior, full_neg_posterior, q, sims, optimizer='RMSProp', 
-        iterations=1000, learning_rate=0.001, mini_batch=2, record_elbo=False, quiet_progress=False):
+        iterations=1000, learning_rate=0.001, mini_batch=2, record_elbo=False, quiet_progress=False, elbo_every=1):
         self.neg_posterior = neg_posterior
         self.full_neg_posterior = full_neg_posterior
         self.q = q
         self.sims = sims
         self.iterations = iterations
         self.approx_param_no = np.array([i.param_no for i in self.q])
+        self.batched_scores = self.scores_are_batched(self.q)
         self.optimizer = optimizer
         self.printer = True
         self.learning_rate = learning_rate
         self.mini_batch = mini_batch
         self.record_elbo = record_elbo
+        self.elbo_every = elbo_every
         self.quiet_progress = quiet_progress
 
     def log_p(self,z):
@@ -461,7 +578,7 @@ class BBVIM(BBVI):
         gradient[np.isnan(gradient)] = 0
         variance = np.power(gradient, 2)       
         final_parameters = self.current_parameters()
-        final_samples = 1
+        final_samples = 0
 
         # Create optimizer
         if self.optimizer == 'ADAM':
@@ -471,7 +588,7 @@ class BBVIM(BBVI):
 
         # Record elbo
         if self.record_elbo is True:
-            elbo_records = np.zeros(self.iterations)
+            elbo_records = np.zeros(len(range(0, self.iterations, self.elbo_every)))
         else:
             elbo_records = None
 
@@ -484,18 +601,17 @@ class BBVIM(BBVI):
             if self.printer is True:
                 self.print_progress(i, self.optim.parameters[::2])
 
-            # Construct final parameters using final 10% of samples
-            if i > self.iterations-round(self.iterations/10):
+            # Construct final parameters as a running mean over the final 10% of iterations
+            if i >= self.iterations-max(round(self.iterations/10), 1):
                 final_samples += 1
-                final_parameters = final_parameters+self.optim.parameters
+                final_parameters += (self.optim.parameters-final_parameters)/final_samples
 
-            if self.record_elbo is True:
-                elbo_records[i] = self.get_elbo(self.optim.parameters[::2])
+            if self.record_elbo is True and i % self.elbo_every == 0:
+                elbo_records[i//self.elbo_every] = self.get_elbo(self.optim.parameters[::2])
 
-        final_parameters = final_parameters/float(final_samples)
         self.change_parameters(final_parameters)
-        final_means = np.array([final_parameters[el] for el in range(len(final_parameters)) if el%2==0])
-        final_ses = np.array([final_parameters[el] for el in range(len(final_parameters)) if el%2!=0])
+        final_means = final_parameters[::2]
+        final_ses = final_parameters[1::2]
         if not self.quiet_progress:
             print("")
             print("Final model ELBO is " + str(-self.full_neg_posterior(final_means)-self.create_normal_logq(final_means)))
@@ -512,7 +628,7 @@ class BBVIM(BBVI):
         gradient[np.isnan(gradient)] = 0
         variance = np.power(gradient,2)       
         final_parameters = self.current_parameters()
-        final_samples = 1
+        final_samples = 0
 
         # Create optimizer
         if self.optimizer == 'ADAM':
@@ -526,7 +642,7 @@ class BBVIM(BBVI):
 
         # Record elbo
         if self.record_elbo is True:
-            elbo_records = np.zeros(self.iterations)
+            elbo_records = np.zeros(len(range(0, self.iterations, self.elbo_every)))
         else:
             elbo_records = None
 
@@ -542,18 +658,17 @@ class BBVIM(BBVI):
             if self.printer is True:
                 self.print_progress(i,self.optim.parameters[::2])
 
-            # Construct final parameters using final 10% of samples
-            if i > self.iterations-round(self.iterations/10):
+            # Construct final parameters as a running mean over the final 10% of iterations
+            if i >= self.iterations-max(round(self.iterations/10), 1):
                 final_samples += 1
-                final_parameters = final_parameters+self.optim.parameters
+                final_parameters += (self.optim.parameters-final_parameters)/final_samples
 
-            if self.record_elbo is True:
-                elbo_records[i] = self.get_elbo(self.optim.parameters[::2])
+            if self.record_elbo is True and i % self.elbo_every == 0:
+                elbo_records[i//self.elbo_every] = self.get_elbo(self.optim.parameters[::2])
 
-        final_parameters = final_parameters/float(final_samples)
         self.change_parameters(final_parameters)
-        final_means = np.array([final_parameters[el] for el in range(len(final_parameters)) if el%2==0])
-        final_ses = np.array([final_parameters[el] for el in range(len(final_parameters)) if el%2!=0])
+        final_means = final_parameters[::2]
+        final_ses = final_parameters[1::2]
 
         if not self.quiet_progress:
             print("")
@@ -5,14 +5,29 @@ cimport cython
 @cython.boundscheck(False)
 @cython.wraparound(False)
 @cython.cdivision(True)
-def alpha_recursion(double[:] alpha0, np.ndarray[double,ndim=2] grad_log_q, np.ndarray[double,ndim=2] gradient, int param_no):
+def alpha_recursion(double[:] alpha0, double[:, :] grad_log_q, double[:, :] gradient, int param_no):
+    """ Control variate coefficients: the covariance of each row of grad_log_q with the same
+    row of gradient, for all rows in one pass over the samples """
 
-    cdef Py_ssize_t lambda_i
+    cdef Py_ssize_t lambda_i, j
+    cdef Py_ssize_t sims = grad_log_q.shape[1]
+    cdef double mean_q, mean_g, cross
 
     for lambda_i in range(param_no):
-         alpha0[lambda_i] = np.cov(grad_log_q[lambda_i],gradient[lambda_i])[0][1]  
-
-    return alpha0
+        mean_q = 0.0
+        mean_g = 0.0
+        for j in range(sims):
+            mean_q += grad_log_q[lambda_i, j]
+            mean_g += gradient[lambda_i, j]
+        mean_q /= sims
+        mean_g /= sims
+
+        cross = 0.0
+        for j in range(sims):
+            cross += (grad_log_q[lambda_i, j] - mean_q)*(gradient[lambda_i, j] - mean_g)
+        alpha0[lambda_i] = cross/(sims - 1)
+
+    return np.asarray(alpha0)
 
 @cython.boundscheck(False)
 @cython.wraparound(False)
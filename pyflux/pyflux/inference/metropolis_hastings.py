@@ -1,12 +1,138 @@
-import numpy as np
+import multiprocessing as mp
 import sys
 if sys.version_info < (3,):
     range = xrange
 
-from scipy.stats import multivariate_normal
+import numpy as np
 
 from .metropolis_sampler import metropolis_sampler
 
+# How many random walk proposals are drawn at a time
+CHUNK_SIZE = 10000
+
+def split_chains(chains):
+    """ Splits every chain into its first and second half
+
+    Parameters
+    ----------
+    chains : np.array
+        (chains, draws, parameters) array of samples
+
+    Returns
+    ----------
+    (2*chains, draws//2, parameters) np.array
+    """
+    half = chains.shape[1]//2
+    return np.concatenate([chains[:, :half], chains[:, chains.shape[1]-half:]], axis=0)
+
+def split_rhat(chains):
+    """ Split R-hat (potential scale reduction) of the chains of each parameter
+
+    Parameters
+    ----------
+    chains : np.array
+        (chains, draws, parameters) array of samples
+
+    Returns
+    ----------
+    np.array of R-hat values, one per parameter
+    """
+    split = split_chains(chains)
+    n = split.shape[1]
+    within = np.mean(np.var(split, axis=1, ddof=1), axis=0)
+    between = np.var(np.mean(split, axis=1), axis=0, ddof=1)
+    var_plus = (n-1.0)/n*within + between
+    return np.sqrt(var_plus/within)
+
+def effective_sample_size(chains):
+    """ Effective sample size of the chains of each parameter
+
+    Autocorrelations are combined across split chains and summed over
+    Geyer's initial positive sequence.
+
+    Parameters
+    ----------
+    chains : np.array
+        (chains, draws, parameters) array of samples
+
+    Returns
+    ----------
+    np.array of effective sample sizes, one per parameter
+    """
+    ess = np.zeros(chains.shape[2])
+
+    # One parameter at a time, so the FFT buffers stay the size of a single parameter's draws
+    for k in range(chains.shape[2]):
+        split = split_chains(chains[:, :, k:k+1])[:, :, 0]
+        m, n = split.shape
+
+        # Autocovariances of every chain at once through the FFT
+        centered = split - np.mean(split, axis=1, keepdims=True)
+        freq = np.fft.rfft(centered, n=2*n, axis=1)
+        acov = np.fft.irfft(freq*np.conjugate(freq), axis=1)[:, :n]/n
+
+        within = np.mean(acov[:, 0]*n/(n-1.0))
+        var_plus = (n-1.0)/n*within + np.var(np.mean(split, axis=1), ddof=1)
+        rho = 1.0 - (within - np.mean(acov, axis=0))/var_plus
+
+        # Sum autocorrelation pairs until the first non-positive pair
+        pairs = rho[:2*(n//2):2] + rho[1:2*(n//2):2]
+        tau = -1.0 + 2.0*np.sum(pairs*np.cumprod(pairs > 0))
+
+        # Cap antithetic chains at m*n*log10(m*n) draws
+        ess[k] = m*n/max(tau, 1.0/np.log10(m*n))
+
+    return ess
+
+def update_moments(count, mean, scatter, draws):
+    """ Recursively updates a running mean and scatter matrix with a block of draws
+
+    Parameters
+    ----------
+    count : int
+        How many draws the running moments summarize
+
+    mean : np.array
+        Running mean of the draws
+
+    scatter : np.array
+        Running sum of outer products of deviations from the mean (count-1 times the covariance)
+
+    draws : np.array
+        (draws, parameters) block of new draws
+
+    Returns
+    ----------
+    count, mean, scatter : the moments of all draws so far
+    """
+    block_count = draws.shape[0]
+    block_mean = np.mean(draws, axis=0)
+    deviations = draws - block_mean
+    delta = block_mean - mean
+    total = count + block_count
+    mean = mean + delta*block_count/total
+    scatter = scatter + np.dot(deviations.T, deviations) + np.outer(delta, delta)*count*block_count/total
+    return total, mean, scatter
+
+def _run_chain(task):
+    """ Runs one Metropolis-Hastings chain from its own random seed (for use in a process pool)
+
+    Returns the kept draws, or the rows they occupy if the chain is stored on disk
+    """
+    seed, posterior, scale, nsims, initials, cov_matrix, thinning, warm_up_period, adaptive, target_ess, \
+        chain_file, chain_offset = task
+    np.random.seed(seed)
+    sampler = MetropolisHastings(posterior, scale, nsims, initials, cov_matrix=cov_matrix,
+        thinning=thinning, warm_up_period=warm_up_period, quiet_progress=True,
+        adaptive=adaptive, target_ess=target_ess, chain_file=chain_file, chain_offset=chain_offset)
+    sampler.sample()
+
+    if chain_file is None:
+        return sampler.phi
+    else:
+        sampler.phi.flush()
+        return sampler.kept_rows
+
 class MetropolisHastings(object):
     """ RANDOM-WALK METROPOLIS-HASTINGS MCMC
 
@@ -38,17 +164,51 @@ class MetropolisHastings(object):
 
     quiet_progress : boolean
         Whether to print progress to console or stay quiet
+
+    chains : int
+        (default: 1) How many independent chains to run; chains after the first start from
+        the initial values jittered by a draw from the random walk covariance
+
+    processes : int
+        (default: None) How many worker processes run the chains; defaults to the number of
+        CPUs, and 1 runs the chains serially in the current process
+
+    adaptive : boolean
+        (default: False) Whether to learn the full proposal covariance from the chain as it
+        runs (adaptive Metropolis) instead of tuning a scale for the fixed covariance
+
+    target_ess : float
+        (default: None) For the adaptive sampler, stop as soon as every parameter has this
+        effective sample size after warm-up and thinning; the chain never runs longer than
+        without a target. Split evenly between chains when several are run.
+
+    chain_file : str
+        (default: None) If given, the kept draws are written to a memory-mapped array in
+        this file rather than held in memory, and phi (and the returned chain) are views of it.
+        With several chains, the file holds all of them one after the other.
+
+    chain_offset : int
+        (default: None) Byte offset of this chain's rows in an existing chain_file that is
+        shared with other chains; by default the sampler creates chain_file itself
+
+    Notes
+    ----------
+    Only the draws that are kept are stored: the warm-up draws and the draws dropped by
+    thinning are never written anywhere. The adaptive sampler does not know its warm-up
+    length in advance, so it stores every thinned draw and drops the warm-up half at the end.
     """
 
     def __init__(self, posterior, scale, nsims, initials, 
-        cov_matrix=None, thinning=2, warm_up_period=True, model_object=None, quiet_progress=False):
+        cov_matrix=None, thinning=2, warm_up_period=True, model_object=None, quiet_progress=False,
+        chains=1, processes=None, adaptive=False, target_ess=None, chain_file=None, chain_offset=None):
         self.posterior = posterior
         self.scale = scale
+        self.draws = nsims
         self.nsims = (1+warm_up_period)*nsims*thinning
         self.initials = initials
         self.param_no = self.initials.shape[0]
-        self.phi = np.zeros([self.nsims, self.param_no])
-        self.phi[0] = self.initials # point from which to start the Metropolis-Hasting algorithm
+        self.phi = None
+        self.kept_rows = None
         self.quiet_progress = quiet_progress
 
         if cov_matrix is None:
@@ -62,6 +222,15 @@ class MetropolisHastings(object):
         if model_object is not None:
             self.model = model_object
 
+        self.chains = chains
+        self.processes = processes
+        self.rhat = None
+        self.ess = None
+        self.adaptive = adaptive
+        self.target_ess = target_ess
+        self.chain_file = chain_file
+        self.chain_offset = chain_offset
+
     @staticmethod
     def tune_scale(acceptance, scale):
         """ Tunes scale for M-H algorithm
@@ -99,9 +268,62 @@ class MetropolisHastings(object):
             scale *= 0.1
         return scale        
 
+    def _sample_chains(self):
+        """ Runs the independent chains on a process pool, each from its own random seed
+
+        Returns
+        ----------
+        list of (draws, parameters) np.arrays of samples after warm-up and thinning, one per chain
+        """
+        seeds = np.random.randint(2**31-1, size=self.chains)
+        starts = [self.initials] + [self.initials + np.random.multivariate_normal(np.zeros(self.param_no), 
+            self.cov_matrix) for i in range(1, self.chains)]
+        target_ess = None if self.target_ess is None else float(self.target_ess)/self.chains
+
+        # Every chain gets its own block of rows in a shared chain file
+        rows = self._store_rows()
+        if self.chain_file is not None:
+            store = np.memmap(self.chain_file, dtype=np.float64, mode='w+', shape=(self.chains*rows, self.param_no))
+            store.flush()
+            offsets = [i*rows*self.param_no*store.itemsize for i in range(self.chains)]
+        else:
+            offsets = [None]*self.chains
+
+        tasks = [(seeds[i], self.posterior, self.scale, self.draws, starts[i], self.cov_matrix, 
+            self.thinning, self.warm_up_period, self.adaptive, target_ess, self.chain_file, offsets[i]) 
+            for i in range(self.chains)]
+
+        if self.processes == 1:
+            phis = [_run_chain(task) for task in tasks]
+        else:
+            pool = mp.Pool(processes=self.processes)
+            try:
+                phis = pool.map(_run_chain, tasks)
+            finally:
+                pool.close()
+                pool.join()
+
+        if self.chain_file is None:
+            self.phi = np.concatenate(phis)
+            return phis
+
+        # Move the kept rows of every chain to the front of the file, one chain after the other
+        position = 0
+        kept = []
+        for i, (start, stop) in enumerate(phis):
+            store[position:position+stop-start] = store[i*rows+start:i*rows+stop]
+            kept.append(store[position:position+stop-start])
+            position += stop-start
+        store.flush()
+        self.phi = store[:position]
+        return kept
+
     def sample(self):
         """ Sample from M-H algorithm
 
+        With more than one chain, the chains are stacked one after the other, and split R-hat
+        and effective sample sizes are stored in the rhat and ess attributes.
+
         Returns
         ----------
         chain : np.array
@@ -120,8 +342,162 @@ class MetropolisHastings(object):
             Lower 95% credibility interval for each parameter           
         """     
 
+        if self.chains > 1:
+            phis = self._sample_chains()
+
+            # Adaptive chains can stop at different lengths, so compare their latest draws
+            length = min(phi.shape[0] for phi in phis)
+            chains = np.array([phi[phi.shape[0]-length:] for phi in phis])
+        else:
+            if self.adaptive:
+                self._sample_adaptive()
+            else:
+                self._sample_chain()
+            chains = self.phi[np.newaxis]
+
+        self.rhat = split_rhat(chains)
+        self.ess = effective_sample_size(chains)
+        if self.chains > 1 and not self.quiet_progress:
+            print("Split R-hat of Metropolis-Hastings chains is " + str(self.rhat))
+
+        chain = self.phi.T
+        mean_est = np.mean(self.phi, axis=0)
+        median_est = np.median(self.phi, axis=0)
+        upper_95_est = np.percentile(self.phi, 95, axis=0)
+        lower_95_est = np.percentile(self.phi, 5, axis=0)
+
+        return chain, mean_est, median_est, upper_95_est, lower_95_est
+
+    def _store_rows(self):
+        """ How many rows the chain store needs for the draws that are kept """
+        if self.adaptive:
+            return len(range(0, self.nsims, self.thinning))
+        else:
+            return len(range(int(self.nsims/2), self.nsims, self.thinning))
+
+    def _chain_store(self, rows):
+        """ Allocates the chain store, either in memory or memory-mapped to chain_file """
+        if self.chain_file is None:
+            return np.empty([rows, self.param_no])
+        elif self.chain_offset is None:
+            return np.memmap(self.chain_file, dtype=np.float64, mode='w+', shape=(rows, self.param_no))
+        else:
+            return np.memmap(self.chain_file, dtype=np.float64, mode='r+', shape=(rows, self.param_no),
+                offset=self.chain_offset)
+
+    def _walk(self, state, old_lik, steps, proposal, scale, store=None, stored=0, index=1, keep_from=None):
+        """ Takes random walk steps from state, drawing the proposals a chunk at a time
+
+        Parameters
+        ----------
+        state : np.array
+            Where the walk starts
+
+        old_lik : float
+            Log posterior at state
+
+        steps : int
+            How many steps to take
+
+        proposal : np.array
+            Covariance matrix of the random walk
+
+        scale : float
+            Scale of the random walk
+
+        store : np.array
+            (default: None) Where to write the kept states; nothing is kept if None
+
+        stored : int
+            (default: 0) First free row of store
+
+        index : int
+            (default: 1) Position in the chain of the state reached by the first step
+
+        keep_from : int
+            (default: None) Position of the first state to keep; every thinning-th state
+            from there is written to store
+
+        Returns
+        ----------
+        state, old_lik, stored, accepted : the last state, its log posterior, the next free
+        row of store and how many proposals were accepted
+        """
+
+        if store is None:
+            keep_from = index+steps
+
+        accepted = 0
+
+        for start in range(0, steps, CHUNK_SIZE):
+            chunk = min(CHUNK_SIZE, steps-start)
+            crit = np.random.rand(chunk,1)
+            rnums = np.random.multivariate_normal(np.zeros(self.param_no), proposal, chunk)*scale
+            state, old_lik, stored, chunk_accepted = metropolis_sampler(state, old_lik, self.posterior, 
+                rnums, crit, store, stored, index+start, keep_from, self.thinning)
+            accepted += chunk_accepted
+
+        return state, old_lik, stored, accepted
+
+    def _kept_range(self, stored):
+        """ The rows of the adaptive sampler's store that are kept once the warm-up half is dropped """
+        if self.warm_up_period:
+            return int(stored/2), stored
+        return 0, stored
+
+    def _sample_adaptive(self):
+        """ Runs an adaptive Metropolis chain, keeping the draws after warm-up and thinning in phi
+
+        The chain runs in blocks. After each block the running mean and covariance of the
+        kept draws are updated recursively and become the proposal covariance of the next block,
+        while the proposal scale moves towards a 0.234 acceptance rate in diminishing steps.
+        """
+
+        block = max(50, min(500, int(self.nsims/10)))
+        jitter = 1e-10*np.identity(self.param_no)
+        proposal = self.cov_matrix
+        log_scale = np.log(self.scale)
+        count, mean, scatter = 1, self.initials.copy(), np.zeros((self.param_no, self.param_no))
+
+        store = self._chain_store(self._store_rows())
+        store[0] = self.initials
+        stored = 1
+        state, old_lik = self.initials, -self.posterior(self.initials)
+        done = 1
+        rounds = 0
+
+        while done < self.nsims:
+            steps = min(block, self.nsims-done)
+            previous = stored
+            state, old_lik, stored, accepted = self._walk(state, old_lik, steps, proposal, np.exp(log_scale),
+                store=store, stored=stored, index=done, keep_from=0)
+            done += steps
+            rounds += 1
+
+            if stored > previous:
+                count, mean, scatter = update_moments(count, mean, scatter, store[previous:stored])
+            if count > self.param_no:
+                proposal = scatter/(count-1) + jitter
+            log_scale += (float(accepted)/steps-0.234)/np.sqrt(rounds)
+
+            if self.target_ess is not None:
+                start, stop = self._kept_range(stored)
+                if stop-start >= 100 and np.min(effective_sample_size(store[np.newaxis, start:stop])) >= self.target_ess:
+                    break
+
+        self.scale = np.exp(log_scale)
+        self.kept_rows = self._kept_range(stored)
+        self.phi = store[self.kept_rows[0]:self.kept_rows[1]]
+
+        if not self.quiet_progress:
+            print("Adaptive Metropolis finished after " + str(done) + " iterations")
+
+    def _sample_chain(self):
+        """ Tunes the scale and runs a single chain, keeping the draws after warm-up and thinning in phi """
+
         acceptance = 1
         finish = 0
+        old_lik = -self.posterior(self.initials) # Initial posterior
 
         while (acceptance < 0.234 or acceptance > 0.4) or finish == 0:
 
@@ -132,40 +508,20 @@ class MetropolisHastings(object):
                     print("")
                     print("Tuning complete! Now sampling.")
                 sims_to_do = self.nsims
+                store = self._chain_store(self._store_rows())
             else:
+                finish = 0 # A sampling run with acceptance out of range goes back to tuning
                 sims_to_do = int(self.nsims/2) # For acceptance rate tuning
+                store = None
 
-            # Holds data on acceptance rates and uniform random numbers
-            a_rate = np.zeros([sims_to_do,1])
-            crit = np.random.rand(sims_to_do,1)
-            post = multivariate_normal(np.zeros(self.param_no), self.cov_matrix)
-            rnums = post.rvs()*self.scale
-            
-            for k in range(1,sims_to_do): 
-                rnums = np.vstack((rnums,post.rvs()*self.scale))
-
-            self.phi, a_rate = metropolis_sampler(sims_to_do, self.phi, self.posterior, 
-                a_rate, rnums, crit)
+            # Every run starts from the initial values; only the thinned draws after warm-up are stored
+            __, __, stored, accepted = self._walk(self.initials, old_lik, sims_to_do-1, self.cov_matrix, 
+                self.scale, store=store, keep_from=int(self.nsims/2))
 
-            acceptance = a_rate.sum()/a_rate.shape[0]
+            acceptance = float(accepted)/sims_to_do
             self.scale = self.tune_scale(acceptance,self.scale)
             if not self.quiet_progress:
                 print("Acceptance rate of Metropolis-Hastings is " + str(acceptance))
 
-        # Remove warm-up and thin
-        self.phi = self.phi[int(self.nsims/2):,:][::self.thinning,:]
-
-        chain = np.array([self.phi[i][0] for i in range(0, self.phi.shape[0])])
-
-        for m in range(1, self.param_no):
-            chain = np.vstack((chain, [self.phi[i][m] for i in range(0,self.phi.shape[0])]))
-
-        if self.param_no == 1:
-            chain = np.array([chain])
-
-        mean_est = np.array([np.mean(np.array([self.phi[i][j] for i in range(0,self.phi.shape[0])])) for j in range(self.param_no)])
-        median_est = np.array([np.median(np.array([self.phi[i][j] for i in range(0,self.phi.shape[0])])) for j in range(self.param_no)])
-        upper_95_est = np.array([np.percentile(np.array([self.phi[i][j] for i in range(0,self.phi.shape[0])]), 95) for j in range(self.param_no)])
-        lower_95_est = np.array([np.percentile(np.array([self.phi[i][j] for i in range(0,self.phi.shape[0])]), 5) for j in range(self.param_no)])
-
-        return chain, mean_est, median_est, upper_95_est, lower_95_est
\ No newline at end of file
+        self.kept_rows = (0, stored)
+        self.phi = store
@@ -1,31 +1,44 @@
 import numpy as np
 cimport numpy as np
 cimport cython
+from libc.math cimport exp
 
 @cython.boundscheck(False)
 @cython.wraparound(False)
 @cython.cdivision(True)
-def metropolis_sampler(int sims_to_do, np.ndarray[double,ndim=2] phi, 
-    posterior, np.ndarray[double,ndim=2] a_rate, np.ndarray[double,ndim=2] rnums, 
-    np.ndarray[double,ndim=2] crit):
+def metropolis_sampler(np.ndarray[double,ndim=1] state, double old_lik, posterior,
+    np.ndarray[double,ndim=2] rnums, np.ndarray[double,ndim=2] crit, store,
+    Py_ssize_t stored, Py_ssize_t index, Py_ssize_t keep_from, int thinning):
+    """ Takes one random walk step from state per row of rnums
 
-    cdef Py_ssize_t i
-    cdef float post_prop, lik_rate, old_lik
-    cdef np.ndarray[double, ndim=1, mode="c"] phi_prop 
+    The state reached by step i has position index+i in the chain. States at positions
+    keep_from, keep_from+thinning, ... are written to store from row stored onwards; no
+    other states are kept.
 
-    old_lik = -posterior(phi[0]) # Initial posterior
+    Returns
+    ----------
+    state, old_lik, stored, accepted : the last state, its log posterior, the next free
+    row of store and how many proposals were accepted
+    """
+
+    cdef Py_ssize_t i, position
+    cdef double post_prop
+    cdef Py_ssize_t accepted = 0
+    cdef np.ndarray[double, ndim=1, mode="c"] phi_prop
 
     # Sampling time!
-    for i in range(1,sims_to_do):
-        phi_prop = phi[i-1] + rnums[i]
+    for i in range(rnums.shape[0]):
+        phi_prop = state + rnums[i]
         post_prop = -posterior(phi_prop)
-        lik_rat = np.exp(post_prop - old_lik)
 
-        if crit[i] < lik_rat:
-            phi[i] = phi_prop
-            a_rate[i] = 1
+        if crit[i,0] < exp(post_prop - old_lik):
+            state = phi_prop
             old_lik = post_prop
-        else:
-            phi[i] = phi[i-1]
+            accepted += 1
+
+        position = index + i
+        if position >= keep_from and (position - keep_from) % thinning == 0:
+            store[stored] = state
+            stored += 1
 
-    return phi, a_rate
+    return state, old_lik, stored, accepted
@@ -2,48 +2,72 @@ import numpy as np
 
 class RMSProp(object):
     """
-    *** RMSProp *** 
+    *** RMSProp ***
 
     Computes adaptive learning rates for each parameter. Has an EWMA of squared gradients.
+
+    The parameters and squared gradient average are updated in place, with one preallocated work buffer.
     """
     def __init__(self, starting_parameters, starting_variance, learning_rate, ewma):
-        self.parameters = starting_parameters
-        self.variance = starting_variance
+        self.parameters = np.array(starting_parameters, dtype=np.float64)
+        self.variance = np.array(starting_variance, dtype=np.float64)
         self.learning_rate = learning_rate
         self.ewma = ewma
-        self.epsilon = np.power(10.0,-8)    
+        self.epsilon = np.power(10.0,-8)
         self.t = 1
+        self._buffer = np.empty_like(self.parameters)
 
     def update(self, gradient):
-        self.variance = self.ewma*self.variance + (1-self.ewma)*np.power(gradient,2)
+        np.multiply(gradient, gradient, out=self._buffer)
+        self._buffer *= (1-self.ewma)
+        self.variance *= self.ewma
+        self.variance += self._buffer
         if self.t > 5:
-            self.parameters += (self.learning_rate+(self.learning_rate*15.0*(0.990**self.t)))*(gradient/np.sqrt(self.variance+self.epsilon))  
+            np.add(self.variance, self.epsilon, out=self._buffer)
+            np.sqrt(self._buffer, out=self._buffer)
+            np.divide(gradient, self._buffer, out=self._buffer)
+            self._buffer *= (self.learning_rate+(self.learning_rate*15.0*(0.990**self.t)))
+            self.parameters += self._buffer
         self.t += 1
         return self.parameters
 
 class ADAM(object):
     """
-    *** Adaptive Moment Estimation (ADAM) *** 
+    *** Adaptive Moment Estimation (ADAM) ***
 
     Computes adaptive learning rates for each parameter. Has an EWMA of past gradients and squared gradients.
+
+    The parameters and both averages are updated in place, with one preallocated work buffer.
     """
     def __init__(self, starting_parameters, starting_variance, learning_rate, ewma_1, ewma_2):
-        self.parameters = starting_parameters
-        self.f_gradient = 0.0
-        self.variance = starting_variance
+        self.parameters = np.array(starting_parameters, dtype=np.float64)
+        self.f_gradient = np.zeros_like(self.parameters)
+        self.variance = np.array(starting_variance, dtype=np.float64)
         self.learning_rate = learning_rate
         self.ewma_1 = ewma_1
         self.ewma_2 = ewma_2
 
-        self.epsilon = np.power(10.0,-8)        
+        self.epsilon = np.power(10.0,-8)
         self.t = 1
+        self._buffer = np.empty_like(self.parameters)
 
     def update(self, gradient):
-        self.f_gradient = self.ewma_1*self.f_gradient + (1-self.ewma_1)*gradient
-        f_gradient_hat = self.f_gradient / (1-np.power(self.ewma_1,self.t))
-        self.variance = self.ewma_2*self.variance + (1-self.ewma_2)*np.power(gradient,2)
-        variance_hat = self.variance / (1-np.power(self.ewma_2,self.t))
+        np.multiply(gradient, 1-self.ewma_1, out=self._buffer)
+        self.f_gradient *= self.ewma_1
+        self.f_gradient += self._buffer
+
+        np.multiply(gradient, gradient, out=self._buffer)
+        self._buffer *= (1-self.ewma_2)
+        self.variance *= self.ewma_2
+        self.variance += self._buffer
+
         if self.t > 5:
-            self.parameters += (self.learning_rate+(self.learning_rate*15.0*(0.990**self.t)))*(f_gradient_hat/(np.sqrt(variance_hat)+self.epsilon))  
+            # Bias-corrected step: f_gradient_hat/(sqrt(variance_hat)+epsilon)
+            np.divide(self.variance, 1-np.power(self.ewma_2,self.t), out=self._buffer)
+            np.sqrt(self._buffer, out=self._buffer)
+            self._buffer += self.epsilon
+            np.divide(self.f_gradient, self._buffer, out=self._buffer)
+            self._buffer *= (self.learning_rate+(self.learning_rate*15.0*(0.990**self.t)))/(1-np.power(self.ewma_1,self.t))
+            self.parameters += self._buffer
         self.t += 1
-        return self.parameters
\ No newline at end of file
+        return self.parameters
@@ -19,6 +19,7 @@ class LatentVariables(object):
         self.z_indices = {}
         self.estimated = False
         self.estimation_method = None
+        self._compiled = None
 
     def __str__(self):
         z_row = []
@@ -66,6 +67,7 @@ class LatentVariables(object):
         """
 
         self.z_list.append(LatentVariable(name,len(self.z_list),prior,q))
+        self._compiled = None
         if index is True:
             self.z_indices[name] = {'start': len(self.z_list)-1, 'end': len(self.z_list)-1}
 
@@ -108,6 +110,7 @@ class LatentVariables(object):
             starting_index = len(self.z_list)
 
         self.z_indices[name] = {'start': starting_index, 'end': starting_index+len(indices)-1, 'dim': len(dim)}
+        self._compiled = None
 
         for index in indices:
             self.add_z(name + " " + index, prior, q, index=False)
@@ -128,6 +131,8 @@ class LatentVariables(object):
         None (changes priors in Parameters object)
         """
 
+        self._compiled = None
+
         if isinstance(index, list):
             for item in index:
                 if item < 0 or item > (len(self.z_list)-1) or not isinstance(item, int):
@@ -148,6 +153,127 @@ class LatentVariables(object):
                 elif hasattr(self.z_list[index].prior, 'loc0'):
                     self.z_list[index].start = self.z_list[index].prior.loc0  
 
+    def _compile(self):
+        """ Groups the latent variables by transform and by prior, so all of them can be
+        transformed, or have their prior log-densities evaluated, with a few array operations
+
+        The groups are built on first use and dropped by add_z, create and adjust_prior, so
+        they are rebuilt only after the latent variables or their priors change.
+
+        Returns
+        ----------
+        dict of index arrays (and Normal prior hyperparameters)
+        """
+
+        if self._compiled is None:
+            transforms = {'exp': [], 'logit': [], 'tanh': [], None: [], 'other': []}
+            normal, other_priors = [], []
+
+            for i, z in enumerate(self.z_list):
+                transforms[z.prior.transform_name if z.prior.transform_name in transforms else 'other'].append(i)
+
+                if type(z.prior) is Normal:
+                    normal.append(i)
+                elif not isinstance(z.prior, Flat):
+                    other_priors.append(i)
+
+            self._compiled = {'normal': np.array(normal, dtype=int), 'other_priors': other_priors,
+                'mu0': np.array([float(self.z_list[i].prior.mu0) for i in normal]),
+                'sigma0': np.array([float(self.z_list[i].prior.sigma0) for i in normal])}
+
+            for name in transforms:
+                self._compiled[name] = np.array(transforms[name], dtype=int)
+
+        return self._compiled
+
+    def transform_all(self, beta):
+        """ Transforms latent variables by applying their link functions
+
+        Parameters
+        ----------
+        beta : np.array
+            Untransformed latent variables, or an (S, k) array with one vector per row
+
+        Returns
+        ----------
+        np.array of transformed latent variables, of the same shape as beta
+        """
+
+        groups = self._compile()
+        beta = np.asarray(beta, dtype=float)
+        values = beta.copy()
+
+        if groups['exp'].size > 0:
+            values[..., groups['exp']] = np.exp(beta[..., groups['exp']])
+        if groups['logit'].size > 0:
+            values[..., groups['logit']] = 1.0/(1.0+np.exp(-beta[..., groups['logit']]))
+        if groups['tanh'].size > 0:
+            values[..., groups['tanh']] = np.tanh(beta[..., groups['tanh']])
+        for k in groups['other']:
+            values[..., k] = self.z_list[k].prior.transform(beta[..., k])
+
+        return values
+
+    def transform_derivative_all(self, beta):
+        """ Derivatives of the link functions of the latent variables
+
+        Parameters
+        ----------
+        beta : np.array
+            Untransformed latent variables, or an (S, k) array with one vector per row
+
+        Returns
+        ----------
+        np.array of derivatives, of the same shape as beta
+        """
+
+        groups = self._compile()
+        beta = np.asarray(beta, dtype=float)
+        values = np.ones_like(beta)
+
+        if groups['exp'].size > 0:
+            values[..., groups['exp']] = np.exp(beta[..., groups['exp']])
+        if groups['logit'].size > 0:
+            ilogit = 1.0/(1.0+np.exp(-beta[..., groups['logit']]))
+            values[..., groups['logit']] = ilogit*(1.0-ilogit)
+        if groups['tanh'].size > 0:
+            values[..., groups['tanh']] = 1.0 - np.power(np.tanh(beta[..., groups['tanh']]),2)
+        for k in groups['other']:
+            values[..., k] = self.z_list[k].prior.transform_derivative(beta[..., k])
+
+        return values
+
+    def log_prior_all(self, beta):
+        """ Sum of the prior log-densities of the latent variables
+
+        Parameters
+        ----------
+        beta : np.array
+            Untransformed latent variables, or an (S, k) array with one vector per row
+
+        Returns
+        ----------
+        The log prior density, one per row if beta is 2-D
+        """
+
+        groups = self._compile()
+        beta = np.asarray(beta, dtype=float)
+        log_prior = np.zeros(beta.shape[:-1])
+
+        if groups['normal'].size > 0:
+            values = self.transform_all(beta)[..., groups['normal']]
+            log_prior = log_prior + np.sum(-np.log(groups['sigma0']) 
+                - 0.5*np.power(values-groups['mu0'],2)/np.power(groups['sigma0'],2), axis=-1)
+
+        for k in groups['other_priors']:
+            prior = self.z_list[k].prior
+            try:
+                log_prior = log_prior + prior.logpdf(beta[..., k])
+            except (TypeError, ValueError):
+                log_prior = log_prior + np.array([prior.logpdf(z) for z in beta[..., k]])
+
+        return log_prior
+
     def get_z_names(self):
         names = []
         for z in self.z_list:
@@ -211,26 +337,16 @@ class LatentVariables(object):
         return transforms
 
     def get_z_starting_values(self,transformed=False):
-        transforms = self.get_z_transforms()
-
-        values = np.zeros(len(self.z_list))
-        for i in range(len(self.z_list)):
-            if transformed is True:
-                values[i] = transforms[i](self.z_list[i].start)
-            else:
-                values[i] = self.z_list[i].start
+        values = np.array([z.start for z in self.z_list], dtype=float)
+        if transformed is True:
+            return self.transform_all(values)
         return values
 
     def get_z_values(self, transformed=False):
-        transforms = self.get_z_transforms()
-
         if self.estimated is True:
-            values = np.zeros(len(self.z_list))
-            for i in range(len(self.z_list)):
-                if transformed is True:
-                    values[i] = transforms[i](self.z_list[i].value)
-                else:
-                    values[i] = self.z_list[i].value
+            values = np.array([z.value for z in self.z_list], dtype=float)
+            if transformed is True:
+                return self.transform_all(values)
             return values
         else:
             return ValueError("No latent variables have been estimated yet")
@@ -642,7 +642,7 @@ class MCMCResults(Results):
     def __init__(self,data_name,X_names,model_name,model_type,latent_variables, 
         data,index,multivariate_model,objective_object,method,
         z_hide,max_lag,samples,mean_est,median_est,lower_95_est,upper_95_est,
-        signal=None,scores=None,states=None,states_var=None):
+        signal=None,scores=None,states=None,states_var=None,rhat=None,ess=None):
         self.data_name = data_name
         self.X_names = X_names
         self.max_lag = max_lag
@@ -656,6 +656,8 @@ class MCMCResults(Results):
         self.median_est = median_est
         self.lower_95_est = lower_95_est
         self.upper_95_est = upper_95_est
+        self.rhat = rhat
+        self.ess = ess
         self.scores = scores
         self.states = states
         self.states_var = states_var
@@ -692,6 +694,9 @@ class MCMCResults(Results):
         print(".z : LatentVariables() object")
         if self.samples is not None:
             print(".samples: MCMC samples")             
+        if self.rhat is not None:
+            print(".rhat: Split R-hat of each latent variable")
+            print(".ess: Effective sample size of each latent variable")
         print("")
         print("Implied Model Attributes: ")
         print(".aic: Akaike Information Criterion") 
@@ -6,6 +6,7 @@ from .dynlin import DynReg
 from .dar import DAR
 from .ndynlin import NDynReg
 from .kalman import nl_univariate_KFS, nld_univariate_KFS
+from .batch import batch_kalman, batch_smoothed_state, batch_fit
 from .local_level import LocalLevel
 from .local_trend import LocalTrend
 from .dynamic_glm import DynamicGLM
\ No newline at end of file
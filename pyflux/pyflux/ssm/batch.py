@@ -0,0 +1,231 @@
+import numpy as np
+
+from .kalman import batch_univariate_kalman, batch_univariate_loglik, batch_univariate_KFS
+
+def batch_ss_matrices(variances):
+    """ Creates the state space matrices for N local level or local linear trend models
+
+    Parameters
+    ----------
+    variances : np.array
+        (N, 2) irregular and level variances for local level models, or (N, 3) irregular,
+        level and trend variances for local linear trend models
+
+    Returns
+    ----------
+    T, Z, R, Q, H : np.array
+        Shared T, Z and R, and stacked (N, m, m) Q and (N, 1, 1) H
+    """
+
+    variances = np.atleast_2d(variances)
+    m = variances.shape[1] - 1
+
+    T = np.identity(m)
+    if m == 2:
+        T[0][1] = 1
+
+    Z = np.zeros(m)
+    Z[0] = 1
+
+    R = np.identity(m)
+    H = variances[:,0].reshape(-1,1,1).astype(np.float64)
+    Q = np.zeros((variances.shape[0],m,m))
+    Q[:,np.arange(m),np.arange(m)] = variances[:,1:]
+
+    return T, Z, R, Q, H
+
+def batch_kalman(data, variances):
+    """ Kalman filters N local level or local linear trend models in one call
+
+    Parameters
+    ----------
+    data : np.array
+        (N, T) panel of time series, one per row
+
+    variances : np.array
+        (N, 2) or (N, 3) variances of each series (see batch_ss_matrices)
+
+    Returns
+    ----------
+    a : np.array
+        (N, m, T+1) filtered states
+
+    P : np.array
+        (N, m, m, T+1) filtered variances
+
+    loglik : np.array
+        (N,) log-likelihood of each series
+    """
+
+    data = np.ascontiguousarray(data, dtype=np.float64)
+    T, Z, R, Q, H = batch_ss_matrices(variances)
+    a, P, _, F, v = batch_univariate_kalman(data, Z, H, T, Q, R, 0.0)
+    F = F[:,0,0]
+    loglik = -0.5*(data.shape[1]*np.log(2*np.pi) + np.sum(np.log(np.abs(F)) + np.power(v,2)/F, axis=1))
+    return a, P, loglik
+
+def batch_smoothed_state(data, variances):
+    """ Smoothed states of N local level or local linear trend models in one call
+
+    Parameters
+    ----------
+    data : np.array
+        (N, T) panel of time series, one per row
+
+    variances : np.array
+        (N, 2) or (N, 3) variances of each series (see batch_ss_matrices)
+
+    Returns
+    ----------
+    alpha : np.array
+        (N, m, T+1) smoothed states
+
+    V : np.array
+        (N, m, m, T+1) variance of smoothed states
+    """
+
+    T, Z, R, Q, H = batch_ss_matrices(variances)
+    return batch_univariate_KFS(np.ascontiguousarray(data, dtype=np.float64), Z, H, T, Q, R, 0.0)
+
+def batch_neg_loglik(data, z, tol=1e-10):
+    """ Negative log-likelihoods of N local level or local linear trend models
+
+    Parameters
+    ----------
+    data : np.array
+        (N, T) panel of time series, one per row
+
+    z : np.array
+        (N, 2) or (N, 3) log variances of each series, as the LLEV and LLT latent variables
+
+    tol : float
+        Relative change in P below which the filter holds the gain fixed (0 always runs the full update)
+
+    Returns
+    ----------
+    (N,) negative log-likelihood of each series
+    """
+
+    T, Z, R, Q, H = batch_ss_matrices(np.exp(z))
+    return -batch_univariate_loglik(np.ascontiguousarray(data, dtype=np.float64), Z, H, T, Q, R, 0.0, tol=tol)
+
+def batch_derivatives(data, z, eps=1e-4):
+    """ Negative log-likelihoods of N series with their gradients and Hessians
+
+    The series share no latent variables, so shifting the j-th latent variable of every
+    series at once gives all N partial derivatives from one batched likelihood call.
+    Central differences then need 1 + 2k^2 calls for k latent variables. The filter runs the
+    full variance update throughout, as a fixed-gain switch would add noise to the differences.
+
+    Parameters
+    ----------
+    data : np.array
+        (N, T) panel of time series, one per row
+
+    z : np.array
+        (N, k) log variances of each series
+
+    eps : float
+        Step for the central differences
+
+    Returns
+    ----------
+    f : np.array
+        (N,) negative log-likelihoods
+
+    gradient : np.array
+        (N, k) gradients
+
+    hessian : np.array
+        (N, k, k) Hessians
+    """
+
+    k = z.shape[1]
+    f = batch_neg_loglik(data, z, 0.0)
+    gradient = np.zeros(z.shape)
+    hessian = np.zeros((z.shape[0],k,k))
+    steps = np.identity(k)*eps
+
+    for j in range(k):
+        f_plus = batch_neg_loglik(data, z+steps[j], 0.0)
+        f_minus = batch_neg_loglik(data, z-steps[j], 0.0)
+        gradient[:,j] = (f_plus - f_minus)/(2*eps)
+        hessian[:,j,j] = (f_plus - 2*f + f_minus)/(eps**2)
+        for l in range(j):
+            hessian[:,j,l] = (batch_neg_loglik(data, z+steps[j]+steps[l], 0.0) - batch_neg_loglik(data, z+steps[j]-steps[l], 0.0)
+                - batch_neg_loglik(data, z-steps[j]+steps[l], 0.0) + batch_neg_loglik(data, z-steps[j]-steps[l], 0.0))/(4*eps**2)
+            hessian[:,l,j] = hessian[:,j,l]
+
+    return f, gradient, hessian
+
+def batch_fit(data, trend=False, start=None, iterations=500, gtol=1e-5, ftol=1e-10):
+    """ Fits a local level (or local linear trend) model to each of N series by maximum likelihood
+
+    Every series takes its own damped Newton (Levenberg-Marquardt) steps, but the likelihoods,
+    gradients and Hessians of all series are evaluated together with the batched filter.
+
+    Parameters
+    ----------
+    data : np.array
+        (N, T) panel of time series, one per row
+
+    trend : boolean
+        Whether to fit local linear trend models (default: local level models)
+
+    start : np.array
+        (optional) (N, k) starting log variances (default: zeros, as LLEV and LLT)
+
+    iterations : int
+        Maximum number of Newton steps
+
+    gtol : float
+        A series has converged once every element of its gradient is below gtol
+
+    ftol : float
+        A series has also converged once a step lowers its negative log-likelihood by less
+        than ftol times its value
+
+    Returns
+    ----------
+    z : np.array
+        (N, k) estimated log variances, as the LLEV and LLT latent variables
+
+    loglik : np.array
+        (N,) maximized log-likelihood of each series
+    """
+
+    data = np.ascontiguousarray(data, dtype=np.float64)
+    k = 3 if trend is True else 2
+    if start is None:
+        z = np.zeros((data.shape[0],k))
+    else:
+        z = np.array(start, dtype=np.float64)
+    damping = np.ones(data.shape[0])*1e-3
+    active = np.arange(data.shape[0])
+
+    for i in range(iterations):
+        # Only the series that have not converged are filtered
+        f, gradient, hessian = batch_derivatives(data[active], z[active])
+        done = np.max(np.abs(gradient), axis=1) < gtol
+
+        # Raise the damping of a series until its step lowers its negative log-likelihood
+        pending = ~done
+        for trial in range(20):
+            step = -np.linalg.solve(hessian + damping[active,None,None]*np.identity(k), gradient[:,:,None])[:,:,0]
+            step[~pending] = 0.0
+            f_step = batch_neg_loglik(data[active], z[active]+step, 0.0)
+            improved = pending & (f_step < f)
+            z[active[improved]] += step[improved]
+            damping[active[improved]] = np.maximum(damping[active[improved]]/10.0, 1e-8)
+            done |= improved & (f - f_step < ftol*np.abs(f))
+            pending &= ~improved
+            damping[active[pending]] *= 10.0
+            if not pending.any():
+                break
+
+        # Series where no step lowers the negative log-likelihood have converged too
+        active = active[~(done | pending)]
+        if active.shape[0] == 0:
+            break
+
+    return z, -batch_neg_loglik(data, z)
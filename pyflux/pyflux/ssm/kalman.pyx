@@ -2,15 +2,349 @@ import numpy as np
 cimport numpy as np
 cimport cython
 
+from libc.math cimport log, fabs, M_PI
+
 # TO DO: REFACTOR AND COMBINE THESE SCRIPTS TO USE A SINGLE KALMAN FILTER/SMOOTHER SCRIPT
 # Main differences between these functions are whether they treat certain matrices as
 # constant or not
 
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.cdivision(True)
+cdef inline bint has_converged(double[:,:] P_new, double[:,:] P_old, double tol) nogil:
+    """ Whether every element of P_new is within tol (relative to the largest element) of P_old """
+
+    cdef Py_ssize_t i, j
+    cdef double diff = 0.0, scale = 0.0
+
+    for i in range(P_new.shape[0]):
+        for j in range(P_new.shape[1]):
+            if fabs(P_new[i,j] - P_old[i,j]) > diff:
+                diff = fabs(P_new[i,j] - P_old[i,j])
+            if fabs(P_new[i,j]) > scale:
+                scale = fabs(P_new[i,j])
+
+    return diff <= tol*scale
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.cdivision(True)
+cdef Py_ssize_t small_kalman_filter(double[:] y, double[:,::1] Z, bint z_varies, double h, double[:,::1] T,
+    double[:,::1] RQR, double mu, double[:,::1] a, double[:,:,::1] P, double[:,::1] K,
+    double[:,:,::1] F, double[::1] v, double[::1] PZ, double[:,::1] TP, double tol) nogil:
+    """ Kalman filter recursion for a small state dimension m, written as plain loops
+
+    a[:,0] and P[:,:,0] hold the initial state and variance. Z is (1, m), or (n, m) with
+    z_varies set for a time-varying design. PZ (m) and TP (m, m) are work buffers.
+
+    For a time-invariant design, once P_t+1 is within tol of P_t the gain is held fixed and
+    the Riccati update is skipped. Returns the first t from which P, K and F are constant
+    (the length of y if that never happens).
+    """
+
+    cdef Py_ssize_t t, i, j, k, row
+    cdef Py_ssize_t m = a.shape[0]
+    cdef Py_ssize_t steady = y.shape[0]
+    cdef double f, fitted, tpz
+
+    for t in range(y.shape[0]):
+        row = t if z_varies else 0
+
+        fitted = 0.0
+        for i in range(m):
+            fitted += Z[row,i]*a[i,t]
+        v[t] = y[t] - fitted - mu
+
+        if t > steady:
+            # Steady state: fixed gain, constant variance
+            F[0,0,t] = f
+            for i in range(m):
+                K[i,t] = K[i,t-1]
+                a[i,t+1] = K[i,t]*v[t]
+                for j in range(m):
+                    a[i,t+1] += T[i,j]*a[j,t]
+                    P[i,j,t+1] = P[i,j,t]
+            continue
+
+        # PZ = P_t Z'
+        f = h
+        for i in range(m):
+            PZ[i] = 0.0
+            for j in range(m):
+                PZ[i] += P[i,j,t]*Z[row,j]
+            f += Z[row,i]*PZ[i]
+        F[0,0,t] = f
+
+        # K_t = T P_t Z' / F_t
+        for i in range(m):
+            tpz = 0.0
+            for j in range(m):
+                tpz += T[i,j]*PZ[j]
+            K[i,t] = tpz/f
+
+        # a_t+1 = T a_t + K_t v_t
+        for i in range(m):
+            a[i,t+1] = K[i,t]*v[t]
+            for j in range(m):
+                a[i,t+1] += T[i,j]*a[j,t]
+
+        if t == steady:
+            for i in range(m):
+                for j in range(m):
+                    P[i,j,t+1] = P[i,j,t]
+            continue
+
+        # P_t+1 = T P_t T' + RQR' - F_t K_t K_t'
+        for i in range(m):
+            for j in range(m):
+                TP[i,j] = 0.0
+                for k in range(m):
+                    TP[i,j] += T[i,k]*P[k,j,t]
+        for i in range(m):
+            for j in range(m):
+                P[i,j,t+1] = RQR[i,j] - f*K[i,t]*K[j,t]
+                for k in range(m):
+                    P[i,j,t+1] += TP[i,k]*T[j,k]
+
+        if not z_varies and has_converged(P[:,:,t+1], P[:,:,t], tol):
+            steady = t+1
+
+    return steady
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.cdivision(True)
+cdef double small_kalman_loglik(double[:] y, double[:,::1] Z, bint z_varies, double h, double[:,::1] T,
+    double[:,::1] RQR, double mu, double[::1] a, double[:,::1] P, double[::1] a_next,
+    double[::1] PZ, double[::1] K, double[:,::1] TP, double[:,::1] P_next, double tol) nogil:
+    """ Prediction error decomposition log-likelihood for a small state dimension m
+
+    Only the current state a (m) and variance P (m, m) are kept; both hold the initial
+    values on entry and are overwritten as the filter runs. Z is (1, m), or (n, m) with
+    z_varies set for a time-varying design. a_next, PZ, K, TP and P_next are work buffers.
+
+    For a time-invariant design, once P_t+1 is within tol of P_t the gain is held fixed and
+    the Riccati update is skipped.
+    """
+
+    cdef Py_ssize_t t, i, j, k, row
+    cdef Py_ssize_t m = a.shape[0]
+    cdef double f, v, tpz, log_f
+    cdef bint steady = False
+    cdef double loglik = 0.0
+
+    for t in range(y.shape[0]):
+        row = t if z_varies else 0
+
+        v = y[t] - mu
+        for i in range(m):
+            v -= Z[row,i]*a[i]
+
+        if not steady:
+            f = h
+            for i in range(m):
+                PZ[i] = 0.0
+                for j in range(m):
+                    PZ[i] += P[i,j]*Z[row,j]
+                f += Z[row,i]*PZ[i]
+
+            # log|F_t|, as with np.linalg.slogdet: F_t can turn negative under the diffuse prior
+            log_f = log(fabs(f))
+
+            for i in range(m):
+                tpz = 0.0
+                for j in range(m):
+                    tpz += T[i,j]*PZ[j]
+                K[i] = tpz/f
+
+        loglik += log_f + v*v/f
+
+        for i in range(m):
+            a_next[i] = K[i]*v
+            for j in range(m):
+                a_next[i] += T[i,j]*a[j]
+        for i in range(m):
+            a[i] = a_next[i]
+
+        if steady:
+            continue
+
+        for i in range(m):
+            for j in range(m):
+                TP[i,j] = 0.0
+                for k in range(m):
+                    TP[i,j] += T[i,k]*P[k,j]
+        for i in range(m):
+            for j in range(m):
+                P_next[i,j] = RQR[i,j] - f*K[i]*K[j]
+                for k in range(m):
+                    P_next[i,j] += TP[i,k]*T[j,k]
+
+        if not z_varies and has_converged(P_next, P, tol):
+            steady = True
+        for i in range(m):
+            for j in range(m):
+                P[i,j] = P_next[i,j]
+
+    return -0.5*(y.shape[0]*log(2.0*M_PI) + loglik)
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.cdivision(True)
+cdef void small_kalman_smoother(double[:,::1] Z, double[:,::1] T, double[:,::1] a, double[:,:,::1] P,
+    double[:,::1] K, double[:,:,::1] F, double[::1] v, double[:,::1] alpha, double[:,:,::1] V,
+    Py_ssize_t steady, double[::1] r, double[::1] r_star, double[:,::1] N, double[:,::1] N_star,
+    double[::1] K_star, double[:,::1] PN, double tol) nogil:
+    """ Backward smoothing pass over the output of small_kalman_filter, for a (1, m) design Z
+
+    steady is the first t from which the filter held P, K and F constant. From there on, once
+    N has converged as well, the smoothed variances are constant and N is no longer updated.
+    r, r_star, N, N_star, K_star and PN are work buffers; r and N must start at zero.
+    """
+
+    cdef Py_ssize_t t, i, j, k
+    cdef Py_ssize_t m = a.shape[0]
+    cdef double e, d, n_new, z_sum = 0.0
+    cdef double n_old = 0.0
+    cdef bint n_steady = False
+
+    for i in range(m):
+        z_sum += Z[0,i]
+
+    for t in range(a.shape[1]-2, -1, -1):
+        if t == 0:
+            for i in range(m):
+                alpha[i,t] = a[i,t]
+                for j in range(m):
+                    V[i,j,t] = P[i,j,t]
+            break
+
+        for i in range(m):
+            r_star[i] = 0.0
+            for j in range(m):
+                r_star[i] += T[j,i]*r[j]
+
+        e = v[t]/F[0,0,t]
+        for i in range(m):
+            e -= K[i,t]*r_star[i]
+
+        for i in range(m):
+            r[i] = Z[0,i]*e + r_star[i]
+
+        for i in range(m):
+            alpha[i,t] = a[i,t]
+            for j in range(m):
+                alpha[i,t] += P[i,j,t]*r[j]
+
+        if n_steady and t >= steady:
+            for i in range(m):
+                for j in range(m):
+                    V[i,j,t] = V[i,j,t+1]
+            continue
+
+        # N*_t = T N_t T', K*_t = N*_t K_t, D_t = 1/F_t + K_t'K*_t
+        for i in range(m):
+            for j in range(m):
+                PN[i,j] = 0.0
+                for k in range(m):
+                    PN[i,j] += T[i,k]*N[k,j]
+        for i in range(m):
+            for j in range(m):
+                N_star[i,j] = 0.0
+                for k in range(m):
+                    N_star[i,j] += PN[i,k]*T[j,k]
+        d = 1.0/F[0,0,t]
+        for i in range(m):
+            K_star[i] = 0.0
+            for j in range(m):
+                K_star[i] += N_star[i,j]*K[j,t]
+            d += K[i,t]*K_star[i]
+
+        # Every element of N_t-1 is the scalar Z'D_tZ
+        n_new = d*z_sum*z_sum
+        n_steady = t > steady and fabs(n_new - n_old) <= tol*fabs(n_new)
+        n_old = n_new
+        for i in range(m):
+            for j in range(m):
+                N[i,j] = n_new
+
+        # V_t = P_t - P_t N_t-1 P_t
+        for i in range(m):
+            for j in range(m):
+                PN[i,j] = 0.0
+                for k in range(m):
+                    PN[i,j] += P[i,k,t]*N[k,j]
+        for i in range(m):
+            for j in range(m):
+                V[i,j,t] = P[i,j,t]
+                for k in range(m):
+                    V[i,j,t] -= PN[i,k]*P[k,j,t]
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.cdivision(True)
+cdef void small_state_smoother(double[:] y, double[:,::1] Z, bint z_varies, double[:,::1] T, double mu,
+    double[:,:,::1] P, double[:,::1] K, double[:,:,::1] F, double[:,::1] a, double[::1] v,
+    double[:,::1] alpha, double[::1] r, double[::1] r_star) nogil:
+    """ Smoothed state means of y, reusing P, K and F from a small_kalman_filter pass
+
+    P, K and F do not depend on the data, so any series of the same length and model can be
+    smoothed with the forward mean recursion and the backward r recursion alone. a[:,0] holds
+    the initial state; a, v, r and r_star are work buffers.
+    """
+
+    cdef Py_ssize_t t, i, j, row
+    cdef Py_ssize_t m = a.shape[0]
+    cdef double fitted, e
+
+    # a_t+1 = T a_t + K_t v_t
+    for t in range(y.shape[0]):
+        row = t if z_varies else 0
+        fitted = 0.0
+        for i in range(m):
+            fitted += Z[row,i]*a[i,t]
+        v[t] = y[t] - fitted - mu
+        for i in range(m):
+            a[i,t+1] = K[i,t]*v[t]
+            for j in range(m):
+                a[i,t+1] += T[i,j]*a[j,t]
+
+    # r_t-1 = Z_t'(v_t/F_t - K_t'T'r_t) + T'r_t, alpha_t = a_t + P_t r_t-1
+    for i in range(m):
+        r[i] = 0.0
+    for t in range(y.shape[0]-1, -1, -1):
+        if t == 0:
+            for i in range(m):
+                alpha[i,t] = a[i,t]
+            break
+
+        row = t if z_varies else 0
+        for i in range(m):
+            r_star[i] = 0.0
+            for j in range(m):
+                r_star[i] += T[j,i]*r[j]
+
+        e = v[t]/F[0,0,t]
+        for i in range(m):
+            e -= K[i,t]*r_star[i]
+
+        for i in range(m):
+            r[i] = Z[row,i]*e + r_star[i]
+
+        for i in range(m):
+            alpha[i,t] = a[i,t]
+            for j in range(m):
+                alpha[i,t] += P[i,j,t]*r[j]
+
 @cython.boundscheck(False)
 @cython.wraparound(False)
 @cython.cdivision(True)
 def univariate_KFS(np.ndarray[double,ndim=1] y, np.ndarray[double,ndim=2] Z, np.ndarray[double,ndim=2] H,
-    np.ndarray[double,ndim=2] T, np.ndarray[double,ndim=2] Q, np.ndarray[double,ndim=2] R, double mu):
+    np.ndarray[double,ndim=2] T, np.ndarray[double,ndim=2] Q, np.ndarray[double,ndim=2] R, double mu,
+    double tol=1e-10):
     """ Kalman filtering and smoothing for univariate time series
 
     Notes
@@ -42,6 +376,9 @@ def univariate_KFS(np.ndarray[double,ndim=1] y, np.ndarray[double,ndim=2] Z, np.
     mu : float
         Constant term for measurement equation
 
+    tol : float
+        Relative change in P below which the gain is held fixed (0 always runs the full update)
+
     Returns
     ----------
     alpha : np.array
@@ -51,62 +388,112 @@ def univariate_KFS(np.ndarray[double,ndim=1] y, np.ndarray[double,ndim=2] Z, np.
         Variance of smoothed states
     """     
 
+    cdef Py_ssize_t m = T.shape[0]
+    cdef Py_ssize_t steady
+    Z_row = np.ascontiguousarray(np.atleast_2d(Z), dtype=np.float64)
+    T_c = np.ascontiguousarray(T, dtype=np.float64)
+
     # Filtering matrices
-    cdef np.ndarray[double, ndim=2, mode="c"] a = np.zeros((T.shape[0],y.shape[0]+1), dtype=np.float64) 
-    a[0][0] = np.mean(y[0:5]) # Initialization
-    cdef np.ndarray[double, ndim=3, mode="c"] P = np.ones((a.shape[0],a.shape[0],y.shape[0]+1), dtype=np.float64)*(10**7) # diffuse prior asumed
-    cdef np.ndarray[double, ndim=3, mode="c"] L = np.zeros((a.shape[0],a.shape[0],y.shape[0]+1), dtype=np.float64)
-    cdef np.ndarray[double, ndim=2, mode="c"] K = np.zeros((a.shape[0],y.shape[0]), dtype=np.float64)
-    cdef np.ndarray[double, ndim=1, mode="c"] v = np.zeros(y.shape[0], dtype=np.float64)
-    cdef np.ndarray[double, ndim=3, mode="c"] F = np.zeros((H.shape[0],H.shape[1],y.shape[0]), dtype=np.float64)
+    a = np.zeros((m,y.shape[0]+1), dtype=np.float64)
+    a[0,0] = np.mean(y[0:5]) # Initialization
+    P = np.empty((m,m,y.shape[0]+1), dtype=np.float64)
+    P[:,:,0] = 10**7 # diffuse prior asumed
+    K = np.zeros((m,y.shape[0]), dtype=np.float64)
+    v = np.zeros(y.shape[0], dtype=np.float64)
+    F = np.zeros((1,1,y.shape[0]), dtype=np.float64)
 
     # Smoothing matrices
-    cdef np.ndarray[double, ndim=3, mode="c"] N = np.zeros((a.shape[0],a.shape[0],y.shape[0]+1), dtype=np.float64)
-    cdef np.ndarray[double, ndim=3, mode="c"] V = np.zeros((a.shape[0],a.shape[0],y.shape[0]+1), dtype=np.float64)
-    cdef np.ndarray[double, ndim=2, mode="c"] alpha = np.zeros((T.shape[0],y.shape[0]+1), dtype=np.float64) 
-    cdef np.ndarray[double, ndim=2, mode="c"] r = np.zeros((T.shape[0],y.shape[0]+1), dtype=np.float64) 
-    cdef np.ndarray[double, ndim=2, mode="c"] r_star = np.zeros((T.shape[0],y.shape[0]+1), dtype=np.float64) 
-    cdef np.ndarray[double, ndim=2, mode="c"] K_star = np.zeros((a.shape[0],y.shape[0]), dtype=np.float64)
-    cdef np.ndarray[double, ndim=3, mode="c"] N_star = np.zeros((a.shape[0],a.shape[0],y.shape[0]+1), dtype=np.float64)
-    cdef np.ndarray[double, ndim=1, mode="c"] e = np.zeros(y.shape[0], dtype=np.float64)
-    cdef np.ndarray[double, ndim=3, mode="c"] D = np.zeros((a.shape[0],a.shape[0],y.shape[0]), dtype=np.float64)
+    alpha = np.zeros((m,y.shape[0]+1), dtype=np.float64)
+    V = np.zeros((m,m,y.shape[0]+1), dtype=np.float64)
 
-    cdef Py_ssize_t t
+    steady = small_kalman_filter(y, Z_row, False, H[0,0], T_c, np.dot(np.dot(R,Q),R.T), mu, a, P, K, F, v,
+        np.empty(m, dtype=np.float64), np.empty((m,m), dtype=np.float64), tol)
+    small_kalman_smoother(Z_row, T_c, a, P, K, F, v, alpha, V, steady, np.zeros(m, dtype=np.float64),
+        np.empty(m, dtype=np.float64), np.zeros((m,m), dtype=np.float64), np.empty((m,m), dtype=np.float64),
+        np.empty(m, dtype=np.float64), np.empty((m,m), dtype=np.float64), tol)
 
-    # FORWARDS (FILTERING)
-    for t in range(0,y.shape[0]):
-        v[t] = y[t] - np.dot(Z,a[:,t]) - mu
-        F[:,:,t] = np.dot(np.dot(Z,P[:,:,t]),Z.T) + H.ravel()[0]
-        K[:,t] = np.dot(np.dot(T,P[:,:,t]),Z.T)/(F[:,:,t]).ravel()[0]
-        L[:,:,t] = T - np.dot(K[:,t],Z)
-        a[:,t+1] = np.dot(T,a[:,t]) + np.dot(K[:,t],v[t]) 
-        P[:,:,t+1] = np.dot(np.dot(T,P[:,:,t]),T.T) + np.dot(np.dot(R,Q),R.T) - F[:,:,t].ravel()[0]*np.dot(np.array([K[:,t]]).T,np.array([K[:,t]]))
+    return alpha, V
 
-    for t in reversed(range(y.shape[0])):
-        if t != 0:
-            r_star[:,t] = np.dot(T.T,r[:,t])
-            N_star[:,:,t] = np.dot(T,np.dot(N[:,:,t],T.T))
-            K_star[:,t] = np.dot(N_star[:,:,t],K[:,t])
-            e[t] = np.dot(np.linalg.inv(F[:,:,t]),v[t]) - np.dot(K[:,t].T,r_star[:,t])
-            D[:,:,t] = np.linalg.inv(F[:,:,t]) + np.dot(K[:,t],K_star[:,t].T)
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.cdivision(True)
+def univariate_kalman(np.ndarray[double,ndim=1] y, np.ndarray[double,ndim=2] Z, np.ndarray[double,ndim=2] H,
+    np.ndarray[double,ndim=2] T, np.ndarray[double,ndim=2] Q, np.ndarray[double,ndim=2] R, double mu,
+    double tol=1e-10):
+    """ Kalman filtering for univariate time series
 
-            r[:,t-1] = np.dot(Z.T,e[t]) + r_star[:,t]
-            N[:,:,t-1] = np.dot(Z.T,np.dot(D[:,:,t],Z))
+    Notes
+    ----------
 
-            alpha[:,t] = a[:,t] + np.dot(P[:,:,t],r[:,t-1])
-            V[:,:,t] = P[:,:,t] - np.dot(np.dot(P[:,:,t],N[:,:,t-1]),P[:,:,t])
-        else:
-            alpha[:,t] = a[:,t]
-            V[:,:,t] = P[:,:,t]            
+    y = Za_t + e_t         where   e_t ~ N(0,H)  MEASUREMENT EQUATION
+    a_t = Ta_t-1 + Rn_t    where   n_t ~ N(0,Q)  STATE EQUATION
 
-    return alpha, V
+    Parameters
+    ----------
+    y : np.array
+        The time series data
+
+    Z : np.array
+        Design matrix for state matrix a
+
+    H : np.array
+        Covariance matrix for measurement noise
+
+    T : np.array
+        Design matrix for lagged state matrix in state equation
+
+    Q : np.array
+        Covariance matrix for state evolution noise
+
+    R : np.array
+        Scale matrix for state equation covariance matrix
+
+    mu : float
+        Constant term for measurement equation
+
+    tol : float
+        Relative change in P below which the gain is held fixed (0 always runs the full update)
+
+    Returns
+    ----------
+    a : np.array
+        Filtered states
+
+    P : np.array
+        Filtered variances
+
+    K : np.array
+        Kalman Gain matrices
+
+    F : np.array
+        Signal-to-noise term
+
+    v : np.array
+        Residuals
+    """         
+
+    cdef Py_ssize_t m = T.shape[0]
+    a = np.zeros((m,y.shape[0]+1), dtype=np.float64)
+    a[0,0] = np.mean(y[0:5]) # Initialization
+    P = np.empty((m,m,y.shape[0]+1), dtype=np.float64)
+    P[:,:,0] = 10**7 # diffuse prior asumed
+    K = np.zeros((m,y.shape[0]), dtype=np.float64)
+    v = np.zeros(y.shape[0], dtype=np.float64)
+    F = np.zeros((1,1,y.shape[0]), dtype=np.float64)
+
+    small_kalman_filter(y, np.ascontiguousarray(Z, dtype=np.float64), False, H[0,0],
+        np.ascontiguousarray(T, dtype=np.float64), np.dot(np.dot(R,Q),R.T), mu, a, P, K, F, v,
+        np.empty(m, dtype=np.float64), np.empty((m,m), dtype=np.float64), tol)
+
+    return a, P, K, F, v
 
 @cython.boundscheck(False)
 @cython.wraparound(False)
 @cython.cdivision(True)
-def univariate_kalman(np.ndarray[double,ndim=1] y, np.ndarray[double,ndim=2] Z, np.ndarray[double,ndim=2] H,
-    np.ndarray[double,ndim=2] T, np.ndarray[double,ndim=2] Q, np.ndarray[double,ndim=2] R, double mu):
-    """ Kalman filtering for univariate time series
+def llev_univariate_kalman(double[:] y, np.ndarray[double,ndim=2] Z, np.ndarray[double,ndim=2] H,
+    np.ndarray[double,ndim=2] T, np.ndarray[double,ndim=2] Q, np.ndarray[double,ndim=2] R, double mu,
+    double tol=1e-10):
+    """ Kalman filtering for univariate time series with a single state
 
     Notes
     ----------
@@ -114,6 +501,8 @@ def univariate_kalman(np.ndarray[double,ndim=1] y, np.ndarray[double,ndim=2] Z,
     y = Za_t + e_t         where   e_t ~ N(0,H)  MEASUREMENT EQUATION
     a_t = Ta_t-1 + Rn_t    where   n_t ~ N(0,Q)  STATE EQUATION
 
+    All matrices are (1, 1), so the recursion is carried out on scalars.
+
     Parameters
     ----------
     y : np.array
@@ -137,6 +526,9 @@ def univariate_kalman(np.ndarray[double,ndim=1] y, np.ndarray[double,ndim=2] Z,
     mu : float
         Constant term for measurement equation
 
+    tol : float
+        Relative change in P below which the gain is held fixed (0 always runs the full update)
+
     Returns
     ----------
     a : np.array
@@ -155,28 +547,175 @@ def univariate_kalman(np.ndarray[double,ndim=1] y, np.ndarray[double,ndim=2] Z,
         Residuals
     """         
 
-    cdef np.ndarray[double, ndim=2, mode="c"] a = np.zeros((T.shape[0],y.shape[0]+1), dtype=np.float64) 
-    a[0][0] = np.mean(y[0:5]) # Initialization
-    cdef np.ndarray[double, ndim=3, mode="c"] P = np.ones((a.shape[0],a.shape[0],y.shape[0]+1), dtype=np.float64)*(10**7) # diffuse prior asumed
+    cdef Py_ssize_t t
+    cdef double z = Z[0,0], h = H[0,0], tr = T[0,0]
+    cdef double rqr = R[0,0]*Q[0,0]*R[0,0]
+    cdef double f, k
+    cdef bint steady = False
+
+    a_arr = np.zeros((1,y.shape[0]+1), dtype=np.float64)
+    a_arr[0][0] = np.mean(y[0:5]) # Initialization
+    P_arr = np.empty((1,1,y.shape[0]+1), dtype=np.float64)
+    P_arr[0,0,0] = 10**7 # diffuse prior asumed
+    K_arr = np.zeros((1,y.shape[0]), dtype=np.float64)
+    v_arr = np.zeros(y.shape[0], dtype=np.float64)
+    F_arr = np.zeros((1,1,y.shape[0]), dtype=np.float64)
+
+    cdef double[::1] a = a_arr[0]
+    cdef double[::1] P = P_arr[0,0]
+    cdef double[::1] K = K_arr[0]
+    cdef double[::1] v = v_arr
+    cdef double[::1] F = F_arr[0,0]
+
+    with nogil:
+        for t in range(y.shape[0]):
+            v[t] = y[t] - z*a[t] - mu
+            if not steady:
+                f = z*P[t]*z + h
+                k = tr*P[t]*z/f
+            F[t] = f
+            K[t] = k
+            a[t+1] = tr*a[t] + k*v[t]
+            if steady:
+                P[t+1] = P[t]
+            else:
+                P[t+1] = tr*P[t]*tr + rqr - f*k*k
+                steady = fabs(P[t+1] - P[t]) <= tol*fabs(P[t+1])
+
+    return a_arr, P_arr, K_arr, F_arr, v_arr
 
-    cdef np.ndarray[double, ndim=2, mode="c"] K = np.zeros((a.shape[0],y.shape[0]), dtype=np.float64)
-    cdef np.ndarray[double, ndim=1, mode="c"] v = np.zeros(y.shape[0], dtype=np.float64)
-    cdef np.ndarray[double, ndim=3, mode="c"] F = np.zeros((H.shape[0],H.shape[1],y.shape[0]), dtype=np.float64)
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.cdivision(True)
+def llev_univariate_loglik(double[:] y, np.ndarray[double,ndim=2] Z, np.ndarray[double,ndim=2] H,
+    np.ndarray[double,ndim=2] T, np.ndarray[double,ndim=2] Q, np.ndarray[double,ndim=2] R, double mu,
+    double tol=1e-10):
+    """ Kalman filter log-likelihood for univariate time series with a single state
+
+    Notes
+    ----------
+
+    y = Za_t + e_t         where   e_t ~ N(0,H)  MEASUREMENT EQUATION
+    a_t = Ta_t-1 + Rn_t    where   n_t ~ N(0,Q)  STATE EQUATION
+
+    All matrices are (1, 1); only the current state and its variance are kept.
+
+    Parameters
+    ----------
+    y : np.array
+        The time series data
+
+    Z : np.array
+        Design matrix for state matrix a
+
+    H : np.array
+        Covariance matrix for measurement noise
+
+    T : np.array
+        Design matrix for lagged state matrix in state equation
+
+    Q : np.array
+        Covariance matrix for state evolution noise
+
+    R : np.array
+        Scale matrix for state equation covariance matrix
+
+    mu : float
+        Constant term for measurement equation
+
+    tol : float
+        Relative change in P below which the gain is held fixed (0 always runs the full update)
+
+    Returns
+    ----------
+    loglik : float
+        Log-likelihood of the data
+    """         
 
     cdef Py_ssize_t t
+    cdef double z = Z[0,0], h = H[0,0], tr = T[0,0]
+    cdef double rqr = R[0,0]*Q[0,0]*R[0,0]
+    cdef double a = np.mean(y[0:5]) # Initialization
+    cdef double P = 10**7 # diffuse prior asumed
+    cdef double f, k, v, log_f, P_next
+    cdef bint steady = False
+    cdef double loglik = 0.0
+
+    with nogil:
+        for t in range(y.shape[0]):
+            v = y[t] - z*a - mu
+            if not steady:
+                f = z*P*z + h
+                # log|F_t|, as with np.linalg.slogdet: F_t can turn negative under the diffuse prior
+                log_f = log(fabs(f))
+                k = tr*P*z/f
+            loglik += log_f + v*v/f
+            a = tr*a + k*v
+            if not steady:
+                P_next = tr*P*tr + rqr - f*k*k
+                steady = fabs(P_next - P) <= tol*fabs(P_next)
+                P = P_next
+
+    return -0.5*(y.shape[0]*log(2.0*M_PI) + loglik)
 
-    for t in range(0,y.shape[0]):
-        v[t] = y[t] - np.dot(Z,a[:,t]) - mu
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.cdivision(True)
+def univariate_loglik(np.ndarray[double,ndim=1] y, np.ndarray Z, np.ndarray[double,ndim=2] H,
+    np.ndarray[double,ndim=2] T, np.ndarray[double,ndim=2] Q, np.ndarray[double,ndim=2] R, double mu,
+    double tol=1e-10):
+    """ Kalman filter log-likelihood for univariate time series
 
-        F[:,:,t] = np.dot(np.dot(Z,P[:,:,t]),Z.T) + H.ravel()[0]
+    Notes
+    ----------
 
-        K[:,t] = np.dot(np.dot(T,P[:,:,t]),Z.T)/(F[:,:,t]).ravel()[0]
+    y = Za_t + e_t         where   e_t ~ N(0,H)  MEASUREMENT EQUATION
+    a_t = Ta_t-1 + Rn_t    where   n_t ~ N(0,Q)  STATE EQUATION
 
-        a[:,t+1] = np.dot(T,a[:,t]) + np.dot(K[:,t],v[t]) 
+    Only the current state and its variance are kept, so memory does not grow with the
+    length of the series.
 
-        P[:,:,t+1] = np.dot(np.dot(T,P[:,:,t]),T.T) + np.dot(np.dot(R,Q),R.T) - F[:,:,t].ravel()[0]*np.dot(np.array([K[:,t]]).T,np.array([K[:,t]]))
+    Parameters
+    ----------
+    y : np.array
+        The time series data
 
-    return a, P, K, F, v
+    Z : np.array
+        Design matrix for state matrix a
+
+    H : np.array
+        Covariance matrix for measurement noise
+
+    T : np.array
+        Design matrix for lagged state matrix in state equation
+
+    Q : np.array
+        Covariance matrix for state evolution noise
+
+    R : np.array
+        Scale matrix for state equation covariance matrix
+
+    mu : float
+        Constant term for measurement equation
+
+    tol : float
+        Relative change in P below which the gain is held fixed (0 always runs the full update)
+
+    Returns
+    ----------
+    loglik : float
+        Log-likelihood of the data
+    """         
+
+    cdef Py_ssize_t m = T.shape[0]
+    a = np.zeros(m, dtype=np.float64)
+    a[0] = np.mean(y[0:5]) # Initialization
+    P = np.ones((m,m), dtype=np.float64)*(10**7) # diffuse prior asumed
+
+    return small_kalman_loglik(y, np.ascontiguousarray(np.atleast_2d(Z), dtype=np.float64), False, H[0,0],
+        np.ascontiguousarray(T, dtype=np.float64), np.dot(np.dot(R,Q),R.T), mu, a, P, np.empty(m, dtype=np.float64),
+        np.empty(m, dtype=np.float64), np.empty(m, dtype=np.float64), np.empty((m,m), dtype=np.float64),
+        np.empty((m,m), dtype=np.float64), tol)
 
 @cython.boundscheck(False)
 @cython.wraparound(False)
@@ -256,7 +795,8 @@ def univariate_kalman_fcst(np.ndarray[double,ndim=1] y, np.ndarray[double,ndim=2
 @cython.wraparound(False)
 @cython.cdivision(True)
 def llt_univariate_KFS(np.ndarray[double,ndim=1] y, np.ndarray[double,ndim=1] Z, np.ndarray[double,ndim=2] H,
-    np.ndarray[double,ndim=2] T, np.ndarray[double,ndim=2] Q, np.ndarray[double,ndim=2] R, double mu):
+    np.ndarray[double,ndim=2] T, np.ndarray[double,ndim=2] Q, np.ndarray[double,ndim=2] R, double mu,
+    double tol=1e-10):
     """ Kalman filtering and smoothing for univariate time series
 
     Notes
@@ -288,6 +828,9 @@ def llt_univariate_KFS(np.ndarray[double,ndim=1] y, np.ndarray[double,ndim=1] Z,
     mu : float
         Constant term for measurement equation
 
+    tol : float
+        Relative change in P below which the gain is held fixed (0 always runs the full update)
+
     Returns
     ----------
     alpha : np.array
@@ -297,53 +840,29 @@ def llt_univariate_KFS(np.ndarray[double,ndim=1] y, np.ndarray[double,ndim=1] Z,
         Variance of smoothed states
     """     
 
+    cdef Py_ssize_t m = T.shape[0]
+    cdef Py_ssize_t steady
+    Z_row = np.ascontiguousarray(np.atleast_2d(Z), dtype=np.float64)
+    T_c = np.ascontiguousarray(T, dtype=np.float64)
+
     # Filtering matrices
-    cdef np.ndarray[double, ndim=2, mode="c"] a = np.zeros((T.shape[0],y.shape[0]+1), dtype=np.float64) 
-    a[0][0] = np.mean(y[0:5]) # Initialization
-    cdef np.ndarray[double, ndim=3, mode="c"] P = np.ones((a.shape[0],a.shape[0],y.shape[0]+1), dtype=np.float64)*(10**7) # diffuse prior asumed
-    cdef np.ndarray[double, ndim=3, mode="c"] L = np.zeros((a.shape[0],a.shape[0],y.shape[0]+1), dtype=np.float64)
-    cdef np.ndarray[double, ndim=2, mode="c"] K = np.zeros((a.shape[0],y.shape[0]), dtype=np.float64)
-    cdef np.ndarray[double, ndim=1, mode="c"] v = np.zeros(y.shape[0], dtype=np.float64)
-    cdef np.ndarray[double, ndim=3, mode="c"] F = np.zeros((H.shape[0],H.shape[1],y.shape[0]), dtype=np.float64)
+    a = np.zeros((m,y.shape[0]+1), dtype=np.float64)
+    a[0,0] = np.mean(y[0:5]) # Initialization
+    P = np.empty((m,m,y.shape[0]+1), dtype=np.float64)
+    P[:,:,0] = 10**7 # diffuse prior asumed
+    K = np.zeros((m,y.shape[0]), dtype=np.float64)
+    v = np.zeros(y.shape[0], dtype=np.float64)
+    F = np.zeros((1,1,y.shape[0]), dtype=np.float64)
 
     # Smoothing matrices
-    cdef np.ndarray[double, ndim=3, mode="c"] N = np.zeros((a.shape[0],a.shape[0],y.shape[0]+1), dtype=np.float64)
-    cdef np.ndarray[double, ndim=3, mode="c"] V = np.zeros((a.shape[0],a.shape[0],y.shape[0]+1), dtype=np.float64)
-    cdef np.ndarray[double, ndim=2, mode="c"] alpha = np.zeros((T.shape[0],y.shape[0]+1), dtype=np.float64) 
-    cdef np.ndarray[double, ndim=2, mode="c"] r = np.zeros((T.shape[0],y.shape[0]+1), dtype=np.float64) 
-    cdef np.ndarray[double, ndim=2, mode="c"] r_star = np.zeros((T.shape[0],y.shape[0]+1), dtype=np.float64) 
-    cdef np.ndarray[double, ndim=2, mode="c"] K_star = np.zeros((a.shape[0],y.shape[0]), dtype=np.float64)
-    cdef np.ndarray[double, ndim=3, mode="c"] N_star = np.zeros((a.shape[0],a.shape[0],y.shape[0]+1), dtype=np.float64)
-    cdef np.ndarray[double, ndim=1, mode="c"] e = np.zeros(y.shape[0], dtype=np.float64)
-    cdef np.ndarray[double, ndim=3, mode="c"] D = np.zeros((a.shape[0],a.shape[0],y.shape[0]), dtype=np.float64)
-
-    cdef Py_ssize_t t
-
-    # FORWARDS (FILTERING)
-    for t in range(0,y.shape[0]):
-        v[t] = y[t] - np.dot(Z,a[:,t]) - mu
-        F[:,:,t] = np.dot(np.dot(Z,P[:,:,t]),Z.T) + H.ravel()[0]
-        K[:,t] = np.dot(np.dot(T,P[:,:,t]),Z.T)/(F[:,:,t]).ravel()[0]
-        L[:,:,t] = T - np.dot(K[:,t],Z)
-        a[:,t+1] = np.dot(T,a[:,t]) + np.dot(K[:,t],v[t]) 
-        P[:,:,t+1] = np.dot(np.dot(T,P[:,:,t]),T.T) + np.dot(np.dot(R,Q),R.T) - F[:,:,t].ravel()[0]*np.dot(np.array([K[:,t]]).T,np.array([K[:,t]]))
-
-    for t in reversed(range(y.shape[0])):
-        if t != 0:
-            r_star[:,t] = np.dot(T.T,r[:,t])
-            N_star[:,:,t] = np.dot(T,np.dot(N[:,:,t],T.T))
-            K_star[:,t] = np.dot(N_star[:,:,t],K[:,t])
-            e[t] = np.dot(np.linalg.inv(F[:,:,t]),v[t]) - np.dot(K[:,t].T,r_star[:,t])
-            D[:,:,t] = np.linalg.inv(F[:,:,t]) + np.dot(K[:,t],K_star[:,t].T)
+    alpha = np.zeros((m,y.shape[0]+1), dtype=np.float64)
+    V = np.zeros((m,m,y.shape[0]+1), dtype=np.float64)
 
-            r[:,t-1] = np.dot(Z.T,e[t]) + r_star[:,t]
-            N[:,:,t-1] = np.dot(Z.T,np.dot(D[:,:,t],Z))
-
-            alpha[:,t] = a[:,t] + np.dot(P[:,:,t],r[:,t-1])
-            V[:,:,t] = P[:,:,t] - np.dot(np.dot(P[:,:,t],N[:,:,t-1]),P[:,:,t])
-        else:
-            alpha[:,t] = a[:,t]
-            V[:,:,t] = P[:,:,t]            
+    steady = small_kalman_filter(y, Z_row, False, H[0,0], T_c, np.dot(np.dot(R,Q),R.T), mu, a, P, K, F, v,
+        np.empty(m, dtype=np.float64), np.empty((m,m), dtype=np.float64), tol)
+    small_kalman_smoother(Z_row, T_c, a, P, K, F, v, alpha, V, steady, np.zeros(m, dtype=np.float64),
+        np.empty(m, dtype=np.float64), np.zeros((m,m), dtype=np.float64), np.empty((m,m), dtype=np.float64),
+        np.empty(m, dtype=np.float64), np.empty((m,m), dtype=np.float64), tol)
 
     return alpha, V
 
@@ -351,7 +870,8 @@ def llt_univariate_KFS(np.ndarray[double,ndim=1] y, np.ndarray[double,ndim=1] Z,
 @cython.wraparound(False)
 @cython.cdivision(True)
 def llt_univariate_kalman(np.ndarray[double,ndim=1] y, np.ndarray[double,ndim=1] Z, np.ndarray[double,ndim=2] H,
-    np.ndarray[double,ndim=2] T, np.ndarray[double,ndim=2] Q, np.ndarray[double,ndim=2] R, double mu):
+    np.ndarray[double,ndim=2] T, np.ndarray[double,ndim=2] Q, np.ndarray[double,ndim=2] R, double mu,
+    double tol=1e-10):
     """ Kalman filtering for univariate time series
 
     Notes
@@ -383,6 +903,9 @@ def llt_univariate_kalman(np.ndarray[double,ndim=1] y, np.ndarray[double,ndim=1]
     mu : float
         Constant term for measurement equation
 
+    tol : float
+        Relative change in P below which the gain is held fixed (0 always runs the full update)
+
     Returns
     ----------
     a : np.array
@@ -401,28 +924,63 @@ def llt_univariate_kalman(np.ndarray[double,ndim=1] y, np.ndarray[double,ndim=1]
         Residuals
     """         
 
-    cdef np.ndarray[double, ndim=2, mode="c"] a = np.zeros((T.shape[0],y.shape[0]+1), dtype=np.float64) 
-    a[0][0] = np.mean(y[0:5]) # Initialization
-    cdef np.ndarray[double, ndim=3, mode="c"] P = np.ones((a.shape[0],a.shape[0],y.shape[0]+1), dtype=np.float64)*(10**7) # diffuse prior asumed
-
-    cdef np.ndarray[double, ndim=2, mode="c"] K = np.zeros((a.shape[0],y.shape[0]), dtype=np.float64)
-    cdef np.ndarray[double, ndim=1, mode="c"] v = np.zeros(y.shape[0], dtype=np.float64)
-    cdef np.ndarray[double, ndim=3, mode="c"] F = np.zeros((H.shape[0],H.shape[1],y.shape[0]), dtype=np.float64)
-
     cdef Py_ssize_t t
-
-    for t in range(0,y.shape[0]):
-        v[t] = y[t] - np.dot(Z,a[:,t]) - mu
-
-        F[:,:,t] = np.dot(np.dot(Z,P[:,:,t]),Z.T) + H.ravel()[0]
-
-        K[:,t] = np.dot(np.dot(T,P[:,:,t]),Z.T)/(F[:,:,t]).ravel()[0]
-
-        a[:,t+1] = np.dot(T,a[:,t]) + np.dot(K[:,t],v[t]) 
-
-        P[:,:,t+1] = np.dot(np.dot(T,P[:,:,t]),T.T) + np.dot(np.dot(R,Q),R.T) - F[:,:,t].ravel()[0]*np.dot(np.array([K[:,t]]).T,np.array([K[:,t]]))
-
-    return a, P, K, F, v
+    cdef double h = H[0,0]
+    cdef double z0 = Z[0], z1 = Z[1]
+    cdef double t00 = T[0,0], t01 = T[0,1], t10 = T[1,0], t11 = T[1,1]
+    cdef double p00, p01, p10, p11, tp00, tp01, tp10, tp11, pz0, pz1, f, k0, k1
+    cdef bint steady = False
+    cdef double[:,::1] RQR = np.dot(np.dot(R,Q),R.T)
+    cdef double[:] y_view = y
+
+    a_arr = np.zeros((2,y.shape[0]+1), dtype=np.float64)
+    a_arr[0][0] = np.mean(y[0:5]) # Initialization
+    P_arr = np.empty((2,2,y.shape[0]+1), dtype=np.float64)
+    P_arr[:,:,0] = 10**7 # diffuse prior asumed
+    K_arr = np.zeros((2,y.shape[0]), dtype=np.float64)
+    v_arr = np.zeros(y.shape[0], dtype=np.float64)
+    F_arr = np.zeros((1,1,y.shape[0]), dtype=np.float64)
+
+    cdef double[:,::1] a = a_arr
+    cdef double[:,:,::1] P = P_arr
+    cdef double[:,::1] K = K_arr
+    cdef double[::1] v = v_arr
+    cdef double[:,:,::1] F = F_arr
+
+    with nogil:
+        for t in range(y.shape[0]):
+            p00, p01, p10, p11 = P[0,0,t], P[0,1,t], P[1,0,t], P[1,1,t]
+
+            v[t] = y_view[t] - z0*a[0,t] - z1*a[1,t] - mu
+
+            if not steady:
+                pz0 = p00*z0 + p01*z1
+                pz1 = p10*z0 + p11*z1
+                f = z0*pz0 + z1*pz1 + h
+                k0 = (t00*pz0 + t01*pz1)/f
+                k1 = (t10*pz0 + t11*pz1)/f
+            F[0,0,t] = f
+            K[0,t] = k0
+            K[1,t] = k1
+
+            a[0,t+1] = t00*a[0,t] + t01*a[1,t] + k0*v[t]
+            a[1,t+1] = t10*a[0,t] + t11*a[1,t] + k1*v[t]
+
+            if steady:
+                P[0,0,t+1], P[0,1,t+1], P[1,0,t+1], P[1,1,t+1] = p00, p01, p10, p11
+                continue
+
+            tp00 = t00*p00 + t01*p10
+            tp01 = t00*p01 + t01*p11
+            tp10 = t10*p00 + t11*p10
+            tp11 = t10*p01 + t11*p11
+            P[0,0,t+1] = tp00*t00 + tp01*t01 + RQR[0,0] - f*k0*k0
+            P[0,1,t+1] = tp00*t10 + tp01*t11 + RQR[0,1] - f*k0*k1
+            P[1,0,t+1] = tp10*t00 + tp11*t01 + RQR[1,0] - f*k1*k0
+            P[1,1,t+1] = tp10*t10 + tp11*t11 + RQR[1,1] - f*k1*k1
+            steady = has_converged(P[:,:,t+1], P[:,:,t], tol)
+
+    return a_arr, P_arr, K_arr, F_arr, v_arr
 
 @cython.boundscheck(False)
 @cython.wraparound(False)
@@ -498,6 +1056,360 @@ def llt_univariate_kalman_fcst(np.ndarray[double,ndim=1] y, np.ndarray[double,nd
 
     return a, P
 
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.cdivision(True)
+def batch_univariate_kalman(double[:,::1] Y, np.ndarray Z, np.ndarray[double,ndim=3] H,
+    np.ndarray[double,ndim=2] T, np.ndarray[double,ndim=3] Q, np.ndarray[double,ndim=2] R, double mu,
+    double tol=1e-10):
+    """ Kalman filtering for N univariate time series that share Z, T and R
+
+    Notes
+    ----------
+
+    y_n = Za_n,t + e_n,t         where   e_n,t ~ N(0,H_n)  MEASUREMENT EQUATION
+    a_n,t = Ta_n,t-1 + Rn_n,t    where   n_n,t ~ N(0,Q_n)  STATE EQUATION
+
+    Parameters
+    ----------
+    Y : np.array
+        (N, T) panel of time series, one per row
+
+    Z : np.array
+        Design matrix for state matrix a
+
+    H : np.array
+        (N, 1, 1) measurement noise variances
+
+    T : np.array
+        Design matrix for lagged state matrix in state equation
+
+    Q : np.array
+        (N, m, m) covariance matrices for state evolution noise
+
+    R : np.array
+        Scale matrix for state equation covariance matrix
+
+    mu : float
+        Constant term for measurement equation
+
+    tol : float
+        Relative change in P below which the gain is held fixed (0 always runs the full update)
+
+    Returns
+    ----------
+    a : np.array
+        (N, m, T+1) filtered states
+
+    P : np.array
+        (N, m, m, T+1) filtered variances
+
+    K : np.array
+        (N, m, T) Kalman Gain matrices
+
+    F : np.array
+        (N, 1, 1, T) signal-to-noise terms
+
+    v : np.array
+        (N, T) residuals
+    """         
+
+    cdef Py_ssize_t n
+    cdef Py_ssize_t m = T.shape[0]
+    cdef double[:,::1] Z_row = np.ascontiguousarray(np.atleast_2d(Z), dtype=np.float64)
+    cdef double[:,::1] T_c = np.ascontiguousarray(T, dtype=np.float64)
+    cdef double[:,:,::1] RQR = np.ascontiguousarray(np.einsum('ij,njk,lk->nil', R, Q, R))
+    cdef double[::1] h = np.ascontiguousarray(H[:,0,0])
+    cdef double[::1] PZ = np.empty(m, dtype=np.float64)
+    cdef double[:,::1] TP = np.empty((m,m), dtype=np.float64)
+
+    a_arr = np.zeros((Y.shape[0],m,Y.shape[1]+1), dtype=np.float64)
+    a_arr[:,0,0] = np.mean(np.asarray(Y)[:,0:5], axis=1) # Initialization
+    P_arr = np.empty((Y.shape[0],m,m,Y.shape[1]+1), dtype=np.float64)
+    P_arr[:,:,:,0] = 10**7 # diffuse prior asumed
+    K_arr = np.zeros((Y.shape[0],m,Y.shape[1]), dtype=np.float64)
+    F_arr = np.zeros((Y.shape[0],1,1,Y.shape[1]), dtype=np.float64)
+    v_arr = np.zeros((Y.shape[0],Y.shape[1]), dtype=np.float64)
+
+    cdef double[:,:,::1] a = a_arr
+    cdef double[:,:,:,::1] P = P_arr
+    cdef double[:,:,::1] K = K_arr
+    cdef double[:,:,:,::1] F = F_arr
+    cdef double[:,::1] v = v_arr
+
+    with nogil:
+        for n in range(Y.shape[0]):
+            small_kalman_filter(Y[n], Z_row, False, h[n], T_c, RQR[n], mu, a[n], P[n], K[n], F[n], v[n],
+                PZ, TP, tol)
+
+    return a_arr, P_arr, K_arr, F_arr, v_arr
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.cdivision(True)
+def batch_univariate_loglik(double[:,::1] Y, np.ndarray Z, np.ndarray[double,ndim=3] H,
+    np.ndarray[double,ndim=2] T, np.ndarray[double,ndim=3] Q, np.ndarray[double,ndim=2] R, double mu,
+    double tol=1e-10):
+    """ Kalman filter log-likelihoods for N univariate time series that share Z, T and R
+
+    Only the current state and variance of one series are kept at a time, so memory does
+    not grow with the length of the series.
+
+    Parameters
+    ----------
+    Y : np.array
+        (N, T) panel of time series, one per row
+
+    Z : np.array
+        Design matrix for state matrix a
+
+    H : np.array
+        (N, 1, 1) measurement noise variances
+
+    T : np.array
+        Design matrix for lagged state matrix in state equation
+
+    Q : np.array
+        (N, m, m) covariance matrices for state evolution noise
+
+    R : np.array
+        Scale matrix for state equation covariance matrix
+
+    mu : float
+        Constant term for measurement equation
+
+    tol : float
+        Relative change in P below which the gain is held fixed (0 always runs the full update)
+
+    Returns
+    ----------
+    loglik : np.array
+        (N,) log-likelihood of each series
+    """         
+
+    cdef Py_ssize_t n, i, j
+    cdef Py_ssize_t m = T.shape[0]
+    cdef double[:,::1] Z_row = np.ascontiguousarray(np.atleast_2d(Z), dtype=np.float64)
+    cdef double[:,::1] T_c = np.ascontiguousarray(T, dtype=np.float64)
+    cdef double[:,:,::1] RQR = np.ascontiguousarray(np.einsum('ij,njk,lk->nil', R, Q, R))
+    cdef double[::1] h = np.ascontiguousarray(H[:,0,0])
+    cdef double[::1] a0 = np.mean(np.asarray(Y)[:,0:5], axis=1) # Initialization
+    cdef double[::1] a = np.empty(m, dtype=np.float64)
+    cdef double[:,::1] P = np.empty((m,m), dtype=np.float64)
+    cdef double[::1] a_next = np.empty(m, dtype=np.float64)
+    cdef double[::1] PZ = np.empty(m, dtype=np.float64)
+    cdef double[::1] K = np.empty(m, dtype=np.float64)
+    cdef double[:,::1] TP = np.empty((m,m), dtype=np.float64)
+    cdef double[:,::1] P_next = np.empty((m,m), dtype=np.float64)
+
+    loglik_arr = np.zeros(Y.shape[0], dtype=np.float64)
+    cdef double[::1] loglik = loglik_arr
+
+    with nogil:
+        for n in range(Y.shape[0]):
+            for i in range(m):
+                a[i] = 0.0
+                for j in range(m):
+                    P[i,j] = 10**7 # diffuse prior asumed
+            a[0] = a0[n]
+            loglik[n] = small_kalman_loglik(Y[n], Z_row, False, h[n], T_c, RQR[n], mu, a, P, a_next, PZ, K,
+                TP, P_next, tol)
+
+    return loglik_arr
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.cdivision(True)
+def batch_univariate_KFS(double[:,::1] Y, np.ndarray Z, np.ndarray[double,ndim=3] H,
+    np.ndarray[double,ndim=2] T, np.ndarray[double,ndim=3] Q, np.ndarray[double,ndim=2] R, double mu,
+    double tol=1e-10):
+    """ Kalman filtering and smoothing for N univariate time series that share Z, T and R
+
+    Parameters
+    ----------
+    Y : np.array
+        (N, T) panel of time series, one per row
+
+    Z : np.array
+        Design matrix for state matrix a
+
+    H : np.array
+        (N, 1, 1) measurement noise variances
+
+    T : np.array
+        Design matrix for lagged state matrix in state equation
+
+    Q : np.array
+        (N, m, m) covariance matrices for state evolution noise
+
+    R : np.array
+        Scale matrix for state equation covariance matrix
+
+    mu : float
+        Constant term for measurement equation
+
+    tol : float
+        Relative change in P below which the gain is held fixed (0 always runs the full update)
+
+    Returns
+    ----------
+    alpha : np.array
+        (N, m, T+1) smoothed states
+
+    V : np.array
+        (N, m, m, T+1) variance of smoothed states
+    """     
+
+    cdef Py_ssize_t n, i, j, steady
+    cdef Py_ssize_t m = T.shape[0]
+    cdef double[:,::1] Z_row = np.ascontiguousarray(np.atleast_2d(Z), dtype=np.float64)
+    cdef double[:,::1] T_c = np.ascontiguousarray(T, dtype=np.float64)
+    cdef double[:,:,::1] RQR = np.ascontiguousarray(np.einsum('ij,njk,lk->nil', R, Q, R))
+    cdef double[::1] h = np.ascontiguousarray(H[:,0,0])
+    cdef double[::1] a0 = np.mean(np.asarray(Y)[:,0:5], axis=1) # Initialization
+
+    # Filtering matrices, reused for each series
+    cdef double[:,::1] a = np.zeros((m,Y.shape[1]+1), dtype=np.float64)
+    cdef double[:,:,::1] P = np.empty((m,m,Y.shape[1]+1), dtype=np.float64)
+    cdef double[:,::1] K = np.zeros((m,Y.shape[1]), dtype=np.float64)
+    cdef double[:,:,::1] F = np.zeros((1,1,Y.shape[1]), dtype=np.float64)
+    cdef double[::1] v = np.zeros(Y.shape[1], dtype=np.float64)
+
+    # Work buffers
+    cdef double[::1] PZ = np.empty(m, dtype=np.float64)
+    cdef double[:,::1] TP = np.empty((m,m), dtype=np.float64)
+    cdef double[::1] r = np.empty(m, dtype=np.float64)
+    cdef double[::1] r_star = np.empty(m, dtype=np.float64)
+    cdef double[:,::1] N = np.empty((m,m), dtype=np.float64)
+    cdef double[:,::1] N_star = np.empty((m,m), dtype=np.float64)
+    cdef double[::1] K_star = np.empty(m, dtype=np.float64)
+
+    alpha_arr = np.zeros((Y.shape[0],m,Y.shape[1]+1), dtype=np.float64)
+    V_arr = np.zeros((Y.shape[0],m,m,Y.shape[1]+1), dtype=np.float64)
+    cdef double[:,:,::1] alpha = alpha_arr
+    cdef double[:,:,:,::1] V = V_arr
+
+    with nogil:
+        for n in range(Y.shape[0]):
+            for i in range(m):
+                a[i,0] = 0.0
+                r[i] = 0.0
+                for j in range(m):
+                    P[i,j,0] = 10**7 # diffuse prior asumed
+                    N[i,j] = 0.0
+            a[0,0] = a0[n]
+            steady = small_kalman_filter(Y[n], Z_row, False, h[n], T_c, RQR[n], mu, a, P, K, F, v, PZ, TP, tol)
+            small_kalman_smoother(Z_row, T_c, a, P, K, F, v, alpha[n], V[n], steady, r, r_star, N, N_star,
+                K_star, TP, tol)
+
+    return alpha_arr, V_arr
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.cdivision(True)
+cdef tuple small_simulation_smoother(double[:] y, double[:,::1] Y_plus, double[:,::1] Z, bint z_varies,
+    double h, double[:,::1] T, double[:,::1] RQR, double mu, bint mean_start, double tol):
+    """ Smoothed state means of y and of every row of Y_plus from a single filter pass over y
+
+    With mean_start the first state starts at the mean of the first five observations of each
+    series, as in univariate_KFS; otherwise it starts at zero, as in dl_univariate_KFS.
+    """
+
+    cdef Py_ssize_t s, i, j
+    cdef Py_ssize_t m = T.shape[0]
+    cdef Py_ssize_t n = y.shape[0]
+    cdef double[::1] a0 = np.zeros(Y_plus.shape[0], dtype=np.float64)
+    if mean_start:
+        a0 = np.mean(np.asarray(Y_plus)[:,0:5], axis=1)
+
+    cdef double[:,::1] a = np.zeros((m,n+1), dtype=np.float64)
+    cdef double[:,:,::1] P = np.empty((m,m,n+1), dtype=np.float64)
+    cdef double[:,::1] K = np.zeros((m,n), dtype=np.float64)
+    cdef double[:,:,::1] F = np.zeros((1,1,n), dtype=np.float64)
+    cdef double[::1] v = np.zeros(n, dtype=np.float64)
+    cdef double[::1] r = np.empty(m, dtype=np.float64)
+    cdef double[::1] r_star = np.empty(m, dtype=np.float64)
+
+    alpha_arr = np.zeros((m,n+1), dtype=np.float64)
+    alpha_plus_arr = np.zeros((Y_plus.shape[0],m,n+1), dtype=np.float64)
+    cdef double[:,:,::1] alpha_plus = alpha_plus_arr
+
+    # The variances and gains come from the observed data only
+    if mean_start:
+        a[0,0] = np.mean(np.asarray(y)[0:5])
+    P[:,:,0] = 10**7 # diffuse prior asumed
+    small_kalman_filter(y, Z, z_varies, h, T, RQR, mu, a, P, K, F, v, np.empty(m, dtype=np.float64),
+        np.empty((m,m), dtype=np.float64), tol)
+    small_state_smoother(y, Z, z_varies, T, mu, P, K, F, a, v, alpha_arr, r, r_star)
+
+    with nogil:
+        for s in range(Y_plus.shape[0]):
+            for i in range(m):
+                a[i,0] = 0.0
+            a[0,0] = a0[s]
+            small_state_smoother(Y_plus[s], Z, z_varies, T, mu, P, K, F, a, v, alpha_plus[s], r, r_star)
+
+    return alpha_arr, alpha_plus_arr
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.cdivision(True)
+def univariate_simulation_smoother(np.ndarray[double,ndim=1] y, double[:,::1] Y_plus, np.ndarray Z,
+    np.ndarray[double,ndim=2] H, np.ndarray[double,ndim=2] T, np.ndarray[double,ndim=2] Q,
+    np.ndarray[double,ndim=2] R, double mu, double tol=1e-10):
+    """ Smoothed state means of a univariate time series and of S simulated series
+
+    Notes
+    ----------
+
+    y = mu + Za_t + e_t         where   e_t ~ N(0,H)  MEASUREMENT EQUATION
+    a_t = Ta_t-1 + Rn_t    where   n_t ~ N(0,Q)  STATE EQUATION
+
+    The filter runs once, over y; the simulated series reuse its variances and gains, as these
+    do not depend on the data. This gives the two smoothing passes of the Durbin-Koopman
+    simulation smoother for S draws at once.
+
+    Parameters
+    ----------
+    y : np.array
+        The time series data
+
+    Y_plus : np.array
+        (S, T) simulated series, one per row
+
+    Z : np.array
+        Design matrix for state matrix a
+
+    H : np.array
+        Covariance matrix for measurement noise
+
+    T : np.array
+        Design matrix for lagged state matrix in state equation
+
+    Q : np.array
+        Covariance matrix for state evolution noise
+
+    R : np.array
+        Scale matrix for state equation covariance matrix
+
+    mu : float
+        Constant term for measurement equation
+
+    tol : float
+        Relative change in P below which the gain is held fixed (0 always runs the full update)
+
+    Returns
+    ----------
+    alpha : np.array
+        (m, T+1) smoothed states of y
+
+    alpha_plus : np.array
+        (S, m, T+1) smoothed states of the simulated series
+    """     
+
+    return small_simulation_smoother(y, Y_plus, np.ascontiguousarray(np.atleast_2d(Z), dtype=np.float64), False,
+        H[0,0], np.ascontiguousarray(T, dtype=np.float64), np.dot(np.dot(R,Q),R.T), mu, True, tol)
+
 def nl_univariate_KFS(y,Z,H,T,Q,R,mu):
     """ Kalman filtering and smoothing for univariate time series
     Notes
@@ -783,27 +1695,128 @@ def dl_univariate_kalman(np.ndarray[double,ndim=1] y,np.ndarray[double,ndim=2] Z
         Residuals
     """         
 
-    cdef np.ndarray[double, ndim=2, mode="c"] a = np.zeros((T.shape[0],y.shape[0]+1), dtype=np.float64) 
-    cdef np.ndarray[double, ndim=3, mode="c"] P = np.ones((a.shape[0],a.shape[0],y.shape[0]+1), dtype=np.float64)*(10**7) # diffuse prior asumed
+    cdef Py_ssize_t m = T.shape[0]
+    a = np.zeros((m,y.shape[0]+1), dtype=np.float64)
+    P = np.empty((m,m,y.shape[0]+1), dtype=np.float64)
+    P[:,:,0] = 10**7 # diffuse prior asumed
+    K = np.zeros((m,y.shape[0]), dtype=np.float64)
+    v = np.zeros(y.shape[0], dtype=np.float64)
+    F = np.zeros((1,1,y.shape[0]), dtype=np.float64)
 
-    cdef np.ndarray[double, ndim=2, mode="c"] K = np.zeros((a.shape[0],y.shape[0]), dtype=np.float64)
-    cdef np.ndarray[double, ndim=1, mode="c"] v = np.zeros(y.shape[0], dtype=np.float64)
-    cdef np.ndarray[double, ndim=3, mode="c"] F = np.zeros((H.shape[0],H.shape[1],y.shape[0]), dtype=np.float64)
+    small_kalman_filter(y, np.ascontiguousarray(Z, dtype=np.float64), True, H[0,0],
+        np.ascontiguousarray(T, dtype=np.float64), np.dot(np.dot(R,Q),R.T), mu, a, P, K, F, v,
+        np.empty(m, dtype=np.float64), np.empty((m,m), dtype=np.float64), 0.0)
 
-    cdef Py_ssize_t t
+    return a, P, K, F, v
 
-    for t in range(0,y.shape[0]):
-        v[t] = y[t] - np.dot(Z[t],a[:,t]) - mu
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.cdivision(True)
+def dl_univariate_loglik(np.ndarray[double,ndim=1] y, np.ndarray Z, np.ndarray[double,ndim=2] H,
+    np.ndarray[double,ndim=2] T, np.ndarray[double,ndim=2] Q, np.ndarray[double,ndim=2] R, double mu):
+    """ Kalman filter log-likelihood for univariate time series with a time-varying design
 
-        F[:,:,t] = np.dot(np.dot(Z[t],P[:,:,t]),Z[t].T) + H.ravel()[0]
+    Notes
+    ----------
 
-        K[:,t] = np.dot(np.dot(T,P[:,:,t]),Z[t].T)/(F[:,:,t]).ravel()[0]
+    y = Za_t + e_t         where   e_t ~ N(0,H)  MEASUREMENT EQUATION
+    a_t = Ta_t-1 + Rn_t    where   n_t ~ N(0,Q)  STATE EQUATION
 
-        a[:,t+1] = np.dot(T,a[:,t]) + np.dot(K[:,t],v[t]) 
+    Only the current state and its variance are kept, so memory does not grow with the
+    length of the series.
 
-        P[:,:,t+1] = np.dot(np.dot(T,P[:,:,t]),T.T) + np.dot(np.dot(R,Q),R.T) - F[:,:,t].ravel()[0]*np.dot(np.array([K[:,t]]).T,np.array([K[:,t]]))
+    Parameters
+    ----------
+    y : np.array
+        The time series data
 
-    return a, P, K, F, v
+    Z : np.array
+        Design matrix for state matrix a
+
+    H : np.array
+        Covariance matrix for measurement noise
+
+    T : np.array
+        Design matrix for lagged state matrix in state equation
+
+    Q : np.array
+        Covariance matrix for state evolution noise
+
+    R : np.array
+        Scale matrix for state equation covariance matrix
+
+    mu : float
+        Constant term for measurement equation
+
+    Returns
+    ----------
+    loglik : float
+        Log-likelihood of the data
+    """         
+
+    cdef Py_ssize_t m = T.shape[0]
+    a = np.zeros(m, dtype=np.float64)
+    P = np.ones((m,m), dtype=np.float64)*(10**7) # diffuse prior asumed
+
+    return small_kalman_loglik(y, np.ascontiguousarray(np.atleast_2d(Z), dtype=np.float64), True, H[0,0],
+        np.ascontiguousarray(T, dtype=np.float64), np.dot(np.dot(R,Q),R.T), mu, a, P, np.empty(m, dtype=np.float64),
+        np.empty(m, dtype=np.float64), np.empty(m, dtype=np.float64), np.empty((m,m), dtype=np.float64),
+        np.empty((m,m), dtype=np.float64), 0.0)
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.cdivision(True)
+def dl_univariate_simulation_smoother(np.ndarray[double,ndim=1] y, double[:,::1] Y_plus, np.ndarray[double,ndim=2] Z,
+    np.ndarray[double,ndim=2] H, np.ndarray[double,ndim=2] T, np.ndarray[double,ndim=2] Q,
+    np.ndarray[double,ndim=2] R, double mu):
+    """ Smoothed state means of a univariate time series with a time-varying design, and of
+    S simulated series
+
+    Notes
+    ----------
+
+    y = Za_t + e_t         where   e_t ~ N(0,H)  MEASUREMENT EQUATION
+    a_t = Ta_t-1 + Rn_t    where   n_t ~ N(0,Q)  STATE EQUATION
+
+    The filter runs once, over y; the simulated series reuse its variances and gains.
+
+    Parameters
+    ----------
+    y : np.array
+        The time series data
+
+    Y_plus : np.array
+        (S, T) simulated series, one per row
+
+    Z : np.array
+        Design matrix for state matrix a
+
+    H : np.array
+        Covariance matrix for measurement noise
+
+    T : np.array
+        Design matrix for lagged state matrix in state equation
+
+    Q : np.array
+        Covariance matrix for state evolution noise
+
+    R : np.array
+        Scale matrix for state equation covariance matrix
+
+    mu : float
+        Constant term for measurement equation
+
+    Returns
+    ----------
+    alpha : np.array
+        (m, T+1) smoothed states of y
+
+    alpha_plus : np.array
+        (S, m, T+1) smoothed states of the simulated series
+    """         
+
+    return small_simulation_smoother(y, Y_plus, np.ascontiguousarray(Z, dtype=np.float64), True, H[0,0],
+        np.ascontiguousarray(T, dtype=np.float64), np.dot(np.dot(R,Q),R.T), mu, False, 0.0)
 
 @cython.boundscheck(False)
 @cython.wraparound(False)
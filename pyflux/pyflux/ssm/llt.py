@@ -153,11 +153,8 @@ class LLT(tsm.TSM):
         ----------
         The negative log logliklihood of the model
         """         
-        _, _, _, F, v = self._model(self.data,beta)
-        loglik = 0.0
-        for i in range(0,self.data.shape[0]):
-            loglik += np.linalg.slogdet(F[:,:,i])[1] + np.dot(v[i],np.dot(np.linalg.pinv(F[:,:,i]),v[i]))
-        return -(-((self.data.shape[0]/2)*np.log(2*np.pi))-0.5*loglik.T[0].sum())
+        T, Z, R, Q, H = self._ss_matrices(beta)
+        return -univariate_loglik(self.data,Z,H,T,Q,R,0.0)
 
     def mb_neg_loglik(self, beta, mini_batch):
         """ Creates the negative log likelihood of the model
@@ -177,11 +174,8 @@ class LLT(tsm.TSM):
 
         rand_int =  np.random.randint(low=0, high=self.data.shape[0]-mini_batch-self.max_lag+1)
         sample = np.arange(start=rand_int, stop=rand_int+mini_batch)
-        _, _, _, F, v = self._model(self.data[sample],beta)
-        loglik = 0.0
-        for i in range(0,len(sample)):
-            loglik += np.linalg.slogdet(F[:,:,i])[1] + np.dot(v[i],np.dot(np.linalg.pinv(F[:,:,i]),v[i]))
-        return -(-((len(sample)/2)*np.log(2*np.pi))-0.5*loglik.T[0].sum())
+        T, Z, R, Q, H = self._ss_matrices(beta)
+        return -univariate_loglik(self.data[sample],Z,H,T,Q,R,0.0)
 
 
     def plot_predict(self, h=5, past_values=20, intervals=True, **kwargs):      
@@ -508,7 +502,7 @@ class LLT(tsm.TSM):
         plt.legend(loc=2)   
         plt.show()               
 
-    def simulation_smoother(self,beta):
+    def simulation_smoother(self, beta, nsims=1):
         """ Koopman's simulation smoother - simulates from states given
         model latent variables and observations
 
@@ -518,37 +512,38 @@ class LLT(tsm.TSM):
         beta : np.array
             Contains untransformed starting values for latent variables
 
+        nsims : int (default : 1)
+            How many draws of the state evolution to simulate
+
         Returns
         ----------
-        - A simulated state evolution
+        - A simulated state evolution, or an (nsims, m, T+1) array of them if nsims > 1
         """         
 
         T, Z, R, Q, H = self._ss_matrices(beta)
+        n = self.data.shape[0]
 
-        # Generate e_t+ and n_t+
-        rnd_h = np.random.normal(0,np.sqrt(H),self.data.shape[0]+1)
-        q_dist = ss.multivariate_normal([0.0, 0.0], Q)
-        rnd_q = q_dist.rvs(self.data.shape[0]+1)
+        # Generate e_t+ and n_t+ for every draw
+        rnd_h = np.random.normal(0, np.sqrt(H[0,0]), (nsims, n))
+        rnd_q = np.random.multivariate_normal(np.zeros(T.shape[0]), Q, (nsims, n)).transpose(0,2,1)
 
         # Generate a_t+ and y_t+
-        a_plus = np.zeros((T.shape[0],self.data.shape[0]+1)) 
-        a_plus[0,0] = np.mean(self.data[0:5])
-        y_plus = np.zeros(self.data.shape[0])
-
-        for t in range(0,self.data.shape[0]+1):
-            if t == 0:
-                a_plus[:,t] = np.dot(T,a_plus[:,t]) + rnd_q[t,:]
-                y_plus[t] = np.dot(Z,a_plus[:,t]) + rnd_h[t]
-            else:
-                if t != self.data.shape[0]:
-                    a_plus[:,t] = np.dot(T,a_plus[:,t-1]) + rnd_q[t,:]
-                    y_plus[t] = np.dot(Z,a_plus[:,t]) + rnd_h[t]
-
-        alpha_hat,_ = self.smoothed_state(self.data,beta)
-        alpha_hat_plus,_ = self.smoothed_state(y_plus,beta)
+        # level_t = level_t-1 + trend_t-1 + n_t, so the level sums the lagged trend as well
+        a_plus = np.zeros((nsims, T.shape[0], n+1))
+        trend = np.cumsum(rnd_q[:,1], axis=1)
+        a_plus[:,1,:n] = trend
+        a_plus[:,0,:n] = np.mean(self.data[0:5]) + np.cumsum(rnd_q[:,0], axis=1)
+        a_plus[:,0,1:n] += np.cumsum(trend[:,:-1], axis=1)
+        y_plus = a_plus[:,0,:n] + rnd_h
+
+        # Both smoothing passes share one filter run over the data
+        alpha_hat, alpha_hat_plus = univariate_simulation_smoother(self.data, y_plus, Z, H, T, Q, R, 0.0)
         alpha_tilde = alpha_hat - alpha_hat_plus + a_plus
-    
-        return alpha_tilde
+
+        if nsims == 1:
+            return alpha_tilde[0]
+        else:
+            return alpha_tilde
 
     def smoothed_state(self,data,beta):
         """ Creates the negative log marginal likelihood of the model
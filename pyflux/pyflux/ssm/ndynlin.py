@@ -12,6 +12,7 @@ from .. import families as fam
 from .. import output as op
 from .. import tsm as tsm
 from .. import data_check as dc
+from .. import forecasting as fc
 from .. import covariances as cov
 from .. import results as res
 from .. import gas as gas
@@ -125,7 +126,7 @@ class NDynReg(tsm.TSM):
         states = np.zeros([self.state_no, self.data_length])
         for state_i in range(self.state_no):
             states[state_i,:] = beta[(self.z_no + (self.data_length*state_i)):(self.z_no + (self.data_length*(state_i+1)))]
-        parm = np.array([self.latent_variables.z_list[k].prior.transform(beta[k]) for k in range(self.z_no)]) # transformed distribution parameters
+        parm = self.latent_variables.transform_all(beta[:self.z_no]) # transformed distribution parameters
         scale, shape, skewness = self._get_scale_and_shape(parm)
         return self.state_likelihood(beta, states) + self.family.neg_loglikelihood(self.data, self.link(np.sum(self.X*states.T,axis=1)), scale, shape, skewness)  # negative loglikelihood for model
 
@@ -144,7 +145,7 @@ class NDynReg(tsm.TSM):
         states = np.zeros([self.state_no, self.data_length])
         for state_i in range(self.state_no):
             states[state_i,:] = beta[(self.z_no + (self.data_length*state_i)):(self.z_no + (self.data_length*(state_i+1)))]
-        parm = np.array([self.latent_variables.z_list[k].prior.transform(beta[k]) for k in range(self.z_no)]) # transformed distribution parameters
+        parm = self.latent_variables.transform_all(beta[:self.z_no]) # transformed distribution parameters
         scale, shape, skewness = self._get_scale_and_shape(parm)
         return self.family.markov_blanket(self.data, self.link(np.sum(self.X*states.T,axis=1)), scale, shape, skewness)  # negative loglikelihood for model
 
@@ -203,10 +204,7 @@ class NDynReg(tsm.TSM):
         ----------
         - Negative log posterior
         """
-        post = self.neg_loglik(beta)
-        for k in range(0,self.z_no):
-            post += -self.latent_variables.z_list[k].prior.logpdf(beta[k])
-        return post     
+        return self.neg_loglik(beta) - self.latent_variables.log_prior_all(beta[:self.z_no])
 
     def markov_blanket(self, beta, alpha):
         """ Creates total Markov blanket for states
@@ -501,6 +499,7 @@ class NDynReg(tsm.TSM):
         batch_size = kwargs.get('batch_size', 24) 
         learning_rate = kwargs.get('learning_rate', default_learning_rate) 
         record_elbo = kwargs.get('record_elbo', False) 
+        elbo_every = kwargs.get('elbo_every', 1)
 
         # Starting values
         gaussian_latents = self._preoptimize_model() # find parameters for Gaussian model
@@ -510,7 +509,7 @@ class NDynReg(tsm.TSM):
 
         # PERFORM BBVI
         bbvi_obj = ifr.CBBVI(self.neg_logposterior, self.log_p_blanket, q_list, batch_size, 
-            optimizer, iterations, learning_rate, record_elbo)
+            optimizer, iterations, learning_rate, record_elbo, elbo_every=elbo_every)
 
         if print_progress is False:
             bbvi_obj.printer = False
@@ -622,8 +621,8 @@ class NDynReg(tsm.TSM):
             plt.figure(figsize=figsize) 
 
             if intervals == True:
-                plt.fill_between(date_index[-h-1:], np.insert([np.percentile(i,5) for i in sim_vector],0,previous_value), 
-                    np.insert([np.percentile(i,95) for i in sim_vector],0,previous_value), alpha=0.2,label="95 C.I.")   
+                error_bars = fc.error_bars(sim_vector, previous_value, percentiles=[5, 95])
+                plt.fill_between(date_index[-h-1:], error_bars[0], error_bars[1], alpha=0.2,label="95 C.I.")   
 
             plot_values = np.append(self.data[-past_values:],forecasted_values)
             plot_index = date_index[-h-past_values:]
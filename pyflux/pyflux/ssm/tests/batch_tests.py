@@ -0,0 +1,42 @@
+import numpy as np
+import pyflux as pf
+from pyflux.ssm.batch import batch_kalman, batch_smoothed_state, batch_fit, batch_neg_loglik
+
+panel = np.cumsum(np.random.normal(0,1,(5,100)), axis=1) + np.random.normal(0,1,(5,100))
+
+def test_batch_kalman():
+	"""
+	Tests that filtering a panel of local level models matches filtering each series with LLEV
+	"""
+	z = np.random.normal(0,1,(5,2))
+	a, P, loglik = batch_kalman(panel, np.exp(z))
+	for n in range(5):
+		model = pf.LLEV(data=panel[n])
+		a_n, P_n, _, _, _ = model._model(model.data, z[n])
+		assert(np.allclose(a[n], a_n))
+		assert(np.allclose(P[n], P_n))
+		assert(np.allclose(loglik[n], -model.neg_loglik(z[n])))
+	assert(np.allclose(batch_neg_loglik(panel, z), -loglik))
+
+def test_batch_smoothed_state():
+	"""
+	Tests that smoothing a panel of local linear trend models matches smoothing each series with LLT
+	"""
+	z = np.random.normal(-1,1,(5,3))
+	alpha, V = batch_smoothed_state(panel, np.exp(z))
+	for n in range(5):
+		model = pf.LLT(data=panel[n])
+		alpha_n, V_n = model.smoothed_state(model.data, z[n])
+		assert(np.allclose(alpha[n], alpha_n, equal_nan=True))
+		assert(np.allclose(V[n], V_n, equal_nan=True))
+
+def test_batch_fit():
+	"""
+	Tests that fitting a panel of local level models reaches the likelihood of fitting each series with LLEV
+	"""
+	z, loglik = batch_fit(panel)
+	assert(z.shape == (5,2))
+	for n in range(5):
+		model = pf.LLEV(data=panel[n])
+		model.fit()
+		assert(loglik[n] > -model.neg_loglik(model.latent_variables.get_z_values()) - 1e-3)
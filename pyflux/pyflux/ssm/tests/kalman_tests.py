@@ -0,0 +1,143 @@
+import numpy as np
+import pyflux as pf
+from pyflux.ssm.kalman import univariate_kalman, llev_univariate_kalman, llt_univariate_kalman, dl_univariate_kalman
+from pyflux.ssm.kalman import univariate_loglik, llev_univariate_loglik, dl_univariate_loglik
+from pyflux.ssm.kalman import univariate_KFS, llt_univariate_KFS, dl_univariate_KFS
+from pyflux.ssm.kalman import univariate_simulation_smoother, dl_univariate_simulation_smoother
+
+data = np.cumsum(np.random.normal(0,1,100))
+
+def reference_kalman(y, Z, H, T, Q, R, a0):
+	"""
+	Kalman filter written step by step with matrix products
+	"""
+	a = np.zeros((T.shape[0],y.shape[0]+1))
+	a[:,0] = a0
+	P = np.ones((T.shape[0],T.shape[0],y.shape[0]+1))*(10**7)
+	K = np.zeros((T.shape[0],y.shape[0]))
+	F = np.zeros((1,1,y.shape[0]))
+	v = np.zeros(y.shape[0])
+	for t in range(y.shape[0]):
+		z = Z[t] if Z.shape[0] == y.shape[0] else Z[0]
+		v[t] = y[t] - np.dot(z,a[:,t])
+		F[0,0,t] = np.dot(np.dot(z,P[:,:,t]),z) + H[0,0]
+		K[:,t] = np.dot(np.dot(T,P[:,:,t]),z)/F[0,0,t]
+		a[:,t+1] = np.dot(T,a[:,t]) + K[:,t]*v[t]
+		P[:,:,t+1] = np.dot(np.dot(T,P[:,:,t]),T.T) + np.dot(np.dot(R,Q),R.T) - F[0,0,t]*np.outer(K[:,t],K[:,t])
+	return a, P, K, F, v
+
+def test_llev_kalman():
+	"""
+	Tests that the scalar and generic local level filters match the reference filter
+	"""
+	H, Q = np.identity(1)*0.5, np.identity(1)*0.2
+	expected = reference_kalman(data, np.identity(1), H, np.identity(1), Q, np.identity(1), np.mean(data[0:5]))
+	for kalman in [llev_univariate_kalman, univariate_kalman]:
+		for x, y in zip(kalman(data, np.identity(1), H, np.identity(1), Q, np.identity(1), 0.0), expected):
+			assert(np.allclose(x, y))
+
+def test_llt_kalman():
+	"""
+	Tests that the local linear trend filter matches the reference filter
+	"""
+	T = np.identity(2)
+	T[0][1] = 1
+	Z = np.array([1.0, 0.0])
+	H, Q = np.identity(1)*0.5, np.diag([0.2, 0.05])
+	expected = reference_kalman(data, np.array([Z]), H, T, Q, np.identity(2), [np.mean(data[0:5]), 0.0])
+	for x, y in zip(llt_univariate_kalman(data, Z, H, T, Q, np.identity(2), 0.0), expected):
+		assert(np.allclose(x, y))
+
+def test_dl_kalman():
+	"""
+	Tests that the dynamic regression filter, with a time-varying design, matches the reference filter
+	"""
+	X = np.random.normal(0,1,(100,3))
+	H, Q = np.identity(1)*0.5, np.diag([0.1, 0.2, 0.3])
+	expected = reference_kalman(data, X, H, np.identity(3), Q, np.identity(3), np.zeros(3))
+	for x, y in zip(dl_univariate_kalman(data, X, H, np.identity(3), Q, np.identity(3), 0.0), expected):
+		assert(np.allclose(x, y))
+
+def reference_loglik(F, v):
+	"""
+	Prediction error decomposition log-likelihood from the filter output
+	"""
+	return -0.5*(v.shape[0]*np.log(2*np.pi) + np.sum(np.log(np.abs(F[0,0])) + v**2/F[0,0]))
+
+def test_loglik():
+	"""
+	Tests that the likelihood-only filters match the log-likelihood of the full filters
+	"""
+	H, Q = np.identity(1)*0.5, np.identity(1)*0.2
+	_, _, _, F, v = llev_univariate_kalman(data, np.identity(1), H, np.identity(1), Q, np.identity(1), 0.0)
+	assert(np.allclose(llev_univariate_loglik(data, np.identity(1), H, np.identity(1), Q, np.identity(1), 0.0), reference_loglik(F, v)))
+
+	T = np.identity(2)
+	T[0][1] = 1
+	Z = np.array([1.0, 0.0])
+	Q = np.diag([0.2, 0.05])
+	_, _, _, F, v = llt_univariate_kalman(data, Z, H, T, Q, np.identity(2), 0.0)
+	assert(np.allclose(univariate_loglik(data, Z, H, T, Q, np.identity(2), 0.0), reference_loglik(F, v)))
+
+	X = np.random.normal(0,1,(100,3))
+	Q = np.diag([0.1, 0.2, 0.3])
+	_, _, _, F, v = dl_univariate_kalman(data, X, H, np.identity(3), Q, np.identity(3), 0.0)
+	assert(np.allclose(dl_univariate_loglik(data, X, H, np.identity(3), Q, np.identity(3), 0.0), reference_loglik(F, v)))
+
+def test_steady_state():
+	"""
+	Tests that holding the gain fixed once the variance converges matches running the full update throughout
+	"""
+	long_data = np.cumsum(np.random.normal(0,1,1000))
+	H, Q = np.identity(1)*0.5, np.identity(1)*0.2
+	args = (long_data, np.identity(1), H, np.identity(1), Q, np.identity(1), 0.0)
+	for kalman in [llev_univariate_kalman, univariate_kalman, univariate_KFS]:
+		for x, y in zip(kalman(*args), kalman(*args, tol=0.0)):
+			assert(np.allclose(x, y, rtol=1e-8))
+	assert(np.allclose(llev_univariate_loglik(*args), llev_univariate_loglik(*args, tol=0.0), rtol=1e-8))
+
+	T = np.identity(2)
+	T[0][1] = 1
+	Q = np.diag([0.2, 0.05])
+	args = (long_data, np.array([1.0, 0.0]), H, T, Q, np.identity(2), 0.0)
+	for x, y in zip(llt_univariate_kalman(*args), llt_univariate_kalman(*args, tol=0.0)):
+		assert(np.allclose(x, y, rtol=1e-8))
+	assert(np.allclose(univariate_loglik(*args), univariate_loglik(*args, tol=0.0), rtol=1e-8))
+
+def test_simulation_smoother():
+	"""
+	Tests that smoothing simulated series with the gains of the data matches smoothing each series on its own
+	"""
+	sims = np.cumsum(np.random.normal(0,1,(5,100)), axis=1)
+	H, Q = np.identity(1)*0.5, np.identity(1)*0.2
+	args = (np.identity(1), H, np.identity(1), Q, np.identity(1), 0.0)
+	alpha, alpha_plus = univariate_simulation_smoother(data, sims, *args)
+	assert(np.allclose(alpha, univariate_KFS(data, *args)[0]))
+	for s in range(5):
+		assert(np.allclose(alpha_plus[s], univariate_KFS(sims[s], *args)[0]))
+
+	T = np.identity(2)
+	T[0][1] = 1
+	args = (np.array([1.0, 0.0]), H, T, np.diag([0.2, 0.05]), np.identity(2), 0.0)
+	alpha, alpha_plus = univariate_simulation_smoother(data, sims, *args)
+	assert(np.allclose(alpha, llt_univariate_KFS(data, *args)[0]))
+	for s in range(5):
+		assert(np.allclose(alpha_plus[s], llt_univariate_KFS(sims[s], *args)[0]))
+
+	args = (np.random.normal(0,1,(100,3)), H, np.identity(3), np.diag([0.1, 0.2, 0.3]), np.identity(3), 0.0)
+	alpha, alpha_plus = dl_univariate_simulation_smoother(data, sims, *args)
+	assert(np.allclose(alpha, dl_univariate_KFS(data, *args)[0]))
+	for s in range(5):
+		assert(np.allclose(alpha_plus[s], dl_univariate_KFS(sims[s], *args)[0]))
+
+def test_simulation_smoother_draws():
+	"""
+	Tests that many draws from the LLEV and LLT simulation smoothers average to the smoothed state
+	"""
+	for model in [pf.LLEV(data=data), pf.LLT(data=data)]:
+		z = np.zeros(len(model.latent_variables.z_list))
+		alpha, _ = model.smoothed_state(model.data, z)
+		draws = model.simulation_smoother(z, nsims=2000)
+		assert(draws.shape == (2000, alpha.shape[0], alpha.shape[1]))
+		assert(model.simulation_smoother(z).shape == alpha.shape)
+		assert(np.allclose(draws.mean(axis=0)[:,1:-1], alpha[:,1:-1], atol=0.4))
@@ -8,12 +8,12 @@ if sys.version_info < (3,):
 
 import numpy as np
 from scipy import optimize
-import numdifftools as nd
 import pandas as pd
 
 from .covariances import acf
-from .families import Normal
-from .inference import BBVI, BBVIM, MetropolisHastings, norm_post_sim
+from .hessians import find_hessian, resolve_hessian
+from .families import Normal, Flat
+from .inference import BBVI, BBVIM, BBVIR, MetropolisHastings, norm_post_sim
 from .output import TablePrinter
 from .tests import find_p_value
 from .latent_variables import LatentVariable, LatentVariables
@@ -111,7 +111,7 @@ class TSM(object):
 
     def _bbvi_fit(self, posterior, optimizer='RMSProp', iterations=1000, 
         map_start=True, batch_size=12, mini_batch=None, learning_rate=0.001, 
-        record_elbo=False, quiet_progress=False, **kwargs):
+        record_elbo=False, quiet_progress=False, reparameterize=False, elbo_every=1, **kwargs):
         """ Performs Black Box Variational Inference
 
         Parameters
@@ -128,17 +128,30 @@ class TSM(object):
         map_start : boolean
             Whether to start values from a MAP estimate (if False, uses default starting values)
 
+        reparameterize : boolean
+            Whether to use reparameterization gradients, which need a model with an analytic
+            likelihood gradient, instead of score function gradients
+
+        elbo_every : int
+            If recording the ELBO, record it every elbo_every iterations
+
         Returns
         ----------
         BBVIResults object
         """
 
+        if reparameterize is True:
+            if mini_batch is not None:
+                raise Exception("Reparameterization gradients are not available with mini-batches")
+            elif self._objective_gradient(posterior) is None:
+                raise Exception("Reparameterization gradients need a model with an analytic likelihood gradient")
+
         # Starting values
         phi = self.latent_variables.get_z_starting_values()
         phi = kwargs.get('start',phi).copy() # If user supplied
 
         if self.model_type not in ['GPNARX','GPR','GP','GASRank'] and map_start is True and mini_batch is None:
-            p = optimize.minimize(posterior, phi, method='L-BFGS-B') # PML starting values
+            p = optimize.minimize(posterior, phi, method='L-BFGS-B', jac=self._objective_gradient(posterior)) # PML starting values
             start_loc = 0.8*p.x + 0.2*phi
         else:
             start_loc = phi
@@ -157,10 +170,25 @@ class TSM(object):
 
         q_list = [k.q for k in self.latent_variables.z_list]
 
-        if mini_batch is None:
-            bbvi_obj = BBVI(posterior, q_list, batch_size, optimizer, iterations, learning_rate, record_elbo, quiet_progress)
+        if reparameterize is True:
+            # Evaluate the gradients of all Monte Carlo draws in one pass if the model supports it
+            if hasattr(self, 'neg_loglik_gradient_batch') and posterior == self.neg_logposterior:
+                gradient_batch = self.neg_logposterior_gradient_batch
+            else:
+                gradient_batch = None
+            bbvi_obj = BBVIR(posterior, self._objective_gradient(posterior), q_list, batch_size, optimizer, iterations, 
+                learning_rate, record_elbo, quiet_progress, neg_posterior_gradient_batch=gradient_batch, elbo_every=elbo_every)
+        elif mini_batch is None:
+            # Evaluate all Monte Carlo draws in one pass if the model supports it
+            if hasattr(self, 'neg_loglik_batch') and posterior == self.neg_logposterior:
+                posterior_batch = self.neg_logposterior_batch
+            else:
+                posterior_batch = None
+            bbvi_obj = BBVI(posterior, q_list, batch_size, optimizer, iterations, learning_rate, record_elbo, quiet_progress,
+                neg_posterior_batch=posterior_batch, elbo_every=elbo_every)
         else:
-            bbvi_obj = BBVIM(posterior, self.neg_logposterior, q_list, mini_batch, optimizer, iterations, learning_rate, mini_batch, record_elbo, quiet_progress)
+            bbvi_obj = BBVIM(posterior, self.neg_logposterior, q_list, mini_batch, optimizer, iterations, learning_rate, mini_batch, record_elbo, quiet_progress,
+                elbo_every=elbo_every)
         
         q, q_z, q_ses, elbo_records = bbvi_obj.run()
         self.latent_variables.set_z_values(q_z,'BBVI',np.exp(q_ses),None)
@@ -221,7 +249,8 @@ class TSM(object):
                 z_hide=self._z_hide,max_lag=self.max_lag,states=states,states_var=states_var)
 
     def _mcmc_fit(self, scale=1.0, nsims=10000, printer=True, method="M-H", 
-        cov_matrix=None, map_start=True, quiet_progress=False, **kwargs):
+        cov_matrix=None, map_start=True, quiet_progress=False, chains=1, processes=None, 
+        adaptive=False, target_ess=None, chain_file=None, **kwargs):
         """ Performs random walk Metropolis-Hastings
 
         Parameters
@@ -240,6 +269,21 @@ class TSM(object):
 
         cov_matrix: None or np.array
             Can optionally provide a covariance matrix for M-H.
+
+        chains : int
+            How many independent chains to run
+
+        processes : int
+            How many worker processes run the chains (1 runs them serially)
+
+        adaptive : boolean
+            Whether to learn the full proposal covariance as the chain runs
+
+        target_ess : float
+            If adaptive, stop once every latent variable has this effective sample size
+
+        chain_file : str
+            If given, the samples are kept in a memory-mapped array in this file
         """
         scale = 2.38/np.sqrt(self.z_no)
 
@@ -262,7 +306,9 @@ class TSM(object):
 
         if method == "M-H":
             sampler = MetropolisHastings(self.neg_logposterior, scale, nsims, starting_values, 
-                cov_matrix=cov_matrix, model_object=None, quiet_progress=quiet_progress)
+                cov_matrix=cov_matrix, model_object=None, quiet_progress=quiet_progress,
+                chains=chains, processes=processes, adaptive=adaptive, target_ess=target_ess,
+                chain_file=chain_file)
             chain, mean_est, median_est, upper_95_est, lower_95_est = sampler.sample()
         else:
             raise Exception("Method not recognized!")
@@ -298,7 +344,7 @@ class TSM(object):
             multivariate_model=self.multivariate_model,objective_object=self.neg_logposterior, 
             method='Metropolis Hastings',samples=chain,mean_est=mean_est,median_est=median_est,lower_95_est=lower_95_est,
             upper_95_est=upper_95_est,signal=theta,scores=scores, z_hide=self._z_hide,max_lag=self.max_lag,
-            states=states,states_var=states_var)
+            states=states,states_var=states_var,rhat=sampler.rhat,ess=sampler.ess)
 
     def _ols_fit(self):
         """ Performs OLS
@@ -344,12 +390,38 @@ class TSM(object):
             method=method,ihessian=ihessian,signal=theta,scores=scores,
             z_hide=self._z_hide,max_lag=self.max_lag,states=states,states_var=states_var)
 
+    def _objective_gradient(self, obj_type):
+        """ Finds the analytic gradient of an objective, if the model supplies one
+
+        Parameters
+        ----------
+        obj_type : method
+            Whether a likelihood or a posterior
+
+        Returns
+        ----------
+        The gradient method, or None (the optimizer then uses finite differences)
+        """
+
+        if not hasattr(self, 'neg_loglik_gradient'):
+            return None
+        elif obj_type == self.neg_loglik:
+            return self.neg_loglik_gradient
+        elif obj_type == self.neg_logposterior:
+            return self.neg_logposterior_gradient
+        else:
+            return None
+
     def _optimize_fit(self, obj_type=None, **kwargs):
         """
         This function fits models using Maximum Likelihood or Penalized Maximum Likelihood
+
+        The hessian keyword picks how the inverse Hessian for the standard errors is
+        found (see hessians.find_hessian); None or False skips it for point estimates only.
         """
 
         preopt_search = kwargs.get('preopt_search', True) # If user supplied
+        hessian = resolve_hessian(self, obj_type, kwargs.get('hessian', 'auto'))
 
         if obj_type == self.neg_loglik:
             method = 'MLE'
@@ -370,26 +442,34 @@ class TSM(object):
 
         phi = kwargs.get('start',phi).copy() # If user supplied
 
+        # Use the model's analytic gradient when it provides one
+        jac = self._objective_gradient(obj_type)
+
         # Optimize using L-BFGS-B
-        p = optimize.minimize(obj_type, phi, method='L-BFGS-B', options={'gtol': 1e-8})
+        p = optimize.minimize(obj_type, phi, method='L-BFGS-B', jac=jac, options={'gtol': 1e-8})
         if preoptimized is True:
             p2 = optimize.minimize(obj_type, self.latent_variables.get_z_starting_values(), method='L-BFGS-B', 
-                options={'gtol': 1e-8})
+                jac=jac, options={'gtol': 1e-8})
             if self.neg_loglik(p2.x) < self.neg_loglik(p.x):
                 p = p2
 
         theta, Y, scores, states, states_var, X_names = self._categorize_model_output(p.x)
 
         # Check that matrix is non-singular; act accordingly
-        try:
-            ihessian = np.linalg.inv(nd.Hessian(obj_type)(p.x))
-            ses = np.power(np.abs(np.diag(ihessian)),0.5)
-            self.latent_variables.set_z_values(p.x,method,ses,None)
+        ihessian = None
+        ses = None
+        if hessian is not None:
+            try:
+                H = find_hessian(self, obj_type, p.x, hessian)
+                if not np.all(np.isfinite(H)):
+                    raise ValueError("Hessian is not finite!")
+                ihessian = np.linalg.inv(H)
+                ses = np.power(np.abs(np.diag(ihessian)),0.5)
+            except (np.linalg.LinAlgError, ValueError):
+                ihessian = None
+                ses = None
 
-        except:
-            ihessian = None
-            ses = None
-            self.latent_variables.set_z_values(p.x,method,None,None)
+        self.latent_variables.set_z_values(p.x,method,ses,None)
 
         self.latent_variables.estimation_method = method
 
@@ -428,6 +508,13 @@ class TSM(object):
         learning_rate = kwargs.get('learning_rate', 0.001)
         record_elbo = kwargs.get('record_elbo', None)
         quiet_progress = kwargs.get('quiet_progress', False)
+        reparameterize = kwargs.get('reparameterize', False)
+        elbo_every = kwargs.get('elbo_every', 1)
+        chains = kwargs.get('chains', 1)
+        processes = kwargs.get('processes', None)
+        adaptive = kwargs.get('adaptive', False)
+        target_ess = kwargs.get('target_ess', None)
+        chain_file = kwargs.get('chain_file', None)
 
         if method is None:
             method = self.default_method
@@ -440,7 +527,8 @@ class TSM(object):
             return self._optimize_fit(self.neg_logposterior, **kwargs)   
         elif method == 'M-H':
             return self._mcmc_fit(nsims=nsims, method=method, cov_matrix=cov_matrix,
-                map_start=map_start, quiet_progress=quiet_progress)
+                map_start=map_start, quiet_progress=quiet_progress, chains=chains, processes=processes,
+                adaptive=adaptive, target_ess=target_ess, chain_file=chain_file)
         elif method == "Laplace":
             return self._laplace_fit(self.neg_logposterior) 
         elif method == "BBVI":
@@ -450,7 +538,8 @@ class TSM(object):
                 posterior = self.mb_neg_logposterior
             return self._bbvi_fit(posterior, optimizer=optimizer, iterations=iterations,
                 batch_size=batch_size, mini_batch=mini_batch, map_start=map_start, 
-                learning_rate=learning_rate, record_elbo=record_elbo, quiet_progress=quiet_progress)
+                learning_rate=learning_rate, record_elbo=record_elbo, quiet_progress=quiet_progress,
+                reparameterize=reparameterize, elbo_every=elbo_every)
         elif method == "OLS":
             return self._ols_fit()          
 
@@ -467,10 +556,89 @@ class TSM(object):
         Negative log posterior
         """
 
-        post = self.neg_loglik(beta)
+        return self.neg_loglik(beta) - self.latent_variables.log_prior_all(beta[:self.z_no])
+
+    def neg_logposterior_batch(self, Z):
+        """ Returns negative log posteriors for many latent variable vectors (for models with a neg_loglik_batch method)
+
+        Parameters
+        ----------
+        Z : np.array
+            (S, k) array of untransformed latent variables, one vector per row
+
+        Returns
+        ----------
+        np.array of S negative log posteriors
+        """
+
+        return self.neg_loglik_batch(Z) - self.latent_variables.log_prior_all(Z[:,:self.z_no])
+
+    def transform_batch(self, Z):
+        """ Transforms many untransformed latent variable vectors at once
+
+        Parameters
+        ----------
+        Z : np.array
+            (S, k) array of untransformed latent variables, one vector per row
+
+        Returns
+        ----------
+        (S, k) np.array of transformed latent variables
+        """
+
+        return self.latent_variables.transform_all(Z)
+
+    def neg_logposterior_gradient(self, beta):
+        """ Returns the gradient of the negative log posterior (for models with a neg_loglik_gradient method)
+
+        Parameters
+        ----------
+        beta : np.array
+            Contains untransformed starting values for latent variables
+
+        Returns
+        ----------
+        Gradient of the negative log posterior
+        """
+
+        grad = self.neg_loglik_gradient(beta)
         for k in range(0,self.z_no):
-            post += -self.latent_variables.z_list[k].prior.logpdf(beta[k])
-        return post
+            prior = self.latent_variables.z_list[k].prior
+            if isinstance(prior, Flat):
+                continue
+            elif isinstance(prior, Normal):
+                grad[k] += (prior.transform(beta[k])-prior.mu0)*prior.transform_derivative(beta[k])/float(prior.sigma0**2)
+            else:
+                grad[k] -= (prior.logpdf(beta[k]+1e-6) - prior.logpdf(beta[k]-1e-6))/2e-6
+        return grad
+
+    def neg_logposterior_gradient_batch(self, Z):
+        """ Returns the gradients of the negative log posterior for many latent variable vectors
+        (for models with a neg_loglik_gradient_batch method)
+
+        Parameters
+        ----------
+        Z : np.array
+            (S, k) array of untransformed latent variables, one vector per row
+
+        Returns
+        ----------
+        (S, k) array whose rows are the gradients of the negative log posterior
+        """
+
+        grad = self.neg_loglik_gradient_batch(Z)
+        for k in range(0,self.z_no):
+            prior = self.latent_variables.z_list[k].prior
+            if isinstance(prior, Flat):
+                continue
+            elif isinstance(prior, Normal):
+                grad[:,k] += (prior.transform(Z[:,k])-prior.mu0)*prior.transform_derivative(Z[:,k])/float(prior.sigma0**2)
+            else:
+                try:
+                    grad[:,k] -= (prior.logpdf(Z[:,k]+1e-6) - prior.logpdf(Z[:,k]-1e-6))/2e-6
+                except (TypeError, ValueError):
+                    grad[:,k] -= [(prior.logpdf(z+1e-6) - prior.logpdf(z-1e-6))/2e-6 for z in Z[:,k]]
+        return grad
 
     def mb_neg_logposterior(self, beta, mini_batch):
         """ Returns negative log posterior
@@ -488,10 +656,7 @@ class TSM(object):
         Negative log posterior
         """
 
-        post = (self.data.shape[0]/mini_batch)*self.mb_neg_loglik(beta, mini_batch)
-        for k in range(0,self.z_no):
-            post += -self.latent_variables.z_list[k].prior.logpdf(beta[k])
-        return post
+        return (self.data.shape[0]/mini_batch)*self.mb_neg_loglik(beta, mini_batch) - self.latent_variables.log_prior_all(beta[:self.z_no])
 
     def multivariate_neg_logposterior(self,beta):
         """ Returns negative log posterior, for a model with a covariance matrix 